@@ -1,23 +1,34 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+import ast
 import os
+import queue
 import subprocess
 import sys
 import tempfile
+import threading
 import time
 import zipfile
+from collections import deque
 from dataclasses import dataclass
+from multiprocessing import shared_memory
 from pathlib import Path
 from typing import Any
 
 import cv2
 import numpy as np
 
+from .algorithm_worker import WORKER_ENTRY_NAMES, read_frame, write_frame
+
 
 IMAGE_EXTS = {".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp"}
 VIDEO_EXTS = {".mp4", ".avi", ".mov", ".mkv", ".webm"}
 
+RUNNER_MODES = ("subprocess", "worker")
+WORKER_TRANSPORTS = ("shm", "pipe")
+WORKER_SCRIPT_PATH = Path(__file__).resolve().with_name("algorithm_worker.py")
+
 
 def _read_image_bgr(path: Path) -> np.ndarray | None:
     try:
@@ -55,20 +66,270 @@ def _read_first_frame_bgr(path: Path) -> np.ndarray | None:
     return frame
 
 
+def normalize_runner_mode(value: Any) -> str:
+    mode = str(value or "").strip().lower()
+    return mode if mode in RUNNER_MODES else "subprocess"
+
+
+def _detect_worker_entry(script_path: Path) -> str | None:
+    """静态检查脚本是否定义了顶层 process(image) 入口，不导入用户代码。"""
+    try:
+        tree = ast.parse(script_path.read_text(encoding="utf-8", errors="replace"))
+    except (OSError, SyntaxError, ValueError):
+        return None
+    names = {node.name for node in tree.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))}
+    for name in WORKER_ENTRY_NAMES:
+        if name in names:
+            return name
+    return None
+
+
+def normalize_worker_transport(value: Any) -> str:
+    transport = str(value or "").strip().lower()
+    return transport if transport in WORKER_TRANSPORTS else "shm"
+
+
+class _SharedFrameBuffers:
+    """父进程持有的输入 / 输出共享内存段；帧变大时按 1.5 倍扩容，减少频繁重建。"""
+
+    def __init__(self) -> None:
+        self._segments: dict[str, shared_memory.SharedMemory] = {}
+
+    def ensure(self, role: str, size: int) -> shared_memory.SharedMemory:
+        cur = self._segments.get(role)
+        if cur is not None and cur.size >= size:
+            return cur
+        new_size = max(int(size), int(cur.size * 1.5) if cur is not None else 0, 1)
+        seg = shared_memory.SharedMemory(create=True, size=new_size)
+        if cur is not None:
+            self._release(cur)
+        self._segments[role] = seg
+        return seg
+
+    @staticmethod
+    def _release(seg: shared_memory.SharedMemory) -> None:
+        try:
+            seg.close()
+        except BufferError:
+            pass
+        try:
+            seg.unlink()
+        except FileNotFoundError:
+            pass
+
+    def close(self) -> None:
+        for seg in self._segments.values():
+            self._release(seg)
+        self._segments.clear()
+
+
+class _WarmAlgorithmWorker:
+    """单个常驻子进程：启动时加载一次用户脚本，之后按帧协议逐样本收发图像。"""
+
+    def __init__(self, script_path: Path, *, timeout_s: float, startup_timeout_s: float, transport: str = "shm"):
+        self.script_path = script_path
+        self.timeout = timeout_s
+        self.transport = normalize_worker_transport(transport)
+        self._buffers = _SharedFrameBuffers()
+        self._out_hint = 0
+        # 最近一个样本实际使用的传输方式：shm 输出放不下或共享内存不可用时为 pipe
+        self.last_transport = ""
+        env = os.environ.copy()
+        env.setdefault("PYTHONIOENCODING", "utf-8")
+        self.command = [sys.executable, str(WORKER_SCRIPT_PATH), "--script", str(script_path)]
+        self._stderr_tail: deque[str] = deque(maxlen=200)
+        self._frames: queue.Queue = queue.Queue()
+        start = time.time()
+        self.proc = subprocess.Popen(
+            self.command,
+            cwd=str(script_path.parent),
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        threading.Thread(target=self._drain_stderr, name="abp_alg_worker_stderr", daemon=True).start()
+        threading.Thread(target=self._read_frames, name="abp_alg_worker_reader", daemon=True).start()
+        header, _ = self._wait_frame(startup_timeout_s, "algorithm_worker_startup_timeout")
+        if not header.get("ok"):
+            self.kill()
+            raise AlgorithmRuntimeError(str(header.get("error") or "algorithm_worker_import_failed"), self._failure_detail(header))
+        self.entry = str(header.get("entry") or "")
+        self.pid = int(header.get("pid") or self.proc.pid)
+        self.startup_s = time.time() - start
+
+    def _drain_stderr(self) -> None:
+        stream = self.proc.stderr
+        if stream is None:
+            return
+        with stream:
+            for raw in iter(stream.readline, b""):
+                self._stderr_tail.append(raw.decode("utf-8", errors="replace"))
+
+    def _read_frames(self) -> None:
+        stream = self.proc.stdout
+        try:
+            while stream is not None:
+                frame = read_frame(stream)
+                self._frames.put(frame)
+                if frame is None:
+                    return
+        except Exception:
+            self._frames.put(None)
+        finally:
+            if stream is not None:
+                stream.close()
+
+    def stderr_text(self) -> str:
+        return _short_text("".join(self._stderr_tail))
+
+    def _failure_detail(self, header: dict[str, Any] | None = None) -> dict[str, Any]:
+        header = header or {}
+        detail: dict[str, Any] = {
+            "script": str(self.script_path),
+            "command": " ".join(self.command),
+            "mode": "worker",
+            "returncode": self.proc.poll(),
+            "stderr": self.stderr_text(),
+        }
+        if header.get("message"):
+            detail["message"] = _short_text(str(header.get("message")))
+        if header.get("traceback"):
+            detail["traceback"] = _short_text(str(header.get("traceback")))
+        return detail
+
+    def _wait_frame(self, timeout_s: float, timeout_error: str) -> tuple[dict[str, Any], bytes]:
+        try:
+            frame = self._frames.get(timeout=timeout_s)
+        except queue.Empty:
+            self.kill()
+            detail = self._failure_detail()
+            detail["timeout_s"] = timeout_s
+            raise AlgorithmRuntimeError(timeout_error, detail) from None
+        if frame is None:
+            try:
+                self.proc.wait(timeout=1.0)
+            except subprocess.TimeoutExpired:
+                pass
+            raise AlgorithmRuntimeError("algorithm_worker_crashed", self._failure_detail())
+        return frame
+
+    def _send(self, header: dict[str, Any], payload: bytes | memoryview = b"") -> None:
+        try:
+            write_frame(self.proc.stdin, header, payload)
+        except (BrokenPipeError, OSError) as exc:
+            raise AlgorithmRuntimeError("algorithm_worker_crashed", self._failure_detail()) from exc
+
+    def _stage_shm(self, image: np.ndarray) -> dict[str, Any] | None:
+        """把输入写入共享内存并返回请求头；共享内存不可用时返回 None，改走管道。"""
+        try:
+            shm_in = self._buffers.ensure("in", image.nbytes)
+            shm_out = self._buffers.ensure("out", max(image.nbytes, self._out_hint))
+        except OSError:
+            self.transport = "pipe"
+            self._buffers.close()
+            return None
+        np.ndarray(image.shape, dtype=np.uint8, buffer=shm_in.buf)[...] = image
+        return {
+            "op": "process",
+            "transport": "shm",
+            "shape": list(image.shape),
+            "in_shm": shm_in.name,
+            "out_shm": shm_out.name,
+        }
+
+    def process(self, image_bgr_u8: np.ndarray) -> np.ndarray:
+        if self.proc.poll() is not None:
+            raise AlgorithmRuntimeError("algorithm_worker_crashed", self._failure_detail())
+        image = np.ascontiguousarray(image_bgr_u8)
+        request = self._stage_shm(image) if self.transport == "shm" else None
+        if request is not None:
+            self._send(request)
+        else:
+            self._send({"op": "process", "shape": list(image.shape)}, memoryview(image).cast("B"))
+        header, payload = self._wait_frame(self.timeout, "algorithm_script_timeout")
+        if not header.get("ok"):
+            raise AlgorithmRuntimeError(str(header.get("error") or "algorithm_script_failed"), self._failure_detail(header))
+        shape = tuple(int(x) for x in header.get("shape") or ())
+        self.last_transport = "shm" if header.get("transport") == "shm" else "pipe"
+        if header.get("transport") == "shm":
+            # 输出段会被下一个样本复用，这里复制一份交给指标计算
+            return np.ndarray(shape, dtype=np.uint8, buffer=self._buffers.ensure("out", 0).buf).copy()
+        if request is not None:
+            self._out_hint = len(payload)
+        return np.frombuffer(payload, dtype=np.uint8).reshape(shape)
+
+    def kill(self) -> None:
+        if self.proc.poll() is None:
+            self.proc.kill()
+        try:
+            self.proc.wait(timeout=5.0)
+        except subprocess.TimeoutExpired:
+            pass
+        if self.proc.stdin is not None and not self.proc.stdin.closed:
+            try:
+                self.proc.stdin.close()
+            except OSError:
+                pass
+        self._buffers.close()
+
+    def close(self) -> None:
+        if self.proc.poll() is None:
+            try:
+                write_frame(self.proc.stdin, {"op": "close"})
+                self.proc.stdin.close()
+                self.proc.wait(timeout=3.0)
+            except Exception:
+                pass
+        self.kill()
+        self._buffers.close()
+
+
+def _as_bgr_u8(image: np.ndarray) -> np.ndarray:
+    if image.ndim == 2:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    if image.ndim == 3 and image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+    if image.ndim == 3 and image.shape[2] == 1:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    return image
+
+
 class UserAlgorithmImageRunner:
-    def __init__(self, algorithm: dict[str, Any], *, timeout_s: float = 30.0):
+    def __init__(
+        self,
+        algorithm: dict[str, Any],
+        *,
+        timeout_s: float = 30.0,
+        mode: str = "subprocess",
+        startup_timeout_s: float | None = None,
+        transport: str = "shm",
+    ):
         self.algorithm = algorithm if isinstance(algorithm, dict) else {}
         self.archive_path = _resolve_archive_path(self.algorithm)
         self.timeout = max(1.0, float(timeout_s or 30.0))
+        self.startup_timeout = max(self.timeout, float(startup_timeout_s or 60.0))
         self._tmp_ctx = tempfile.TemporaryDirectory(prefix="abp_alg_")
         self._tmp_dir = Path(self._tmp_ctx.name)
         self.script_path = _prepare_script(self.archive_path, self._tmp_dir)
         self._sample_index = 0
         self._closed = False
+        self.requested_mode = normalize_runner_mode(mode)
+        self.mode = self.requested_mode
+        self.mode_fallback = ""
+        self.transport = normalize_worker_transport(transport)
+        self._worker: _WarmAlgorithmWorker | None = None
+        if self.mode == "worker" and _detect_worker_entry(self.script_path) is None:
+            # 旧脚本只支持 --input/--output 协议，自动退回逐样本子进程
+            self.mode = "subprocess"
+            self.mode_fallback = "worker_entry_missing"
 
     def close(self) -> None:
         if self._closed:
             return
+        if self._worker is not None:
+            self._worker.close()
+            self._worker = None
         self._tmp_ctx.cleanup()
         self._closed = True
 
@@ -89,6 +350,8 @@ class UserAlgorithmImageRunner:
             raise AlgorithmRuntimeError("algorithm_input_image_invalid", {"sample_name": sample_name})
 
         self._sample_index += 1
+        if self.mode == "worker":
+            return self._run_worker(input_bgr_u8, sample_name=sample_name)
         sample_dir = self._tmp_dir / "samples" / f"sample_{self._sample_index:04d}"
         sample_dir.mkdir(parents=True, exist_ok=True)
         input_path = sample_dir / "input.png"
@@ -146,8 +409,54 @@ class UserAlgorithmImageRunner:
         detail["output_path"] = str(resolved_output)
         if pred is None or pred.size == 0:
             raise AlgorithmRuntimeError("algorithm_output_unreadable", detail)
+        if self.mode_fallback:
+            detail["mode_fallback"] = self.mode_fallback
         return AlgorithmRuntimeResult(image_bgr_u8=pred, detail=detail)
 
+    def _run_worker(self, input_bgr_u8: np.ndarray, *, sample_name: str) -> AlgorithmRuntimeResult:
+        try:
+            if self._worker is None:
+                self._worker = _WarmAlgorithmWorker(
+                    self.script_path,
+                    timeout_s=self.timeout,
+                    startup_timeout_s=self.startup_timeout,
+                    transport=self.transport,
+                )
+            start = time.time()
+            pred = self._worker.process(input_bgr_u8)
+        except AlgorithmRuntimeError as exc:
+            exc.detail.update(
+                {
+                    "archive_path": str(self.archive_path),
+                    "sample_name": sample_name,
+                    "sample_index": self._sample_index,
+                }
+            )
+            if exc.message in {"algorithm_script_timeout", "algorithm_worker_crashed", "algorithm_worker_startup_timeout"} and self._worker is not None:
+                self._worker.kill()
+                self._worker = None
+            raise
+        elapsed = time.time() - start
+        detail = {
+            "archive_path": str(self.archive_path),
+            "script": str(self.script_path),
+            "command": " ".join(self._worker.command),
+            "returncode": 0,
+            "elapsed_s": round(float(elapsed), 6),
+            "stdout": "",
+            "stderr": self._worker.stderr_text(),
+            "sample_name": sample_name,
+            "sample_index": self._sample_index,
+            "mode": "worker",
+            "worker_pid": self._worker.pid,
+            "worker_entry": self._worker.entry,
+            "worker_startup_s": round(float(self._worker.startup_s), 6),
+            "transport": self._worker.last_transport,
+        }
+        if pred is None or pred.size == 0:
+            raise AlgorithmRuntimeError("algorithm_output_unreadable", detail)
+        return AlgorithmRuntimeResult(image_bgr_u8=_as_bgr_u8(pred), detail=detail)
+
 
 class UserAlgorithmVideoRunner:
     def __init__(self, algorithm: dict[str, Any], *, timeout_s: float = 60.0):
@@ -371,6 +680,7 @@ def execute_user_algorithm_image(
     *,
     timeout_s: float = 30.0,
     sample_name: str = "",
+    mode: str = "subprocess",
 ) -> AlgorithmRuntimeResult:
-    with UserAlgorithmImageRunner(algorithm, timeout_s=timeout_s) as runner:
+    with UserAlgorithmImageRunner(algorithm, timeout_s=timeout_s, mode=mode) as runner:
         return runner.run(input_bgr_u8, sample_name=sample_name)
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+用户算法常驻 worker：由 algorithm_runtime 以独立进程启动，只依赖标准库与 numpy。
+子进程加载一次用户脚本中的 process(image) 入口，之后通过 stdin/stdout 帧协议逐样本处理，
+避免每个样本都重新启动解释器、导入依赖和加载模型。
+
+帧格式：4 字节魔数 + <II>(header_len, payload_len) + UTF-8 JSON header + 原始负载。
+transport=shm 时图像不走管道：输入 / 输出都放在父进程创建的 multiprocessing.shared_memory 段中，
+header 只携带段名与 shape；输出超出输出段容量时退回管道负载，由父进程扩容后续样本的输出段。
+"""
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import os
+import struct
+import sys
+import traceback
+from pathlib import Path
+from typing import Any, BinaryIO
+
+FRAME_MAGIC = b"ABPW"
+_FRAME_HEAD = struct.Struct("<4sII")
+WORKER_ENTRY_NAMES = ("process", "process_image")
+
+
+def write_frame(stream: BinaryIO, header: dict[str, Any], payload: bytes | memoryview = b"") -> None:
+    head = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    stream.write(_FRAME_HEAD.pack(FRAME_MAGIC, len(head), len(payload)))
+    stream.write(head)
+    if len(payload):
+        stream.write(payload)
+    stream.flush()
+
+
+def _read_exact(stream: BinaryIO, size: int) -> bytes | None:
+    chunks: list[bytes] = []
+    remain = size
+    while remain > 0:
+        chunk = stream.read(remain)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        remain -= len(chunk)
+    return b"".join(chunks)
+
+
+def read_frame(stream: BinaryIO) -> tuple[dict[str, Any], bytes] | None:
+    """读取一帧；对端关闭时返回 None，魔数不符视为协议错误。"""
+    raw = _read_exact(stream, _FRAME_HEAD.size)
+    if raw is None:
+        return None
+    magic, head_len, payload_len = _FRAME_HEAD.unpack(raw)
+    if magic != FRAME_MAGIC:
+        raise ValueError("algorithm_worker_protocol_error")
+    head = _read_exact(stream, head_len) if head_len else b"{}"
+    payload = _read_exact(stream, payload_len) if payload_len else b""
+    if head is None or payload is None:
+        return None
+    header = json.loads(head.decode("utf-8"))
+    return (header if isinstance(header, dict) else {}), payload
+
+
+def _load_entry(script_path: Path) -> tuple[str, Any]:
+    script_dir = str(script_path.parent)
+    if script_dir not in sys.path:
+        sys.path.insert(0, script_dir)
+    spec = importlib.util.spec_from_file_location("abp_user_algorithm", str(script_path))
+    if spec is None or spec.loader is None:
+        raise ImportError(f"cannot load {script_path}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    for name in WORKER_ENTRY_NAMES:
+        fn = getattr(module, name, None)
+        if callable(fn):
+            return name, fn
+    raise AttributeError("algorithm_worker_entry_missing")
+
+
+def attach_shared_memory(name: str) -> Any:
+    """附着到父进程创建的共享内存；子进程不参与生命周期管理，避免退出时被 resource_tracker 误删。"""
+    from multiprocessing import shared_memory
+
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # type: ignore[call-arg]
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            from multiprocessing import resource_tracker
+
+            resource_tracker.unregister(getattr(shm, "_name", "/" + name), "shared_memory")
+        return shm
+
+
+class _ShmSlots:
+    """按角色（in / out）缓存共享内存附着，段名变化时释放旧段。"""
+
+    def __init__(self) -> None:
+        self._slots: dict[str, Any] = {}
+
+    def get(self, role: str, name: str) -> Any:
+        cur = self._slots.get(role)
+        if cur is not None and cur.name.lstrip("/") == name.lstrip("/"):
+            return cur
+        if cur is not None:
+            try:
+                cur.close()
+            except BufferError:
+                pass
+        cur = attach_shared_memory(name)
+        self._slots[role] = cur
+        return cur
+
+    def close(self) -> None:
+        for shm in self._slots.values():
+            try:
+                shm.close()
+            except BufferError:
+                pass
+        self._slots.clear()
+
+
+def _to_u8_image(result: Any) -> Any:
+    import numpy as np
+
+    arr = np.asarray(result)
+    if arr.dtype != np.uint8:
+        arr = np.clip(np.rint(arr.astype(np.float64)), 0, 255).astype(np.uint8)
+    return np.ascontiguousarray(arr)
+
+
+def _serve(proto_in: BinaryIO, proto_out: BinaryIO, fn: Any) -> None:
+    slots = _ShmSlots()
+    try:
+        _serve_frames(proto_in, proto_out, fn, slots)
+    finally:
+        slots.close()
+
+
+def _process_frame(header: dict[str, Any], payload: bytes, fn: Any, slots: _ShmSlots) -> tuple[dict[str, Any], Any]:
+    import numpy as np
+
+    shape = tuple(int(x) for x in header.get("shape") or ())
+    if header.get("transport") != "shm":
+        image = np.frombuffer(payload, dtype=np.uint8).reshape(shape).copy()
+        out = _to_u8_image(fn(image))
+        return {"ok": True, "shape": list(out.shape)}, memoryview(out).cast("B")
+
+    shm_in = slots.get("in", str(header.get("in_shm") or ""))
+    image = np.ndarray(shape, dtype=np.uint8, buffer=shm_in.buf)
+    try:
+        out = _to_u8_image(fn(image))
+    finally:
+        del image
+    shm_out = slots.get("out", str(header.get("out_shm") or ""))
+    if out.nbytes <= shm_out.size:
+        view = np.ndarray(out.shape, dtype=np.uint8, buffer=shm_out.buf)
+        np.copyto(view, out)
+        del view
+        return {"ok": True, "shape": list(out.shape), "transport": "shm"}, b""
+    return {"ok": True, "shape": list(out.shape), "transport": "pipe"}, memoryview(out).cast("B")
+
+
+def _serve_frames(proto_in: BinaryIO, proto_out: BinaryIO, fn: Any, slots: _ShmSlots) -> None:
+    while True:
+        frame = read_frame(proto_in)
+        if frame is None:
+            return
+        header, payload = frame
+        op = str(header.get("op") or "")
+        if op == "close":
+            return
+        if op != "process":
+            write_frame(proto_out, {"ok": False, "error": "algorithm_worker_bad_op", "op": op})
+            continue
+        try:
+            reply, body = _process_frame(header, payload, fn, slots)
+            write_frame(proto_out, reply, body)
+        except Exception as exc:
+            write_frame(
+                proto_out,
+                {
+                    "ok": False,
+                    "error": "algorithm_script_failed",
+                    "message": f"{type(exc).__name__}: {exc}",
+                    "traceback": traceback.format_exc(),
+                },
+            )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="algorithm benchmark warm worker")
+    parser.add_argument("--script", required=True)
+    args = parser.parse_args()
+
+    # 协议独占原始 stdout；用户代码的 print 全部改写到 stderr，避免破坏帧边界
+    proto_out = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+    proto_in = sys.stdin.buffer
+    sys.stdin = open(os.devnull, "r", encoding="utf-8")
+
+    try:
+        entry_name, fn = _load_entry(Path(args.script).resolve())
+    except Exception as exc:
+        write_frame(
+            proto_out,
+            {
+                "ok": False,
+                "error": "algorithm_worker_entry_missing" if str(exc) == "algorithm_worker_entry_missing" else "algorithm_worker_import_failed",
+                "message": f"{type(exc).__name__}: {exc}",
+                "traceback": traceback.format_exc(),
+            },
+        )
+        return 2
+    write_frame(proto_out, {"ok": True, "op": "ready", "entry": entry_name, "pid": os.getpid()})
+    _serve(proto_in, proto_out, fn)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
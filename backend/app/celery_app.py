@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import os
+
 from celery import Celery
 
-CELERY_BROKER_URL = "redis://127.0.0.1:6379/0"
-CELERY_RESULT_BACKEND = "redis://127.0.0.1:6379/0"
+from .redis_pool import get_redis_url
+
+# 默认与 store 使用同一个 Redis（ABP_REDIS_URL），也可单独指定
+CELERY_BROKER_URL = (os.getenv("ABP_CELERY_BROKER_URL") or "").strip() or get_redis_url()
+CELERY_RESULT_BACKEND = (os.getenv("ABP_CELERY_RESULT_BACKEND") or "").strip() or CELERY_BROKER_URL
 
 celery_app = Celery(
     "backend",
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+分块断点续传上传：init → 逐块 PUT（可乱序、可重传、可并发）→ complete 校验 sha256，
+校验通过的文件再交给数据集 zip 导入 / 算法接入申请等既有逻辑。
+
+会话放在 data/_uploads/<upload_id>/：meta.json 只在创建时写一次，数据写入预分配的 data.part，
+每收到一块写一个 chunks/<序号> 标记文件，因此并发上传不同块时无需对 meta 做读改写。
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from . import errors as err
+
+UPLOAD_DIRNAME = "_uploads"
+UPLOAD_CHUNK_BYTES_ENV = "ABP_UPLOAD_CHUNK_BYTES"
+UPLOAD_TTL_ENV = "ABP_UPLOAD_TTL_S"
+UPLOAD_MAX_BYTES_ENV = "ABP_UPLOAD_MAX_BYTES"
+DEFAULT_UPLOAD_CHUNK_BYTES = 8 << 20
+MIN_UPLOAD_CHUNK_BYTES = 256 << 10
+MAX_UPLOAD_CHUNK_BYTES = 64 << 20
+DEFAULT_UPLOAD_TTL_S = 24 * 3600
+DEFAULT_UPLOAD_MAX_BYTES = 50 << 30
+COPY_CHUNK_BYTES = 1 << 20
+
+PURPOSE_DATASET_ZIP = "dataset_zip"
+PURPOSE_ALGORITHM_ARCHIVE = "algorithm_archive"
+# 算法包沿用 base64 接口原有的 20MB 上限
+PURPOSE_MAX_BYTES = {PURPOSE_ALGORITHM_ARCHIVE: 20 * 1024 * 1024}
+
+_UPLOAD_ID_RE = re.compile(r"^up_[0-9a-f]{20}$")
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+def default_upload_root() -> Path:
+    return Path(__file__).resolve().parents[1] / "data" / UPLOAD_DIRNAME
+
+
+def _session_dir(root: Path, upload_id: str) -> Path:
+    if not _UPLOAD_ID_RE.match(str(upload_id or "")):
+        err.api_error(404, err.E_HTTP, "upload_not_found", upload_id=upload_id)
+    return Path(root) / upload_id
+
+
+def upload_data_path(root: Path, upload_id: str) -> Path:
+    return _session_dir(root, upload_id) / "data.part"
+
+
+def _normalize_sha256(value: str | None) -> str:
+    digest = str(value or "").strip().lower()
+    if digest and not _SHA256_RE.match(digest):
+        err.api_error(400, err.E_HTTP, "upload_sha256_invalid")
+    return digest
+
+
+def _chunk_count(meta: dict[str, Any]) -> int:
+    total = int(meta["total_size"])
+    size = int(meta["chunk_size"])
+    return max(1, (total + size - 1) // size)
+
+
+def _received(sdir: Path) -> list[int]:
+    try:
+        return sorted(int(p.name) for p in (sdir / "chunks").iterdir() if p.name.isdigit())
+    except FileNotFoundError:
+        return []
+
+
+def purge_stale_uploads(root: Path, ttl_s: float | None = None) -> int:
+    """删除超过 TTL 未更新的会话（以会话目录 mtime 为准，每收到一块都会刷新）。"""
+    ttl = float(_env_int(UPLOAD_TTL_ENV, DEFAULT_UPLOAD_TTL_S) if ttl_s is None else ttl_s)
+    cutoff = time.time() - ttl
+    removed = 0
+    try:
+        entries = list(Path(root).iterdir())
+    except FileNotFoundError:
+        return 0
+    for sdir in entries:
+        if not _UPLOAD_ID_RE.match(sdir.name):
+            continue
+        try:
+            if sdir.stat().st_mtime < cutoff:
+                shutil.rmtree(sdir, ignore_errors=True)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+def init_upload(
+    root: Path,
+    *,
+    owner_id: str,
+    purpose: str,
+    filename: str,
+    total_size: int,
+    sha256: str,
+    chunk_size: int | None = None,
+) -> dict[str, Any]:
+    if purpose not in (PURPOSE_DATASET_ZIP, PURPOSE_ALGORITHM_ARCHIVE):
+        err.api_error(400, err.E_HTTP, "upload_purpose_invalid", purpose=purpose)
+    safe_name = Path(str(filename or "").strip()).name
+    if not safe_name:
+        err.api_error(400, err.E_HTTP, "upload_filename_required")
+    total = int(total_size)
+    max_bytes = PURPOSE_MAX_BYTES.get(purpose) or _env_int(UPLOAD_MAX_BYTES_ENV, DEFAULT_UPLOAD_MAX_BYTES)
+    if total <= 0:
+        err.api_error(400, err.E_HTTP, "upload_empty")
+    if total > max_bytes:
+        err.api_error(400, err.E_HTTP, "upload_too_large", max_bytes=max_bytes)
+    expected_sha = _normalize_sha256(sha256)
+    if not expected_sha:
+        err.api_error(400, err.E_HTTP, "upload_sha256_required")
+    size = int(chunk_size or _env_int(UPLOAD_CHUNK_BYTES_ENV, DEFAULT_UPLOAD_CHUNK_BYTES))
+    size = max(MIN_UPLOAD_CHUNK_BYTES, min(MAX_UPLOAD_CHUNK_BYTES, size))
+    root = Path(root)
+    purge_stale_uploads(root)
+    upload_id = f"up_{uuid.uuid4().hex[:20]}"
+    sdir = root / upload_id
+    (sdir / "chunks").mkdir(parents=True)
+    with open(sdir / "data.part", "wb") as f:
+        # 预分配（稀疏文件），各块按偏移直接写入
+        f.truncate(total)
+    meta = {
+        "upload_id": upload_id,
+        "owner_id": str(owner_id or ""),
+        "purpose": purpose,
+        "filename": safe_name,
+        "total_size": total,
+        "chunk_size": size,
+        "sha256": expected_sha,
+        "created_at": time.time(),
+    }
+    (sdir / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    return upload_status(root, meta)
+
+
+def load_upload(root: Path, upload_id: str, *, owner_id: str | None = None) -> dict[str, Any]:
+    """读取会话；不存在或不属于 owner_id 时一律 404。"""
+    sdir = _session_dir(root, upload_id)
+    try:
+        meta = json.loads((sdir / "meta.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        err.api_error(404, err.E_HTTP, "upload_not_found", upload_id=upload_id)
+    if owner_id is not None and str(meta.get("owner_id") or "") != str(owner_id):
+        err.api_error(404, err.E_HTTP, "upload_not_found", upload_id=upload_id)
+    return meta
+
+
+def upload_status(root: Path, meta: dict[str, Any]) -> dict[str, Any]:
+    sdir = _session_dir(root, meta["upload_id"])
+    received = _received(sdir)
+    total_chunks = _chunk_count(meta)
+    have = set(received)
+    return {
+        "upload_id": meta["upload_id"],
+        "purpose": meta["purpose"],
+        "filename": meta["filename"],
+        "total_size": int(meta["total_size"]),
+        "chunk_size": int(meta["chunk_size"]),
+        "total_chunks": total_chunks,
+        "received": received,
+        "missing": [i for i in range(total_chunks) if i not in have],
+        "sha256": meta.get("sha256") or "",
+        "completed": (sdir / "complete").exists(),
+    }
+
+
+def write_chunk(root: Path, meta: dict[str, Any], index: int, src: BinaryIO, *, sha256: str = "") -> dict[str, Any]:
+    """把第 index 块写到 data.part 的对应偏移；重传同一块直接覆盖。sha256 非空时校验该块内容。"""
+    sdir = _session_dir(root, meta["upload_id"])
+    total = int(meta["total_size"])
+    size = int(meta["chunk_size"])
+    index = int(index)
+    if index < 0 or index >= _chunk_count(meta):
+        err.api_error(400, err.E_HTTP, "upload_chunk_out_of_range", index=index)
+    if (sdir / "complete").exists():
+        err.api_error(409, err.E_HTTP, "upload_already_completed", upload_id=meta["upload_id"])
+    expected_len = min(size, total - index * size)
+    expected_sha = _normalize_sha256(sha256)
+    hasher = hashlib.sha256()
+    written = 0
+    with open(sdir / "data.part", "r+b") as out:
+        out.seek(index * size)
+        while True:
+            buf = src.read(COPY_CHUNK_BYTES)
+            if not buf:
+                break
+            written += len(buf)
+            if written > expected_len:
+                break
+            hasher.update(buf)
+            out.write(buf)
+    marker = sdir / "chunks" / str(index)
+    if written != expected_len:
+        marker.unlink(missing_ok=True)
+        err.api_error(400, err.E_HTTP, "upload_chunk_size_mismatch", index=index, expected=expected_len)
+    if expected_sha and hasher.hexdigest() != expected_sha:
+        marker.unlink(missing_ok=True)
+        err.api_error(400, err.E_HTTP, "upload_chunk_hash_mismatch", index=index)
+    marker.touch()
+    # 刷新会话目录 mtime，供 TTL 清理判断
+    os.utime(sdir)
+    return {"upload_id": meta["upload_id"], "index": index, "size": written}
+
+
+def complete_upload(root: Path, meta: dict[str, Any]) -> dict[str, Any]:
+    """全部块到齐后计算整体 sha256，与 init 时声明的值比对；不一致（或会话未声明）时清空已收块，需整体重传。"""
+    sdir = _session_dir(root, meta["upload_id"])
+    status = upload_status(root, meta)
+    if status["completed"]:
+        return status
+    if status["missing"]:
+        err.api_error(409, err.E_HTTP, "upload_incomplete", missing=status["missing"][:100])
+    hasher = hashlib.sha256()
+    with open(sdir / "data.part", "rb") as f:
+        for buf in iter(lambda: f.read(COPY_CHUNK_BYTES), b""):
+            hasher.update(buf)
+    digest = hasher.hexdigest()
+    expected = meta.get("sha256") or ""
+    if digest != expected:
+        shutil.rmtree(sdir / "chunks", ignore_errors=True)
+        (sdir / "chunks").mkdir(exist_ok=True)
+        err.api_error(400, err.E_HTTP, "upload_hash_mismatch", expected=expected, actual=digest)
+    (sdir / "complete").write_text(digest, encoding="utf-8")
+    return {**status, "sha256": digest, "completed": True}
+
+
+def completed_upload_path(root: Path, meta: dict[str, Any], purpose: str) -> Path:
+    """交接给下游前的检查：用途一致且已 complete。"""
+    sdir = _session_dir(root, meta["upload_id"])
+    if meta.get("purpose") != purpose:
+        err.api_error(400, err.E_HTTP, "upload_purpose_mismatch", expected=purpose, actual=meta.get("purpose"))
+    if not (sdir / "complete").exists():
+        err.api_error(409, err.E_HTTP, "upload_not_completed", upload_id=meta["upload_id"])
+    return sdir / "data.part"
+
+
+def discard_upload(root: Path, upload_id: str) -> bool:
+    sdir = _session_dir(root, upload_id)
+    if not sdir.exists():
+        return False
+    shutil.rmtree(sdir, ignore_errors=True)
+    return True
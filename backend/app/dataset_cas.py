@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+数据集内容寻址存储：文件按 sha256 存为 data/_cas/blobs/<前两位>/<sha256>，
+社区数据集“下载到我的库”时副本目录中的文件直接硬链接到 blob，不再整目录复制。
+
+引用计数就是 inode 的链接数：blob 的 st_nlink - 1 即引用它的数据集文件数。
+数据集目录删除后调用 release_tree，按该目录的清单逐个检查，只剩仓库自身一个链接的 blob 被回收。
+目录改名后调用 rename_tree 把清单挂到新路径；gc_blobs 全量扫描兜底回收漏掉的 blob。
+数据集文件在本仓库中只会被整目录替换（zip 导入走暂存目录 + os.replace），不会原地改写，因此共享 inode 是安全的。
+
+每个目录的清单 data/_cas/manifests/<目录路径摘要>.json 记录 {相对路径: [size, mtime_ns, inode, sha256]}，
+同时充当哈希缓存：源数据集首次被下载时计算一遍 sha256，之后再下载只需 stat + link。
+"""
+from __future__ import annotations
+
+import errno
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Any
+
+CAS_DIRNAME = "_cas"
+DEDUP_ENV = "ABP_DATASET_DEDUP"
+HASH_CHUNK_BYTES = 1 << 20
+
+# 这些错误说明当前文件系统 / 位置不能建硬链接，退回普通复制
+_LINK_FALLBACK_ERRNOS = {errno.EXDEV, errno.EMLINK, errno.EPERM, errno.EACCES, errno.ENOTSUP, errno.EOPNOTSUPP}
+
+
+def dedup_enabled() -> bool:
+    return str(os.getenv(DEDUP_ENV, "1") or "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def default_cas_root() -> Path:
+    return Path(__file__).resolve().parents[1] / "data" / CAS_DIRNAME
+
+
+def blob_path(cas_root: Path, sha256: str) -> Path:
+    return Path(cas_root) / "blobs" / sha256[:2] / sha256
+
+
+def manifest_path(ds_dir: Path, cas_root: Path | None = None) -> Path:
+    digest = hashlib.sha1(str(Path(ds_dir).resolve()).encode("utf-8")).hexdigest()[:24]
+    return Path(cas_root or default_cas_root()) / "manifests" / f"{digest}.json"
+
+
+def _load_manifest(ds_dir: Path, cas_root: Path) -> dict[str, list[Any]]:
+    try:
+        data = json.loads(manifest_path(ds_dir, cas_root).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    files = data.get("files") if isinstance(data, dict) else None
+    return files if isinstance(files, dict) else {}
+
+
+def _save_manifest(ds_dir: Path, cas_root: Path, files: dict[str, list[Any]]) -> None:
+    path = manifest_path(ds_dir, cas_root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp.write_text(json.dumps({"ds_dir": str(Path(ds_dir).resolve()), "files": files}, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _sha256_file(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for buf in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            hasher.update(buf)
+    return hasher.hexdigest()
+
+
+def _link_or_copy(src: Path, dst: Path) -> bool:
+    """优先硬链接，返回是否链接成功；文件系统不支持时复制。"""
+    try:
+        os.link(src, dst)
+        return True
+    except OSError as exc:
+        if exc.errno not in _LINK_FALLBACK_ERRNOS:
+            raise
+    shutil.copy2(src, dst)
+    return False
+
+
+def _ensure_blob(cas_root: Path, sha256: str, src: Path) -> Path:
+    blob = blob_path(cas_root, sha256)
+    if blob.exists():
+        return blob
+    blob.parent.mkdir(parents=True, exist_ok=True)
+    tmp = blob.with_name(f".{sha256}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        # 源文件本身成为 blob 的一个链接，入库不复制数据
+        _link_or_copy(src, tmp)
+        try:
+            os.link(tmp, blob)
+        except FileExistsError:
+            # 并发入库同一内容，保留先到的那份
+            pass
+    finally:
+        tmp.unlink(missing_ok=True)
+    return blob
+
+
+def ingest_tree(src_dir: Path, *, cas_root: Path | None = None) -> dict[str, list[Any]]:
+    """把目录中的文件登记进仓库，返回并保存该目录的清单；未变化的文件沿用清单中的 sha256。"""
+    src_dir = Path(src_dir)
+    root = Path(cas_root or default_cas_root())
+    prev = _load_manifest(src_dir, root)
+    files: dict[str, list[Any]] = {}
+    for path in sorted(src_dir.rglob("*")):
+        try:
+            if path.is_symlink() or not path.is_file():
+                continue
+            st = path.stat()
+        except OSError:
+            continue
+        rel = path.relative_to(src_dir).as_posix()
+        key = [int(st.st_size), int(st.st_mtime_ns), int(st.st_ino)]
+        cached = prev.get(rel)
+        sha256 = cached[3] if isinstance(cached, list) and len(cached) == 4 and cached[:3] == key else _sha256_file(path)
+        _ensure_blob(root, sha256, path)
+        files[rel] = [*key, sha256]
+    if files != prev:
+        _save_manifest(src_dir, root, files)
+    return files
+
+
+def dedup_copy_tree(src_dir: Path, dst_dir: Path, *, cas_root: Path | None = None) -> dict[str, int]:
+    """
+    以硬链接方式把 src_dir 复制为 dst_dir（dst_dir 不能已存在）。先在同级暂存目录中建好，再整体改名到位。
+    返回 {"files", "linked", "copied"}。
+    """
+    src_dir = Path(src_dir)
+    dst_dir = Path(dst_dir)
+    root = Path(cas_root or default_cas_root())
+    files = ingest_tree(src_dir, cas_root=root)
+    dst_dir.parent.mkdir(parents=True, exist_ok=True)
+    stage = dst_dir.parent / f".{dst_dir.name}.cas-{uuid.uuid4().hex[:12]}"
+    linked = 0
+    out: dict[str, list[Any]] = {}
+    try:
+        stage.mkdir()
+        for rel, (_size, _mtime_ns, _ino, sha256) in files.items():
+            target = stage / rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                linked += int(_link_or_copy(blob_path(root, sha256), target))
+            except FileNotFoundError:
+                # blob 恰好被并发的 release_tree 回收，从源文件重新入库
+                linked += int(_link_or_copy(_ensure_blob(root, sha256, src_dir / rel), target))
+            st = target.stat()
+            out[rel] = [int(st.st_size), int(st.st_mtime_ns), int(st.st_ino), sha256]
+        os.replace(stage, dst_dir)
+    finally:
+        shutil.rmtree(stage, ignore_errors=True)
+    _save_manifest(dst_dir, root, out)
+    return {"files": len(files), "linked": linked, "copied": len(files) - linked}
+
+
+def _collect_unlinked(root: Path, hashes: set[str]) -> int:
+    removed = 0
+    for sha256 in hashes:
+        blob = blob_path(root, sha256)
+        try:
+            if blob.stat().st_nlink <= 1:
+                blob.unlink()
+                removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
+
+
+def _manifest_hashes(files: dict[str, list[Any]]) -> set[str]:
+    return {entry[3] for entry in files.values() if isinstance(entry, list) and len(entry) == 4}
+
+
+def release_tree(ds_dir: Path, *, cas_root: Path | None = None) -> int:
+    """
+    数据集目录被删除 / 替换后调用：删除该路径的清单，并回收清单中已无其他链接的 blob。返回回收数量。
+    目录改名用 rename_tree，否则新路径没有清单，之后删除时 blob 无法回收。
+    """
+    root = Path(cas_root or default_cas_root())
+    files = _load_manifest(ds_dir, root)
+    manifest_path(ds_dir, root).unlink(missing_ok=True)
+    return _collect_unlinked(root, _manifest_hashes(files))
+
+
+def rename_tree(old_dir: Path, new_dir: Path, *, cas_root: Path | None = None) -> int:
+    """
+    数据集目录已从 old_dir 移到 new_dir 后调用：清单改挂到新路径。
+    同一文件系统内改名 inode 不变，链接关系保持；跨文件系统移动时文件被复制，旧链接断开的 blob 在此回收。返回回收数量。
+    """
+    root = Path(cas_root or default_cas_root())
+    files = _load_manifest(old_dir, root)
+    if not files:
+        return 0
+    _save_manifest(new_dir, root, files)
+    manifest_path(old_dir, root).unlink(missing_ok=True)
+    return _collect_unlinked(root, _manifest_hashes(files))
+
+
+def gc_blobs(*, cas_root: Path | None = None) -> int:
+    """全量扫描仓库，回收只剩自身一个链接（已无数据集文件引用）的 blob，返回回收数量。"""
+    root = Path(cas_root or default_cas_root())
+    blobs_dir = root / "blobs"
+    if not blobs_dir.is_dir():
+        return 0
+    hashes = {p.name for p in blobs_dir.glob("*/*") if not p.name.startswith(".")}
+    return _collect_unlinked(root, hashes)
@@ -0,0 +1,476 @@
+# -*- coding: utf-8 -*-
+"""
+数据集 zip 导出：已压缩的媒体（PNG/JPG/MP4 等）直接 STORED，其余文件由线程池提前并行 deflate，
+按文件顺序流式输出合法的 zip64 包。
+
+每个条目都用“本地头不含 CRC/大小 + 数据描述符”的写法，本地头只依赖文件名、mtime 与压缩方式，
+再加上 zlib 输出对相同输入是确定的，同一份数据集每次导出的字节完全一致。
+首次完整导出时把各条目的 CRC / 压缩后大小记为布局索引，之后即可给出 Content-Length 并支持 Range 断点续传；
+ETag 只由文件列表（名称、大小、mtime）决定，无需读取文件内容。
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator
+
+EXPORT_WORKERS_ENV = "ABP_ZIP_EXPORT_WORKERS"
+DEFAULT_EXPORT_WORKERS = 4
+MAX_EXPORT_WORKERS = 16
+EXPORT_INDEX_VERSION = 1
+EXPORT_INDEX_DIRNAME = "_export_index"
+READ_CHUNK_BYTES = 1 << 20
+# 并行压缩结果先放内存，超过该大小落到临时文件
+SPOOL_MAX_BYTES = 16 << 20
+DEFLATE_LEVEL = 6
+
+# 再压缩几乎没有收益、只白白占用 CPU 的格式
+STORED_SUFFIXES = frozenset(
+    {
+        ".png", ".jpg", ".jpeg", ".webp", ".gif", ".heic", ".avif", ".jp2",
+        ".mp4", ".mkv", ".avi", ".mov", ".webm", ".m4v", ".flv", ".wmv", ".mpg", ".mpeg",
+        ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".zst", ".npz",
+    }
+)
+
+_ZIP64_LIMIT = (1 << 31) - 1
+_U32_MAX = 0xFFFFFFFF
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+_EXTERNAL_ATTR = (0o100644 & 0xFFFF) << 16
+
+
+@dataclass(frozen=True)
+class ExportEntry:
+    arcname: str
+    path: Path
+    size: int
+    mtime_ns: int
+    method: int
+
+    @property
+    def zip64(self) -> bool:
+        # 与 zipfile 流式写入的判定一致：按未压缩大小预估，deflate 最坏情况略有膨胀
+        return self.size * 1.05 > _ZIP64_LIMIT
+
+
+def _export_workers(workers: int | None) -> int:
+    if workers is None:
+        try:
+            workers = int(os.getenv(EXPORT_WORKERS_ENV, "") or DEFAULT_EXPORT_WORKERS)
+        except ValueError:
+            workers = DEFAULT_EXPORT_WORKERS
+    return max(1, min(MAX_EXPORT_WORKERS, int(workers)))
+
+
+def list_export_entries(source_dir: Path) -> list[ExportEntry]:
+    """与原导出一致：按路径排序的全部文件，不含空目录。"""
+    source_dir = Path(source_dir)
+    out: list[ExportEntry] = []
+    for path in sorted(source_dir.rglob("*")):
+        try:
+            if not path.is_file():
+                continue
+            st = path.stat()
+        except OSError:
+            continue
+        method = 0 if path.suffix.lower() in STORED_SUFFIXES else 8
+        out.append(
+            ExportEntry(
+                arcname=path.relative_to(source_dir).as_posix(),
+                path=path,
+                size=int(st.st_size),
+                mtime_ns=int(st.st_mtime_ns),
+                method=method,
+            )
+        )
+    return out
+
+
+def export_etag(entries: list[ExportEntry]) -> str:
+    hasher = hashlib.sha1(f"v{EXPORT_INDEX_VERSION}:{zlib.ZLIB_RUNTIME_VERSION}:{DEFLATE_LEVEL}\n".encode("utf-8"))
+    for e in entries:
+        hasher.update(f"{e.arcname}\0{e.size}\0{e.mtime_ns}\0{e.method}\n".encode("utf-8", "surrogateescape"))
+    return hasher.hexdigest()
+
+
+def _dos_time(mtime_ns: int) -> tuple[int, int]:
+    t = time.localtime(mtime_ns / 1e9)
+    # DOS 时间只能表示 1980-2107 年，超出时与 zipfile(strict_timestamps=False) 一样取边界值
+    if t.tm_year < 1980:
+        fields = (1980, 1, 1, 0, 0, 0)
+    elif t.tm_year > 2107:
+        fields = (2107, 12, 31, 23, 59, 59)
+    else:
+        fields = (t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, t.tm_min, t.tm_sec)
+    year, mon, mday, hour, minute, sec = fields
+    return hour << 11 | minute << 5 | (sec // 2), (year - 1980) << 9 | mon << 5 | mday
+
+
+def _name_and_flags(entry: ExportEntry) -> tuple[bytes, int]:
+    try:
+        return entry.arcname.encode("ascii"), _FLAG_DATA_DESCRIPTOR
+    except UnicodeEncodeError:
+        return entry.arcname.encode("utf-8", "surrogateescape"), _FLAG_DATA_DESCRIPTOR | _FLAG_UTF8
+
+
+def _local_header(entry: ExportEntry) -> bytes:
+    name, flags = _name_and_flags(entry)
+    dos_time, dos_date = _dos_time(entry.mtime_ns)
+    if entry.zip64:
+        extra = struct.pack("<HHQQ", 1, 16, 0, 0)
+        version, size_field = 45, _U32_MAX
+    else:
+        extra = b""
+        version, size_field = 20, 0
+    return struct.pack(
+        "<IHHHHHIIIHH", 0x04034B50, version, flags, entry.method, dos_time, dos_date,
+        0, size_field, size_field, len(name), len(extra),
+    ) + name + extra
+
+
+def _data_descriptor(entry: ExportEntry, crc: int, csize: int) -> bytes:
+    if entry.zip64:
+        return struct.pack("<IIQQ", 0x08074B50, crc, csize, entry.size)
+    return struct.pack("<IIII", 0x08074B50, crc, csize, entry.size)
+
+
+def _central_header(entry: ExportEntry, crc: int, csize: int, offset: int) -> bytes:
+    name, flags = _name_and_flags(entry)
+    dos_time, dos_date = _dos_time(entry.mtime_ns)
+    extra_vals: list[int] = []
+    usize_f, csize_f, offset_f = entry.size, csize, offset
+    if entry.size >= _U32_MAX:
+        extra_vals.append(entry.size)
+        usize_f = _U32_MAX
+    if csize >= _U32_MAX:
+        extra_vals.append(csize)
+        csize_f = _U32_MAX
+    if offset >= _U32_MAX:
+        extra_vals.append(offset)
+        offset_f = _U32_MAX
+    extra = struct.pack(f"<HH{len(extra_vals)}Q", 1, 8 * len(extra_vals), *extra_vals) if extra_vals else b""
+    version = 45 if (entry.zip64 or extra_vals) else 20
+    return struct.pack(
+        "<IBBHHHHHIIIHHHHHII", 0x02014B50, version, 3, version, flags, entry.method, dos_time, dos_date,
+        crc, csize_f, usize_f, len(name), len(extra), 0, 0, 0, _EXTERNAL_ATTR, offset_f,
+    ) + name + extra
+
+
+def _end_records(count: int, cd_offset: int, cd_size: int) -> bytes:
+    out = b""
+    if count >= 0xFFFF or cd_offset >= _U32_MAX or cd_size >= _U32_MAX:
+        zip64_end = cd_offset + cd_size
+        out += struct.pack("<IQHHIIQQQQ", 0x06064B50, 44, 45, 45, 0, 0, count, count, cd_size, cd_offset)
+        out += struct.pack("<IIQI", 0x07064B50, 0, zip64_end, 1)
+    out += struct.pack(
+        "<IHHHHIIH", 0x06054B50, 0, 0, min(count, 0xFFFF), min(count, 0xFFFF),
+        min(cd_size, _U32_MAX), min(cd_offset, _U32_MAX), 0,
+    )
+    return out
+
+
+def _central_directory(entries: list[ExportEntry], results: list[tuple[int, int]], offsets: list[int], cd_offset: int) -> bytes:
+    cd = b"".join(_central_header(e, crc, csize, off) for e, (crc, csize), off in zip(entries, results, offsets))
+    return cd + _end_records(len(entries), cd_offset, len(cd))
+
+
+def _iter_file(path: Path) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        for buf in iter(lambda: f.read(READ_CHUNK_BYTES), b""):
+            yield buf
+
+
+def _iter_deflated(path: Path) -> Iterator[bytes]:
+    comp = zlib.compressobj(DEFLATE_LEVEL, zlib.DEFLATED, -15)
+    for buf in _iter_file(path):
+        out = comp.compress(buf)
+        if out:
+            yield out
+    yield comp.flush()
+
+
+def _deflate_to_spool(entry: ExportEntry) -> tuple[int, int, Any]:
+    """线程池任务：压缩一个文件，返回 (crc, 压缩后大小, 已回到开头的临时文件)。zlib 压缩时释放 GIL。"""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    try:
+        crc = 0
+        comp = zlib.compressobj(DEFLATE_LEVEL, zlib.DEFLATED, -15)
+        csize = 0
+        for buf in _iter_file(entry.path):
+            crc = zlib.crc32(buf, crc)
+            out = comp.compress(buf)
+            csize += len(out)
+            spool.write(out)
+        out = comp.flush()
+        csize += len(out)
+        spool.write(out)
+        spool.seek(0)
+        return crc, csize, spool
+    except BaseException:
+        spool.close()
+        raise
+
+
+def _check_unchanged(entry: ExportEntry) -> None:
+    st = entry.path.stat()
+    if int(st.st_size) != entry.size or int(st.st_mtime_ns) != entry.mtime_ns:
+        raise RuntimeError(f"dataset file changed during export: {entry.arcname}")
+
+
+def stream_zip_entries(
+    entries: list[ExportEntry],
+    *,
+    workers: int | None = None,
+    on_complete: Any = None,
+) -> Iterator[bytes]:
+    """
+    按顺序流式输出 zip。deflate 条目在线程池中提前压缩（最多领先 workers*2 个条目），
+    STORED 条目在输出时边读边算 CRC。结束时以布局索引回调 on_complete。
+    """
+    n_workers = _export_workers(workers)
+    lookahead = n_workers * 2
+    pool = ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix="abp-zip-export")
+    pending: deque[tuple[int, Future]] = deque()
+    next_submit = 0
+    results: list[tuple[int, int]] = []
+    offsets: list[int] = []
+    position = 0
+
+    def _fill(current: int) -> None:
+        nonlocal next_submit
+        next_submit = max(next_submit, current)
+        while next_submit < len(entries) and len(pending) < lookahead:
+            if entries[next_submit].method == 8:
+                pending.append((next_submit, pool.submit(_deflate_to_spool, entries[next_submit])))
+            next_submit += 1
+
+    try:
+        for i, entry in enumerate(entries):
+            _fill(i)
+            header = _local_header(entry)
+            offsets.append(position)
+            yield header
+            position += len(header)
+            if entry.method == 8:
+                idx, fut = pending.popleft()
+                assert idx == i
+                crc, csize, spool = fut.result()
+                _fill(i + 1)
+                try:
+                    for buf in iter(lambda: spool.read(READ_CHUNK_BYTES), b""):
+                        yield buf
+                finally:
+                    spool.close()
+            else:
+                crc, csize = 0, 0
+                for buf in _iter_file(entry.path):
+                    crc = zlib.crc32(buf, crc)
+                    csize += len(buf)
+                    yield buf
+                    _fill(i + 1)
+                if csize != entry.size:
+                    raise RuntimeError(f"dataset file changed during export: {entry.arcname}")
+            _check_unchanged(entry)
+            position += csize
+            descriptor = _data_descriptor(entry, crc, csize)
+            yield descriptor
+            position += len(descriptor)
+            results.append((crc, csize))
+        tail = _central_directory(entries, results, offsets, position)
+        yield tail
+        position += len(tail)
+    finally:
+        for _idx, fut in pending:
+            fut.cancel()
+        pool.shutdown(wait=True, cancel_futures=True)
+        for _idx, fut in pending:
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                fut.result()[2].close()
+    if on_complete is not None:
+        on_complete({"results": results, "total_size": position})
+
+
+class ExportLayout:
+    """由布局索引还原的字节布局，用于 Content-Length 与 Range 请求。"""
+
+    def __init__(self, entries: list[ExportEntry], results: list[tuple[int, int]]):
+        self.entries = entries
+        self.results = results
+        self.segments: list[tuple[int, int, str, Any]] = []
+        offsets: list[int] = []
+        pos = 0
+        for i, (entry, (crc, csize)) in enumerate(zip(entries, results)):
+            offsets.append(pos)
+            header = _local_header(entry)
+            self.segments.append((pos, len(header), "bytes", header))
+            pos += len(header)
+            self.segments.append((pos, csize, "data", i))
+            pos += csize
+            descriptor = _data_descriptor(entry, crc, csize)
+            self.segments.append((pos, len(descriptor), "bytes", descriptor))
+            pos += len(descriptor)
+        tail = _central_directory(entries, results, offsets, pos)
+        self.segments.append((pos, len(tail), "bytes", tail))
+        self.total_size = pos + len(tail)
+
+    def _data(self, i: int, skip: int, length: int) -> Iterator[bytes]:
+        entry = self.entries[i]
+        _check_unchanged(entry)
+        if entry.method == 0:
+            with open(entry.path, "rb") as f:
+                f.seek(skip)
+                remaining = length
+                while remaining > 0:
+                    buf = f.read(min(READ_CHUNK_BYTES, remaining))
+                    if not buf:
+                        raise RuntimeError(f"dataset file changed during export: {entry.arcname}")
+                    remaining -= len(buf)
+                    yield buf
+            return
+        # deflate 输出是确定的：从头重新压缩该条目，丢弃 skip 之前的部分
+        pos = 0
+        end = skip + length
+        for buf in _iter_deflated(entry.path):
+            lo, hi = max(skip, pos), min(end, pos + len(buf))
+            if lo < hi:
+                yield buf[lo - pos : hi - pos]
+            pos += len(buf)
+            if pos >= end:
+                return
+        if pos < end:
+            raise RuntimeError(f"dataset file changed during export: {entry.arcname}")
+
+    def iter_range(self, start: int, end: int) -> Iterator[bytes]:
+        """输出 [start, end] 闭区间的字节。"""
+        stop = end + 1
+        for seg_start, seg_len, kind, payload in self.segments:
+            seg_end = seg_start + seg_len
+            if seg_end <= start or seg_len == 0:
+                continue
+            if seg_start >= stop:
+                break
+            lo, hi = max(start, seg_start) - seg_start, min(stop, seg_end) - seg_start
+            if kind == "bytes":
+                yield payload[lo:hi]
+            else:
+                yield from self._data(payload, lo, hi - lo)
+
+
+def default_index_root() -> Path:
+    return Path(__file__).resolve().parents[1] / "data" / EXPORT_INDEX_DIRNAME
+
+
+def _index_path(source_dir: Path, index_root: Path | None) -> Path:
+    digest = hashlib.sha1(str(Path(source_dir).resolve()).encode("utf-8")).hexdigest()[:24]
+    return Path(index_root or default_index_root()) / f"{digest}.json"
+
+
+def load_export_layout(source_dir: Path, entries: list[ExportEntry], etag: str, index_root: Path | None = None) -> ExportLayout | None:
+    try:
+        data = json.loads(_index_path(source_dir, index_root).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("etag") != etag:
+        return None
+    results = [(int(crc), int(csize)) for crc, csize in data.get("results") or []]
+    if len(results) != len(entries):
+        return None
+    return ExportLayout(entries, results)
+
+
+def save_export_layout(source_dir: Path, etag: str, results: list[tuple[int, int]], index_root: Path | None = None) -> None:
+    path = _index_path(source_dir, index_root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp.write_text(json.dumps({"version": EXPORT_INDEX_VERSION, "etag": etag, "results": results}), encoding="utf-8")
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def remove_export_layout(source_dir: Path, index_root: Path | None = None) -> bool:
+    try:
+        _index_path(source_dir, index_root).unlink()
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def stream_zip_directory(
+    source_dir: Path,
+    entries: list[ExportEntry],
+    etag: str,
+    *,
+    workers: int | None = None,
+    index_root: Path | None = None,
+) -> Iterator[bytes]:
+    """完整导出；完整输出后写入布局索引，供之后的 Range 请求使用。"""
+
+    def _save(layout: dict[str, Any]) -> None:
+        try:
+            save_export_layout(source_dir, etag, layout["results"], index_root)
+        except OSError:
+            pass
+
+    return stream_zip_entries(entries, workers=workers, on_complete=_save)
+
+
+def ensure_export_layout(
+    source_dir: Path,
+    entries: list[ExportEntry],
+    etag: str,
+    *,
+    workers: int | None = None,
+    index_root: Path | None = None,
+) -> ExportLayout:
+    """没有有效索引时并行跑一遍压缩（不输出）以得到布局。"""
+    layout = load_export_layout(source_dir, entries, etag, index_root)
+    if layout is not None:
+        return layout
+    captured: dict[str, Any] = {}
+    for _ in stream_zip_entries(entries, workers=workers, on_complete=captured.update):
+        pass
+    try:
+        save_export_layout(source_dir, etag, captured["results"], index_root)
+    except OSError:
+        pass
+    return ExportLayout(entries, captured["results"])
+
+
+def parse_range(header: str | None, total_size: int) -> tuple[int, int] | None | bool:
+    """
+    解析单段 Range 头。返回 (start, end)；无 Range 或无法识别（含多段）时返回 None，按完整响应处理；
+    区间不可满足时返回 False（对应 416）。
+    """
+    raw = str(header or "").strip()
+    if not raw.startswith("bytes=") or "," in raw:
+        return None
+    spec = raw[len("bytes="):].strip()
+    first, sep, last = spec.partition("-")
+    if not sep:
+        return None
+    try:
+        if first.strip() == "":
+            suffix = int(last)
+            if suffix <= 0:
+                return False
+            return max(0, total_size - suffix), total_size - 1
+        start = int(first)
+        end = int(last) if last.strip() else total_size - 1
+    except ValueError:
+        return None
+    if start < 0 or start >= total_size or end < start:
+        return False
+    return start, min(end, total_size - 1)
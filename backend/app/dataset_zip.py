@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+数据集 zip 导入：上传按块落盘后直接从磁盘读取，API 进程内存中不保留整个压缩包。
+成员先统一做路径检查并换算到最终目录结构（与原先“解压到暂存目录 → 规范化 → 逐个 move”的结果一致），
+再由线程池并行解压到数据集目录同级的暂存目录，最后整体改名到位，失败时原目录不受影响。
+"""
+from __future__ import annotations
+
+import io
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+import zipfile
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from pathlib import Path, PurePosixPath
+from typing import Any, BinaryIO
+
+from . import errors as err
+
+ZIP_EXTRACT_WORKERS_ENV = "ABP_ZIP_EXTRACT_WORKERS"
+DEFAULT_ZIP_EXTRACT_WORKERS = 4
+MAX_ZIP_EXTRACT_WORKERS = 16
+COPY_CHUNK_BYTES = 1 << 20
+
+# 压缩包外面多套了一层目录时，以最浅的、含这些子目录之一的目录作为数据集根
+LAYOUT_MARKER_DIRS = ("gt", "hazy", "noisy", "blur", "lr", "dark", "clear")
+
+
+def spool_upload(src: BinaryIO, dest_dir: Path | None = None) -> Path:
+    """把上传流按块写入临时文件并返回路径，调用方负责删除。"""
+    fd, name = tempfile.mkstemp(prefix="abp_upload_", suffix=".zip", dir=str(dest_dir) if dest_dir else None)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            shutil.copyfileobj(src, out, COPY_CHUNK_BYTES)
+    except BaseException:
+        Path(name).unlink(missing_ok=True)
+        raise
+    return Path(name)
+
+
+def _extract_workers(workers: int | None) -> int:
+    if workers is None:
+        try:
+            workers = int(os.getenv(ZIP_EXTRACT_WORKERS_ENV, "") or DEFAULT_ZIP_EXTRACT_WORKERS)
+        except ValueError:
+            workers = DEFAULT_ZIP_EXTRACT_WORKERS
+    return max(1, min(MAX_ZIP_EXTRACT_WORKERS, int(workers)))
+
+
+def _open_zip(source: str | Path | bytes) -> zipfile.ZipFile:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return zipfile.ZipFile(io.BytesIO(source))
+    return zipfile.ZipFile(str(source))
+
+
+def _member_name(info: zipfile.ZipInfo) -> str | None:
+    name = info.filename.replace("\\", "/")
+    if not name or name.endswith("/"):
+        return None
+    parts = PurePosixPath(name).parts
+    if name.startswith("/") or ".." in parts or (parts and ":" in parts[0]):
+        err.api_error(400, err.E_ZIP_PATH_TRAVERSAL, "zip_path_traversal", name=name)
+    return name
+
+
+def _layout_root(names: list[str]) -> str | None:
+    entries: set[str] = set(names)
+    for name in names:
+        parts = name.split("/")[:-1]
+        for i in range(1, len(parts) + 1):
+            entries.add("/".join(parts[:i]))
+    if "gt" in entries:
+        return None
+    candidates = [
+        d
+        for d in entries
+        if PurePosixPath(d).name != "__MACOSX" and any(f"{d}/{m}" in entries for m in LAYOUT_MARKER_DIRS)
+    ]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda d: (d.count("/"), d))
+
+
+def plan_zip_members(infos: list[zipfile.ZipInfo]) -> dict[str, zipfile.ZipInfo]:
+    """返回 {最终相对路径: 成员}；任何成员路径越界时整体拒绝，此时尚未写入任何文件。"""
+    named = [(info, name) for info in infos for name in [_member_name(info)] if name]
+    root = _layout_root([name for _, name in named])
+    prefix = f"{root}/" if root else None
+    plan: dict[str, zipfile.ZipInfo] = {}
+    rooted: dict[str, zipfile.ZipInfo] = {}
+    for info, name in named:
+        if prefix and name.startswith(prefix):
+            rooted[name[len(prefix) :]] = info
+        else:
+            plan[name] = info
+    # 数据集根目录内的同名文件优先（原先规范化时以覆盖方式上移）
+    plan.update(rooted)
+    return plan
+
+
+def _has_files(root: Path) -> bool:
+    if not root.exists():
+        return False
+    for _dirpath, _dirs, files in os.walk(root):
+        if files:
+            return True
+    return False
+
+
+def _extract_parallel(source: str | Path | bytes, plan: dict[str, zipfile.ZipInfo], stage: Path, workers: int) -> None:
+    stage_resolved = stage.resolve()
+    local = threading.local()
+    opened: list[zipfile.ZipFile] = []
+    opened_lock = threading.Lock()
+
+    def _zf() -> zipfile.ZipFile:
+        zf = getattr(local, "zf", None)
+        if zf is None:
+            # 每个线程独立打开压缩包，解压（zlib 释放 GIL）可真正并行
+            zf = _open_zip(source)
+            local.zf = zf
+            with opened_lock:
+                opened.append(zf)
+        return zf
+
+    def _one(rel: str, info: zipfile.ZipInfo) -> None:
+        out_path = (stage / rel).resolve()
+        if stage_resolved not in out_path.parents:
+            err.api_error(400, err.E_ZIP_PATH_TRAVERSAL, "zip_path_traversal", name=info.filename)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        with _zf().open(info, "r") as src, open(out_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, COPY_CHUNK_BYTES)
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="abp-unzip")
+    try:
+        futures = [pool.submit(_one, rel, info) for rel, info in plan.items()]
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        for fut in done:
+            exc = fut.exception()
+            if exc is not None:
+                raise exc
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        for zf in opened:
+            zf.close()
+
+
+def import_zip_into_dir(
+    source: str | Path | bytes,
+    ds_dir: Path,
+    *,
+    overwrite: bool,
+    workers: int | None = None,
+) -> dict[str, Any]:
+    """
+    把 zip（磁盘路径或内存字节）导入数据集目录。overwrite=False 且目录中已有文件时返回 409，
+    路径越界返回 400；两种情况都在写入任何文件之前判定。
+    """
+    ds_dir = Path(ds_dir)
+    with _open_zip(source) as zf:
+        plan = plan_zip_members(zf.infolist())
+    if not overwrite and _has_files(ds_dir):
+        err.api_error(
+            409,
+            err.E_DATASET_IMPORT_REQUIRES_OVERWRITE,
+            "dataset_import_requires_overwrite",
+            hint="当前数据集目录已存在文件。若要重新导入并替换现有内容，请勾选“导入时覆盖原有目录内容”。",
+            dataset_dir=str(ds_dir),
+        )
+    ds_dir.parent.mkdir(parents=True, exist_ok=True)
+    token = uuid.uuid4().hex[:12]
+    stage = ds_dir.parent / f".{ds_dir.name}.import-{token}"
+    trash = ds_dir.parent / f".{ds_dir.name}.replaced-{token}"
+    n_workers = _extract_workers(workers)
+    try:
+        stage.mkdir(parents=True)
+        _extract_parallel(source, plan, stage, n_workers)
+        if ds_dir.exists():
+            os.replace(ds_dir, trash)
+        try:
+            os.replace(stage, ds_dir)
+        except BaseException:
+            # 新目录没能就位时把旧目录放回原处，再清理暂存
+            if trash.exists() and not ds_dir.exists():
+                os.replace(trash, ds_dir)
+            raise
+    finally:
+        shutil.rmtree(stage, ignore_errors=True)
+        shutil.rmtree(trash, ignore_errors=True)
+    return {"files": len(plan), "workers": n_workers}
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator
+
+EVAL_EXECUTOR_ENV = "ABP_EVAL_EXECUTOR"
+EVAL_WORKERS_ENV = "ABP_EVAL_WORKERS"
+PREFETCH_DEPTH_ENV = "ABP_PREFETCH_DEPTH"
+
+EXECUTOR_KINDS = ("serial", "thread", "process")
+MAX_EVAL_WORKERS = 32
+DEFAULT_PREFETCH_DEPTH = 4
+MAX_PREFETCH_DEPTH = 64
+PREFETCH_WORKERS = 2
+
+
+@dataclass(frozen=True)
+class SampleExecutorConfig:
+    kind: str
+    workers: int
+    requested_kind: str
+    fallback_reason: str = ""
+
+    def as_record(self) -> dict[str, Any]:
+        out: dict[str, Any] = {"kind": self.kind, "workers": self.workers}
+        if self.requested_kind != self.kind:
+            out["requested_kind"] = self.requested_kind
+        if self.fallback_reason:
+            out["fallback_reason"] = self.fallback_reason
+        return out
+
+
+def _normalize_kind(value: Any) -> str:
+    kind = str(value or "").strip().lower()
+    return kind if kind in EXECUTOR_KINDS else ""
+
+
+def _parse_workers(value: Any) -> int | None:
+    text = str(value if value is not None else "").strip().lower()
+    if not text:
+        return None
+    if text == "auto":
+        return max(1, os.cpu_count() or 1)
+    try:
+        return int(float(text))
+    except Exception:
+        return None
+
+
+def resolve_sample_executor(params: dict[str, Any] | None, *, allow_parallel: bool = True) -> SampleExecutorConfig:
+    """
+    解析单次评测的样本执行器：run.params 的 eval_executor / eval_workers 优先，其次读环境变量。
+    未配置时保持串行；不可并行（如用户算法包共享同一运行目录）或在守护进程中无法再派生子进程时自动降级。
+    """
+    src = params if isinstance(params, dict) else {}
+    workers = _parse_workers(src.get("eval_workers"))
+    if workers is None:
+        workers = _parse_workers(os.getenv(EVAL_WORKERS_ENV))
+    workers = max(1, min(MAX_EVAL_WORKERS, int(workers or 1)))
+    requested = _normalize_kind(src.get("eval_executor")) or _normalize_kind(os.getenv(EVAL_EXECUTOR_ENV))
+    if not requested:
+        requested = "thread" if workers > 1 else "serial"
+
+    if requested == "serial" or workers <= 1:
+        return SampleExecutorConfig(kind="serial", workers=1, requested_kind=requested)
+    if not allow_parallel:
+        return SampleExecutorConfig(kind="serial", workers=1, requested_kind=requested, fallback_reason="parallel_not_supported")
+    if requested == "process" and multiprocessing.current_process().daemon:
+        # Celery prefork 子进程是 daemon，不允许再创建子进程，退回线程池
+        return SampleExecutorConfig(kind="thread", workers=workers, requested_kind=requested, fallback_reason="daemon_process")
+    return SampleExecutorConfig(kind=requested, workers=workers, requested_kind=requested)
+
+
+def resolve_prefetch_depth(params: dict[str, Any] | None, config: SampleExecutorConfig) -> int:
+    """
+    解码预取深度：run.params.prefetch_depth 优先，其次 ABP_PREFETCH_DEPTH，默认 4，0 表示关闭。
+    进程池执行器在子进程内各自解码，预取后再跨进程传图反而更慢，因此不预取。
+    """
+    if config.kind == "process":
+        return 0
+    src = params if isinstance(params, dict) else {}
+    depth = _parse_workers(src.get("prefetch_depth"))
+    if depth is None:
+        depth = _parse_workers(os.getenv(PREFETCH_DEPTH_ENV))
+    if depth is None:
+        depth = DEFAULT_PREFETCH_DEPTH
+    return max(0, min(MAX_PREFETCH_DEPTH, int(depth)))
+
+
+def _make_pool(config: SampleExecutorConfig) -> Executor:
+    if config.kind == "process":
+        return ProcessPoolExecutor(max_workers=config.workers)
+    return ThreadPoolExecutor(max_workers=config.workers, thread_name_prefix="abp_eval")
+
+
+def map_ordered(
+    fn: Callable[[Any], Any],
+    items: Iterable[Any],
+    config: SampleExecutorConfig,
+    *,
+    before_submit: Callable[[], None] | None = None,
+    max_inflight: int | None = None,
+) -> Iterator[Any]:
+    """
+    按输入顺序逐个产出 fn(item) 的结果，保证聚合指标与串行执行一致。
+    before_submit 在每个样本提交前调用（用于取消检查），抛出的异常会取消尚未开始的样本。
+    同时在途的样本数受 max_inflight 限制，避免大数据集一次性占满内存。
+    items 若是生成器（如上游的预取阶段），结束或中断时会一并关闭，确保上游线程池随之停止。
+    """
+    source = iter(items)
+    if config.kind == "serial" or config.workers <= 1:
+        try:
+            for item in source:
+                if before_submit is not None:
+                    before_submit()
+                yield fn(item)
+        finally:
+            _close_source(source)
+        return
+
+    window = max(config.workers, int(max_inflight or config.workers * 2))
+    pool = _make_pool(config)
+    pending: deque[Future] = deque()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < window:
+                try:
+                    item = next(source)
+                except StopIteration:
+                    exhausted = True
+                    break
+                if before_submit is not None:
+                    before_submit()
+                pending.append(pool.submit(fn, item))
+            if not pending:
+                break
+            yield pending.popleft().result()
+    finally:
+        for fut in pending:
+            fut.cancel()
+        pool.shutdown(wait=True, cancel_futures=True)
+        _close_source(source)
+
+
+def _close_source(source: Iterator[Any]) -> None:
+    close = getattr(source, "close", None)
+    if callable(close):
+        close()
+
+
+def prefetch_ordered(fn: Callable[[Any], Any], items: Iterable[Any], depth: int) -> Iterator[Any]:
+    """
+    有界预取：后台线程按顺序提前执行 fn（通常是解码），最多领先消费方 depth 个元素；depth<=0 时同步执行。
+    取消由下游 map_ordered 的 before_submit 负责，下游中断时会关闭本生成器并停止尚未开始的预取。
+    """
+    if depth <= 0:
+        config = SampleExecutorConfig(kind="serial", workers=1, requested_kind="serial")
+    else:
+        workers = max(1, min(PREFETCH_WORKERS, depth))
+        config = SampleExecutorConfig(kind="thread", workers=workers, requested_kind="thread")
+    yield from map_ordered(fn, items, config, max_inflight=depth)
@@ -9,10 +9,8 @@ import json
 import re
 import base64
 import hashlib
-import zipfile
 import shutil
 import os
-import tempfile
 import threading
 
 from datetime import datetime
@@ -21,7 +19,7 @@ from typing import Optional, Any
 
 from fastapi import FastAPI, HTTPException, Query, Request, UploadFile, File, Depends, Body
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, RedirectResponse, StreamingResponse
+from fastapi.responses import JSONResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime, timedelta
 from urllib.parse import quote
@@ -84,6 +82,7 @@ from .schemas import (
     MetricPublish,
     MetricOut,
     AlgorithmSubmissionCreate,
+    AlgorithmSubmissionFromUpload,
     AlgorithmSubmissionReview,
     AlgorithmSubmissionPublish,
     AlgorithmSubmissionOut,
@@ -95,11 +94,22 @@ from .schemas import (
     UserProfileUpdate,
     UserOut,
     Token,
+    UploadInit,
+    UploadOut,
 )
 from .store import (
     make_redis,
     save_run,
     load_run,
+    load_run_progress,
+    load_run_samples,
+    load_materialize_job,
+    save_materialize_job,
+    load_samples_for_runs,
+    overlay_run_progress,
+    overlay_runs_progress,
+    save_run_samples,
+    strip_run_samples,
     delete_run,
     list_runs,
     list_all_runs,
@@ -130,6 +140,12 @@ from .store import (
     load_algorithm_submission,
     delete_algorithm_submission,
     list_algorithm_submissions,
+    load_indexed,
+    save_many,
+    delete_many,
+    begin_round_trip_count,
+    round_trip_count,
+    end_round_trip_count,
 )
 from .auth import (
     get_current_user,
@@ -140,11 +156,38 @@ from .auth import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
 )
 from .celery_app import celery_app
-from .tasks import execute_run
-from . import errors as err, sql_store
-from .metric_runtime import validate_python_metric_code
-from .vision.dataset_access import IMG_EXTS, VIDEO_EXTS, count_paired_images, count_paired_videos, resolve_dataset_dir
+from .tasks import execute_run, materialize_dataset_job
+from . import errors as err, redis_pool, sql_store
+from .dataset_zip import import_zip_into_dir, spool_upload
+from .dataset_cas import dedup_copy_tree, dedup_enabled, gc_blobs, release_tree, rename_tree
+from .dataset_export import (
+    ensure_export_layout,
+    export_etag,
+    list_export_entries,
+    load_export_layout,
+    parse_range,
+    remove_export_layout,
+    stream_zip_directory,
+)
+from .chunked_upload import (
+    PURPOSE_ALGORITHM_ARCHIVE,
+    PURPOSE_DATASET_ZIP,
+    complete_upload,
+    completed_upload_path,
+    default_upload_root,
+    discard_upload,
+    init_upload,
+    load_upload,
+    upload_status,
+    write_chunk,
+)
+from . import run_results
+from .metric_runtime import invalidate_metric_cache, validate_python_metric_code
+from .vision.dataset_access import resolve_dataset_dir
 from .vision.dataset_io import resolve_gt_dir_under
+from .vision.dataset_materialize import IMAGE_TASK_INPUT_DIRS, remove_materialized
+from .vision.fs_changes import detect_dataset_changes, remove_fs_state, state_root_for
+from .vision.pair_manifest import get_pair_manifest, manifest_root_for, remove_pair_manifest, task_group
 
 import cv2
 
@@ -951,32 +994,25 @@ def mark_notice_read(notice_id: str, current_user: dict = Depends(get_current_us
 def mark_all_notices_read(current_user: dict = Depends(get_current_user)):
     r = make_redis()
     username = _username_of(current_user)
-    items = _list_notices(r, username, unread_only=True)
-    count = 0
+    items = [item for item in _list_notices(r, username, unread_only=True) if not bool(item.get("read"))]
     for item in items:
-        if bool(item.get("read")):
-            continue
         item["read"] = True
-        _save_notice(r, username, item)
-        count += 1
-    return {"ok": True, "updated": count}
+    if items:
+        _save_notices(r, username, items)
+    return {"ok": True, "updated": len(items)}
 
 
 @app.post("/me/notices/clear-read")
 def clear_read_notices(current_user: dict = Depends(get_current_user)):
     r = make_redis()
     username = _username_of(current_user)
-    items = _list_notices(r, username, unread_only=False)
-    deleted = 0
-    for item in items:
-        if not bool(item.get("read")):
-            continue
-        notice_id = str(item.get("notice_id") or "").strip()
-        if not notice_id:
-            continue
-        _delete_notice(r, username, notice_id)
-        deleted += 1
-    return {"ok": True, "deleted": deleted}
+    notice_ids = [
+        str(item.get("notice_id") or "").strip()
+        for item in _list_notices(r, username, unread_only=False)
+        if bool(item.get("read")) and str(item.get("notice_id") or "").strip()
+    ]
+    _delete_notices(r, username, notice_ids)
+    return {"ok": True, "deleted": len(notice_ids)}
 
 
 @app.post("/me/password")
@@ -1000,7 +1036,8 @@ def change_my_password(payload: UserPasswordChange, current_user: dict = Depends
 
 
 def _sanitize_run_for_api(run: dict) -> dict:
-    out = dict(run)
+    # 逐样本结果走 GET /runs/{id}/samples 分页读取，这里只返回汇总
+    out = dict(strip_run_samples(run))
     params = out.get("params")
     if isinstance(params, dict):
         p2 = dict(params)
@@ -1043,9 +1080,38 @@ app.add_middleware(
     allow_credentials=False, # 璁句负 False 浠ユ敮鎸?"*"
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Disposition"],
+    expose_headers=["Content-Disposition", "X-Redis-Round-Trips"],
 )
 
+class _RedisRoundTripMiddleware:
+    """每个请求的 Redis 往返次数写入 X-Redis-Round-Trips 响应头（流式响应只统计到响应头发出为止）。
+    纯 ASGI 实现，不缓冲响应体，数据集导出等流式下载不受影响。"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope.get("type") != "http":
+            await self.app(scope, receive, send)
+            return
+        token = begin_round_trip_count()
+
+        async def _send(message):
+            if message.get("type") == "http.response.start":
+                headers = list(message.get("headers") or [])
+                headers.append((b"x-redis-round-trips", str(round_trip_count()).encode("ascii")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            end_round_trip_count(token)
+
+
+app.add_middleware(_RedisRoundTripMiddleware)
+
+
 TASK_LABEL_BY_TYPE = {
     "denoise": "\u53bb\u566a",
     "deblur": "\u53bb\u6a21\u7cca",
@@ -1388,6 +1454,13 @@ def health():
     return {"ok": True, "ts": time.time()}
 
 
+@app.get("/admin/redis/pool")
+def admin_redis_pool(current_user: dict = Depends(get_current_user)):
+    """当前进程的 Redis 连接池使用情况（多 worker 部署时每个进程各自统计）。"""
+    _require_admin(current_user)
+    return redis_pool.pool_stats()
+
+
 @app.get("/meta/error-codes")
 def meta_error_codes():
     return {"items": err.list_error_defs()}
@@ -2375,88 +2448,6 @@ def _ensure_catalog_defaults(r):
     _CATALOG_INITIALIZED = True
 
 
-def _safe_extract_zip_bytes(zip_bytes: bytes, dest_dir: Path) -> None:
-    dest_dir.mkdir(parents=True, exist_ok=True)
-    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zf:
-        for info in zf.infolist():
-            name = info.filename.replace("\\", "/")
-            if not name or name.endswith("/"):
-                continue
-            if name.startswith("/") or name.startswith("../") or "/../" in name:
-                err.api_error(400, err.E_ZIP_PATH_TRAVERSAL, "zip_path_traversal", name=name)
-            out_path = (dest_dir / name).resolve()
-            if dest_dir.resolve() not in out_path.parents and out_path != dest_dir.resolve():
-                err.api_error(400, err.E_ZIP_PATH_TRAVERSAL, "zip_path_traversal", name=name)
-            out_path.parent.mkdir(parents=True, exist_ok=True)
-            with zf.open(info, "r") as src, open(out_path, "wb") as dst:
-                shutil.copyfileobj(src, dst)
-
-
-def _merge_tree(src_root: Path, dst_root: Path, overwrite: bool) -> None:
-    for p in src_root.rglob("*"):
-        if not p.is_file():
-            continue
-        rel = p.relative_to(src_root)
-        out = dst_root / rel
-        out.parent.mkdir(parents=True, exist_ok=True)
-        if out.exists() and not overwrite:
-            continue
-        if out.exists() and overwrite:
-            out.unlink()
-        shutil.move(str(p), str(out))
-
-
-def _normalize_dataset_import_layout(ds_dir: Path, overwrite: bool) -> None:
-    if (ds_dir / "gt").exists():
-        return
-    marker_dirs = ("gt", "hazy", "noisy", "blur", "lr", "dark", "clear")
-    candidates = []
-    for p in ds_dir.rglob("*"):
-        if not p.is_dir():
-            continue
-        if p.name == "__MACOSX":
-            continue
-        if any((p / d).exists() for d in marker_dirs):
-            depth = len(p.relative_to(ds_dir).parts)
-            candidates.append((depth, p))
-    if not candidates:
-        return
-    candidates.sort(key=lambda x: x[0])
-    root = candidates[0][1]
-    if root == ds_dir:
-        return
-    _merge_tree(root, ds_dir, overwrite=overwrite)
-    shutil.rmtree(root, ignore_errors=True)
-
-
-def _dir_contains_files(root: Path) -> bool:
-    if not root.exists():
-        return False
-    for p in root.rglob("*"):
-        if p.is_file():
-            return True
-    return False
-
-
-def _import_dataset_zip_bytes_into_dir(zip_bytes: bytes, ds_dir: Path, overwrite: bool) -> None:
-    with tempfile.TemporaryDirectory(prefix="abp_ds_import_") as tmp_dir:
-        stage_dir = Path(tmp_dir) / "stage"
-        _safe_extract_zip_bytes(zip_bytes, stage_dir)
-        _normalize_dataset_import_layout(stage_dir, overwrite=True)
-        if _dir_contains_files(ds_dir) and not overwrite:
-            err.api_error(
-                409,
-                err.E_DATASET_IMPORT_REQUIRES_OVERWRITE,
-                "dataset_import_requires_overwrite",
-                hint="当前数据集目录已存在文件。若要重新导入并替换现有内容，请勾选“导入时覆盖原有目录内容”。",
-                dataset_dir=str(ds_dir),
-            )
-        if overwrite and ds_dir.exists():
-            shutil.rmtree(ds_dir, ignore_errors=True)
-        ds_dir.mkdir(parents=True, exist_ok=True)
-        _merge_tree(stage_dir, ds_dir, overwrite=True)
-
-
 def _validate_text_encoding(v: str, field: str) -> str:
     s = (v or "").strip()
     if not s:
@@ -2692,6 +2683,16 @@ def _sql_record_save(record_type: str, record_id: str, data: dict) -> None:
             raise
 
 
+def _sql_record_save_many(record_type: str, items: list[tuple[str, dict]]) -> None:
+    if not sql_store.is_enabled():
+        return
+    try:
+        sql_store.save_records(record_type, items)
+    except Exception:
+        if not sql_store.allow_redis_fallback():
+            raise
+
+
 def _sql_record_delete(record_type: str, record_id: str) -> None:
     if not sql_store.is_enabled():
         return
@@ -2723,6 +2724,14 @@ def _metric_history_key(owner_id: str, history_id: str) -> str:
     return f"metric_history:{owner_id}:{history_id}"
 
 
+def _algorithm_history_index(owner_id: str) -> str:
+    return f"algorithm_history:{owner_id}"
+
+
+def _metric_history_index(owner_id: str) -> str:
+    return f"metric_history:{owner_id}"
+
+
 def _save_algorithm_history_item(r, history_id: str, data: dict) -> None:
     item = dict(data or {})
     owner_id = str(item.get("owner_id") or "").strip()
@@ -2731,7 +2740,7 @@ def _save_algorithm_history_item(r, history_id: str, data: dict) -> None:
     item["history_id"] = str(history_id)
     _sql_record_save("algorithm_history", history_id, item)
     try:
-        r.set(_algorithm_history_key(owner_id, history_id), json.dumps(item, ensure_ascii=False))
+        save_many(r, {_algorithm_history_key(owner_id, history_id): item}, indexes=(_algorithm_history_index(owner_id),))
     except Exception:
         pass
 
@@ -2744,7 +2753,7 @@ def _save_metric_history_item(r, history_id: str, data: dict) -> None:
     item["history_id"] = str(history_id)
     _sql_record_save("metric_history", history_id, item)
     try:
-        r.set(_metric_history_key(owner_id, history_id), json.dumps(item, ensure_ascii=False))
+        save_many(r, {_metric_history_key(owner_id, history_id): item}, indexes=(_metric_history_index(owner_id),))
     except Exception:
         pass
 
@@ -2759,17 +2768,11 @@ def _list_algorithm_history_items(r, owner_id: str, limit: int = 5000) -> list[d
         if not sql_store.allow_redis_fallback():
             sql_items.sort(key=lambda item: float(item.get("created_at") or 0), reverse=True)
             return sql_items[:limit]
-    items: list[dict] = []
-    for key in r.scan_iter(match=_algorithm_history_key(owner, "*"), count=500):
-        try:
-            raw = r.get(key)
-            if not raw:
-                continue
-            data = json.loads(raw)
-            if isinstance(data, dict) and str(data.get("owner_id") or "").strip() == owner:
-                items.append(data)
-        except Exception:
-            continue
+    items = [
+        data
+        for _, data in load_indexed(r, _algorithm_history_index(owner))
+        if str(data.get("owner_id") or "").strip() == owner
+    ]
     items = _merge_by(items, sql_items, lambda item: str(item.get("history_id") or ""))
     items.sort(key=lambda item: float(item.get("created_at") or 0), reverse=True)
     return items[:limit]
@@ -2785,17 +2788,11 @@ def _list_metric_history_items(r, owner_id: str, limit: int = 5000) -> list[dict
         if not sql_store.allow_redis_fallback():
             sql_items.sort(key=lambda item: float(item.get("created_at") or 0), reverse=True)
             return sql_items[:limit]
-    items: list[dict] = []
-    for key in r.scan_iter(match=_metric_history_key(owner, "*"), count=500):
-        try:
-            raw = r.get(key)
-            if not raw:
-                continue
-            data = json.loads(raw)
-            if isinstance(data, dict) and str(data.get("owner_id") or "").strip() == owner:
-                items.append(data)
-        except Exception:
-            continue
+    items = [
+        data
+        for _, data in load_indexed(r, _metric_history_index(owner))
+        if str(data.get("owner_id") or "").strip() == owner
+    ]
     items = _merge_by(items, sql_items, lambda item: str(item.get("history_id") or ""))
     items.sort(key=lambda item: float(item.get("created_at") or 0), reverse=True)
     return items[:limit]
@@ -2806,15 +2803,17 @@ def _clear_algorithm_history_items(r, owner_id: str) -> int:
     if not owner:
         return 0
     items = _list_algorithm_history_items(r, owner, limit=20000)
+    keys = []
     for item in items:
         hid = str(item.get("history_id") or "").strip()
         if not hid:
             continue
         _sql_record_delete("algorithm_history", hid)
-        try:
-            r.delete(_algorithm_history_key(owner, hid))
-        except Exception:
-            pass
+        keys.append(_algorithm_history_key(owner, hid))
+    try:
+        delete_many(r, keys, indexes=(_algorithm_history_index(owner),))
+    except Exception:
+        pass
     return len(items)
 
 
@@ -2823,15 +2822,17 @@ def _clear_metric_history_items(r, owner_id: str) -> int:
     if not owner:
         return 0
     items = _list_metric_history_items(r, owner, limit=20000)
+    keys = []
     for item in items:
         hid = str(item.get("history_id") or "").strip()
         if not hid:
             continue
         _sql_record_delete("metric_history", hid)
-        try:
-            r.delete(_metric_history_key(owner, hid))
-        except Exception:
-            pass
+        keys.append(_metric_history_key(owner, hid))
+    try:
+        delete_many(r, keys, indexes=(_metric_history_index(owner),))
+    except Exception:
+        pass
     return len(items)
 
 
@@ -2844,17 +2845,17 @@ def _delete_algorithm_history_items(r, owner_id: str, history_ids: list[str]) ->
         return 0
     existing = _list_algorithm_history_items(r, owner, limit=20000)
     existing_ids = {str(item.get("history_id") or "").strip() for item in existing}
-    removed = 0
+    keys = []
     for hid in wanted:
         if hid not in existing_ids:
             continue
         _sql_record_delete("algorithm_history", hid)
-        try:
-            r.delete(_algorithm_history_key(owner, hid))
-        except Exception:
-            pass
-        removed += 1
-    return removed
+        keys.append(_algorithm_history_key(owner, hid))
+    try:
+        delete_many(r, keys, indexes=(_algorithm_history_index(owner),))
+    except Exception:
+        pass
+    return len(keys)
 
 
 def _delete_metric_history_items(r, owner_id: str, history_ids: list[str]) -> int:
@@ -2866,17 +2867,17 @@ def _delete_metric_history_items(r, owner_id: str, history_ids: list[str]) -> in
         return 0
     existing = _list_metric_history_items(r, owner, limit=20000)
     existing_ids = {str(item.get("history_id") or "").strip() for item in existing}
-    removed = 0
+    keys = []
     for hid in wanted:
         if hid not in existing_ids:
             continue
         _sql_record_delete("metric_history", hid)
-        try:
-            r.delete(_metric_history_key(owner, hid))
-        except Exception:
-            pass
-        removed += 1
-    return removed
+        keys.append(_metric_history_key(owner, hid))
+    try:
+        delete_many(r, keys, indexes=(_metric_history_index(owner),))
+    except Exception:
+        pass
+    return len(keys)
 
 
 def _comment_key(resource_type: str, resource_id: str, comment_id: str) -> str:
@@ -2887,6 +2888,11 @@ def _comment_record_id(resource_type: str, resource_id: str, comment_id: str) ->
     return f"{resource_type}:{resource_id}:{comment_id}"
 
 
+def _comment_indexes(resource_type: str, resource_id: str) -> tuple[str, str]:
+    # 按资源的索引供详情页评论列表，全局索引供管理端
+    return (f"comment:{resource_type}:{resource_id}", "comment")
+
+
 def _list_resource_comments(r, resource_type: str, resource_id: str) -> list[dict]:
     sql_items = _sql_record_list("comment", limit=5000)
     if sql_items is not None:
@@ -2897,18 +2903,7 @@ def _list_resource_comments(r, resource_type: str, resource_id: str) -> list[dic
         if not sql_store.allow_redis_fallback():
             sql_items.sort(key=lambda item: float(item.get("created_at") or 0))
             return sql_items
-    items: list[dict] = []
-    pattern = _comment_key(resource_type, resource_id, "*")
-    for key in r.scan_iter(match=pattern, count=500):
-        try:
-            raw = r.get(key)
-            if not raw:
-                continue
-            data = json.loads(raw)
-            if isinstance(data, dict):
-                items.append(data)
-        except Exception:
-            continue
+    items = [data for _, data in load_indexed(r, _comment_indexes(resource_type, resource_id)[0])]
     items = _merge_by(items, sql_items, lambda item: _comment_record_id(
         str(item.get("resource_type") or resource_type),
         str(item.get("resource_id") or resource_id),
@@ -2923,7 +2918,7 @@ def _save_resource_comment(r, resource_type: str, resource_id: str, data: dict)
     if not comment_id:
         raise ValueError("comment_id_required")
     _sql_record_save("comment", _comment_record_id(resource_type, resource_id, comment_id), data)
-    r.set(_comment_key(resource_type, resource_id, comment_id), json.dumps(data, ensure_ascii=False))
+    save_many(r, {_comment_key(resource_type, resource_id, comment_id): data}, indexes=_comment_indexes(resource_type, resource_id))
 
 
 def _load_resource_comment(r, resource_type: str, resource_id: str, comment_id: str) -> Optional[dict]:
@@ -2944,7 +2939,7 @@ def _load_resource_comment(r, resource_type: str, resource_id: str, comment_id:
 
 def _delete_resource_comment(r, resource_type: str, resource_id: str, comment_id: str) -> None:
     _sql_record_delete("comment", _comment_record_id(resource_type, resource_id, comment_id))
-    r.delete(_comment_key(resource_type, resource_id, comment_id))
+    delete_many(r, [_comment_key(resource_type, resource_id, comment_id)], indexes=_comment_indexes(resource_type, resource_id))
 
 
 def _notice_key(username: str, notice_id: str) -> str:
@@ -2955,6 +2950,10 @@ def _notice_record_id(username: str, notice_id: str) -> str:
     return f"{username}:{notice_id}"
 
 
+def _notice_index(username: str) -> str:
+    return f"notice:{username}"
+
+
 def _report_key(report_id: str) -> str:
     return f"report:{report_id}"
 
@@ -2964,8 +2963,24 @@ def _save_notice(r, username: str, data: dict) -> None:
     owner = str(username or "").strip()
     if not notice_id or not owner:
         raise ValueError("notice_key_required")
-    _sql_record_save("notice", _notice_record_id(owner, notice_id), data)
-    r.set(_notice_key(owner, notice_id), json.dumps(data, ensure_ascii=False))
+    _save_notices(r, owner, [data])
+
+
+def _save_notices(r, username: str, items: list[dict]) -> None:
+    """批量保存同一用户的通知：SQL 一条多行 upsert，Redis 一个 pipeline。"""
+    owner = str(username or "").strip()
+    if not owner:
+        raise ValueError("notice_key_required")
+    batch: dict[str, dict] = {}
+    sql_items: list[tuple[str, dict]] = []
+    for data in items:
+        notice_id = str(data.get("notice_id") or "").strip()
+        if not notice_id:
+            raise ValueError("notice_key_required")
+        sql_items.append((_notice_record_id(owner, notice_id), data))
+        batch[_notice_key(owner, notice_id)] = data
+    _sql_record_save_many("notice", sql_items)
+    save_many(r, batch, indexes=(_notice_index(owner),))
 
 
 def _load_notice(r, username: str, notice_id: str) -> Optional[dict]:
@@ -2989,8 +3004,17 @@ def _delete_notice(r, username: str, notice_id: str) -> None:
     nid = str(notice_id or "").strip()
     if not owner or not nid:
         return
-    _sql_record_delete("notice", _notice_record_id(owner, nid))
-    r.delete(_notice_key(owner, nid))
+    _delete_notices(r, owner, [nid])
+
+
+def _delete_notices(r, username: str, notice_ids: list[str]) -> None:
+    owner = str(username or "").strip()
+    ids = [str(x or "").strip() for x in notice_ids if str(x or "").strip()]
+    if not owner or not ids:
+        return
+    for nid in ids:
+        _sql_record_delete("notice", _notice_record_id(owner, nid))
+    delete_many(r, [_notice_key(owner, nid) for nid in ids], indexes=(_notice_index(owner),))
 
 
 def _list_notices(r, username: str, unread_only: bool = False) -> list[dict]:
@@ -3014,29 +3038,24 @@ def _list_notices(r, username: str, unread_only: bool = False) -> list[dict]:
             sql_items.sort(key=lambda item: float(item.get("created_at") or 0), reverse=True)
             return sql_items
     items: list[dict] = []
-    for key in r.scan_iter(match=_notice_key(owner, "*"), count=500):
+    resync: dict[str, dict] = {}
+    for key, data in load_indexed(r, _notice_index(owner)):
+        notice_id = str(data.get("notice_id") or "").strip()
+        sql_item = sql_item_map.get(notice_id)
+        if sql_item is not None:
+            # SQL 已经成为通知状态的权威来源，若 Redis 里仍保留旧副本，
+            # 在列表读取时直接用 SQL 数据回写，避免角标与通知页口径不一致。
+            if sql_item != data:
+                resync[key] = sql_item
+            continue
+        if unread_only and bool(data.get("read")):
+            continue
+        items.append(data)
+    if resync:
         try:
-            raw = r.get(key)
-            if not raw:
-                continue
-            data = json.loads(raw)
-            if not isinstance(data, dict):
-                continue
-            notice_id = str(data.get("notice_id") or "").strip()
-            sql_item = sql_item_map.get(notice_id)
-            if sql_item is not None:
-                # SQL 已经成为通知状态的权威来源，若 Redis 里仍保留旧副本，
-                # 在列表读取时直接用 SQL 数据回写，避免角标与通知页口径不一致。
-                try:
-                    r.set(_notice_key(owner, notice_id), json.dumps(sql_item, ensure_ascii=False))
-                except Exception:
-                    pass
-                continue
-            if unread_only and bool(data.get("read")):
-                continue
-            items.append(data)
+            save_many(r, resync, indexes=(_notice_index(owner),))
         except Exception:
-            continue
+            pass
     items = _merge_by(items, sql_items, lambda item: _notice_record_id(
         str(item.get("username") or owner),
         str(item.get("notice_id") or ""),
@@ -3064,7 +3083,7 @@ def _create_notice(r, username: str, title: str, content: str, *, kind: str = "i
 
 def _save_report(r, report_id: str, data: dict) -> None:
     _sql_record_save("report", report_id, data)
-    r.set(_report_key(report_id), json.dumps(data, ensure_ascii=False))
+    save_many(r, {_report_key(report_id): data}, indexes=("report",))
 
 
 def _load_report(r, report_id: str) -> Optional[dict]:
@@ -3088,17 +3107,7 @@ def _list_reports(r) -> list[dict]:
     if sql_items is not None and not sql_store.allow_redis_fallback():
         sql_items.sort(key=lambda item: float(item.get("created_at") or 0), reverse=True)
         return sql_items
-    items: list[dict] = []
-    for key in r.scan_iter(match="report:*", count=500):
-        try:
-            raw = r.get(key)
-            if not raw:
-                continue
-            data = json.loads(raw)
-            if isinstance(data, dict) and data.get("report_id"):
-                items.append(data)
-        except Exception:
-            continue
+    items = [data for _, data in load_indexed(r, "report") if data.get("report_id")]
     items = _merge_by(items, sql_items, lambda item: str(item.get("report_id") or ""))
     items.sort(key=lambda item: float(item.get("created_at") or 0), reverse=True)
     return items
@@ -3106,7 +3115,7 @@ def _list_reports(r) -> list[dict]:
 
 def _delete_report(r, report_id: str) -> None:
     _sql_record_delete("report", report_id)
-    r.delete(_report_key(report_id))
+    delete_many(r, [_report_key(report_id)], indexes=("report",))
 
 
 def _delete_dataset_record_with_related_state(r, dataset: dict, *, delete_disk: bool) -> bool:
@@ -3135,6 +3144,7 @@ def _delete_dataset_record_with_related_state(r, dataset: dict, *, delete_disk:
             return False
         if target_dir.exists():
             shutil.rmtree(target_dir, ignore_errors=False)
+            release_tree(target_dir)
             return True
     except Exception:
         return False
@@ -3638,69 +3648,6 @@ def _cleanup_invalid_runs_for_owner(r, owner_id: str | None) -> None:
             delete_run(r, run_id)
 
 
-class _StreamingZipBuffer:
-    def __init__(self):
-        self._chunks: list[bytes] = []
-        self._position = 0
-
-    def write(self, data):
-        if not data:
-            return 0
-        if isinstance(data, memoryview):
-            data = data.tobytes()
-        elif isinstance(data, bytearray):
-            data = bytes(data)
-        self._chunks.append(data)
-        self._position += len(data)
-        return len(data)
-
-    def tell(self):
-        return self._position
-
-    def flush(self):
-        return None
-
-    def readable(self):
-        return False
-
-    def writable(self):
-        return True
-
-    def seekable(self):
-        return False
-
-    def pop_chunks(self) -> bytes:
-        if not self._chunks:
-            return b""
-        data = b"".join(self._chunks)
-        self._chunks.clear()
-        return data
-
-
-def _stream_zipped_directory(source_dir: Path, chunk_size: int = 1024 * 1024):
-    buffer = _StreamingZipBuffer()
-    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
-        for path in sorted(source_dir.rglob("*")):
-            if not path.is_file():
-                continue
-            arcname = str(path.relative_to(source_dir))
-            with zf.open(arcname, "w") as target, path.open("rb") as source:
-                while True:
-                    chunk = source.read(chunk_size)
-                    if not chunk:
-                        break
-                    target.write(chunk)
-                    ready = buffer.pop_chunks()
-                    if ready:
-                        yield ready
-            ready = buffer.pop_chunks()
-            if ready:
-                yield ready
-    ready = buffer.pop_chunks()
-    if ready:
-        yield ready
-
-
 def _dataset_has_files(dataset_dir: Path) -> bool:
     if not dataset_dir.exists() or not dataset_dir.is_dir():
         return False
@@ -3857,17 +3804,7 @@ def _list_all_comments(r) -> list[dict]:
     if sql_items is not None and not sql_store.allow_redis_fallback():
         sql_items.sort(key=lambda x: float(x.get("created_at") or 0), reverse=True)
         return sql_items
-    items: list[dict] = []
-    for key in r.scan_iter(match="comment:*:*:*", count=1000):
-        try:
-            raw = r.get(key)
-            if not raw:
-                continue
-            data = json.loads(raw)
-            if isinstance(data, dict) and data.get("comment_id"):
-                items.append(data)
-        except Exception:
-            continue
+    items = [data for _, data in load_indexed(r, "comment") if data.get("comment_id")]
     items = _merge_by(items, sql_items, lambda item: _comment_record_id(
         str(item.get("resource_type") or ""),
         str(item.get("resource_id") or ""),
@@ -4065,6 +4002,12 @@ def change_dataset_id(dataset_id: str, payload: DatasetIdChange, current_user: d
     r.delete(_get_dataset_cache_key(dataset_id))
     r.delete(_get_dataset_version_key(dataset_id))
     r.delete(_get_dataset_fs_hash_key(dataset_id))
+    # 物化数据与配对清单都按源文件路径索引，目录搬走后整体失效
+    remove_materialized(_dataset_storage_root(), owner_id, dataset_id)
+    remove_pair_manifest(old_dir, manifest_root_for(_dataset_storage_root()))
+    remove_export_layout(old_dir)
+    rename_tree(old_dir, new_dir)
+    remove_fs_state(old_dir, state_root_for(_dataset_storage_root()))
 
     for preset in list_presets(r, limit=5000, owner_id=owner_id):
         if str(preset.get("dataset_id") or "") != dataset_id:
@@ -4110,6 +4053,10 @@ def remove_dataset(dataset_id: str, delete_disk: bool = Query(False), current_us
         )
     deleted_disk = False
     delete_dataset(r, dataset_id)
+    remove_materialized(_dataset_storage_root(), str(cur.get("owner_id") or "system").strip() or "system", dataset_id)
+    remove_pair_manifest(dataset_dir, manifest_root_for(_dataset_storage_root()))
+    remove_export_layout(dataset_dir)
+    remove_fs_state(dataset_dir, state_root_for(_dataset_storage_root()))
     r.delete(_get_dataset_cache_key(dataset_id))
     r.delete(_get_dataset_version_key(dataset_id))
     r.delete(_get_dataset_fs_hash_key(dataset_id))
@@ -4120,6 +4067,7 @@ def remove_dataset(dataset_id: str, delete_disk: bool = Query(False), current_us
             target_dir.relative_to(storage_root)
             if target_dir.exists():
                 shutil.rmtree(target_dir, ignore_errors=True)
+                release_tree(target_dir)
                 deleted_disk = True
         except Exception:
             deleted_disk = False
@@ -4127,7 +4075,7 @@ def remove_dataset(dataset_id: str, delete_disk: bool = Query(False), current_us
 
 
 @app.get("/datasets/{dataset_id}/export")
-def export_dataset(dataset_id: str, current_user: dict = Depends(get_current_user)):
+def export_dataset(dataset_id: str, request: Request, current_user: dict = Depends(get_current_user)):
     r = make_redis()
     _ensure_catalog_defaults(r)
     cur = load_dataset(r, dataset_id)
@@ -4138,10 +4086,36 @@ def export_dataset(dataset_id: str, current_user: dict = Depends(get_current_use
     if not _dataset_has_files(dataset_dir):
         err.api_error(400, err.E_HTTP, "empty_dataset_not_allowed", dataset_id=dataset_id)
     filename = f"{dataset_id}.zip"
+    entries = list_export_entries(dataset_dir)
+    etag = export_etag(entries)
+    headers = {**_attachment_headers(filename), "Accept-Ranges": "bytes", "ETag": f'"{etag}"'}
+    range_header = request.headers.get("range")
+    if_range = str(request.headers.get("if-range") or "").strip()
+    if range_header and (not if_range or if_range == f'"{etag}"'):
+        # 断点续传：导出字节是确定的，按布局索引定位；尚无索引时先并行跑一遍得到布局
+        layout = ensure_export_layout(dataset_dir, entries, etag)
+        span = parse_range(range_header, layout.total_size)
+        if span is False:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{layout.total_size}"})
+        if span:
+            start, end = span
+            return StreamingResponse(
+                layout.iter_range(start, end),
+                status_code=206,
+                media_type="application/zip",
+                headers={
+                    **headers,
+                    "Content-Range": f"bytes {start}-{end}/{layout.total_size}",
+                    "Content-Length": str(end - start + 1),
+                },
+            )
+    layout = load_export_layout(dataset_dir, entries, etag)
+    if layout is not None:
+        headers["Content-Length"] = str(layout.total_size)
     return StreamingResponse(
-        _stream_zipped_directory(dataset_dir),
+        stream_zip_directory(dataset_dir, entries, etag),
         media_type="application/zip",
-        headers=_attachment_headers(filename),
+        headers=headers,
     )
 
 
@@ -4191,7 +4165,11 @@ def download_dataset_to_user_library(dataset_id: str, current_user: dict = Depen
     target_dir.parent.mkdir(parents=True, exist_ok=True)
     if target_dir.exists():
         shutil.rmtree(target_dir)
-    if source_dir.exists():
+        release_tree(target_dir)
+    if source_dir.exists() and dedup_enabled():
+        # 副本文件硬链接到内容寻址存储中的 blob，不复制数据
+        dedup_copy_tree(source_dir, target_dir)
+    elif source_dir.exists():
         shutil.copytree(source_dir, target_dir)
     else:
         target_dir.mkdir(parents=True, exist_ok=True)
@@ -4329,24 +4307,12 @@ def _get_dataset_fs_hash_key(dataset_id: str) -> str:
     return f"dataset:fs_hash:{dataset_id}"
 
 
-def _get_dataset_fs_hash_by_dir(ds_dir: Path) -> str:
-    import hashlib
-    import os
-
-    hasher = hashlib.md5()
-    if ds_dir.exists():
-        for root, dirs, files in os.walk(ds_dir):
-            for file in sorted(files):
-                file_path = os.path.join(root, file)
-                try:
-                    mtime = os.path.getmtime(file_path)
-                    hasher.update(f"{file_path}:{mtime}".encode("utf-8"))
-                except Exception:
-                    pass
-    return hasher.hexdigest()
+def _get_dataset_fs_hash_by_dir(ds_dir: Path, full: bool = False) -> str:
+    # 增量检测：只 stat 已知目录，mtime 变化的目录才重新列举；full=True 时全量复核（可发现同名文件被原地覆盖）
+    return detect_dataset_changes(ds_dir, full=full, state_root=state_root_for(_dataset_storage_root())).fs_hash
 
 
-def _scan_dataset_dir_on_disk(ds_dir: Path) -> tuple[str, str, dict]:
+def _scan_dataset_dir_on_disk(ds_dir: Path, fs_hash: str | None = None) -> tuple[str, str, dict]:
     gt_dir = resolve_gt_dir_under(ds_dir, "gt")
     if gt_dir is None:
         return "图像", "0 张", {"supported_task_types": [], "pairs_by_task": {}, "counts_by_dir": {}}
@@ -4360,39 +4326,15 @@ def _scan_dataset_dir_on_disk(ds_dir: Path) -> tuple[str, str, dict]:
         "video_denoise": "noisy",
         "video_sr": "lr",
     }
-    gt_img_count = 0
-    gt_video_count = 0
-    for p in gt_dir.rglob("*"):
-        if not p.is_file():
-            continue
-        suf = p.suffix.lower()
-        if suf in IMG_EXTS:
-            gt_img_count += 1
-        elif suf in VIDEO_EXTS:
-            gt_video_count += 1
+    # 扫描是配对清单的写入方：一次遍历得到各目录计数与全部任务的配对，创建 / 执行 Run 时直接读取清单
+    manifest = get_pair_manifest(ds_dir, fs_hash=fs_hash, rebuild=True, manifest_root=manifest_root_for(_dataset_storage_root()))
+    gt_img_count = manifest.dir_count("gt", "image")
+    gt_video_count = manifest.dir_count("gt", "video")
     counts_by_dir: dict[str, int] = {"gt": gt_img_count + gt_video_count}
-
     for d in input_dir_by_task.values():
-        dd = ds_dir / d
-        total = 0
-        if dd.exists():
-            for p in dd.rglob("*"):
-                if not p.is_file():
-                    continue
-                suf = p.suffix.lower()
-                if suf in IMG_EXTS or suf in VIDEO_EXTS:
-                    total += 1
-        counts_by_dir[d] = total
+        counts_by_dir[d] = manifest.dir_count(d)
 
-    pairs_by_task = {
-        "dehaze": count_paired_images(data_root=ds_dir.parent, owner_id="", dataset_id=ds_dir.name, input_dirname="hazy", gt_dirname="gt", storage_path=str(ds_dir)),
-        "denoise": count_paired_images(data_root=ds_dir.parent, owner_id="", dataset_id=ds_dir.name, input_dirname="noisy", gt_dirname="gt", storage_path=str(ds_dir)),
-        "deblur": count_paired_images(data_root=ds_dir.parent, owner_id="", dataset_id=ds_dir.name, input_dirname="blur", gt_dirname="gt", storage_path=str(ds_dir)),
-        "sr": count_paired_images(data_root=ds_dir.parent, owner_id="", dataset_id=ds_dir.name, input_dirname="lr", gt_dirname="gt", storage_path=str(ds_dir)),
-        "lowlight": count_paired_images(data_root=ds_dir.parent, owner_id="", dataset_id=ds_dir.name, input_dirname="dark", gt_dirname="gt", storage_path=str(ds_dir)),
-        "video_denoise": count_paired_videos(data_root=ds_dir.parent, owner_id="", dataset_id=ds_dir.name, input_dirname="noisy", gt_dirname="gt", storage_path=str(ds_dir)),
-        "video_sr": count_paired_videos(data_root=ds_dir.parent, owner_id="", dataset_id=ds_dir.name, input_dirname="lr", gt_dirname="gt", storage_path=str(ds_dir)),
-    }
+    pairs_by_task = {task: manifest.count(*task_group(task)) for task in input_dir_by_task}
     supported = sorted([t for t, c in pairs_by_task.items() if c > 0])
     image_pair_total = sum(v for k, v in pairs_by_task.items() if not k.startswith("video_"))
     video_pair_total = sum(v for k, v in pairs_by_task.items() if k.startswith("video_"))
@@ -4442,7 +4384,7 @@ def scan_dataset(
     # 检查文件系统变化
     fs_hash_key = _get_dataset_fs_hash_key(dataset_id)
     ds_dir = _dataset_dir_from_record(cur)
-    current_fs_hash = _get_dataset_fs_hash_by_dir(ds_dir)
+    current_fs_hash = _get_dataset_fs_hash_by_dir(ds_dir, full=force_refresh)
     cached_fs_hash = r.get(fs_hash_key)
     
     # 濡傛灉鏂囦欢绯荤粺鍙戠敓鍙樺寲锛屽鍔犵増鏈彿
@@ -4483,7 +4425,7 @@ def scan_dataset(
         user_dir = data_root / owner_id
         user_dir.mkdir(parents=True, exist_ok=True)
         ds_dir.parent.mkdir(parents=True, exist_ok=True)
-        t, size, meta = _scan_dataset_dir_on_disk(ds_dir)
+        t, size, meta = _scan_dataset_dir_on_disk(ds_dir, fs_hash=current_fs_hash)
         
         # 缓存结果，包含版本信息
         import json
@@ -4513,6 +4455,62 @@ def scan_dataset(
     return DatasetOut(**cur)
 
 
+@app.post("/datasets/{dataset_id}/materialize", status_code=202)
+def materialize_dataset_tensors(
+    dataset_id: str,
+    task_type: Optional[str] = Query(None, description="只物化指定图像任务；为空时物化全部可配对的图像任务"),
+    current_user: dict = Depends(get_current_user),
+):
+    r = make_redis()
+    _ensure_catalog_defaults(r)
+    cur = load_dataset(r, dataset_id)
+    if not cur:
+        err.api_error(404, err.E_DATASET_NOT_FOUND, "dataset_not_found", dataset_id=dataset_id)
+    _assert_resource_access(cur, current_user, allow_system=True)
+    task_types = None
+    if task_type:
+        key = str(task_type).strip().lower()
+        if key not in IMAGE_TASK_INPUT_DIRS:
+            err.api_error(400, err.E_HTTP, "materialize_task_type_unsupported", task_type=key, allowed=sorted(IMAGE_TASK_INPUT_DIRS))
+        task_types = [key]
+    ds_dir = _dataset_dir_from_record(cur)
+    if not ds_dir.is_dir():
+        err.api_error(404, err.E_DATASET_NOT_FOUND, "dataset_dir_not_found", dataset_id=dataset_id)
+    # 解码写盘耗时与数据集大小成正比，交给 worker 执行；同一数据集已有排队 / 运行中的任务时直接返回它
+    job = load_materialize_job(r, dataset_id)
+    if job and job.get("status") in {"queued", "running"}:
+        return {"ok": True, "dataset_id": dataset_id, "job": job}
+    owner_id = str(cur.get("owner_id") or "system").strip() or "system"
+    job = {"dataset_id": dataset_id, "task_types": task_types, "status": "queued", "queued_at": time.time()}
+    save_materialize_job(r, dataset_id, job)
+    materialize_dataset_job.delay(dataset_id, str(_dataset_storage_root()), str(ds_dir), owner_id, task_types)
+    return {"ok": True, "dataset_id": dataset_id, "job": job}
+
+
+@app.get("/datasets/{dataset_id}/materialize")
+def get_materialize_dataset_job(dataset_id: str, current_user: dict = Depends(get_current_user)):
+    r = make_redis()
+    _ensure_catalog_defaults(r)
+    cur = load_dataset(r, dataset_id)
+    if not cur:
+        err.api_error(404, err.E_DATASET_NOT_FOUND, "dataset_not_found", dataset_id=dataset_id)
+    _assert_resource_access(cur, current_user, allow_system=True)
+    return {"ok": True, "dataset_id": dataset_id, "job": load_materialize_job(r, dataset_id)}
+
+
+@app.delete("/datasets/{dataset_id}/materialize")
+def remove_materialized_dataset_tensors(dataset_id: str, current_user: dict = Depends(get_current_user)):
+    r = make_redis()
+    _ensure_catalog_defaults(r)
+    cur = load_dataset(r, dataset_id)
+    if not cur:
+        err.api_error(404, err.E_DATASET_NOT_FOUND, "dataset_not_found", dataset_id=dataset_id)
+    _assert_resource_access(cur, current_user, allow_system=True)
+    owner_id = str(cur.get("owner_id") or "system").strip() or "system"
+    removed = remove_materialized(_dataset_storage_root(), owner_id, dataset_id)
+    return {"ok": True, "dataset_id": dataset_id, "removed": removed}
+
+
 @app.post("/datasets/{dataset_id}/import_zip", response_model=DatasetOut)
 def import_dataset_zip(dataset_id: str, payload: DatasetImportZip, current_user: dict = Depends(get_current_user)):
     r = make_redis()
@@ -4547,7 +4545,8 @@ def import_dataset_zip(dataset_id: str, payload: DatasetImportZip, current_user:
     # 确保数据目录存在
     ds_dir = _dataset_dir_from_record(cur)
     ds_dir.parent.mkdir(parents=True, exist_ok=True)
-    _import_dataset_zip_bytes_into_dir(zip_bytes, ds_dir, overwrite=True)
+    import_zip_into_dir(zip_bytes, ds_dir, overwrite=True)
+    release_tree(ds_dir)
 
     cur["storage_path"] = str(ds_dir)
     t, size, meta = _scan_dataset_dir_on_disk(ds_dir)
@@ -4576,15 +4575,7 @@ def import_dataset_zip(dataset_id: str, payload: DatasetImportZip, current_user:
     return DatasetOut(**cur)
 
 
-@app.post("/datasets/{dataset_id}/import_zip_file", response_model=DatasetOut)
-def import_dataset_zip_file(
-    dataset_id: str,
-    overwrite: bool = Query(False),
-    file: UploadFile = File(...),
-    current_user: dict = Depends(get_current_user),
-):
-    r = make_redis()
-    _ensure_catalog_defaults(r)
+def _dataset_record_for_zip_import(r, dataset_id: str, current_user: dict) -> dict:
     cur = load_dataset(r, dataset_id)
     if not cur:
         created = time.time()
@@ -4598,22 +4589,16 @@ def import_dataset_zip_file(
             "created_at": created,
             "meta": {},
         }
-    else:
-        # 浠庣幇鏈夋暟鎹泦涓幏鍙杘wner_id
-        owner_id = cur.get("owner_id", _username_of(current_user))
     _assert_resource_access(cur, current_user, allow_system=True)
-    try:
-        zip_bytes = file.file.read()
-    except Exception:
-        err.api_error(400, err.E_BAD_BASE64, "bad_zip_file")
+    return cur
 
-    data_root = Path(__file__).resolve().parents[1] / "data"
-    # 使用用户独立目录结构
-    user_dir = data_root / owner_id
-    # 纭繚鏁版嵁鐩綍瀛樺湪
+
+def _import_dataset_zip_path(r, dataset_id: str, cur: dict, zip_path: Path) -> DatasetOut:
     ds_dir = _dataset_dir_from_record(cur)
     ds_dir.parent.mkdir(parents=True, exist_ok=True)
-    _import_dataset_zip_bytes_into_dir(zip_bytes, ds_dir, overwrite=True)
+    import_zip_into_dir(zip_path, ds_dir, overwrite=True)
+    # 旧内容被整体替换，回收只被旧内容引用的 blob
+    release_tree(ds_dir)
 
     cur["storage_path"] = str(ds_dir)
     t, size, meta = _scan_dataset_dir_on_disk(ds_dir)
@@ -4630,7 +4615,7 @@ def import_dataset_zip_file(
     _apply_task_types_from_scan_meta(cur, meta)
     save_dataset(r, dataset_id, cur)
     
-    # 澧炲姞鏁版嵁闆嗙増鏈彿锛屼娇缂撳瓨澶辨晥
+    # 澧炲姞鏁版嵁闆嗙増鏈彿锛屼娇缂撳瓨澶辨晥
     _increment_dataset_version(r, dataset_id)
     
     # 清除缓存，确保下次扫描获取最新数据
@@ -4640,6 +4625,88 @@ def import_dataset_zip_file(
     return DatasetOut(**cur)
 
 
+@app.post("/datasets/{dataset_id}/import_zip_file", response_model=DatasetOut)
+def import_dataset_zip_file(
+    dataset_id: str,
+    overwrite: bool = Query(False),
+    file: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user),
+):
+    r = make_redis()
+    _ensure_catalog_defaults(r)
+    cur = _dataset_record_for_zip_import(r, dataset_id, current_user)
+    # 上传按块落盘，解压直接读磁盘文件，不在内存中保留整个压缩包
+    try:
+        zip_path = spool_upload(file.file)
+    except Exception:
+        err.api_error(400, err.E_BAD_BASE64, "bad_zip_file")
+    try:
+        return _import_dataset_zip_path(r, dataset_id, cur, zip_path)
+    finally:
+        zip_path.unlink(missing_ok=True)
+
+
+@app.post("/datasets/{dataset_id}/import_upload/{upload_id}", response_model=DatasetOut)
+def import_dataset_zip_upload(dataset_id: str, upload_id: str, current_user: dict = Depends(get_current_user)):
+    """用已 complete 的分块上传导入数据集，导入结束后删除上传会话。"""
+    r = make_redis()
+    _ensure_catalog_defaults(r)
+    root = default_upload_root()
+    upload = load_upload(root, upload_id, owner_id=_username_of(current_user))
+    zip_path = completed_upload_path(root, upload, PURPOSE_DATASET_ZIP)
+    cur = _dataset_record_for_zip_import(r, dataset_id, current_user)
+    out = _import_dataset_zip_path(r, dataset_id, cur, zip_path)
+    discard_upload(root, upload_id)
+    return out
+
+
+@app.post("/uploads", response_model=UploadOut)
+def create_upload(payload: UploadInit, current_user: dict = Depends(get_current_user)):
+    """分块上传：创建会话，返回块大小；之后按 PUT /uploads/{id}/chunks/{index} 上传各块。"""
+    return init_upload(
+        default_upload_root(),
+        owner_id=_username_of(current_user),
+        purpose=payload.purpose,
+        filename=payload.filename,
+        total_size=payload.total_size,
+        sha256=payload.sha256,
+        chunk_size=payload.chunk_size,
+    )
+
+
+@app.get("/uploads/{upload_id}", response_model=UploadOut)
+def get_upload(upload_id: str, current_user: dict = Depends(get_current_user)):
+    """断点续传时查询已收到 / 缺失的块。"""
+    root = default_upload_root()
+    return upload_status(root, load_upload(root, upload_id, owner_id=_username_of(current_user)))
+
+
+@app.put("/uploads/{upload_id}/chunks/{index}")
+def put_upload_chunk(
+    upload_id: str,
+    index: int,
+    sha256: str = Query(""),
+    file: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user),
+):
+    root = default_upload_root()
+    upload = load_upload(root, upload_id, owner_id=_username_of(current_user))
+    return write_chunk(root, upload, index, file.file, sha256=sha256)
+
+
+@app.post("/uploads/{upload_id}/complete", response_model=UploadOut)
+def complete_upload_session(upload_id: str, current_user: dict = Depends(get_current_user)):
+    root = default_upload_root()
+    return complete_upload(root, load_upload(root, upload_id, owner_id=_username_of(current_user)))
+
+
+@app.delete("/uploads/{upload_id}")
+def delete_upload(upload_id: str, current_user: dict = Depends(get_current_user)):
+    root = default_upload_root()
+    load_upload(root, upload_id, owner_id=_username_of(current_user))
+    return {"ok": True, "upload_id": upload_id, "removed": discard_upload(root, upload_id)}
+
+
 
 @app.get("/algorithms")
 def get_algorithms(limit: int = 500, scope: str = Query("manage"), current_user: Optional[dict] = Depends(get_current_user_optional)):
@@ -4933,17 +5000,46 @@ def list_algorithm_submissions_for_current_user(current_user: dict = Depends(get
 
 @app.post("/algorithm-submissions", response_model=AlgorithmSubmissionOut)
 def create_algorithm_submission(payload: AlgorithmSubmissionCreate, current_user: dict = Depends(get_current_user)):
-    r = make_redis()
-    owner_id = _username_of(current_user)
+    task_type, name = _validate_algorithm_submission_fields(payload)
+    archive_filename = Path(str(payload.archive_filename or "").strip() or "").name
+    if not archive_filename:
+        err.api_error(400, err.E_HTTP, "algorithm_archive_filename_required")
+    archive_bytes = _decode_algorithm_submission_archive(payload.archive_b64)
+    return _create_algorithm_submission(payload, task_type, name, archive_filename, archive_bytes, current_user)
+
+
+@app.post("/algorithm-submissions/from-upload", response_model=AlgorithmSubmissionOut)
+def create_algorithm_submission_from_upload(payload: AlgorithmSubmissionFromUpload, current_user: dict = Depends(get_current_user)):
+    """用已 complete 的分块上传创建接入申请（算法包仍受 20MB 上限约束），创建后删除上传会话。"""
+    task_type, name = _validate_algorithm_submission_fields(payload)
+    root = default_upload_root()
+    upload = load_upload(root, payload.upload_id, owner_id=_username_of(current_user))
+    archive_bytes = completed_upload_path(root, upload, PURPOSE_ALGORITHM_ARCHIVE).read_bytes()
+    out = _create_algorithm_submission(payload, task_type, name, upload["filename"], archive_bytes, current_user)
+    discard_upload(root, payload.upload_id)
+    return out
+
+
+def _validate_algorithm_submission_fields(payload) -> tuple[str, str]:
+    """任务类型与名称的廉价校验，先于解码 / 读取算法包执行。"""
     task_label = _normalize_algorithm_task_label(payload.task_type, field="algorithm_submission.task_type")
     task_type = TASK_TYPE_BY_LABEL.get(task_label, "").strip().lower()
     name = _validate_text_encoding(payload.name or "", "algorithm_submission.name").strip()
     if not name:
         err.api_error(400, err.E_HTTP, "algorithm_submission_name_required")
-    archive_filename = Path(str(payload.archive_filename or "").strip() or "").name
-    if not archive_filename:
-        err.api_error(400, err.E_HTTP, "algorithm_archive_filename_required")
-    archive_bytes = _decode_algorithm_submission_archive(payload.archive_b64)
+    return task_type, name
+
+
+def _create_algorithm_submission(
+    payload,
+    task_type: str,
+    name: str,
+    archive_filename: str,
+    archive_bytes: bytes,
+    current_user: dict,
+) -> AlgorithmSubmissionOut:
+    r = make_redis()
+    owner_id = _username_of(current_user)
     submission_id = f"algsub_{uuid.uuid4().hex[:12]}"
     storage_path, archive_size, archive_sha256 = _store_algorithm_submission_archive(owner_id, submission_id, archive_filename, archive_bytes)
     created = time.time()
@@ -5382,6 +5478,7 @@ def patch_metric(metric_id: str, payload: MetricPatch, current_user: dict = Depe
         err.api_error(404, err.E_HTTP, "metric_not_found", metric_id=metric_id)
     _assert_metric_manage_access(cur, current_user)
     was_public = str(cur.get("visibility") or "private").strip().lower() == "public"
+    old_code_text = str(cur.get("code_text") or "")
     if payload.metric_key is not None:
         fallback_name = payload.display_name or payload.name or cur.get("display_name") or cur.get("name")
         cur["metric_key"] = _resolve_metric_key_for_patch(r, metric_id, payload.metric_key, fallback_name)
@@ -5415,6 +5512,8 @@ def patch_metric(metric_id: str, payload: MetricPatch, current_user: dict = Depe
         cur["allow_download"] = False
         cur["community_published_at"] = None
     save_metric(r, metric_id, cur)
+    if str(cur.get("code_text") or "") != old_code_text:
+        invalidate_metric_cache(old_code_text)
     if (
         was_public
         and str(cur.get("visibility") or "private").strip().lower() != "public"
@@ -6576,9 +6675,146 @@ def get_runs(
             return False
         return True
 
-    runs = [x for x in (runs or []) if ok(x)]
+    runs = overlay_runs_progress(r, [x for x in (runs or []) if ok(x)])
     return [_sanitize_run_for_api(x) for x in runs]
 
+
+@app.get("/runs/page")
+def get_runs_page(
+    fields: str | None = Query(None, description="逗号分隔的列，如 run_id,status,task_type,created_at；缺省为全部索引列"),
+    status: str | None = Query(None),
+    task_type: str | None = Query(None),
+    dataset_id: str | None = Query(None),
+    cursor: str | None = Query(None, description="上一页返回的 next_cursor"),
+    limit: int = Query(200, ge=1, le=5000),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Run 轻量列表：只读 SQL 专表的索引列，按 (sort_at, run_id) keyset 分页，不解析完整记录。
+    sort_at 随 Run 更新 / 结束而变化，翻页期间状态变化的 Run 可能漏掉或重复出现。
+    """
+    if not sql_store.is_enabled():
+        err.api_error(409, err.E_HTTP, "sql_store_disabled")
+    filters = {k: v for k, v in {"status": status, "task_type": task_type, "dataset_id": dataset_id}.items() if v}
+    try:
+        items, next_cursor = sql_store.list_record_columns(
+            "run",
+            [x.strip() for x in str(fields or "").split(",") if x.strip()] or None,
+            limit=limit,
+            cursor=cursor,
+            owner_id=_username_of(current_user) or None,
+            include_public=True,
+            **filters,
+        )
+    except ValueError as exc:
+        err.api_error(400, err.E_HTTP, "runs_page_invalid", reason=str(exc))
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def _metric_higher_better(r, metric_key: str) -> bool:
+    for item in [*_builtin_metric_catalog(), *_list_all_metric_records(r)]:
+        if str(item.get("metric_key") or "") == metric_key:
+            return _normalize_metric_direction(item.get("direction")) == "higher_better"
+    return True
+
+
+def _parse_percentiles(raw: str | None) -> list[float]:
+    out: list[float] = []
+    for part in str(raw or "").split(","):
+        part = part.strip().lower().lstrip("p")
+        if not part:
+            continue
+        try:
+            q = float(part)
+        except ValueError:
+            err.api_error(400, err.E_HTTP, "percentiles_invalid", percentiles=raw)
+        if not 0 <= q <= 100:
+            err.api_error(400, err.E_HTTP, "percentiles_invalid", percentiles=raw)
+        out.append(q)
+    return out[:10]
+
+
+@app.get("/runs/leaderboard")
+def get_runs_leaderboard(
+    metric: str = Query(..., description="指标 key，如 PSNR / SSIM / NIQE"),
+    task_type: str | None = Query(None),
+    dataset_id: str | None = Query(None),
+    algorithm_id: str | None = Query(None),
+    eval_mode: str | None = Query(None, description="preview|full"),
+    group_by: str = Query("algorithm_id", description="algorithm_id|dataset_id|task_type|owner_id"),
+    rank_by: str = Query("best", description="best|mean"),
+    order: str = Query("auto", description="auto|desc|asc；auto 按指标方向"),
+    percentiles: str | None = Query(None, description="逗号分隔，如 50,90"),
+    since: float | None = Query(None, description="只统计该时间戳之后完成的 Run"),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: dict = Depends(get_current_user),
+):
+    """已完成 Run 的指标排行榜，直接在结果表上分组聚合。"""
+    if group_by not in run_results.GROUP_COLUMNS:
+        err.api_error(400, err.E_HTTP, "group_by_invalid", allowed=list(run_results.GROUP_COLUMNS))
+    if rank_by not in ("best", "mean"):
+        err.api_error(400, err.E_HTTP, "rank_by_invalid", allowed=["best", "mean"])
+    order_value = str(order or "auto").strip().lower()
+    if order_value not in ("auto", "desc", "asc"):
+        err.api_error(400, err.E_HTTP, "order_invalid", allowed=["auto", "desc", "asc"])
+    r = make_redis()
+    metric_key = str(metric or "").strip()
+    higher_better = _metric_higher_better(r, metric_key) if order_value == "auto" else order_value == "desc"
+    is_admin = _normalize_user_role(current_user) == "admin"
+    items = run_results.leaderboard(
+        metric_key,
+        group_by=group_by,
+        higher_better=higher_better,
+        rank_by=rank_by,
+        percentiles=_parse_percentiles(percentiles),
+        limit=limit,
+        task_type=task_type,
+        dataset_id=dataset_id,
+        algorithm_id=algorithm_id,
+        eval_mode=eval_mode,
+        since=since,
+        viewer_id=None if is_admin else (_username_of(current_user) or ""),
+    )
+    return {
+        "metric": metric_key,
+        "group_by": group_by,
+        "rank_by": rank_by,
+        "direction": "higher_better" if higher_better else "lower_better",
+        "items": items,
+    }
+
+
+@app.get("/runs/compare")
+def get_runs_compare(
+    run_ids: str = Query(..., description="逗号分隔的 run_id"),
+    metrics: str | None = Query(None, description="逗号分隔的指标 key，缺省为全部"),
+    current_user: dict = Depends(get_current_user),
+):
+    ids = [x.strip() for x in str(run_ids or "").split(",") if x.strip()]
+    if len(ids) > 500:
+        err.api_error(400, err.E_HTTP, "too_many_run_ids", max=500)
+    is_admin = _normalize_user_role(current_user) == "admin"
+    return run_results.compare_runs(
+        ids,
+        metrics=[x.strip() for x in str(metrics or "").split(",") if x.strip()],
+        viewer_id=None if is_admin else (_username_of(current_user) or ""),
+    )
+
+
+@app.post("/admin/run-results/rebuild")
+def admin_rebuild_run_results(current_user: dict = Depends(get_current_user)):
+    """从全部 Run 记录重建结果表（历史 Run 回填 / 结果表写入失败后补齐）。"""
+    _require_admin(current_user)
+    r = make_redis()
+    return run_results.rebuild_run_results(list_all_runs(r, limit=1_000_000))
+
+
+@app.post("/admin/dataset-cas/gc")
+def admin_gc_dataset_cas(current_user: dict = Depends(get_current_user)):
+    """回收内容寻址仓库中已无数据集文件引用的 blob（清单丢失 / 进程中断遗留）。"""
+    _require_admin(current_user)
+    return {"removed": gc_blobs()}
+
 @app.get("/runs/export")
 def export_runs(
     format: str = Query("csv", description="csv|xlsx"),
@@ -6663,7 +6899,7 @@ def export_runs(
         m = x.get("metrics") or {}
         params = dict(x.get("params") or {})
         params.pop("niqe_fallback", None)
-        samples = x.get("samples") or []
+        samples = samples_by_run.get(str(x.get("run_id") or "")) or []
         record = x.get("record") if isinstance(x.get("record"), dict) else {}
         ds = record.get("dataset") if isinstance(record.get("dataset"), dict) else {}
         alg = record.get("algorithm") if isinstance(record.get("algorithm"), dict) else {}
@@ -6712,6 +6948,7 @@ def export_runs(
             "record_json": json.dumps(record, ensure_ascii=False),
         }
 
+    samples_by_run = load_samples_for_runs(r, runs)
     rows = [to_row(x) for x in runs]
 
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -6858,7 +7095,29 @@ def get_run(run_id: str, current_user: dict = Depends(get_current_user)):
         run = load_run(r, run_id)
         if not run:
             err.api_error(404, err.E_RUN_NOT_FOUND, "run_not_found", run_id=run_id)
-    return _sanitize_run_for_api(run)
+    return _sanitize_run_for_api(overlay_run_progress(run, load_run_progress(r, run_id)))
+
+
+@app.get("/runs/{run_id}/samples")
+def get_run_samples(
+    run_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: dict = Depends(get_current_user),
+):
+    r = make_redis()
+    run = load_run(r, run_id)
+    if not run:
+        err.api_error(404, err.E_RUN_NOT_FOUND, "run_not_found", run_id=run_id)
+    _assert_resource_access(run, current_user, allow_system=True)
+    embedded = run.get("samples") if isinstance(run.get("samples"), list) else []
+    if embedded and str(run.get("status") or "").lower() in {"done", "failed", "canceled"}:
+        # 旧 Run 样本内嵌在记录里：首次分页读取时迁出，之后列表 / 详情都不再携带
+        save_run_samples(r, run_id, embedded)
+        migrated = {**run, "samples": [], "sample_count": len(embedded)}
+        save_run(r, run_id, migrated)
+    items, total = load_run_samples(r, run_id, offset=offset, limit=limit, run=run)
+    return {"run_id": run_id, "offset": offset, "limit": limit, "total": total, "items": items}
 
 
 @app.post("/runs/{run_id}/cancel")
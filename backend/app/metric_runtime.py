@@ -1,8 +1,13 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+import hashlib
 import inspect
 import math
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
 from typing import Any, Callable
 
 import cv2
@@ -12,6 +17,12 @@ from skimage.metrics import peak_signal_noise_ratio, structural_similarity
 from .vision.niqe_simple import niqe_score
 
 CALLABLE_NAMES = ("compute_metric", "evaluate_metric", "metric_fn")
+METRIC_CACHE_SIZE_ENV = "ABP_METRIC_CACHE_SIZE"
+DEFAULT_METRIC_CACHE_SIZE = 64
+METRIC_ARG_NAMES = ("gt_bgr_u8", "pred_bgr_u8", "gt", "pred", "sample_name", "task_type")
+# 可选的批量入口：一次接收 N×H×W×C 帧栈，返回长度为 N 的逐帧数值序列
+BATCH_CALLABLE_NAMES = ("compute_metric_batch",)
+BATCH_ARG_NAMES = ("gt_batch", "pred_batch", "gt", "pred", "sample_names", "task_type")
 
 SAFE_BUILTINS = {
     "abs": abs,
@@ -50,23 +61,142 @@ def _build_exec_globals() -> dict[str, Any]:
     }
 
 
-def load_metric_callable(code_text: str) -> Callable[..., Any]:
+def _exec_metric_scope(code_text: str) -> dict[str, Any]:
     source = str(code_text or "").strip()
     if not source:
         raise ValueError("metric_code_empty")
     scope: dict[str, Any] = {}
     exec(compile(source, "<metric_code>", "exec"), _build_exec_globals(), scope)
-    for name in CALLABLE_NAMES:
+    return scope
+
+
+def _pick_callable(scope: dict[str, Any], names: tuple[str, ...]) -> Callable[..., Any] | None:
+    for name in names:
         fn = scope.get(name)
         if callable(fn):
             return fn
-    raise ValueError("metric_entrypoint_missing")
+    return None
+
+
+def load_metric_callable(code_text: str) -> Callable[..., Any]:
+    fn = _pick_callable(_exec_metric_scope(code_text), CALLABLE_NAMES)
+    if fn is None:
+        raise ValueError("metric_entrypoint_missing")
+    return fn
+
+
+@dataclass(frozen=True)
+class CompiledMetric:
+    """编译后的自定义指标：入口函数 + 预先解析好的参数绑定方案。"""
+
+    code_hash: str
+    fn: Callable[..., Any]
+    arg_names: tuple[str, ...]
+    missing_param: str = ""
+    batch_fn: Callable[..., Any] | None = None
+    batch_arg_names: tuple[str, ...] = ()
+
+    def bind(self, available: dict[str, Any]) -> dict[str, Any]:
+        if self.missing_param:
+            raise ValueError(f"metric_param_unsupported:{self.missing_param}")
+        return {name: available[name] for name in self.arg_names}
+
+    @property
+    def supports_batch(self) -> bool:
+        return self.batch_fn is not None
+
+
+def metric_code_hash(code_text: str) -> str:
+    return hashlib.sha256(str(code_text or "").strip().encode("utf-8")).hexdigest()
+
+
+def _build_arg_plan(fn: Callable[..., Any], allowed: tuple[str, ...] = METRIC_ARG_NAMES) -> tuple[tuple[str, ...], str]:
+    signature = inspect.signature(fn)
+    if any(p.kind == inspect.Parameter.VAR_KEYWORD for p in signature.parameters.values()):
+        return allowed, ""
+    names: list[str] = []
+    for name, param in signature.parameters.items():
+        if name in allowed:
+            names.append(name)
+        elif param.default is inspect._empty:
+            return (), name
+    return tuple(names), ""
+
+
+def _cache_capacity() -> int:
+    try:
+        return max(1, int(os.getenv(METRIC_CACHE_SIZE_ENV, "") or DEFAULT_METRIC_CACHE_SIZE))
+    except ValueError:
+        return DEFAULT_METRIC_CACHE_SIZE
+
+
+_COMPILED_CACHE: "OrderedDict[str, CompiledMetric]" = OrderedDict()
+_COMPILED_LOCK = threading.Lock()
+
+
+def get_compiled_metric(code_text: str) -> CompiledMetric:
+    """
+    按代码文本哈希缓存编译结果（LRU），同一段指标代码在一个进程内只 compile / exec / 解析签名一次。
+    编译失败不进入缓存，每次调用都会重新抛出原始错误。
+    """
+    key = metric_code_hash(code_text)
+    with _COMPILED_LOCK:
+        hit = _COMPILED_CACHE.get(key)
+        if hit is not None:
+            _COMPILED_CACHE.move_to_end(key)
+            return hit
+    scope = _exec_metric_scope(code_text)
+    fn = _pick_callable(scope, CALLABLE_NAMES)
+    if fn is None:
+        raise ValueError("metric_entrypoint_missing")
+    arg_names, missing = _build_arg_plan(fn)
+    batch_fn = _pick_callable(scope, BATCH_CALLABLE_NAMES)
+    batch_arg_names: tuple[str, ...] = ()
+    if batch_fn is not None:
+        batch_arg_names, batch_missing = _build_arg_plan(batch_fn, BATCH_ARG_NAMES)
+        if batch_missing:
+            # 批量入口签名不受支持时只用逐帧入口，不影响指标可用性
+            batch_fn = None
+    compiled = CompiledMetric(
+        code_hash=key,
+        fn=fn,
+        arg_names=arg_names,
+        missing_param=missing,
+        batch_fn=batch_fn,
+        batch_arg_names=batch_arg_names,
+    )
+    with _COMPILED_LOCK:
+        compiled = _COMPILED_CACHE.setdefault(key, compiled)
+        _COMPILED_CACHE.move_to_end(key)
+        capacity = _cache_capacity()
+        while len(_COMPILED_CACHE) > capacity:
+            _COMPILED_CACHE.popitem(last=False)
+    return compiled
+
+
+def invalidate_metric_cache(code_text: str | None = None) -> None:
+    """指标代码被修改后移除旧代码的缓存；不传参数时清空全部缓存。"""
+    with _COMPILED_LOCK:
+        if code_text is None:
+            _COMPILED_CACHE.clear()
+        else:
+            _COMPILED_CACHE.pop(metric_code_hash(code_text), None)
 
 
 def validate_python_metric_code(code_text: str) -> None:
     load_metric_callable(code_text)
 
 
+def _writable(arr: Any) -> Any:
+    """
+    解码缓存 / 物化数据给出的帧是只读的；用户指标可能原地修改输入（如 pred -= gt），
+    只读数组交给用户代码前复制一份，可写数组原样传入。
+    """
+    if isinstance(arr, np.ndarray) and not arr.flags.writeable:
+        return arr.copy()
+    return arr
+
+
 def execute_python_metric(
     code_text: str,
     gt_bgr_u8,
@@ -74,7 +204,9 @@ def execute_python_metric(
     sample_name: str = "",
     task_type: str = "",
 ) -> float:
-    fn = load_metric_callable(code_text)
+    compiled = get_compiled_metric(code_text)
+    gt_bgr_u8 = _writable(gt_bgr_u8)
+    pred_bgr_u8 = _writable(pred_bgr_u8)
     available = {
         "gt_bgr_u8": gt_bgr_u8,
         "pred_bgr_u8": pred_bgr_u8,
@@ -83,18 +215,10 @@ def execute_python_metric(
         "sample_name": sample_name,
         "task_type": task_type,
     }
-    signature = inspect.signature(fn)
-    kwargs: dict[str, Any] = {}
-    accepts_var_kw = any(p.kind == inspect.Parameter.VAR_KEYWORD for p in signature.parameters.values())
-    if accepts_var_kw:
-        kwargs = dict(available)
-    else:
-        for name, param in signature.parameters.items():
-            if name in available:
-                kwargs[name] = available[name]
-            elif param.default is inspect._empty:
-                raise ValueError(f"metric_param_unsupported:{name}")
-    result = fn(**kwargs)
+    return _coerce_metric_value(compiled.fn(**compiled.bind(available)))
+
+
+def _coerce_metric_value(result: Any) -> float:
     if isinstance(result, dict):
         if "value" not in result:
             raise ValueError("metric_result_missing_value")
@@ -106,3 +230,61 @@ def execute_python_metric(
     if not np.isfinite(value):
         raise ValueError("metric_result_not_finite")
     return value
+
+
+def metric_declares_batch(code_text: str) -> bool:
+    """指标代码是否声明了可用的 compute_metric_batch；编译失败按未声明处理，错误留给逐帧调用报告。"""
+    try:
+        return get_compiled_metric(code_text).batch_fn is not None
+    except Exception:
+        return False
+
+
+def execute_python_metric_batch(
+    code_text: str,
+    gt_stack,
+    pred_stack,
+    sample_names: list[str],
+    task_type: str = "",
+) -> list[float]:
+    """
+    对 N×H×W×C 帧栈计算自定义指标。声明了 compute_metric_batch 的指标一次调用得到 N 个值；
+    否则复用已编译的逐帧入口依次计算，结果与逐帧调用 execute_python_metric 相同。
+    """
+    compiled = get_compiled_metric(code_text)
+    gt_stack = _writable(gt_stack)
+    pred_stack = _writable(pred_stack)
+    n = len(sample_names)
+    if compiled.batch_fn is None:
+        out: list[float] = []
+        for idx in range(n):
+            available = {
+                "gt_bgr_u8": gt_stack[idx],
+                "pred_bgr_u8": pred_stack[idx],
+                "gt": gt_stack[idx],
+                "pred": pred_stack[idx],
+                "sample_name": sample_names[idx],
+                "task_type": task_type,
+            }
+            out.append(_coerce_metric_value(compiled.fn(**compiled.bind(available))))
+        return out
+    available = {
+        "gt_batch": gt_stack,
+        "pred_batch": pred_stack,
+        "gt": gt_stack,
+        "pred": pred_stack,
+        "sample_names": list(sample_names),
+        "task_type": task_type,
+    }
+    result = compiled.batch_fn(**{name: available[name] for name in compiled.batch_arg_names})
+    if isinstance(result, dict):
+        if "values" not in result:
+            raise ValueError("metric_result_missing_value")
+        result = result["values"]
+    try:
+        values = np.asarray(result, dtype=np.float64).reshape(-1)
+    except Exception as exc:
+        raise ValueError("metric_result_not_numeric") from exc
+    if values.size != n:
+        raise ValueError("metric_batch_result_length_mismatch")
+    return [_coerce_metric_value(v) for v in values.tolist()]
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+进程级共享的 Redis 连接池：API、鉴权与 Celery worker 通过 store.make_redis() 复用同一个池，
+不再每次调用都新建客户端和 TCP 连接。
+
+配置（环境变量）：
+- ABP_REDIS_URL：连接地址，默认 redis://127.0.0.1:6379/0；
+- ABP_REDIS_MAX_CONNECTIONS：池上限，用满后阻塞等待而不是继续建连，默认 64；
+- ABP_REDIS_POOL_TIMEOUT_S：等待空闲连接的超时，默认 10 秒；
+- ABP_REDIS_HEALTH_CHECK_S：连接空闲超过该秒数后，下一次使用前先 PING 校验，默认 30；
+- ABP_REDIS_SOCKET_TIMEOUT_S：单条命令的读写超时，默认 0 即不限（与引入连接池前一致），
+  需要让卡死的连接尽快报错时再设置，注意不要小于阻塞命令（如 BLPOP）的等待时间；
+- 建连超时固定为 5 秒，Redis 不可达时尽快失败。
+
+池在 fork 后由 redis-py 按 pid 自动重建，Celery prefork 子进程各自持有自己的连接。
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from redis.connection import BlockingConnectionPool
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+REDIS_URL_ENV = "ABP_REDIS_URL"
+REDIS_MAX_CONNECTIONS_ENV = "ABP_REDIS_MAX_CONNECTIONS"
+REDIS_POOL_TIMEOUT_ENV = "ABP_REDIS_POOL_TIMEOUT_S"
+REDIS_HEALTH_CHECK_ENV = "ABP_REDIS_HEALTH_CHECK_S"
+REDIS_SOCKET_TIMEOUT_ENV = "ABP_REDIS_SOCKET_TIMEOUT_S"
+DEFAULT_REDIS_URL = "redis://127.0.0.1:6379/0"
+DEFAULT_MAX_CONNECTIONS = 64
+DEFAULT_POOL_TIMEOUT_S = 10.0
+DEFAULT_HEALTH_CHECK_S = 30
+DEFAULT_SOCKET_TIMEOUT_S = 0.0
+
+# 池满时 redis-py 抛出的 ConnectionError 文本：BlockingConnectionPool 等待超时 / ConnectionPool 超出上限
+_POOL_EXHAUSTED_MESSAGES = {"No connection available.", "Too many connections"}
+
+
+def _env_num(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+def get_redis_url() -> str:
+    return (os.getenv(REDIS_URL_ENV) or "").strip() or DEFAULT_REDIS_URL
+
+
+def redact_url(url: str) -> str:
+    parts = urlsplit(url)
+    if parts.password is None:
+        return url
+    netloc = f"{parts.username or ''}:***@{parts.hostname or ''}"
+    if parts.port:
+        netloc += f":{parts.port}"
+    return urlunsplit((parts.scheme, netloc, parts.path, parts.query, parts.fragment))
+
+
+class MeteredConnectionPool(BlockingConnectionPool):
+    """在 BlockingConnectionPool 上统计借出次数、等待耗时与池满次数；建连失败等其他异常不计入 exhausted。"""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self._stats_lock = threading.Lock()
+        self.acquired = 0
+        self.wait_s_total = 0.0
+        self.wait_s_max = 0.0
+        self.exhausted = 0
+        super().__init__(*args, **kwargs)
+
+    def get_connection(self, command_name: str, *keys: Any, **options: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return super().get_connection(command_name, *keys, **options)
+        except RedisConnectionError as exc:
+            if str(exc) in _POOL_EXHAUSTED_MESSAGES:
+                with self._stats_lock:
+                    self.exhausted += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.acquired += 1
+                self.wait_s_total += waited
+                self.wait_s_max = max(self.wait_s_max, waited)
+
+    def stats(self) -> Dict[str, Any]:
+        idle = sum(1 for c in list(self.pool.queue) if c is not None)
+        created = len(self._connections)
+        with self._stats_lock:
+            return {
+                "pid": self.pid,
+                "max_connections": self.max_connections,
+                "created": created,
+                "in_use": max(0, created - idle),
+                "idle": idle,
+                "acquired": self.acquired,
+                "wait_ms_avg": round(self.wait_s_total * 1000 / self.acquired, 3) if self.acquired else 0.0,
+                "wait_ms_max": round(self.wait_s_max * 1000, 3),
+                "exhausted": self.exhausted,
+            }
+
+
+_pool: Optional[MeteredConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def build_pool(url: Optional[str] = None) -> MeteredConnectionPool:
+    socket_timeout = _env_num(REDIS_SOCKET_TIMEOUT_ENV, DEFAULT_SOCKET_TIMEOUT_S)
+    return MeteredConnectionPool.from_url(
+        url or get_redis_url(),
+        max_connections=max(1, int(_env_num(REDIS_MAX_CONNECTIONS_ENV, DEFAULT_MAX_CONNECTIONS))),
+        timeout=_env_num(REDIS_POOL_TIMEOUT_ENV, DEFAULT_POOL_TIMEOUT_S),
+        health_check_interval=max(0, int(_env_num(REDIS_HEALTH_CHECK_ENV, DEFAULT_HEALTH_CHECK_S))),
+        socket_timeout=socket_timeout or None,
+        socket_connect_timeout=5,
+        socket_keepalive=True,
+        decode_responses=True,
+    )
+
+
+def get_pool() -> MeteredConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = build_pool()
+    return _pool
+
+
+def reset_pool() -> None:
+    """断开并丢弃当前池（测试 / 修改配置后使用），下次 get_pool 按最新环境变量重建。"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.disconnect()
+        _pool = None
+
+
+def pool_stats() -> Dict[str, Any]:
+    pool = get_pool()
+    return {"url": redact_url(get_redis_url()), **pool.stats()}
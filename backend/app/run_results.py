@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""
+评测结果列式表：每个已完成 Run 的每个指标一行 (run_id, metric)，数据集 / 算法 / 任务 / 耗时等都是带索引的类型化列，
+排行榜、分位数、分组对比直接在 SQL 里聚合，不再 list_runs(limit=5000) 后逐条反序列化 JSON 过滤。
+
+表是 Run 记录的派生数据：Run 结束时由 store.save_run 写入，删除 Run 时同步删除，随时可由 rebuild_run_results 全量重建。
+存放位置按优先级：ABP_RUN_RESULTS_URL → 已启用的 SQL 存储（ABP_SQL_STORE_URL）→ 本地 data/_run_results/results.db（SQLite）。
+"""
+from __future__ import annotations
+
+import math
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+from sqlalchemy import Column, Float, Index, Integer, MetaData, String, Table, and_, create_engine, delete, event, func, insert, or_, select
+from sqlalchemy.engine import Engine
+
+from . import sql_store
+
+RUN_RESULTS_URL_ENV = "ABP_RUN_RESULTS_URL"
+RUN_RESULTS_DIRNAME = "_run_results"
+RESULTS_INSERT_BATCH = 1000
+
+# 排行榜允许的分组列
+GROUP_COLUMNS = ("algorithm_id", "dataset_id", "task_type", "owner_id")
+# Run 的耗时字段，与指标一起冗余到每一行，便于按速度筛选 / 排序
+TIMING_FIELDS = ("elapsed", "algo_elapsed_mean", "metric_elapsed_mean")
+
+metadata = MetaData()
+
+run_results_table = Table(
+    "abp_run_results",
+    metadata,
+    Column("run_id", String(191), primary_key=True),
+    Column("metric", String(128), primary_key=True),
+    Column("value", Float, nullable=False),
+    Column("owner_id", String(191), index=True),
+    Column("visibility", String(32)),
+    Column("task_type", String(64)),
+    Column("dataset_id", String(191)),
+    Column("algorithm_id", String(191), index=True),
+    Column("eval_mode", String(32)),
+    Column("sample_count", Integer),
+    Column("created_at", Float),
+    Column("finished_at", Float, index=True),
+    Column("elapsed", Float),
+    Column("algo_elapsed_mean", Float),
+    Column("metric_elapsed_mean", Float),
+    # 排行榜的典型筛选：某任务 + 某数据集 + 某指标，按算法分组
+    Index("ix_abp_run_results_board", "task_type", "dataset_id", "metric", "algorithm_id", "value"),
+    Index("ix_abp_run_results_metric_algo", "metric", "algorithm_id", "value"),
+)
+
+_init_lock = threading.Lock()
+_initialized: set[str] = set()
+
+
+def default_results_url() -> str:
+    path = Path(__file__).resolve().parents[1] / "data" / RUN_RESULTS_DIRNAME / "results.db"
+    return f"sqlite:///{path}"
+
+
+def get_results_url() -> str:
+    explicit = (os.getenv(RUN_RESULTS_URL_ENV) or "").strip()
+    if explicit:
+        return explicit
+    if sql_store.is_enabled():
+        return sql_store.get_database_url()
+    return default_results_url()
+
+
+@lru_cache(maxsize=4)
+def _engine_for(url: str) -> Engine:
+    if url == sql_store.get_database_url():
+        return sql_store.get_engine()
+    connect_args: dict[str, Any] = {}
+    if url.startswith("sqlite"):
+        connect_args["check_same_thread"] = False
+        db_path = url.split("sqlite:///", 1)[-1]
+        if db_path and db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    engine = create_engine(url, pool_pre_ping=True, future=True, connect_args=connect_args)
+    if url.startswith("sqlite"):
+        # API 进程与 Celery worker 同时读写同一个文件
+        @event.listens_for(engine, "connect")
+        def _sqlite_pragmas(dbapi_conn: Any, _record: Any) -> None:
+            cur = dbapi_conn.cursor()
+            cur.execute("PRAGMA journal_mode=WAL")
+            cur.execute("PRAGMA busy_timeout=5000")
+            cur.close()
+
+    return engine
+
+
+def get_engine() -> Engine:
+    url = get_results_url()
+    engine = _engine_for(url)
+    if url not in _initialized:
+        with _init_lock:
+            if url not in _initialized:
+                sql_store.with_ddl_retry(lambda: metadata.create_all(engine))
+                _initialized.add(url)
+    return engine
+
+
+def _num(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or value is None:
+        return None
+    try:
+        out = float(value)
+    except (TypeError, ValueError):
+        return None
+    return out if math.isfinite(out) else None
+
+
+def result_rows(run: Dict[str, Any]) -> list[Dict[str, Any]]:
+    """把一条 Run 记录展开为结果行；只有 done 状态且指标为有限数值的才入表。"""
+    if str(run.get("status") or "").lower() != "done":
+        return []
+    metrics = run.get("metrics") if isinstance(run.get("metrics"), dict) else {}
+    params = run.get("params") if isinstance(run.get("params"), dict) else {}
+    record = run.get("record") if isinstance(run.get("record"), dict) else {}
+    run_id = str(run.get("run_id") or "")
+    if not run_id:
+        return []
+    samples = run.get("samples")
+    sample_count = run.get("sample_count")
+    if sample_count is None and isinstance(samples, list):
+        sample_count = len(samples)
+    base = {
+        "run_id": run_id,
+        "owner_id": str(run.get("owner_id") or "system"),
+        "visibility": str(run.get("visibility") or "private").lower(),
+        "task_type": str(run.get("task_type") or ""),
+        "dataset_id": str(run.get("dataset_id") or ""),
+        "algorithm_id": str(run.get("algorithm_id") or ""),
+        "eval_mode": str(params.get("eval_mode") or record.get("eval_mode") or ""),
+        "sample_count": int(sample_count) if _num(sample_count) is not None else None,
+        "created_at": _num(run.get("created_at")),
+        "finished_at": _num(run.get("finished_at")),
+        "elapsed": _num(run.get("elapsed")),
+        "algo_elapsed_mean": _num(params.get("algo_elapsed_mean")),
+        "metric_elapsed_mean": _num(params.get("metric_elapsed_mean")),
+    }
+    rows = []
+    for metric, raw in metrics.items():
+        value = _num(raw)
+        if value is None or not str(metric or "").strip():
+            continue
+        rows.append({**base, "metric": str(metric)[:128], "value": value})
+    return rows
+
+
+def _insert_rows(conn: Any, rows: list[Dict[str, Any]]) -> None:
+    for start in range(0, len(rows), RESULTS_INSERT_BATCH):
+        conn.execute(insert(run_results_table), rows[start : start + RESULTS_INSERT_BATCH])
+
+
+def record_run_results(run: Dict[str, Any]) -> int:
+    """用 Run 的当前状态替换它在结果表中的行（非 done 状态即清空），返回写入行数。"""
+    run_id = str(run.get("run_id") or "")
+    if not run_id:
+        return 0
+    rows = result_rows(run)
+
+    def _do() -> int:
+        with get_engine().begin() as conn:
+            conn.execute(delete(run_results_table).where(run_results_table.c.run_id == run_id))
+            _insert_rows(conn, rows)
+        return len(rows)
+
+    return sql_store.with_ddl_retry(_do)
+
+
+def delete_run_results(run_id: str) -> None:
+    def _do() -> None:
+        with get_engine().begin() as conn:
+            conn.execute(delete(run_results_table).where(run_results_table.c.run_id == str(run_id)))
+
+    sql_store.with_ddl_retry(_do)
+
+
+def rebuild_run_results(runs: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    """按给定 Run 列表全量重建结果表（上线前的历史 Run 回填也走这里）。"""
+    rows: list[Dict[str, Any]] = []
+    run_count = 0
+    for run in runs:
+        run_rows = result_rows(run)
+        if run_rows:
+            run_count += 1
+            rows.extend(run_rows)
+
+    def _do() -> None:
+        with get_engine().begin() as conn:
+            conn.execute(delete(run_results_table))
+            _insert_rows(conn, rows)
+
+    sql_store.with_ddl_retry(_do)
+    return {"runs": run_count, "rows": len(rows)}
+
+
+def _filters(
+    *,
+    metric: Optional[str] = None,
+    task_type: Optional[str] = None,
+    dataset_id: Optional[str] = None,
+    algorithm_id: Optional[str] = None,
+    viewer_id: Optional[str] = None,
+    eval_mode: Optional[str] = None,
+    since: Optional[float] = None,
+) -> list[Any]:
+    """viewer_id 为 None 表示管理员视角；否则与 list_runs 一致：自己的、system 的和公开的 Run。"""
+    t = run_results_table.c
+    conds: list[Any] = []
+    if metric:
+        conds.append(t.metric == metric)
+    if task_type:
+        conds.append(t.task_type == task_type)
+    if dataset_id:
+        conds.append(t.dataset_id == dataset_id)
+    if algorithm_id:
+        conds.append(t.algorithm_id == algorithm_id)
+    if eval_mode:
+        conds.append(t.eval_mode == eval_mode)
+    if since is not None:
+        conds.append(t.finished_at >= float(since))
+    if viewer_id is not None:
+        conds.append(or_(t.owner_id.in_([str(viewer_id), "system"]), t.visibility == "public"))
+    return conds
+
+
+def leaderboard(
+    metric: str,
+    *,
+    group_by: str = "algorithm_id",
+    higher_better: bool = True,
+    rank_by: str = "best",
+    percentiles: Iterable[float] = (),
+    limit: int = 50,
+    **filters: Any,
+) -> list[Dict[str, Any]]:
+    """
+    按 group_by 分组聚合某个指标：count / mean / min / max / best 及取得 best 的 run_id，可选分位数。
+    rank_by 取 best 或 mean，按 higher_better 决定排序方向。filters 见 _filters。
+    """
+    if group_by not in GROUP_COLUMNS:
+        raise ValueError(f"unsupported group_by: {group_by}")
+    if rank_by not in ("best", "mean"):
+        raise ValueError(f"unsupported rank_by: {rank_by}")
+    t = run_results_table.c
+    key = t[group_by]
+    conds = _filters(metric=metric, **filters)
+    best_expr = func.max(t.value) if higher_better else func.min(t.value)
+    stmt = select(
+        key.label("group"),
+        func.count().label("count"),
+        func.avg(t.value).label("mean"),
+        func.min(t.value).label("min"),
+        func.max(t.value).label("max"),
+        best_expr.label("best"),
+        func.avg(t.elapsed).label("elapsed_mean"),
+        func.avg(t.algo_elapsed_mean).label("algo_elapsed_mean"),
+        func.max(t.finished_at).label("last_finished_at"),
+    ).where(and_(*conds)).group_by(key)
+    order_col = best_expr if rank_by == "best" else func.avg(t.value)
+    stmt = stmt.order_by(order_col.desc() if higher_better else order_col.asc(), key).limit(max(1, int(limit)))
+    qs = [float(q) for q in percentiles if 0 <= float(q) <= 100]
+
+    with get_engine().connect() as conn:
+        groups = [dict(row._mapping) for row in conn.execute(stmt)]
+        if not groups:
+            return []
+        names = [g["group"] for g in groups]
+        best_by_group = {g["group"]: g["best"] for g in groups}
+        # 取得最优值的 run：只扫描上榜分组的 (分组, 值, run_id) 三列
+        best_stmt = (
+            select(key, t.value, t.run_id, t.finished_at)
+            .where(and_(*conds, key.in_(names)))
+        )
+        best_run: dict[str, tuple[float, str]] = {}
+        values: dict[str, list[float]] = {}
+        for group, value, run_id, finished_at in conn.execute(best_stmt):
+            if qs:
+                values.setdefault(group, []).append(float(value))
+            if value == best_by_group.get(group):
+                prev = best_run.get(group)
+                if prev is None or float(finished_at or 0) > prev[0]:
+                    best_run[group] = (float(finished_at or 0), str(run_id))
+
+    out = []
+    for rank, g in enumerate(groups, start=1):
+        item = {
+            "rank": rank,
+            group_by: g["group"],
+            "count": int(g["count"]),
+            "mean": float(g["mean"]),
+            "min": float(g["min"]),
+            "max": float(g["max"]),
+            "best": float(g["best"]),
+            "best_run_id": best_run.get(g["group"], (0.0, None))[1],
+            "elapsed_mean": float(g["elapsed_mean"]) if g["elapsed_mean"] is not None else None,
+            "algo_elapsed_mean": float(g["algo_elapsed_mean"]) if g["algo_elapsed_mean"] is not None else None,
+            "last_finished_at": g["last_finished_at"],
+        }
+        if qs:
+            arr = np.asarray(values.get(g["group"]) or [], dtype=np.float64)
+            item["percentiles"] = {
+                f"p{q:g}": float(np.percentile(arr, q)) if arr.size else None for q in qs
+            }
+        out.append(item)
+    return out
+
+
+def compare_runs(
+    run_ids: Iterable[str],
+    *,
+    metrics: Optional[Iterable[str]] = None,
+    viewer_id: Optional[str] = None,
+) -> list[Dict[str, Any]]:
+    """多个 Run 的指标矩阵，按传入顺序返回；不可见或未完成的 Run 不出现在结果中。"""
+    ids = [str(x) for x in dict.fromkeys(run_ids) if x]
+    if not ids:
+        return []
+    t = run_results_table.c
+    conds = [t.run_id.in_(ids), *_filters(viewer_id=viewer_id)]
+    wanted = [str(m) for m in (metrics or []) if m]
+    if wanted:
+        conds.append(t.metric.in_(wanted))
+    cols = [t.run_id, t.metric, t.value, t.task_type, t.dataset_id, t.algorithm_id, t.eval_mode, t.sample_count, t.finished_at, *(t[f] for f in TIMING_FIELDS)]
+    by_run: dict[str, Dict[str, Any]] = {}
+    with get_engine().connect() as conn:
+        for row in conn.execute(select(*cols).where(and_(*conds))):
+            m = row._mapping
+            item = by_run.get(m["run_id"])
+            if item is None:
+                item = {k: m[k] for k in ("run_id", "task_type", "dataset_id", "algorithm_id", "eval_mode", "sample_count", "finished_at", *TIMING_FIELDS)}
+                item["metrics"] = {}
+                by_run[m["run_id"]] = item
+            item["metrics"][m["metric"]] = float(m["value"])
+    return [by_run[rid] for rid in ids if rid in by_run]
+
+
+def count_results() -> int:
+    with get_engine().connect() as conn:
+        return int(conn.execute(select(func.count()).select_from(run_results_table)).scalar() or 0)
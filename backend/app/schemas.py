@@ -36,6 +36,7 @@ class RunOut(BaseModel):
     metrics: Dict[str, Any] = Field(default_factory=dict)
     params: Dict[str, Any] = Field(default_factory=dict)
     samples: List[Dict[str, Any]] = Field(default_factory=list)
+    sample_count: Optional[int] = None
     error: Optional[str] = None
     error_code: Optional[str] = None
     error_detail: Optional[Dict[str, Any]] = None
@@ -340,6 +341,37 @@ class AlgorithmSubmissionCreate(BaseModel):
     archive_b64: str
 
 
+class AlgorithmSubmissionFromUpload(BaseModel):
+    task_type: str
+    name: str
+    version: str = "v1"
+    description: str = ""
+    dependency_text: str = ""
+    entry_text: str = ""
+    upload_id: str
+
+
+class UploadInit(BaseModel):
+    purpose: str = Field(..., description="dataset_zip / algorithm_archive")
+    filename: str
+    total_size: int
+    sha256: str = Field(..., description="整个文件的 sha256（十六进制），complete 时校验")
+    chunk_size: Optional[int] = None
+
+
+class UploadOut(BaseModel):
+    upload_id: str
+    purpose: str
+    filename: str
+    total_size: int
+    chunk_size: int
+    total_chunks: int
+    received: List[int] = Field(default_factory=list)
+    missing: List[int] = Field(default_factory=list)
+    sha256: str = ""
+    completed: bool = False
+
+
 class AlgorithmSubmissionReview(BaseModel):
     status: str
     review_note: str = ""
@@ -4,37 +4,44 @@ import json
 import os
 import threading
 import time
+import weakref
 from functools import lru_cache
-from typing import Any, Callable, Dict, Optional, TypeVar
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, TypeVar
 
 
 try:
     from sqlalchemy import (
         Boolean,
         Column,
+        Double,
         Float,
+        Integer,
         MetaData,
         String,
         Table,
         Text,
         create_engine,
         delete,
+        func,
         insert,
         select,
+        bindparam,
         text,
         update,
     )
     from sqlalchemy.engine import Engine
     from sqlalchemy.exc import OperationalError as SAOperationalError
 except Exception:  # pragma: no cover - optional dependency until SQL store is enabled
-    Boolean = Column = Float = MetaData = String = Table = Text = None  # type: ignore
-    create_engine = delete = insert = select = text = update = None  # type: ignore
+    Boolean = Column = Double = Float = Integer = MetaData = String = Table = Text = None  # type: ignore
+    bindparam = create_engine = delete = func = insert = select = text = update = None  # type: ignore
     Engine = object  # type: ignore
     SAOperationalError = None  # type: ignore
 
 SQL_STORE_URL_ENV = "ABP_SQL_STORE_URL"
 MYSQL_STORE_URL_ENV = "ABP_MYSQL_URL"
 SQL_FALLBACK_REDIS_ENV = "ABP_SQL_FALLBACK_REDIS"
+# 旧数据全部迁入专表后可设为 0：list_records 不再查询通用表 abp_store_records 并在 Python 中合并
+SQL_GENERIC_MERGE_ENV = "ABP_SQL_GENERIC_MERGE"
 
 
 def get_database_url() -> str:
@@ -50,6 +57,11 @@ def allow_redis_fallback() -> bool:
     return raw not in {"0", "false", "no", "off"}
 
 
+def generic_merge_enabled() -> bool:
+    raw = str(os.getenv(SQL_GENERIC_MERGE_ENV, "1")).strip().lower()
+    return raw not in {"0", "false", "no", "off"}
+
+
 def is_transient_mysql_schema_error(exc: BaseException) -> bool:
     """MySQL 在并发 DDL / 在线改表时可能返回 1683/1684，应短暂重试而非直接回退。"""
     if SAOperationalError is not None and isinstance(exc, SAOperationalError):
@@ -116,7 +128,8 @@ def _record_table(name: str, pk_name: str, *extra_columns: Any) -> Any:
         *extra_columns,
         Column("created_at", Float, index=True),
         Column("updated_at", Float, index=True),
-        Column("sort_at", Float, index=True),
+        # keyset 游标对 sort_at 做等值比较，必须是双精度：MySQL 的 FLOAT 只有 24 位尾数，epoch 秒按 128 秒取整
+        Column("sort_at", Double, index=True),
         _payload_json_column(),
     )
 
@@ -240,6 +253,14 @@ if metadata is not None:
         Column("status", String(32), index=True),
     )
 
+    # 每个样本一行，Run 记录本身只保留汇总指标
+    run_samples_table = _table(
+        "abp_run_samples",
+        Column("run_id", String(191), primary_key=True),
+        Column("sample_index", Integer, primary_key=True, autoincrement=False),
+        _payload_json_column(),
+    )
+
     store_records_table = _table(
         "abp_store_records",
         Column("record_type", String(64), primary_key=True),
@@ -248,7 +269,7 @@ if metadata is not None:
         Column("visibility", String(32), index=True),
         Column("created_at", Float, index=True),
         Column("updated_at", Float, index=True),
-        Column("sort_at", Float, index=True),
+        Column("sort_at", Double, index=True),
         _payload_json_column(),
     )
 else:
@@ -264,6 +285,7 @@ else:
     comments_table = None
     notices_table = None
     reports_table = None
+    run_samples_table = None
     store_records_table = None
 
 
@@ -303,6 +325,7 @@ def _ensure_mysql_payload_longtext(engine: Any) -> None:
         "abp_comments",
         "abp_notices",
         "abp_reports",
+        "abp_run_samples",
         "abp_store_records",
     )
 
@@ -329,19 +352,86 @@ def _ensure_mysql_payload_longtext(engine: Any) -> None:
     with_ddl_retry(_run_alters)
 
 
-def init_schema() -> None:
+SORT_AT_BACKFILL_BATCH = 1000
+
+
+def _rebuild_sort_at(engine: Any, table: Any, sort_at_of: Callable[[Dict[str, Any]], float]) -> int:
+    """按 payload_json 重新计算整表的 sort_at（列从 FLOAT 升级后旧值已被截断），返回更新行数。"""
+    pk_cols = list(table.primary_key.columns)
+    stmt = (
+        update(table)
+        .where(*[col == bindparam(f"_pk_{col.name}") for col in pk_cols])
+        .values(sort_at=bindparam("_sort_at"))
+    )
+    updated = 0
+    with engine.connect() as reader:
+        result = reader.execution_options(stream_results=True).execute(select(*pk_cols, table.c.payload_json))
+        for rows in result.partitions(SORT_AT_BACKFILL_BATCH):
+            params = []
+            for row in rows:
+                item = _load(row[-1]) or {}
+                params.append({**{f"_pk_{col.name}": row[i] for i, col in enumerate(pk_cols)}, "_sort_at": sort_at_of(item)})
+            with engine.begin() as conn:
+                conn.execute(stmt, params)
+            updated += len(params)
+    return updated
+
+
+def _ensure_mysql_sort_at_double(engine: Any) -> None:
+    """已有库的 sort_at 若仍为单精度 FLOAT，改为 DOUBLE 并按 payload 回填精确值；已是 DOUBLE 则跳过。"""
+    if text is None:
+        return
+    try:
+        dialect = engine.dialect.name
+    except Exception:
+        return
+    if dialect not in ("mysql", "mariadb"):
+        return
+    tables = [(spec["table"], _record_sort_at) for spec in RECORD_TABLE_SPECS.values() if spec.get("table") is not None]
+    tables.append((store_records_table, _generic_sort_at))
+
+    def _run_alters() -> None:
+        for table, sort_at_of in tables:
+            with engine.begin() as conn:
+                row = conn.execute(
+                    text(
+                        "SELECT COLUMN_TYPE FROM information_schema.COLUMNS "
+                        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tn AND COLUMN_NAME = 'sort_at'"
+                    ),
+                    {"tn": table.name},
+                ).first()
+                col = str(row[0] if row else "").lower()
+                if not col.startswith("float"):
+                    continue
+                conn.execute(text(f"ALTER TABLE `{table.name}` MODIFY COLUMN `sort_at` DOUBLE NULL"))
+            _rebuild_sort_at(engine, table, sort_at_of)
+
+    with_ddl_retry(_run_alters)
+
+
+# 已完成建表 / 升级的引擎。每个进程、每个引擎只做一次，之后 init_schema 直接返回，不再每次读写都跑 create_all。
+_schema_ready_engines: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+
+def init_schema(force: bool = False) -> None:
     if not is_enabled():
         return
     if metadata is None:
         raise RuntimeError("SQL store dependencies are not installed. Install SQLAlchemy and PyMySQL first.")
+    engine = get_engine()
+    if not force and engine in _schema_ready_engines:
+        return
 
     def _bootstrap() -> None:
-        engine = get_engine()
         metadata.create_all(engine)
         _ensure_mysql_payload_longtext(engine)
+        _ensure_mysql_sort_at_double(engine)
 
     with _schema_init_rlock:
+        if not force and engine in _schema_ready_engines:
+            return
         with_ddl_retry(_bootstrap)
+        _schema_ready_engines.add(engine)
 
 
 def _dump(data: Dict[str, Any]) -> str:
@@ -387,14 +477,30 @@ def _record_values(record_type: str, record_id: str, data: Dict[str, Any]) -> Di
     }
 
 
+def _record_times(item: Dict[str, Any]) -> tuple[float, float]:
+    created_at = _float_or_zero(item.get("created_at"))
+    updated_at = _float_or_zero(item.get("updated_at") if item.get("updated_at") is not None else item.get("finished_at") or created_at)
+    return created_at, updated_at
+
+
+def _record_sort_at(item: Dict[str, Any]) -> float:
+    created_at, updated_at = _record_times(item)
+    return updated_at or created_at
+
+
+def _generic_sort_at(item: Dict[str, Any]) -> float:
+    created_at = _float_or_zero(item.get("created_at"))
+    updated_at = _float_or_zero(item.get("updated_at") if item.get("updated_at") is not None else created_at)
+    return updated_at or created_at
+
+
 def _record_base_row(
     item: Dict[str, Any],
     *,
     owner_id: str,
     visibility: str,
 ) -> Dict[str, Any]:
-    created_at = _float_or_zero(item.get("created_at"))
-    updated_at = _float_or_zero(item.get("updated_at") if item.get("updated_at") is not None else item.get("finished_at") or created_at)
+    created_at, updated_at = _record_times(item)
     return {
         "owner_id": str(owner_id or "system"),
         "visibility": str(visibility or "private"),
@@ -583,13 +689,49 @@ def _record_spec(record_type: str) -> Optional[Dict[str, Any]]:
     return RECORD_TABLE_SPECS.get(str(record_type or "").strip().lower())
 
 
+UPSERT_BATCH = 500
+
+
+def _upsert_rows(conn: Any, table: Any, pk_names: tuple[str, ...], rows: list[Dict[str, Any]]) -> None:
+    """
+    单语句 upsert：MySQL/MariaDB 用 ON DUPLICATE KEY UPDATE，SQLite/PostgreSQL 用 ON CONFLICT DO UPDATE，
+    多行时按 UPSERT_BATCH 走 executemany。其它方言退回逐行 UPDATE，未命中再 INSERT。
+    """
+    if not rows:
+        return
+    update_cols = [name for name in rows[0] if name not in pk_names]
+    dialect = conn.dialect.name
+    if dialect in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+        stmt = mysql_insert(table)
+        stmt = stmt.on_duplicate_key_update({name: stmt.inserted[name] for name in update_cols})
+    elif dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as conflict_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as conflict_insert
+
+        stmt = conflict_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(pk_names),
+            set_={name: stmt.excluded[name] for name in update_cols},
+        )
+    else:
+        for values in rows:
+            cond = [table.c[name] == values[name] for name in pk_names]
+            result = conn.execute(update(table).where(*cond).values(**values))
+            if int(result.rowcount or 0) == 0:
+                conn.execute(insert(table).values(**values))
+        return
+    for start in range(0, len(rows), UPSERT_BATCH):
+        conn.execute(stmt, rows[start : start + UPSERT_BATCH])
+
+
 def _upsert(table: Any, pk_name: str, pk_value: str, values: Dict[str, Any]) -> None:
     init_schema()
-    engine = get_engine()
-    with engine.begin() as conn:
-        result = conn.execute(update(table).where(table.c[pk_name] == pk_value).values(**values))
-        if int(result.rowcount or 0) == 0:
-            conn.execute(insert(table).values(**values))
+    with get_engine().begin() as conn:
+        _upsert_rows(conn, table, (pk_name,), [values])
 
 
 def save_algorithm(algorithm_id: str, data: Dict[str, Any]) -> None:
@@ -687,28 +829,51 @@ def list_algorithm_submissions(limit: int = 5000) -> list[Dict[str, Any]]:
 
 
 def save_record(record_type: str, record_id: str, data: Dict[str, Any]) -> None:
+    save_records(record_type, [(record_id, data)])
+
+
+def _bulk_target(record_type: str) -> tuple[Any, tuple[str, ...], Callable[[str, Dict[str, Any]], Dict[str, Any]]]:
+    rtype = str(record_type or "").strip().lower()
+    if rtype == "algorithm":
+        return algorithms_table, ("algorithm_id",), _algorithm_values
+    if rtype == "algorithm_submission":
+        return algorithm_submissions_table, ("submission_id",), _submission_values
+    spec = _record_spec(rtype)
+    if spec is not None and spec.get("table") is not None:
+        return spec["table"], (spec["pk"],), spec["values"]
+    return (
+        store_records_table,
+        ("record_type", "record_id"),
+        lambda record_id, data: _record_values(record_type, record_id, data),
+    )
+
+
+def save_records(
+    record_type: str,
+    items: Mapping[str, Dict[str, Any]] | Iterable[tuple[str, Dict[str, Any]]],
+) -> int:
+    """
+    批量保存同一类记录（{record_id: data} 或 [(record_id, data)]），一个事务内分批 upsert，返回条数。
+    除 save_record 支持的类型外，也接受 algorithm / algorithm_submission。
+    """
+    pairs = list(items.items()) if isinstance(items, Mapping) else list(items)
+    if not pairs:
+        return 0
+    table, pk_names, build = _bulk_target(record_type)
+    rows_by_pk: dict[tuple[Any, ...], Dict[str, Any]] = {}
+    for record_id, data in pairs:
+        values = build(str(record_id), data)
+        # 同一批里重复的主键以最后一条为准，避免单条语句内冲突
+        rows_by_pk[tuple(values[name] for name in pk_names)] = values
+    rows = list(rows_by_pk.values())
+
     def _do() -> None:
-        spec = _record_spec(record_type)
-        if spec is not None and spec.get("table") is not None:
-            values = spec["values"](record_id, data)
-            _upsert(spec["table"], spec["pk"], values[spec["pk"]], values)
-            return
-        values = _record_values(record_type, record_id, data)
         init_schema()
-        engine = get_engine()
-        with engine.begin() as conn:
-            result = conn.execute(
-                update(store_records_table)
-                .where(
-                    (store_records_table.c.record_type == values["record_type"])
-                    & (store_records_table.c.record_id == values["record_id"])
-                )
-                .values(**values)
-            )
-            if int(result.rowcount or 0) == 0:
-                conn.execute(insert(store_records_table).values(**values))
+        with get_engine().begin() as conn:
+            _upsert_rows(conn, table, pk_names, rows)
 
     with_ddl_retry(_do)
+    return len(rows)
 
 
 def load_record(record_type: str, record_id: str) -> Optional[Dict[str, Any]]:
@@ -749,64 +914,57 @@ def delete_record(record_type: str, record_id: str) -> None:
     with_ddl_retry(_do)
 
 
+def _visibility_clause(
+    table: Any,
+    owner_id: Optional[str],
+    include_public: bool,
+    filter_by_owner: bool,
+) -> Any:
+    if not filter_by_owner:
+        return None
+    cond = table.c.owner_id == "system"
+    if owner_id:
+        cond = cond | (table.c.owner_id == owner_id)
+    if include_public:
+        cond = cond | (table.c.visibility == "public")
+    return cond
+
+
 def list_records(
     record_type: str,
     limit: int = 500,
     owner_id: Optional[str] = None,
     include_public: bool = False,
     filter_by_owner: bool = True,
+    include_generic: Optional[bool] = None,
 ) -> list[Dict[str, Any]]:
+    """
+    include_generic 为 None 时按 ABP_SQL_GENERIC_MERGE 决定是否合并通用表；
+    为 False 且该类型有专表时只查专表。
+    """
+    if include_generic is None:
+        include_generic = generic_merge_enabled()
+
+    def _query(table: Any, *conds: Any) -> list[Dict[str, Any]]:
+        stmt = select(table.c.payload_json).order_by(table.c.sort_at.desc()).limit(int(limit or 500))
+        visible = _visibility_clause(table, owner_id, include_public, filter_by_owner)
+        for cond in (*conds, visible):
+            if cond is not None:
+                stmt = stmt.where(cond)
+        with get_engine().connect() as conn:
+            rows = conn.execute(stmt).all()
+        return [item for item in (_load(row[0]) for row in rows) if item]
+
     def _do() -> list[Dict[str, Any]]:
         init_schema()
         spec = _record_spec(record_type)
         specific_items: list[Dict[str, Any]] = []
         if spec is not None and spec.get("table") is not None:
-            stmt = (
-                select(spec["table"].c.payload_json)
-                .order_by(spec["table"].c.sort_at.desc())
-                .limit(int(limit or 500))
-            )
-            if filter_by_owner:
-                if owner_id:
-                    if include_public:
-                        stmt = stmt.where(
-                            (spec["table"].c.owner_id == "system")
-                            | (spec["table"].c.owner_id == owner_id)
-                            | (spec["table"].c.visibility == "public")
-                        )
-                    else:
-                        stmt = stmt.where((spec["table"].c.owner_id == "system") | (spec["table"].c.owner_id == owner_id))
-                elif include_public:
-                    stmt = stmt.where((spec["table"].c.owner_id == "system") | (spec["table"].c.visibility == "public"))
-                else:
-                    stmt = stmt.where(spec["table"].c.owner_id == "system")
-            with get_engine().connect() as conn:
-                rows = conn.execute(stmt).all()
-            specific_items = [item for item in (_load(row[0]) for row in rows) if item]
+            specific_items = _query(spec["table"])
+            if not include_generic:
+                return specific_items
 
-        stmt = (
-            select(store_records_table.c.payload_json)
-            .where(store_records_table.c.record_type == str(record_type))
-            .order_by(store_records_table.c.sort_at.desc())
-            .limit(int(limit or 500))
-        )
-        if filter_by_owner:
-            if owner_id:
-                if include_public:
-                    stmt = stmt.where(
-                        (store_records_table.c.owner_id == "system")
-                        | (store_records_table.c.owner_id == owner_id)
-                        | (store_records_table.c.visibility == "public")
-                    )
-                else:
-                    stmt = stmt.where((store_records_table.c.owner_id == "system") | (store_records_table.c.owner_id == owner_id))
-            elif include_public:
-                stmt = stmt.where((store_records_table.c.owner_id == "system") | (store_records_table.c.visibility == "public"))
-            else:
-                stmt = stmt.where(store_records_table.c.owner_id == "system")
-        with get_engine().connect() as conn:
-            rows = conn.execute(stmt).all()
-        generic_items = [item for item in (_load(row[0]) for row in rows) if item]
+        generic_items = _query(store_records_table, store_records_table.c.record_type == str(record_type))
         if not specific_items:
             return generic_items
         merged: dict[str, Dict[str, Any]] = {}
@@ -826,3 +984,143 @@ def list_records(
         return items[: int(limit or 500)]
 
     return with_ddl_retry(_do)
+
+
+def encode_cursor(sort_at: Any, record_id: Any) -> str:
+    return f"{float(sort_at or 0)!r}|{record_id}"
+
+
+def decode_cursor(cursor: str) -> tuple[float, str]:
+    sort_at, sep, record_id = str(cursor or "").partition("|")
+    if not sep:
+        raise ValueError("cursor_invalid")
+    return float(sort_at), record_id
+
+
+def list_record_columns(
+    record_type: str,
+    columns: Optional[Iterable[str]] = None,
+    *,
+    limit: int = 500,
+    cursor: Optional[str] = None,
+    owner_id: Optional[str] = None,
+    include_public: bool = False,
+    filter_by_owner: bool = True,
+    **filters: Any,
+) -> tuple[list[Dict[str, Any]], Optional[str]]:
+    """
+    只查专表的索引列，不读取也不解析 payload_json，适合大列表 / 统计场景。
+
+    - columns：要返回的列，默认全部非 payload 列；主键与 sort_at 总会带上，用于生成游标；
+    - filters：专表列上的等值过滤，如 status="done"、task_type="denoise"；
+    - cursor：上一页返回的 next_cursor，按 (sort_at, 主键) 倒序做 keyset 分页，没有更多数据时为 None。
+      sort_at 取自 updated_at（缺省为 finished_at / created_at），Run 运行、结束时会变大：
+      翻页过程中被更新的记录会移到前面的页，可能在本轮遍历中漏掉或重复出现，需要完整快照时不要依赖游标。
+    只覆盖 RECORD_TABLE_SPECS 中的类型；列名未知时抛 ValueError。
+    """
+    spec = _record_spec(record_type)
+    if spec is None or spec.get("table") is None:
+        raise ValueError(f"record_type_without_table:{record_type}")
+    table, pk = spec["table"], spec["pk"]
+    available = [c.name for c in table.columns if c.name != "payload_json"]
+    wanted = list(columns) if columns else available
+    unknown = [name for name in [*wanted, *filters] if name not in available]
+    if unknown:
+        raise ValueError(f"unknown_columns:{','.join(unknown)}")
+    names = list(dict.fromkeys([pk, *wanted, "sort_at"]))
+    page_size = max(1, int(limit or 500))
+
+    def _do() -> tuple[list[Dict[str, Any]], Optional[str]]:
+        init_schema()
+        stmt = (
+            select(*[table.c[name] for name in names])
+            .order_by(table.c.sort_at.desc(), table.c[pk].desc())
+            .limit(page_size + 1)
+        )
+        visible = _visibility_clause(table, owner_id, include_public, filter_by_owner)
+        if visible is not None:
+            stmt = stmt.where(visible)
+        for name, value in filters.items():
+            stmt = stmt.where(table.c[name] == value)
+        if cursor:
+            sort_at, last_id = decode_cursor(cursor)
+            stmt = stmt.where(
+                (table.c.sort_at < sort_at) | ((table.c.sort_at == sort_at) & (table.c[pk] < last_id))
+            )
+        with get_engine().connect() as conn:
+            rows = [dict(row._mapping) for row in conn.execute(stmt)]
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = encode_cursor(rows[-1]["sort_at"], rows[-1][pk])
+        return rows, next_cursor
+
+    return with_ddl_retry(_do)
+
+
+RUN_SAMPLES_INSERT_BATCH = 1000
+
+
+def replace_run_samples(run_id: str, samples: list[Dict[str, Any]]) -> None:
+    def _do() -> None:
+        init_schema()
+        with get_engine().begin() as conn:
+            conn.execute(delete(run_samples_table).where(run_samples_table.c.run_id == str(run_id)))
+            rows = [
+                {"run_id": str(run_id), "sample_index": i, "payload_json": _dump(sample)}
+                for i, sample in enumerate(samples or [])
+            ]
+            for start in range(0, len(rows), RUN_SAMPLES_INSERT_BATCH):
+                conn.execute(insert(run_samples_table), rows[start : start + RUN_SAMPLES_INSERT_BATCH])
+
+    with_ddl_retry(_do)
+
+
+def load_run_samples(run_id: str, offset: int = 0, limit: int = 100) -> tuple[list[Dict[str, Any]], int]:
+    def _do() -> tuple[list[Dict[str, Any]], int]:
+        init_schema()
+        stmt = (
+            select(run_samples_table.c.payload_json)
+            .where(run_samples_table.c.run_id == str(run_id))
+            .order_by(run_samples_table.c.sample_index)
+            .offset(max(0, int(offset)))
+            .limit(max(0, int(limit)))
+        )
+        count_stmt = select(func.count()).select_from(run_samples_table).where(run_samples_table.c.run_id == str(run_id))
+        with get_engine().connect() as conn:
+            rows = conn.execute(stmt).all()
+            total = int(conn.execute(count_stmt).scalar() or 0)
+        return [item for item in (_load(row[0]) for row in rows) if item is not None], total
+
+    return with_ddl_retry(_do)
+
+
+def load_run_samples_many(run_ids: list[str]) -> dict[str, list[Dict[str, Any]]]:
+    def _do() -> dict[str, list[Dict[str, Any]]]:
+        init_schema()
+        ids = [str(x) for x in run_ids if x]
+        out: dict[str, list[Dict[str, Any]]] = {}
+        if not ids:
+            return out
+        stmt = (
+            select(run_samples_table.c.run_id, run_samples_table.c.payload_json)
+            .where(run_samples_table.c.run_id.in_(ids))
+            .order_by(run_samples_table.c.run_id, run_samples_table.c.sample_index)
+        )
+        with get_engine().connect() as conn:
+            for run_id, payload in conn.execute(stmt):
+                item = _load(payload)
+                if item is not None:
+                    out.setdefault(str(run_id), []).append(item)
+        return out
+
+    return with_ddl_retry(_do)
+
+
+def delete_run_samples(run_id: str) -> None:
+    def _do() -> None:
+        init_schema()
+        with get_engine().begin() as conn:
+            conn.execute(delete(run_samples_table).where(run_samples_table.c.run_id == str(run_id)))
+
+    with_ddl_retry(_do)
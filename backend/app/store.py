@@ -3,17 +3,66 @@ from __future__ import annotations
 import json
 import logging
 import time
-from typing import Any, Dict, Optional
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Mapping, Optional
 import redis
+from redis.client import Pipeline
 
-from . import sql_store
+from . import redis_pool, run_results, sql_store
 
 
 logger = logging.getLogger(__name__)
 
 
+# 每个 HTTP 请求的 Redis 往返次数：单条命令记 1 次，pipeline.execute 记 1 次（由 main 的中间件开启并写入响应头）
+_round_trips: ContextVar[Optional[list[int]]] = ContextVar("abp_redis_round_trips", default=None)
+
+
+def _count_round_trip() -> None:
+    counter = _round_trips.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def begin_round_trip_count() -> Any:
+    return _round_trips.set([0])
+
+
+def round_trip_count() -> int:
+    counter = _round_trips.get()
+    return counter[0] if counter is not None else 0
+
+
+def end_round_trip_count(token: Any) -> None:
+    _round_trips.reset(token)
+
+
+class _CountingPipeline(Pipeline):
+    def execute(self, raise_on_error: bool = True) -> list[Any]:
+        _count_round_trip()
+        return super().execute(raise_on_error)
+
+
+class CountingRedis(redis.Redis):
+    def execute_command(self, *args: Any, **options: Any) -> Any:
+        _count_round_trip()
+        return super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint: Any = None) -> Pipeline:
+        return _CountingPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+_client: Optional[CountingRedis] = None
+
+
 def make_redis() -> redis.Redis:
-    return redis.Redis(host="127.0.0.1", port=6379, db=0, decode_responses=True)
+    """返回绑定进程级共享连接池的客户端（见 redis_pool），可在线程间共用。"""
+    global _client
+    pool = redis_pool.get_pool()
+    client = _client
+    if client is None or client.connection_pool is not pool:
+        client = _client = CountingRedis(connection_pool=pool)
+    return client
 
 
 def _dump(data: Dict[str, Any]) -> str:
@@ -27,14 +76,133 @@ def _load_json(payload: str | None) -> Optional[Dict[str, Any]]:
     return data if isinstance(data, dict) else None
 
 
-def _redis_set(r: redis.Redis, key: str, data: Dict[str, Any]) -> None:
-    r.set(key, _dump(data))
-
-
 def _redis_load(r: redis.Redis, key: str) -> Optional[Dict[str, Any]]:
     return _load_json(r.get(key))
 
 
+# ---- 批量访问层：MGET / pipeline 分批读写，调用方不再逐 key GET / SET ----
+REDIS_BATCH = 1000
+
+
+def _load_json_quiet(payload: str | None) -> Optional[Dict[str, Any]]:
+    try:
+        return _load_json(payload)
+    except ValueError:
+        return None
+
+
+def load_many(r: redis.Redis, keys: Iterable[str]) -> list[Optional[Dict[str, Any]]]:
+    """按顺序返回各 key 的 JSON 记录（缺失或损坏为 None），每 REDIS_BATCH 个 key 一次 MGET。"""
+    keys = list(keys)
+    out: list[Optional[Dict[str, Any]]] = []
+    for start in range(0, len(keys), REDIS_BATCH):
+        out.extend(_load_json_quiet(p) for p in r.mget(keys[start : start + REDIS_BATCH]))
+    return out
+
+
+def keyset_index_key(name: str) -> str:
+    return f"idx:keys:{name}"
+
+
+# key 索引按记录族（索引名第一段，如 notice / comment / report）回填：记录 key 登记到去掉最后一段后的索引
+# （notice:alice:n1 -> notice:alice，report:r1 -> report）。这里列出的族另有一个收录全部记录的族索引。
+_FAMILY_WIDE_INDEXES = frozenset({"comment"})
+
+
+def _index_family(index: str) -> str:
+    return str(index).split(":", 1)[0]
+
+
+def _family_ready_key(family: str) -> str:
+    return f"{keyset_index_key(family)}:family_ready"
+
+
+def save_many(r: redis.Redis, items: Mapping[str, Dict[str, Any]], *, indexes: Iterable[str] = ()) -> None:
+    """一个 pipeline 写入多条记录，并按 created_at 登记到 indexes 中的每个 key 索引。"""
+    if not items:
+        return
+    indexes = tuple(indexes)
+    pipe = r.pipeline(transaction=False)
+    for key, data in items.items():
+        pipe.set(key, _dump(data))
+        for index in indexes:
+            pipe.zadd(keyset_index_key(index), {key: _index_score(data)})
+    pipe.execute()
+
+
+def delete_many(r: redis.Redis, keys: Iterable[str], *, indexes: Iterable[str] = ()) -> None:
+    keys = list(keys)
+    if not keys:
+        return
+    indexes = tuple(indexes)
+    pipe = r.pipeline(transaction=False)
+    for start in range(0, len(keys), REDIS_BATCH):
+        chunk = keys[start : start + REDIS_BATCH]
+        pipe.delete(*chunk)
+        for index in indexes:
+            pipe.zrem(keyset_index_key(index), *chunk)
+    pipe.execute()
+
+
+def _backfill_family_indexes(r: redis.Redis, family: str) -> None:
+    """
+    老数据没有索引：整个记录族只 SCAN 一次，把每条记录登记到它所属的索引，完成后写入族级 ready 标记。
+    之后同族的新索引（新用户的通知、新资源的评论等）都由 save_many / delete_many 维护，不再扫描。
+    """
+    wide = family in _FAMILY_WIDE_INDEXES
+    keys = list(r.scan_iter(match=f"{family}:*", count=REDIS_BATCH))
+    for start in range(0, len(keys), REDIS_BATCH):
+        chunk = keys[start : start + REDIS_BATCH]
+        pipe = r.pipeline(transaction=False)
+        for key, data in zip(chunk, load_many(r, chunk)):
+            if data is None:
+                continue
+            score = {key: _index_score(data)}
+            parent = key.rsplit(":", 1)[0]
+            pipe.zadd(keyset_index_key(parent), score)
+            if wide and parent != family:
+                pipe.zadd(keyset_index_key(family), score)
+        pipe.execute()
+    r.set(_family_ready_key(family), "1")
+
+
+def load_indexed(r: redis.Redis, index: str, *, limit: Optional[int] = None) -> list[tuple[str, Dict[str, Any]]]:
+    """
+    读取 key 索引中的记录，按 created_at 倒序返回 [(key, data)]。
+    记录族已回填时一次 pipeline（EXISTS + ZREVRANGE）加一次 MGET；索引中已不存在的 key 顺带移除，
+    指定 limit 时再从索引中补读，返回条数只在记录不足时少于 limit。
+    """
+    if limit is not None and int(limit) <= 0:
+        return []
+    zkey = keyset_index_key(index)
+    want = -1 if limit is None else int(limit)
+    pipe = r.pipeline(transaction=False)
+    pipe.exists(_family_ready_key(_index_family(index)))
+    pipe.zrevrange(zkey, 0, want - 1 if want > 0 else -1)
+    ready, keys = pipe.execute()
+    if not ready:
+        _backfill_family_indexes(r, _index_family(index))
+        keys = r.zrevrange(zkey, 0, want - 1 if want > 0 else -1)
+    out: list[tuple[str, Dict[str, Any]]] = []
+    requested = want
+    while True:
+        stale: list[str] = []
+        for key, data in zip(keys, load_many(r, keys)):
+            if data is None:
+                stale.append(key)
+            else:
+                out.append((key, data))
+        if not stale:
+            return out
+        r.zrem(zkey, *stale)
+        need = want - len(out)
+        if want < 0 or need <= 0 or len(keys) < requested:
+            return out
+        # 过期成员移除后，已读出的记录仍占据索引前 len(out) 位，从其后补读
+        keys = r.zrevrange(zkey, len(out), len(out) + need - 1)
+        requested = need
+
+
 def _warn_sql_fallback(action: str, exc: Exception) -> None:
     logger.warning("SQL store %s failed; falling back to Redis: %s", action, exc)
 
@@ -104,6 +272,138 @@ def _bump_updated_at(data: Dict[str, Any]) -> Dict[str, Any]:
     return out
 
 
+# Redis 二级索引：每类记录维护按 created_at 排序的 ZSET（全部 / 按 owner / 按 visibility / Run 另按 status），
+# 列表走 ZREVRANGE + MGET，不再 KEYS 全库扫描。idx:{kind}:tags 记录每条记录当前所在的分组，
+# 保存时据此把记录从旧分组移走。老数据在首次列表时用 SCAN 回填一次，完成后写入 idx:{kind}:ready。
+_INDEX_ID_FIELDS = {"run": "run_id", "dataset": "dataset_id", "algorithm": "algorithm_id"}
+# dataset:* 前缀下还放着版本号 / 指纹 / 扫描状态等非元数据键
+_INDEX_SKIP_MARKERS = (":version:", ":fs_hash:", ":scan:")
+
+
+def index_key(kind: str, *parts: str) -> str:
+    return ":".join(("idx", kind, *parts))
+
+
+def _index_tags(kind: str, data: Dict[str, Any]) -> Dict[str, str]:
+    tags = {
+        "owner": str(data.get("owner_id") or "system"),
+        "visibility": str(data.get("visibility") or "private").lower(),
+    }
+    if kind == "run":
+        tags["status"] = str(data.get("status") or "").lower()
+    return tags
+
+
+def _index_sets(kind: str, tags: Dict[str, str]) -> set[str]:
+    return {index_key(kind, "all"), *(index_key(kind, name, value) for name, value in tags.items())}
+
+
+def _index_score(data: Dict[str, Any]) -> float:
+    try:
+        return float(data.get("created_at") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _queue_index_add(pipe: Any, kind: str, record_id: str, data: Dict[str, Any], old_tags: Optional[Dict[str, str]]) -> None:
+    tags = _index_tags(kind, data)
+    new_sets = _index_sets(kind, tags)
+    if old_tags:
+        for key in _index_sets(kind, old_tags) - new_sets:
+            pipe.zrem(key, record_id)
+    score = _index_score(data)
+    for key in new_sets:
+        pipe.zadd(key, {record_id: score})
+    pipe.hset(index_key(kind, "tags"), record_id, _dump(tags))
+
+
+def _redis_save_indexed(r: redis.Redis, kind: str, record_id: str, key: str, data: Dict[str, Any]) -> None:
+    old_tags = _load_json(r.hget(index_key(kind, "tags"), record_id))
+    pipe = r.pipeline(transaction=True)
+    pipe.set(key, _dump(data))
+    _queue_index_add(pipe, kind, record_id, data, old_tags)
+    pipe.execute()
+
+
+def _redis_delete_indexed(r: redis.Redis, kind: str, record_id: str, *keys: str) -> None:
+    old_tags = _load_json(r.hget(index_key(kind, "tags"), record_id))
+    pipe = r.pipeline(transaction=True)
+    pipe.delete(*keys)
+    for key in _index_sets(kind, old_tags) if old_tags else {index_key(kind, "all")}:
+        pipe.zrem(key, record_id)
+    pipe.hdel(index_key(kind, "tags"), record_id)
+    pipe.execute()
+
+
+def rebuild_redis_index(r: redis.Redis, kind: str) -> int:
+    """用 SCAN 分批回填某类记录的索引（幂等），返回登记的记录数。"""
+    id_field = _INDEX_ID_FIELDS[kind]
+    prefix = f"{kind}:"
+    count = 0
+    batch: list[str] = []
+
+    def _flush() -> int:
+        added = 0
+        pipe = r.pipeline(transaction=False)
+        for k, data in zip(batch, load_many(r, batch)):
+            if not data or id_field not in data:
+                continue
+            _queue_index_add(pipe, kind, k[len(prefix):], data, None)
+            added += 1
+        pipe.execute()
+        batch.clear()
+        return added
+
+    for k in r.scan_iter(match=f"{prefix}*", count=REDIS_BATCH):
+        if any(m in k for m in _INDEX_SKIP_MARKERS):
+            continue
+        batch.append(k)
+        if len(batch) >= REDIS_BATCH:
+            count += _flush()
+    if batch:
+        count += _flush()
+    r.set(index_key(kind, "ready"), "1")
+    return count
+
+
+def _redis_index_ids(r: redis.Redis, kind: str, groups: list[tuple[str, ...]], limit: int) -> list[str]:
+    """合并若干分组 ZSET 各自最新的 limit 个成员，按 created_at 倒序去重。"""
+    limit = max(0, int(limit))
+    if limit <= 0:
+        return []
+
+    def _read() -> list[Any]:
+        pipe = r.pipeline(transaction=False)
+        pipe.exists(index_key(kind, "ready"))
+        for group in groups:
+            pipe.zrevrange(index_key(kind, *group), 0, limit - 1, withscores=True)
+        return pipe.execute()
+
+    ready, *pages = _read()
+    if not ready:
+        rebuild_redis_index(r, kind)
+        _, *pages = _read()
+    scored: dict[str, float] = {}
+    for page in pages:
+        for member, score in page:
+            scored[member] = score
+    return sorted(scored, key=lambda m: scored[m], reverse=True)[:limit]
+
+
+def _redis_load_many(r: redis.Redis, kind: str, record_ids: list[str]) -> list[Dict[str, Any]]:
+    id_field = _INDEX_ID_FIELDS[kind]
+    return [data for data in load_many(r, [f"{kind}:{x}" for x in record_ids]) if data and id_field in data]
+
+
+def _visible_groups(owner_id: Optional[str], include_public: bool) -> list[tuple[str, ...]]:
+    groups: list[tuple[str, ...]] = [("owner", "system")]
+    if owner_id:
+        groups.append(("owner", str(owner_id)))
+    if include_public:
+        groups.append(("visibility", "public"))
+    return groups
+
+
 def run_key(run_id: str) -> str:
     return f"run:{run_id}"
 
@@ -144,7 +444,17 @@ def save_run(r: redis.Redis, run_id: str, data: Dict[str, Any]) -> None:
             if not _should_fallback_to_redis():
                 raise
             _warn_sql_fallback("save_run", exc)
-    _redis_set(r, run_key(run_id), data)
+    _redis_save_indexed(r, "run", run_id, run_key(run_id), data)
+    if str(data.get("status") or "").lower() in _RUN_TERMINAL:
+        _sync_run_results(data)
+
+
+def _sync_run_results(data: Dict[str, Any]) -> None:
+    # 结果表是派生数据，写失败只记日志，可由 rebuild_run_results 补齐
+    try:
+        run_results.record_run_results(data)
+    except Exception as exc:
+        logger.warning("run results sync failed for %s: %s", data.get("run_id"), exc)
 
 
 def load_run(r: redis.Redis, run_id: str) -> Optional[Dict[str, Any]]:
@@ -171,11 +481,211 @@ def delete_run(r: redis.Redis, run_id: str) -> None:
     if sql_store.is_enabled():
         try:
             sql_store.delete_record("run", run_id)
+            sql_store.delete_run_samples(run_id)
         except Exception as exc:
             if not _should_fallback_to_redis():
                 raise
             _warn_sql_fallback("delete_run", exc)
-    r.delete(run_key(run_id))
+    _redis_delete_indexed(r, "run", run_id, run_key(run_id), run_progress_key(run_id), run_samples_key(run_id))
+    try:
+        run_results.delete_run_results(run_id)
+    except Exception as exc:
+        logger.warning("run results delete failed for %s: %s", run_id, exc)
+
+
+# 逐样本结果与 Run 记录分开存放（SQL: abp_run_samples；Redis: run_samples:{id} 列表，每项一个 JSON），
+# Run 记录只保留汇总与 sample_count，列表 / 详情不再反序列化成千上万条样本。
+# 旧 Run 的样本仍内嵌在记录的 samples 字段中，读取时兜底。
+RUN_SAMPLES_REDIS_BATCH = 1000
+
+
+def run_samples_key(run_id: str) -> str:
+    return f"run_samples:{run_id}"
+
+
+def save_run_samples(r: redis.Redis, run_id: str, samples: list[Dict[str, Any]]) -> None:
+    if sql_store.is_enabled():
+        try:
+            sql_store.replace_run_samples(run_id, samples)
+        except Exception as exc:
+            if not _should_fallback_to_redis():
+                raise
+            _warn_sql_fallback("save_run_samples", exc)
+    key = run_samples_key(run_id)
+    pipe = r.pipeline(transaction=True)
+    pipe.delete(key)
+    for start in range(0, len(samples), RUN_SAMPLES_REDIS_BATCH):
+        pipe.rpush(key, *[_dump(x) for x in samples[start : start + RUN_SAMPLES_REDIS_BATCH]])
+    pipe.execute()
+
+
+def load_run_samples(
+    r: redis.Redis,
+    run_id: str,
+    *,
+    offset: int = 0,
+    limit: int = 100,
+    run: Optional[Dict[str, Any]] = None,
+) -> tuple[list[Dict[str, Any]], int]:
+    """返回 (当前页样本, 样本总数)。传入 run 时，独立存储中没有样本则回退到记录内嵌的 samples。"""
+    offset = max(0, int(offset))
+    limit = max(0, int(limit))
+    items: list[Dict[str, Any]] = []
+    total = 0
+    loaded = False
+    if sql_store.is_enabled():
+        try:
+            items, total = sql_store.load_run_samples(run_id, offset=offset, limit=limit)
+            loaded = total > 0 or not _should_fallback_to_redis()
+        except Exception as exc:
+            if not _should_fallback_to_redis():
+                raise
+            _warn_sql_fallback("load_run_samples", exc)
+    if not loaded:
+        key = run_samples_key(run_id)
+        pipe = r.pipeline(transaction=False)
+        pipe.llen(key)
+        pipe.lrange(key, offset, offset + max(1, limit) - 1)
+        total_raw, page = pipe.execute()
+        total = int(total_raw or 0)
+        items = [x for x in (_load_json(p) for p in page[:limit]) if x is not None]
+    if total == 0 and run is not None:
+        embedded = run.get("samples") if isinstance(run.get("samples"), list) else []
+        return list(embedded[offset : offset + limit]), len(embedded)
+    return items, total
+
+
+def load_samples_for_runs(r: redis.Redis, runs: list[Dict[str, Any]]) -> dict[str, list[Dict[str, Any]]]:
+    """导出等批量场景：一次取回多条 Run 的全部样本（SQL 一条查询 / Redis 一次 pipeline）。"""
+    run_ids = [str(x.get("run_id") or "") for x in runs if x.get("run_id")]
+    out: dict[str, list[Dict[str, Any]]] = {}
+    if sql_store.is_enabled():
+        try:
+            out = sql_store.load_run_samples_many(run_ids)
+        except Exception as exc:
+            if not _should_fallback_to_redis():
+                raise
+            _warn_sql_fallback("load_samples_for_runs", exc)
+    missing = [rid for rid in run_ids if rid not in out]
+    if missing:
+        pipe = r.pipeline(transaction=False)
+        for rid in missing:
+            pipe.lrange(run_samples_key(rid), 0, -1)
+        for rid, page in zip(missing, pipe.execute()):
+            if page:
+                out[rid] = [x for x in (_load_json(p) for p in page) if x is not None]
+    for run in runs:
+        rid = str(run.get("run_id") or "")
+        if rid and rid not in out and isinstance(run.get("samples"), list) and run.get("samples"):
+            out[rid] = list(run["samples"])
+    return out
+
+
+def strip_run_samples(run: Dict[str, Any]) -> Dict[str, Any]:
+    """接口输出用：去掉内嵌样本，只保留数量。"""
+    embedded = run.get("samples")
+    if not embedded:
+        return run
+    out = dict(run)
+    out["samples"] = []
+    out.setdefault("sample_count", len(embedded) if isinstance(embedded, list) else 0)
+    return out
+
+
+# 运行中的进度单独放在一个小 hash 里，高频更新不再整条重写 Run（含全部 samples）到 SQL / Redis；
+# 完整记录只在阶段切换与结束时保存，读取时由 overlay_run_progress 合并。
+RUN_PROGRESS_TTL_S = 24 * 3600
+
+
+def run_progress_key(run_id: str) -> str:
+    return f"run_progress:{run_id}"
+
+
+def save_run_progress(r: redis.Redis, run_id: str, progress: int, stage: str, message: str) -> None:
+    key = run_progress_key(run_id)
+    pipe = r.pipeline(transaction=False)
+    pipe.hset(
+        key,
+        mapping={
+            "progress": int(progress),
+            "stage": str(stage or ""),
+            "progress_message": str(message or ""),
+            "updated_at": repr(time.time()),
+        },
+    )
+    pipe.expire(key, RUN_PROGRESS_TTL_S)
+    pipe.execute()
+
+
+def load_run_progress(r: redis.Redis, run_id: str) -> Optional[Dict[str, Any]]:
+    return r.hgetall(run_progress_key(run_id)) or None
+
+
+# 物化任务状态：排队 / 运行中的记录较快过期，避免 worker 异常退出后永久占位
+MATERIALIZE_JOB_ACTIVE_TTL_S = 6 * 3600
+MATERIALIZE_JOB_TTL_S = 7 * 24 * 3600
+
+
+def materialize_job_key(dataset_id: str) -> str:
+    # 不能用 dataset: 前缀，该前缀下的键会被当作数据集记录扫描
+    return f"materialize_job:{dataset_id}"
+
+
+def save_materialize_job(r: redis.Redis, dataset_id: str, job: Dict[str, Any]) -> None:
+    active = str(job.get("status") or "") in {"queued", "running"}
+    r.set(
+        materialize_job_key(dataset_id),
+        json.dumps(job, ensure_ascii=False),
+        ex=MATERIALIZE_JOB_ACTIVE_TTL_S if active else MATERIALIZE_JOB_TTL_S,
+    )
+
+
+def load_materialize_job(r: redis.Redis, dataset_id: str) -> Optional[Dict[str, Any]]:
+    raw = r.get(materialize_job_key(dataset_id))
+    if not raw:
+        return None
+    try:
+        job = json.loads(raw)
+    except ValueError:
+        return None
+    return job if isinstance(job, dict) else None
+
+
+def overlay_run_progress(run: Dict[str, Any], progress: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    仅对 running 状态、且进度比记录中最近一次阶段切换更新时采用进度通道的值；
+    取消中 / 已结束等状态由完整记录决定。
+    """
+    if not progress or str(run.get("status") or "").lower() != "running":
+        return run
+    try:
+        updated_at = float(progress.get("updated_at") or 0)
+        if updated_at <= float(run.get("progress_updated_at") or 0):
+            return run
+        value = int(progress.get("progress") or 0)
+    except (TypeError, ValueError):
+        return run
+    return {
+        **run,
+        "progress": max(0, min(100, value)),
+        "stage": str(progress.get("stage") or run.get("stage") or ""),
+        "progress_message": str(progress.get("progress_message") or ""),
+        "progress_updated_at": updated_at,
+    }
+
+
+def overlay_runs_progress(r: redis.Redis, runs: list[Dict[str, Any]]) -> list[Dict[str, Any]]:
+    """列表接口用：一次 pipeline 取回所有 running Run 的进度。"""
+    running = [i for i, x in enumerate(runs) if str(x.get("status") or "").lower() == "running" and x.get("run_id")]
+    if not running:
+        return runs
+    pipe = r.pipeline(transaction=False)
+    for i in running:
+        pipe.hgetall(run_progress_key(str(runs[i]["run_id"])))
+    out = list(runs)
+    for i, progress in zip(running, pipe.execute()):
+        out[i] = overlay_run_progress(out[i], progress)
+    return out
 
 
 def list_runs(r: redis.Redis, limit: int = 200, owner_id: Optional[str] = None) -> list[Dict[str, Any]]:
@@ -190,36 +700,31 @@ def list_runs(r: redis.Redis, limit: int = 200, owner_id: Optional[str] = None)
             if not _should_fallback_to_redis():
                 raise
             _warn_sql_fallback("list_runs", exc)
-    keys = r.keys("run:*")
     runs = []
-    for k in keys:
-        s = r.get(k)
-        if not s:
-            continue
-        try:
-            data = json.loads(s)
-            if isinstance(data, dict) and "run_id" in data:
-                oid = data.get("owner_id", "system")
-                visibility = str(data.get("visibility", "private") or "private").lower()
-                if owner_id:
-                    if oid != "system" and oid != owner_id and visibility != "public":
-                        continue
-                else:
-                    if oid != "system" and visibility != "public":
-                        continue
-                runs.append(data)
-        except Exception:
-            continue
+    for data in _redis_load_many(r, "run", _redis_index_ids(r, "run", _visible_groups(owner_id, True), limit)):
+        oid = data.get("owner_id", "system")
+        visibility = str(data.get("visibility", "private") or "private").lower()
+        if owner_id:
+            if oid != "system" and oid != owner_id and visibility != "public":
+                continue
+        else:
+            if oid != "system" and visibility != "public":
+                continue
+        runs.append(data)
     runs = _merge_records(runs, sql_items, "run_id")
     runs.sort(key=lambda x: x.get("created_at", 0), reverse=True)
     return runs[:limit]
 
 
-def list_all_runs(r: redis.Redis, limit: int = 5000) -> list[Dict[str, Any]]:
+def list_all_runs(r: redis.Redis, limit: int = 5000, status: Optional[str] = None) -> list[Dict[str, Any]]:
+    """status 非空时只返回该状态的 Run（Redis 侧直接读对应状态的索引）。"""
+    status = str(status or "").strip().lower() or None
     sql_items: list[Dict[str, Any]] | None = None
     if sql_store.is_enabled():
         try:
             sql_items = sql_store.list_records("run", limit=limit, filter_by_owner=False)
+            if status:
+                sql_items = [x for x in sql_items if str(x.get("status") or "").lower() == status]
             if not _should_fallback_to_redis():
                 sql_items.sort(key=lambda x: x.get("created_at", 0), reverse=True)
                 return sql_items[:limit]
@@ -227,18 +732,10 @@ def list_all_runs(r: redis.Redis, limit: int = 5000) -> list[Dict[str, Any]]:
             if not _should_fallback_to_redis():
                 raise
             _warn_sql_fallback("list_all_runs", exc)
-    keys = r.keys("run:*")
-    runs = []
-    for k in keys:
-        s = r.get(k)
-        if not s:
-            continue
-        try:
-            data = json.loads(s)
-            if isinstance(data, dict) and "run_id" in data:
-                runs.append(data)
-        except Exception:
-            continue
+    group = ("status", status) if status else ("all",)
+    runs = _redis_load_many(r, "run", _redis_index_ids(r, "run", [group], limit))
+    if status:
+        runs = [x for x in runs if str(x.get("status") or "").lower() == status]
     runs = _merge_records(runs, sql_items, "run_id")
     runs.sort(key=lambda x: x.get("created_at", 0), reverse=True)
     return runs[:limit]
@@ -261,7 +758,7 @@ def save_dataset(r: redis.Redis, dataset_id: str, data: Dict[str, Any]) -> None:
             if not _should_fallback_to_redis():
                 raise
             _warn_sql_fallback("save_dataset", exc)
-    _redis_set(r, dataset_key(dataset_id), payload)
+    _redis_save_indexed(r, "dataset", dataset_id, dataset_key(dataset_id), payload)
 
 
 def load_dataset(r: redis.Redis, dataset_id: str) -> Optional[Dict[str, Any]]:
@@ -290,7 +787,7 @@ def delete_dataset(r: redis.Redis, dataset_id: str) -> None:
             if not _should_fallback_to_redis():
                 raise
             _warn_sql_fallback("delete_dataset", exc)
-    r.delete(dataset_key(dataset_id))
+    _redis_delete_indexed(r, "dataset", dataset_id, dataset_key(dataset_id))
 
 
 def list_datasets(r: redis.Redis, limit: int = 200, owner_id: Optional[str] = None, include_public: bool = False) -> list[Dict[str, Any]]:
@@ -302,31 +799,20 @@ def list_datasets(r: redis.Redis, limit: int = 200, owner_id: Optional[str] = No
             if not _should_fallback_to_redis():
                 raise
             _warn_sql_fallback("list_datasets", exc)
-    keys = r.keys("dataset:*")
     items = []
-    for k in keys:
-        # 排除非元数据键
-        if ":version:" in k or ":fs_hash:" in k or ":scan:" in k:
-            continue
-        s = r.get(k)
-        if not s:
-            continue
-        try:
-            data = json.loads(s)
-            if isinstance(data, dict) and "dataset_id" in data:
-                oid = data.get("owner_id", "system")
-                visibility = str(data.get("visibility", "private") or "private").lower()
-                # 如果指定了 owner_id，则只显示自己的 + system 的
-                if owner_id:
-                    if oid != "system" and oid != owner_id and not (include_public and visibility == "public"):
-                        continue
-                else:
-                    # 如果没指定（游客），只显示 system 的
-                    if oid != "system" and not (include_public and visibility == "public"):
-                        continue
-                items.append(data)
-        except Exception:
-            continue
+    ids = _redis_index_ids(r, "dataset", _visible_groups(owner_id, include_public), limit)
+    for data in _redis_load_many(r, "dataset", ids):
+        oid = data.get("owner_id", "system")
+        visibility = str(data.get("visibility", "private") or "private").lower()
+        # 如果指定了 owner_id，则只显示自己的 + system 的
+        if owner_id:
+            if oid != "system" and oid != owner_id and not (include_public and visibility == "public"):
+                continue
+        else:
+            # 如果没指定（游客），只显示 system 的
+            if oid != "system" and not (include_public and visibility == "public"):
+                continue
+        items.append(data)
     items = _merge_records_prefer_newer(items, sql_items, "dataset_id")
     items.sort(key=lambda x: x.get("created_at", 0), reverse=True)
     return items[:limit]
@@ -341,20 +827,7 @@ def list_all_datasets(r: redis.Redis, limit: int = 5000) -> list[Dict[str, Any]]
             if not _should_fallback_to_redis():
                 raise
             _warn_sql_fallback("list_all_datasets", exc)
-    keys = r.keys("dataset:*")
-    items = []
-    for k in keys:
-        if ":version:" in k or ":fs_hash:" in k or ":scan:" in k:
-            continue
-        s = r.get(k)
-        if not s:
-            continue
-        try:
-            data = json.loads(s)
-            if isinstance(data, dict) and "dataset_id" in data:
-                items.append(data)
-        except Exception:
-            continue
+    items = _redis_load_many(r, "dataset", _redis_index_ids(r, "dataset", [("all",)], limit))
     items = _merge_records_prefer_newer(items, sql_items, "dataset_id")
     items.sort(key=lambda x: x.get("created_at", 0), reverse=True)
     return items[:limit]
@@ -369,7 +842,7 @@ def save_algorithm(r: redis.Redis, algorithm_id: str, data: Dict[str, Any]) -> N
             if not _should_fallback_to_redis():
                 raise
             _warn_sql_fallback("save_algorithm", exc)
-    _redis_set(r, algorithm_key(algorithm_id), payload)
+    _redis_save_indexed(r, "algorithm", algorithm_id, algorithm_key(algorithm_id), payload)
 
 
 def load_algorithm(r: redis.Redis, algorithm_id: str) -> Optional[Dict[str, Any]]:
@@ -398,7 +871,7 @@ def delete_algorithm(r: redis.Redis, algorithm_id: str) -> None:
             if not _should_fallback_to_redis():
                 raise
             _warn_sql_fallback("delete_algorithm", exc)
-    r.delete(algorithm_key(algorithm_id))
+    _redis_delete_indexed(r, "algorithm", algorithm_id, algorithm_key(algorithm_id))
 
 
 def list_algorithms(r: redis.Redis, limit: int = 500, owner_id: Optional[str] = None, include_public: bool = False) -> list[Dict[str, Any]]:
@@ -410,26 +883,18 @@ def list_algorithms(r: redis.Redis, limit: int = 500, owner_id: Optional[str] =
             if not _should_fallback_to_redis():
                 raise
             _warn_sql_fallback("list_algorithms", exc)
-    keys = r.keys("algorithm:*")
     items = []
-    for k in keys:
-        s = r.get(k)
-        if not s:
-            continue
-        try:
-            data = json.loads(s)
-            if isinstance(data, dict) and "algorithm_id" in data:
-                oid = data.get("owner_id", "system")
-                visibility = str(data.get("visibility", "private") or "private").lower()
-                if owner_id:
-                    if oid != "system" and oid != owner_id and not (include_public and visibility == "public"):
-                        continue
-                else:
-                    if oid != "system" and not (include_public and visibility == "public"):
-                        continue
-                items.append(data)
-        except Exception:
-            continue
+    ids = _redis_index_ids(r, "algorithm", _visible_groups(owner_id, include_public), limit)
+    for data in _redis_load_many(r, "algorithm", ids):
+        oid = data.get("owner_id", "system")
+        visibility = str(data.get("visibility", "private") or "private").lower()
+        if owner_id:
+            if oid != "system" and oid != owner_id and not (include_public and visibility == "public"):
+                continue
+        else:
+            if oid != "system" and not (include_public and visibility == "public"):
+                continue
+        items.append(data)
     items = _merge_records_prefer_newer(items, sql_items, "algorithm_id")
     items.sort(key=lambda x: x.get("created_at", 0), reverse=True)
     return items[:limit]
@@ -444,18 +909,7 @@ def list_all_algorithms(r: redis.Redis, limit: int = 5000) -> list[Dict[str, Any
             if not _should_fallback_to_redis():
                 raise
             _warn_sql_fallback("list_all_algorithms", exc)
-    keys = r.keys("algorithm:*")
-    items = []
-    for k in keys:
-        s = r.get(k)
-        if not s:
-            continue
-        try:
-            data = json.loads(s)
-            if isinstance(data, dict) and "algorithm_id" in data:
-                items.append(data)
-        except Exception:
-            continue
+    items = _redis_load_many(r, "algorithm", _redis_index_ids(r, "algorithm", [("all",)], limit))
     items = _merge_records_prefer_newer(items, sql_items, "algorithm_id")
     items.sort(key=lambda x: x.get("created_at", 0), reverse=True)
     return items[:limit]
@@ -474,7 +928,7 @@ def save_preset(r: redis.Redis, preset_id: str, data: Dict[str, Any]) -> None:
             if not _should_fallback_to_redis():
                 raise
             _warn_sql_fallback("save_preset", exc)
-    _redis_set(r, preset_key(preset_id), payload)
+    save_many(r, {preset_key(preset_id): payload}, indexes=("preset",))
 
 
 def load_preset(r: redis.Redis, preset_id: str) -> Optional[Dict[str, Any]]:
@@ -503,7 +957,7 @@ def delete_preset(r: redis.Redis, preset_id: str) -> None:
             if not _should_fallback_to_redis():
                 raise
             _warn_sql_fallback("delete_preset", exc)
-    r.delete(preset_key(preset_id))
+    delete_many(r, [preset_key(preset_id)], indexes=("preset",))
 
 
 def list_presets(r: redis.Redis, limit: int = 200, owner_id: Optional[str] = None) -> list[Dict[str, Any]]:
@@ -515,25 +969,18 @@ def list_presets(r: redis.Redis, limit: int = 200, owner_id: Optional[str] = Non
             if not _should_fallback_to_redis():
                 raise
             _warn_sql_fallback("list_presets", exc)
-    keys = r.keys("preset:*")
     items = []
-    for k in keys:
-        s = r.get(k)
-        if not s:
-            continue
-        try:
-            data = json.loads(s)
-            if isinstance(data, dict) and "preset_id" in data:
-                oid = data.get("owner_id", "system")
-                if owner_id:
-                    if oid != "system" and oid != owner_id:
-                        continue
-                else:
-                    if oid != "system":
-                        continue
-                items.append(data)
-        except Exception:
+    for _, data in load_indexed(r, "preset"):
+        if "preset_id" not in data:
             continue
+        oid = data.get("owner_id", "system")
+        if owner_id:
+            if oid != "system" and oid != owner_id:
+                continue
+        else:
+            if oid != "system":
+                continue
+        items.append(data)
     items = _merge_records_prefer_newer(items, sql_items, "preset_id")
     items.sort(key=lambda x: x.get("updated_at", x.get("created_at", 0)), reverse=True)
     return items[:limit]
@@ -552,7 +999,7 @@ def save_metric(r: redis.Redis, metric_id: str, data: Dict[str, Any]) -> None:
             if not _should_fallback_to_redis():
                 raise
             _warn_sql_fallback("save_metric", exc)
-    _redis_set(r, metric_key(metric_id), payload)
+    save_many(r, {metric_key(metric_id): payload}, indexes=("metric",))
 
 
 def load_metric(r: redis.Redis, metric_id: str) -> Optional[Dict[str, Any]]:
@@ -599,7 +1046,7 @@ def delete_metric(r: redis.Redis, metric_id: str) -> None:
             if not _should_fallback_to_redis():
                 raise
             _warn_sql_fallback("delete_metric", exc)
-    r.delete(metric_key(metric_id))
+    delete_many(r, [metric_key(metric_id)], indexes=("metric",))
 
 
 def list_metrics(r: redis.Redis, limit: int = 500) -> list[Dict[str, Any]]:
@@ -611,18 +1058,7 @@ def list_metrics(r: redis.Redis, limit: int = 500) -> list[Dict[str, Any]]:
             if not _should_fallback_to_redis():
                 raise
             _warn_sql_fallback("list_metrics", exc)
-    keys = r.keys("metric:*")
-    items = []
-    for k in keys:
-        s = r.get(k)
-        if not s:
-            continue
-        try:
-            data = json.loads(s)
-            if isinstance(data, dict) and "metric_id" in data:
-                items.append(data)
-        except Exception:
-            continue
+    items = [data for _, data in load_indexed(r, "metric") if "metric_id" in data]
     items = _merge_records_prefer_newer(items, sql_items, "metric_id")
     items.sort(key=lambda x: x.get("created_at", 0), reverse=True)
     return items[:limit]
@@ -641,7 +1077,7 @@ def save_algorithm_submission(r: redis.Redis, submission_id: str, data: Dict[str
             if not _should_fallback_to_redis():
                 raise
             _warn_sql_fallback("save_algorithm_submission", exc)
-    _redis_set(r, algorithm_submission_key(submission_id), payload)
+    save_many(r, {algorithm_submission_key(submission_id): payload}, indexes=("algorithm_submission",))
 
 
 def load_algorithm_submission(r: redis.Redis, submission_id: str) -> Optional[Dict[str, Any]]:
@@ -670,7 +1106,7 @@ def delete_algorithm_submission(r: redis.Redis, submission_id: str) -> None:
             if not _should_fallback_to_redis():
                 raise
             _warn_sql_fallback("delete_algorithm_submission", exc)
-    r.delete(algorithm_submission_key(submission_id))
+    delete_many(r, [algorithm_submission_key(submission_id)], indexes=("algorithm_submission",))
 
 
 def list_algorithm_submissions(r: redis.Redis, limit: int = 5000) -> list[Dict[str, Any]]:
@@ -682,18 +1118,7 @@ def list_algorithm_submissions(r: redis.Redis, limit: int = 5000) -> list[Dict[s
             if not _should_fallback_to_redis():
                 raise
             _warn_sql_fallback("list_algorithm_submissions", exc)
-    keys = r.keys("algorithm_submission:*")
-    items = []
-    for k in keys:
-        s = r.get(k)
-        if not s:
-            continue
-        try:
-            data = json.loads(s)
-            if isinstance(data, dict) and "submission_id" in data:
-                items.append(data)
-        except Exception:
-            continue
+    items = [data for _, data in load_indexed(r, "algorithm_submission") if "submission_id" in data]
     items = _merge_records_prefer_newer(items, sql_items, "submission_id")
     items.sort(key=lambda x: x.get("created_at", 0), reverse=True)
     return items[:limit]
@@ -712,7 +1137,7 @@ def save_user(r: redis.Redis, username: str, data: Dict[str, Any]) -> None:
             if not _should_fallback_to_redis():
                 raise
             _warn_sql_fallback("save_user", exc)
-    _redis_set(r, user_key(username), payload)
+    save_many(r, {user_key(username): payload}, indexes=("user",))
 
 
 def load_user(r: redis.Redis, username: str) -> Optional[Dict[str, Any]]:
@@ -742,18 +1167,7 @@ def list_users(r: redis.Redis, limit: int = 1000) -> list[Dict[str, Any]]:
             if not _should_fallback_to_redis():
                 raise
             _warn_sql_fallback("list_users", exc)
-    keys = r.keys("user:*")
-    items = []
-    for k in keys:
-        s = r.get(k)
-        if not s:
-            continue
-        try:
-            data = json.loads(s)
-            if isinstance(data, dict) and "username" in data:
-                items.append(data)
-        except Exception:
-            continue
+    items = [data for _, data in load_indexed(r, "user") if "username" in data]
     items = _merge_records_prefer_newer(items, sql_items, "username")
     return items[:limit]
 
@@ -770,4 +1184,4 @@ def delete_user(r: redis.Redis, username: str) -> None:
             if not _should_fallback_to_redis():
                 raise
             _warn_sql_fallback("delete_user", exc)
-    r.delete(user_key(username))
+    delete_many(r, [user_key(username)], indexes=("user",))
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+import functools
 import random
 import time
 import os
@@ -8,22 +9,38 @@ import socket
 import platform
 import tracemalloc
 import math
+from dataclasses import dataclass
+from pathlib import Path
 from typing import Any, Callable, Dict
 
 import numpy as np
 import hashlib
 
 from .celery_app import celery_app
-from .store import make_redis, load_run, save_run, load_dataset, load_algorithm, list_metrics
+from .store import (
+    make_redis,
+    load_run,
+    save_run,
+    save_run_progress,
+    save_run_samples,
+    load_dataset,
+    load_algorithm,
+    list_metrics,
+    load_materialize_job,
+    save_materialize_job,
+)
 from . import errors as err
-from .metric_runtime import execute_python_metric
+from .metric_runtime import execute_python_metric, execute_python_metric_batch, metric_declares_batch
 from .algorithm_runtime import AlgorithmRuntimeError, UserAlgorithmImageRunner, UserAlgorithmVideoRunner
+from .eval_executor import SampleExecutorConfig, map_ordered, prefetch_ordered, resolve_prefetch_depth, resolve_sample_executor
 
 import cv2
-from skimage.metrics import peak_signal_noise_ratio, structural_similarity
 
 from .vision.dehaze_dcp import dehaze_dcp
 from .vision.niqe_simple import niqe_score
+from .vision.psnr_ssim import psnr_ssim_u8
+from .vision.image_cache import DecodeCacheUsage, decode_cache_usage, get_decoded_image_cache, read_image_bgr
+from .vision.dataset_materialize import MaterializeTooLarge, MaterializedPairs, materialize_dataset, open_materialized
 from .vision.dataset_access import count_paired_images, count_paired_videos, find_paired_images, find_paired_videos
 
 
@@ -185,15 +202,7 @@ def _round_metric_value(metric_key: str, value: float) -> float:
 
 
 def _read_image_bgr(path: Any) -> np.ndarray | None:
-    try:
-        data = np.fromfile(str(path), dtype=np.uint8)
-    except Exception:
-        data = np.array([], dtype=np.uint8)
-    if data.size > 0:
-        img = cv2.imdecode(data, cv2.IMREAD_COLOR)
-        if img is not None and img.size > 0:
-            return img
-    return cv2.imread(str(path), cv2.IMREAD_COLOR)
+    return read_image_bgr(path)
 
 
 def _compute_metric_sample(
@@ -256,6 +265,69 @@ def _compute_metric_sample(
     return sample, custom_values, timings
 
 
+def _compute_metric_batch(
+    gt_stack: np.ndarray,
+    pred_stack: np.ndarray,
+    selected_metrics: list[str],
+    metric_defs: dict[str, dict[str, Any]],
+    task_type: str,
+    sample_names: list[str],
+) -> list[tuple[dict[str, Any], dict[str, float], dict[str, float]]]:
+    """
+    _compute_metric_sample 的批量版本：输入 N×H×W×C 帧栈，自定义指标声明了 compute_metric_batch 时整批调用；
+    返回值与逐帧调用一一对应，耗时按帧均摊。
+    PSNR / SSIM 仍逐帧走 psnr_ssim_u8：拼批计算在各分辨率下都不比逐帧快（大帧还要临时分配不缓存的工作区）。
+    """
+    n = len(sample_names)
+    samples: list[dict[str, Any]] = [{"name": name} for name in sample_names]
+    customs: list[dict[str, float]] = [{} for _ in range(n)]
+    totals = {"builtin_elapsed": 0.0, "niqe_elapsed": 0.0, "custom_elapsed": 0.0}
+
+    m0 = time.time()
+    if "PSNR" in selected_metrics or "SSIM" in selected_metrics:
+        t_builtin = time.time()
+        for idx, sample in enumerate(samples):
+            psnr, ssim = _compute_psnr_ssim(gt_stack[idx], pred_stack[idx])
+            if "PSNR" in selected_metrics:
+                sample["PSNR"] = _round_metric_value("PSNR", psnr)
+            if "SSIM" in selected_metrics:
+                sample["SSIM"] = _round_metric_value("SSIM", ssim)
+        totals["builtin_elapsed"] += time.time() - t_builtin
+
+    if "NIQE" in selected_metrics:
+        # NIQE 依赖整帧统计量与未裁边的高斯滤波，无法安全地跨帧拼接，仍逐帧计算
+        t_niqe = time.time()
+        for idx, sample in enumerate(samples):
+            sample["NIQE"] = _round_metric_value("NIQE", float(niqe_score(pred_stack[idx])))
+        totals["niqe_elapsed"] += time.time() - t_niqe
+
+    for metric_key in selected_metrics:
+        if metric_key in BUILTIN_METRICS:
+            continue
+        metric_def = metric_defs.get(metric_key)
+        if not metric_def:
+            continue
+        if str(metric_def.get("implementation_type") or "").lower() != "python":
+            continue
+        t_custom = time.time()
+        values = execute_python_metric_batch(
+            code_text=metric_def.get("code_text") or "",
+            gt_stack=gt_stack,
+            pred_stack=pred_stack,
+            sample_names=sample_names,
+            task_type=task_type,
+        )
+        totals["custom_elapsed"] += time.time() - t_custom
+        for idx, value in enumerate(values):
+            rounded = _round_metric_value(metric_key, value)
+            samples[idx][metric_key] = rounded
+            customs[idx][metric_key] = rounded
+
+    per_frame = {key: value / max(1, n) for key, value in totals.items()}
+    per_frame["metric_elapsed"] = (time.time() - m0) / max(1, n)
+    return [(samples[idx], customs[idx], dict(per_frame)) for idx in range(n)]
+
+
 
 def _make_synthetic_dehaze_pair(h: int = 360, w: int = 640) -> tuple[np.ndarray, np.ndarray]:
     """
@@ -283,15 +355,8 @@ def _make_synthetic_dehaze_pair(h: int = 360, w: int = 640) -> tuple[np.ndarray,
 
 
 def _compute_psnr_ssim(gt_bgr_u8: np.ndarray, pred_bgr_u8: np.ndarray) -> tuple[float, float]:
-    gt_rgb = cv2.cvtColor(gt_bgr_u8, cv2.COLOR_BGR2RGB)
-    pr_rgb = cv2.cvtColor(pred_bgr_u8, cv2.COLOR_BGR2RGB)
-
-    gt01 = gt_rgb.astype(np.float32) / 255.0
-    pr01 = pr_rgb.astype(np.float32) / 255.0
-
-    psnr = float(peak_signal_noise_ratio(gt01, pr01, data_range=1.0))
-    ssim = float(structural_similarity(gt01, pr01, channel_axis=2, data_range=1.0))
-    return psnr, ssim
+    # 口径与 skimage(data_range=1, channel_axis=2) 一致，直接在 uint8 上计算
+    return psnr_ssim_u8(gt_bgr_u8, pred_bgr_u8)
 
 def _resize_to_match(gt_bgr_u8: np.ndarray, pred_bgr_u8: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
     """
@@ -322,6 +387,118 @@ def _video_metric_max_frames(algo_params: dict[str, Any]) -> int:
     return _get_int(algo_params, "video_metric_max_frames", 360, 8, 7200)
 
 
+# 只有声明了 compute_metric_batch 的自定义指标才按批计算，批内帧缓冲上限：
+# 每个像素元素是缓冲中的 gt / pred 各 1 字节、np.stack 后各 1 字节；256 MB 下 1080p 每批 10 帧
+VIDEO_METRIC_BATCH_BYTES = 256 * 1024 * 1024
+VIDEO_METRIC_BYTES_PER_ELEMENT = 2 * 2
+
+
+def _video_metric_batch_frames(algo_params: dict[str, Any]) -> int:
+    """视频任务：批量自定义指标每批最多的帧数；实际批大小还受 VIDEO_METRIC_BATCH_BYTES 限制。"""
+    return _get_int(algo_params, "video_metric_batch_frames", 32, 1, 256)
+
+
+def _has_batch_custom_metric(selected_metrics: list[str], metric_defs: dict[str, dict[str, Any]]) -> bool:
+    for metric_key in selected_metrics:
+        metric_def = metric_defs.get(metric_key) if metric_key not in BUILTIN_METRICS else None
+        if not metric_def or str(metric_def.get("implementation_type") or "").lower() != "python":
+            continue
+        if metric_declares_batch(metric_def.get("code_text") or ""):
+            return True
+    return False
+
+
+def _video_metric_batch_limit(frame_elements: int, batch_frames: int) -> int:
+    per_frame = VIDEO_METRIC_BYTES_PER_ELEMENT * max(1, int(frame_elements))
+    return max(1, min(int(batch_frames), VIDEO_METRIC_BATCH_BYTES // per_frame))
+
+
+class _FrameMetricCollector:
+    """
+    视频逐帧指标的累积器：选了批量自定义指标时帧先进入缓冲，凑满一批（或尺寸变化、结束时）再计算，
+    否则每帧直接计算；结果展开到与逐帧计算相同的各列表中。
+    """
+
+    def __init__(
+        self,
+        *,
+        selected_metrics: list[str],
+        metric_defs: dict[str, dict[str, Any]],
+        task_type: str,
+        sample_name: str,
+        batch_frames: int,
+    ):
+        self.selected_metrics = selected_metrics
+        self.metric_defs = metric_defs
+        self.task_type = task_type
+        self.sample_name = sample_name
+        self.batch_frames = max(1, int(batch_frames)) if _has_batch_custom_metric(selected_metrics, metric_defs) else 1
+        self.psnr_list: list[float] = []
+        self.ssim_list: list[float] = []
+        self.niqe_list: list[float] = []
+        self.custom_metric_values: dict[str, list[float]] = {}
+        self.metric_elapsed_list: list[float] = []
+        self.metric_psnr_ssim_elapsed_list: list[float] = []
+        self.metric_niqe_elapsed_list: list[float] = []
+        self.metric_custom_elapsed_list: list[float] = []
+        self.frame_samples: list[dict[str, Any]] = []
+        self._gt: list[np.ndarray] = []
+        self._pred: list[np.ndarray] = []
+
+    def add(self, gt_u8: np.ndarray, pred_u8: np.ndarray) -> None:
+        if self._gt and (gt_u8.shape != self._gt[0].shape or pred_u8.shape != self._pred[0].shape):
+            self.flush()
+        self._gt.append(gt_u8)
+        self._pred.append(pred_u8)
+        if len(self._gt) >= _video_metric_batch_limit(gt_u8.size, self.batch_frames):
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._gt:
+            return
+        start = len(self.frame_samples)
+        names = [f"{self.sample_name}#f{start + idx}" for idx in range(len(self._gt))]
+        if len(names) == 1:
+            results = [
+                _compute_metric_sample(
+                    self._gt[0],
+                    self._pred[0],
+                    selected_metrics=self.selected_metrics,
+                    metric_defs=self.metric_defs,
+                    task_type=self.task_type,
+                    sample_name=names[0],
+                )
+            ]
+        else:
+            results = _compute_metric_batch(
+                np.stack(self._gt),
+                np.stack(self._pred),
+                selected_metrics=self.selected_metrics,
+                metric_defs=self.metric_defs,
+                task_type=self.task_type,
+                sample_names=names,
+            )
+        self._gt.clear()
+        self._pred.clear()
+        for sample, custom_values, timings in results:
+            self.frame_samples.append(sample)
+            if "PSNR" in sample:
+                self.psnr_list.append(float(sample["PSNR"]))
+            if "SSIM" in sample:
+                self.ssim_list.append(float(sample["SSIM"]))
+            if "NIQE" in sample:
+                self.niqe_list.append(float(sample["NIQE"]))
+            for metric_key, value in custom_values.items():
+                self.custom_metric_values.setdefault(metric_key, []).append(float(value))
+            self.metric_elapsed_list.append(float(timings["metric_elapsed"]))
+            self.metric_psnr_ssim_elapsed_list.append(float(timings["builtin_elapsed"]))
+            self.metric_niqe_elapsed_list.append(float(timings["niqe_elapsed"]))
+            self.metric_custom_elapsed_list.append(float(timings["custom_elapsed"]))
+
+    def mean_row(self) -> dict[str, Any]:
+        return _mean_video_sample_from_frames(self.frame_samples, self.sample_name, self.selected_metrics)
+
+
 def _mean_video_sample_from_frames(
     frame_samples: list[dict[str, Any]],
     sample_name: str,
@@ -347,6 +524,7 @@ def _eval_builtin_video_pair_frames(
     task_type: str,
     sample_name: str,
     max_frames: int,
+    batch_frames: int = 1,
 ) -> tuple[
     list[float],
     list[float],
@@ -361,19 +539,17 @@ def _eval_builtin_video_pair_frames(
     int,
 ]:
     """
-    内置视频算法：对输入 / GT 视频同步逐帧推理并按帧计算指标，再对每帧指标做平均写入汇总行。
+    内置视频算法：对输入 / GT 视频同步逐帧推理，指标按 batch_frames 帧一批计算，再对每帧指标做平均写入汇总行。
     返回各列表为「本段视频各帧」的展开值，便于全局按帧加权平均；最后一个 dict 为该段视频的均值样例行。
     """
-    psnr_list: list[float] = []
-    ssim_list: list[float] = []
-    niqe_list: list[float] = []
-    custom_metric_values: dict[str, list[float]] = {}
-    metric_elapsed_list: list[float] = []
-    metric_psnr_ssim_elapsed_list: list[float] = []
-    metric_niqe_elapsed_list: list[float] = []
-    metric_custom_elapsed_list: list[float] = []
+    collector = _FrameMetricCollector(
+        selected_metrics=selected_metrics,
+        metric_defs=metric_defs,
+        task_type=task_type,
+        sample_name=sample_name,
+        batch_frames=batch_frames,
+    )
     algo_elapsed_list: list[float] = []
-    frame_samples: list[dict[str, Any]] = []
 
     cap_in = cv2.VideoCapture(str(getattr(pair, "input_path", "")))
     cap_gt = cv2.VideoCapture(str(getattr(pair, "gt_path", "")))
@@ -381,14 +557,14 @@ def _eval_builtin_video_pair_frames(
         cap_in.release()
         cap_gt.release()
         return (
-            psnr_list,
-            ssim_list,
-            niqe_list,
-            custom_metric_values,
-            metric_elapsed_list,
-            metric_psnr_ssim_elapsed_list,
-            metric_niqe_elapsed_list,
-            metric_custom_elapsed_list,
+            collector.psnr_list,
+            collector.ssim_list,
+            collector.niqe_list,
+            collector.custom_metric_values,
+            collector.metric_elapsed_list,
+            collector.metric_psnr_ssim_elapsed_list,
+            collector.metric_niqe_elapsed_list,
+            collector.metric_custom_elapsed_list,
             algo_elapsed_list,
             {"name": sample_name},
             0,
@@ -405,45 +581,25 @@ def _eval_builtin_video_pair_frames(
             pred_u8 = compute_pred(inp_u8, gt_u8, pair)
             algo_elapsed_list.append(time.time() - t_algo)
             gt_u8, pred_u8 = _resize_to_match(gt_u8, pred_u8)
-            sample, custom_values, timings = _compute_metric_sample(
-                gt_u8=gt_u8,
-                pred_u8=pred_u8,
-                selected_metrics=selected_metrics,
-                metric_defs=metric_defs,
-                task_type=task_type,
-                sample_name=f"{sample_name}#f{n}",
-            )
-            frame_samples.append(sample)
-            if "PSNR" in sample:
-                psnr_list.append(float(sample["PSNR"]))
-            if "SSIM" in sample:
-                ssim_list.append(float(sample["SSIM"]))
-            if "NIQE" in sample:
-                niqe_list.append(float(sample["NIQE"]))
-            for metric_key, value in custom_values.items():
-                custom_metric_values.setdefault(metric_key, []).append(float(value))
-            metric_elapsed_list.append(float(timings["metric_elapsed"]))
-            metric_psnr_ssim_elapsed_list.append(float(timings["builtin_elapsed"]))
-            metric_niqe_elapsed_list.append(float(timings["niqe_elapsed"]))
-            metric_custom_elapsed_list.append(float(timings["custom_elapsed"]))
+            collector.add(gt_u8, pred_u8)
             n += 1
+        collector.flush()
     finally:
         cap_in.release()
         cap_gt.release()
 
-    mean_row = _mean_video_sample_from_frames(frame_samples, sample_name, selected_metrics)
     return (
-        psnr_list,
-        ssim_list,
-        niqe_list,
-        custom_metric_values,
-        metric_elapsed_list,
-        metric_psnr_ssim_elapsed_list,
-        metric_niqe_elapsed_list,
-        metric_custom_elapsed_list,
+        collector.psnr_list,
+        collector.ssim_list,
+        collector.niqe_list,
+        collector.custom_metric_values,
+        collector.metric_elapsed_list,
+        collector.metric_psnr_ssim_elapsed_list,
+        collector.metric_niqe_elapsed_list,
+        collector.metric_custom_elapsed_list,
         algo_elapsed_list,
-        mean_row,
-        len(frame_samples),
+        collector.mean_row(),
+        len(collector.frame_samples),
     )
 
 
@@ -457,6 +613,7 @@ def _eval_user_video_pair_frames(
     task_type: str,
     sample_name: str,
     max_frames: int,
+    batch_frames: int = 1,
 ) -> tuple[
     list[float],
     list[float],
@@ -469,23 +626,32 @@ def _eval_user_video_pair_frames(
     dict[str, Any],
     int,
 ]:
-    """用户接入视频算法：对算法输出视频与 GT 视频逐帧对齐计算指标。"""
-    psnr_list: list[float] = []
-    ssim_list: list[float] = []
-    niqe_list: list[float] = []
-    custom_metric_values: dict[str, list[float]] = {}
-    metric_elapsed_list: list[float] = []
-    metric_psnr_ssim_elapsed_list: list[float] = []
-    metric_niqe_elapsed_list: list[float] = []
-    metric_custom_elapsed_list: list[float] = []
-    frame_samples: list[dict[str, Any]] = []
+    """用户接入视频算法：对算法输出视频与 GT 视频逐帧对齐，按批计算指标。"""
+    collector = _FrameMetricCollector(
+        selected_metrics=selected_metrics,
+        metric_defs=metric_defs,
+        task_type=task_type,
+        sample_name=sample_name,
+        batch_frames=batch_frames,
+    )
 
     cap_gt = cv2.VideoCapture(str(gt_video_path))
     cap_pr = cv2.VideoCapture(str(pred_video_path))
     if not cap_gt.isOpened() or not cap_pr.isOpened():
         cap_gt.release()
         cap_pr.release()
-        return (psnr_list, ssim_list, niqe_list, custom_metric_values, metric_elapsed_list, metric_psnr_ssim_elapsed_list, metric_niqe_elapsed_list, metric_custom_elapsed_list, {"name": sample_name}, 0)
+        return (
+            collector.psnr_list,
+            collector.ssim_list,
+            collector.niqe_list,
+            collector.custom_metric_values,
+            collector.metric_elapsed_list,
+            collector.metric_psnr_ssim_elapsed_list,
+            collector.metric_niqe_elapsed_list,
+            collector.metric_custom_elapsed_list,
+            {"name": sample_name},
+            0,
+        )
     try:
         n = 0
         while n < max_frames:
@@ -495,44 +661,24 @@ def _eval_user_video_pair_frames(
             if not ok_g or not ok_p or gt_u8 is None or pred_u8 is None:
                 break
             gt_u8, pred_u8 = _resize_to_match(gt_u8, pred_u8)
-            sample, custom_values, timings = _compute_metric_sample(
-                gt_u8=gt_u8,
-                pred_u8=pred_u8,
-                selected_metrics=selected_metrics,
-                metric_defs=metric_defs,
-                task_type=task_type,
-                sample_name=f"{sample_name}#f{n}",
-            )
-            frame_samples.append(sample)
-            if "PSNR" in sample:
-                psnr_list.append(float(sample["PSNR"]))
-            if "SSIM" in sample:
-                ssim_list.append(float(sample["SSIM"]))
-            if "NIQE" in sample:
-                niqe_list.append(float(sample["NIQE"]))
-            for metric_key, value in custom_values.items():
-                custom_metric_values.setdefault(metric_key, []).append(float(value))
-            metric_elapsed_list.append(float(timings["metric_elapsed"]))
-            metric_psnr_ssim_elapsed_list.append(float(timings["builtin_elapsed"]))
-            metric_niqe_elapsed_list.append(float(timings["niqe_elapsed"]))
-            metric_custom_elapsed_list.append(float(timings["custom_elapsed"]))
+            collector.add(gt_u8, pred_u8)
             n += 1
+        collector.flush()
     finally:
         cap_gt.release()
         cap_pr.release()
 
-    mean_row = _mean_video_sample_from_frames(frame_samples, sample_name, selected_metrics)
     return (
-        psnr_list,
-        ssim_list,
-        niqe_list,
-        custom_metric_values,
-        metric_elapsed_list,
-        metric_psnr_ssim_elapsed_list,
-        metric_niqe_elapsed_list,
-        metric_custom_elapsed_list,
-        mean_row,
-        len(frame_samples),
+        collector.psnr_list,
+        collector.ssim_list,
+        collector.niqe_list,
+        collector.custom_metric_values,
+        collector.metric_elapsed_list,
+        collector.metric_psnr_ssim_elapsed_list,
+        collector.metric_niqe_elapsed_list,
+        collector.metric_custom_elapsed_list,
+        collector.mean_row(),
+        len(collector.frame_samples),
     )
 
 
@@ -591,6 +737,18 @@ def _get_int(params: dict[str, Any], key: str, default: int, min_v: int | None =
     return x
 
 
+def _get_flag(params: dict[str, Any], key: str, default: bool) -> bool:
+    v = params.get(key, default)
+    if isinstance(v, bool):
+        return v
+    text = str(v if v is not None else "").strip().lower()
+    if text in {"1", "true", "yes", "on"}:
+        return True
+    if text in {"0", "false", "no", "off"}:
+        return False
+    return bool(default)
+
+
 def _is_retryable_exception(e: Exception) -> bool:
     if isinstance(e, (TimeoutError, ConnectionError)):
         return True
@@ -605,6 +763,7 @@ def _make_runtime_resource(
     attempt_count: int,
     max_attempts: int,
     retry_count: int,
+    decode_cache_run: DecodeCacheUsage | None = None,
 ) -> dict[str, Any]:
     wall_s = max(0.0, time.time() - wall_start)
     cpu_s = max(0.0, time.process_time() - cpu_start)
@@ -621,6 +780,7 @@ def _make_runtime_resource(
         "attempt_count": int(attempt_count),
         "max_attempts": int(max_attempts),
         "retry_count": int(retry_count),
+        "decode_cache": decode_cache_usage(decode_cache_run),
     }
 
 
@@ -631,6 +791,7 @@ def _attach_runtime_to_run(
     attempt_count: int,
     max_attempts: int,
     retry_count: int,
+    decode_cache_run: DecodeCacheUsage | None = None,
 ) -> None:
     record = run.get("record") if isinstance(run.get("record"), dict) else {}
     record["runtime_resource"] = _make_runtime_resource(
@@ -639,10 +800,192 @@ def _attach_runtime_to_run(
         attempt_count=attempt_count,
         max_attempts=max_attempts,
         retry_count=retry_count,
+        decode_cache_run=decode_cache_run,
     )
     run["record"] = record
 
 
+def _compute_builtin_pred(
+    inp_u8: np.ndarray,
+    gt_u8: np.ndarray,
+    pair: Any,
+    *,
+    task_type: str,
+    algorithm_id: str,
+    algo_params: dict[str, Any],
+) -> np.ndarray:
+    """内置算法推理；模块级函数便于 functools.partial 绑定参数后交给进程池执行。"""
+    if task_type == "dehaze":
+        if algorithm_id.startswith("alg_dehaze_clahe"):
+            clip = _get_num(algo_params, "clahe_clip_limit", 2.0, 0.1, 40.0)
+            return _apply_clahe_bgr(inp_u8, clip_limit=clip)
+        if algorithm_id.startswith("alg_dehaze_gamma"):
+            gamma = _get_num(algo_params, "gamma", 0.75, 0.05, 5.0)
+            return _apply_gamma_bgr(inp_u8, gamma=gamma)
+        patch = _get_int(algo_params, "dcp_patch", 15, 3, 51)
+        omega = _get_num(algo_params, "dcp_omega", 0.95, 0.0, 1.5)
+        t0 = _get_num(algo_params, "dcp_t0", 0.1, 0.01, 0.5)
+        return dehaze_dcp(inp_u8, patch=patch, omega=omega, t0=t0)
+    if task_type == "denoise":
+        if algorithm_id.startswith("alg_denoise_bilateral"):
+            d = _get_int(algo_params, "bilateral_d", 7, 1, 25)
+            sc = _get_num(algo_params, "bilateral_sigmaColor", 35, 1, 200)
+            ss = _get_num(algo_params, "bilateral_sigmaSpace", 35, 1, 200)
+            return cv2.bilateralFilter(inp_u8, d=d, sigmaColor=sc, sigmaSpace=ss)
+        if algorithm_id.startswith("alg_denoise_gaussian"):
+            sigma = _get_num(algo_params, "gaussian_sigma", 1.0, 0.05, 20.0)
+            return cv2.GaussianBlur(inp_u8, (0, 0), sigmaX=sigma)
+        if algorithm_id.startswith("alg_denoise_median"):
+            k = _get_int(algo_params, "median_ksize", 3, 1, 31)
+            if k % 2 == 0:
+                k += 1
+            return cv2.medianBlur(inp_u8, k)
+        h = _get_num(algo_params, "nlm_h", 10, 1, 50)
+        hc = _get_num(algo_params, "nlm_hColor", 10, 1, 50)
+        tw = _get_int(algo_params, "nlm_templateWindowSize", 7, 3, 21)
+        sw = _get_int(algo_params, "nlm_searchWindowSize", 21, 3, 51)
+        if tw % 2 == 0:
+            tw += 1
+        if sw % 2 == 0:
+            sw += 1
+        return cv2.fastNlMeansDenoisingColored(inp_u8, None, h, hc, tw, sw)
+    if task_type == "deblur":
+        if algorithm_id.startswith("alg_deblur_laplacian"):
+            st = _get_num(algo_params, "laplacian_strength", 0.7, 0.0, 5.0)
+            return _laplacian_sharpen(inp_u8, strength=st)
+        sigma = _get_num(algo_params, "unsharp_sigma", 1.0, 0.05, 10.0)
+        amount = _get_num(algo_params, "unsharp_amount", 1.6, 1.0, 5.0)
+        return _unsharp_mask(inp_u8, sigma=sigma, amount=amount)
+    if task_type == "sr":
+        h, w = gt_u8.shape[:2]
+        if algorithm_id == "alg_sr_nearest":
+            return cv2.resize(inp_u8, (w, h), interpolation=cv2.INTER_NEAREST)
+        if algorithm_id == "alg_sr_linear":
+            return cv2.resize(inp_u8, (w, h), interpolation=cv2.INTER_LINEAR)
+        if algorithm_id.startswith("alg_sr_lanczos"):
+            pred = cv2.resize(inp_u8, (w, h), interpolation=cv2.INTER_LANCZOS4)
+            if algorithm_id.endswith("_sharp"):
+                sigma = _get_num(algo_params, "unsharp_sigma", 0.8, 0.05, 10.0)
+                amount = _get_num(algo_params, "unsharp_amount", 1.2, 1.0, 5.0)
+                return _unsharp_mask(pred, sigma=sigma, amount=amount)
+            return pred
+        if algorithm_id.startswith("alg_sr_bicubic"):
+            pred = cv2.resize(inp_u8, (w, h), interpolation=cv2.INTER_CUBIC)
+            if algorithm_id.endswith("_sharp"):
+                sigma = _get_num(algo_params, "unsharp_sigma", 0.8, 0.05, 10.0)
+                amount = _get_num(algo_params, "unsharp_amount", 1.3, 1.0, 5.0)
+                return _unsharp_mask(pred, sigma=sigma, amount=amount)
+            return pred
+        return cv2.resize(inp_u8, (w, h), interpolation=cv2.INTER_CUBIC)
+    if task_type == "lowlight":
+        if algorithm_id.startswith("alg_lowlight_clahe"):
+            clip = _get_num(algo_params, "clahe_clip_limit", 2.5, 0.1, 40.0)
+            return _apply_clahe_bgr(inp_u8, clip_limit=clip)
+        if algorithm_id == "alg_lowlight_hybrid":
+            gamma = _get_num(algo_params, "lowlight_gamma", 0.62, 0.05, 5.0)
+            clip = _get_num(algo_params, "clahe_clip_limit", 2.6, 0.1, 40.0)
+            return _apply_clahe_bgr(_apply_gamma_bgr(inp_u8, gamma=gamma), clip_limit=clip)
+        gamma = _get_num(algo_params, "lowlight_gamma", 0.6, 0.05, 5.0)
+        return _apply_gamma_bgr(inp_u8, gamma=gamma)
+    if task_type == "video_denoise":
+        if algorithm_id.startswith("alg_video_denoise_median"):
+            k = _get_int(algo_params, "median_ksize", 3, 1, 31)
+            if k % 2 == 0:
+                k += 1
+            return cv2.medianBlur(inp_u8, k)
+        sigma = _get_num(algo_params, "gaussian_sigma", 1.0, 0.05, 20.0)
+        return cv2.GaussianBlur(inp_u8, (0, 0), sigmaX=sigma)
+    if task_type == "video_sr":
+        h, w = gt_u8.shape[:2]
+        if algorithm_id == "alg_video_sr_nearest":
+            return cv2.resize(inp_u8, (w, h), interpolation=cv2.INTER_NEAREST)
+        if algorithm_id == "alg_video_sr_linear":
+            return cv2.resize(inp_u8, (w, h), interpolation=cv2.INTER_LINEAR)
+        if algorithm_id.startswith("alg_video_sr_lanczos"):
+            pred = cv2.resize(inp_u8, (w, h), interpolation=cv2.INTER_LANCZOS4)
+            if algorithm_id.endswith("_sharp"):
+                sigma = _get_num(algo_params, "unsharp_sigma", 0.8, 0.05, 10.0)
+                amount = _get_num(algo_params, "unsharp_amount", 1.2, 1.0, 5.0)
+                return _unsharp_mask(pred, sigma=sigma, amount=amount)
+            return pred
+        pred = cv2.resize(inp_u8, (w, h), interpolation=cv2.INTER_CUBIC)
+        if algorithm_id.startswith("alg_video_sr_bicubic") and algorithm_id.endswith("_sharp"):
+            sigma = _get_num(algo_params, "unsharp_sigma", 0.8, 0.05, 10.0)
+            amount = _get_num(algo_params, "unsharp_amount", 1.3, 1.0, 5.0)
+            return _unsharp_mask(pred, sigma=sigma, amount=amount)
+        return pred
+    return inp_u8
+
+
+@dataclass(frozen=True)
+class _PairEvalResult:
+    sample: dict[str, Any]
+    custom_values: dict[str, float]
+    timings: dict[str, float]
+    algo_elapsed: float
+
+
+@dataclass(frozen=True)
+class _DecodedPair:
+    pair: Any
+    inp_u8: np.ndarray | None
+    gt_u8: np.ndarray | None
+
+
+def _decode_pair(
+    pair: Any,
+    use_cache: bool = False,
+    materialized: MaterializedPairs | None = None,
+    cache_usage: DecodeCacheUsage | None = None,
+) -> _DecodedPair:
+    """
+    解码一对样本：优先取已物化数据的零拷贝视图，其次经进程内缓存读取（两者返回的数组都只读），
+    都不可用时直接解码。
+    """
+    if materialized is not None:
+        hit = materialized.lookup(pair)
+        if hit is not None:
+            return _DecodedPair(pair=pair, inp_u8=hit[0], gt_u8=hit[1])
+    if use_cache:
+        cache = get_decoded_image_cache()
+        inp_u8 = cache.get_or_decode(pair.input_path, _read_image_bgr, cache_usage)
+        gt_u8 = cache.get_or_decode(pair.gt_path, _read_image_bgr, cache_usage)
+        return _DecodedPair(pair=pair, inp_u8=inp_u8, gt_u8=gt_u8)
+    return _DecodedPair(pair=pair, inp_u8=_read_image_bgr(pair.input_path), gt_u8=_read_image_bgr(pair.gt_path))
+
+
+def _eval_image_pair(
+    item: Any,
+    *,
+    compute_pred: Callable[..., np.ndarray],
+    selected_metrics: list[str],
+    metric_defs: dict[str, dict[str, Any]],
+    task_type: str,
+    decode: Callable[[Any], _DecodedPair] = _decode_pair,
+) -> _PairEvalResult | None:
+    """
+    单个图像样本：解码输入 / GT、推理并计算指标；读取失败返回 None，由调用方计入 read_fail。
+    item 可以是原始 pair，也可以是预取阶段已解码好的 _DecodedPair。
+    """
+    decoded = item if isinstance(item, _DecodedPair) else decode(item)
+    pair, inp_u8, gt_u8 = decoded.pair, decoded.inp_u8, decoded.gt_u8
+    if inp_u8 is None or gt_u8 is None:
+        return None
+    t0 = time.time()
+    pred_u8 = compute_pred(inp_u8, gt_u8, pair)
+    algo_elapsed = time.time() - t0
+    gt_u8, pred_u8 = _resize_to_match(gt_u8, pred_u8)
+    sample, custom_values, timings = _compute_metric_sample(
+        gt_u8=gt_u8,
+        pred_u8=pred_u8,
+        selected_metrics=selected_metrics,
+        metric_defs=metric_defs,
+        task_type=task_type,
+        sample_name=getattr(pair, "name", None) or "",
+    )
+    return _PairEvalResult(sample=sample, custom_values=custom_values, timings=timings, algo_elapsed=algo_elapsed)
+
+
 def _compute_run_for_task_from_pairs(
     pairs: list[Any],
     compute_pred,
@@ -655,6 +998,11 @@ def _compute_run_for_task_from_pairs(
     metric_defs: dict[str, dict[str, Any]],
     task_type: str,
     progress_callback: Callable[[int, int], None] | None = None,
+    executor: SampleExecutorConfig | None = None,
+    prefetch_depth: int = 0,
+    decode_cache: bool = False,
+    materialized: MaterializedPairs | None = None,
+    decode_cache_run: DecodeCacheUsage | None = None,
 ) -> tuple[dict[str, float], dict[str, Any], list[dict[str, Any]]]:
     psnr_list: list[float] = []
     ssim_list: list[float] = []
@@ -669,30 +1017,26 @@ def _compute_run_for_task_from_pairs(
     read_ok = 0
     read_fail = 0
     processed_count = 0
-    for pair in pairs:
-        check_cancel()
-        inp_u8 = _read_image_bgr(pair.input_path)
-        gt_u8 = _read_image_bgr(pair.gt_path)
-        if inp_u8 is None or gt_u8 is None:
+    config = executor if executor is not None else resolve_sample_executor(None)
+    decode = functools.partial(_decode_pair, use_cache=decode_cache, materialized=materialized, cache_usage=decode_cache_run)
+    eval_one = functools.partial(
+        _eval_image_pair,
+        compute_pred=compute_pred,
+        selected_metrics=selected_metrics,
+        metric_defs=metric_defs,
+        task_type=task_type,
+        decode=decode,
+    )
+    source = prefetch_ordered(decode, pairs, prefetch_depth) if prefetch_depth > 0 else pairs
+    for result in map_ordered(eval_one, source, config, before_submit=check_cancel):
+        if result is None:
             read_fail += 1
             continue
         read_ok += 1
-
-        t0 = time.time()
-        pred_u8 = compute_pred(inp_u8, gt_u8, pair)
-        algo_elapsed_list.append(time.time() - t0)
+        algo_elapsed_list.append(result.algo_elapsed)
         processed_count += 1
 
-        gt_u8, pred_u8 = _resize_to_match(gt_u8, pred_u8)
-        sample_name = getattr(pair, "name", None) or ""
-        sample, custom_values, timings = _compute_metric_sample(
-            gt_u8=gt_u8,
-            pred_u8=pred_u8,
-            selected_metrics=selected_metrics,
-            metric_defs=metric_defs,
-            task_type=task_type,
-            sample_name=sample_name,
-        )
+        sample, custom_values, timings = result.sample, result.custom_values, result.timings
         if "PSNR" in sample:
             psnr_list.append(float(sample["PSNR"]))
         if "SSIM" in sample:
@@ -829,6 +1173,80 @@ def _set_run_progress(run: Dict[str, Any], progress: int, stage: str, message: s
     run["progress"] = max(0, min(100, value))
     run["stage"] = str(stage or "")
     run["progress_message"] = str(message or "")
+    run["progress_updated_at"] = time.time()
+
+
+class _CancelSignal:
+    """
+    样本 / 帧循环里调用的取消检查。取消接口总会设置 run_cancel:{id}，因此热路径只按间隔 EXISTS 该键，
+    命中后本地记住；完整 Run 记录（status / cancel_requested）仅每 full_check_interval_s 兜底读取一次。
+    """
+
+    def __init__(self, r, run_id: str, cancel_key: str, *, poll_interval_s: float = 0.2, full_check_interval_s: float = 5.0):
+        self.r = r
+        self.run_id = run_id
+        self.cancel_key = cancel_key
+        self.poll_interval_s = float(poll_interval_s)
+        self.full_check_interval_s = float(full_check_interval_s)
+        self.canceled = False
+        now = time.monotonic()
+        self._next_poll = now
+        self._next_full = now + self.full_check_interval_s
+
+    def _record_says_canceled(self) -> bool:
+        cur = load_run(self.r, self.run_id) or {}
+        return bool(cur.get("cancel_requested")) or str(cur.get("status") or "").lower() in {"canceled", "canceling"}
+
+    def __call__(self) -> None:
+        if not self.canceled:
+            now = time.monotonic()
+            if now >= self._next_poll:
+                self._next_poll = now + self.poll_interval_s
+                self.canceled = bool(self.r.exists(self.cancel_key))
+                if not self.canceled and now >= self._next_full:
+                    self._next_full = now + self.full_check_interval_s
+                    self.canceled = self._record_says_canceled()
+        if self.canceled:
+            raise RunCanceled()
+
+
+class _RunProgressPublisher:
+    """样本级进度按最小间隔写入进度通道（store.save_run_progress），完整 Run 记录只在阶段切换与结束时保存。"""
+
+    def __init__(self, r, run_id: str, min_interval_s: float):
+        self.r = r
+        self.run_id = run_id
+        self.min_interval_s = float(min_interval_s)
+        self._last = 0.0
+
+    def __call__(self, run: Dict[str, Any]) -> None:
+        now = time.time()
+        if now - self._last < self.min_interval_s:
+            return
+        self._last = now
+        save_run_progress(self.r, self.run_id, int(run.get("progress") or 0), run.get("stage") or "", run.get("progress_message") or "")
+
+
+@celery_app.task(name="datasets.materialize")
+def materialize_dataset_job(
+    dataset_id: str, data_root: str, ds_dir: str, owner_id: str, task_types: list[str] | None = None
+) -> Dict[str, Any]:
+    """在 worker 中解码并写出数据集张量，状态写入 materialize_job:{dataset_id} 供接口查询。"""
+    r = make_redis()
+    job = load_materialize_job(r, dataset_id) or {"dataset_id": dataset_id, "task_types": task_types}
+    job.update({"status": "running", "started_at": time.time()})
+    save_materialize_job(r, dataset_id, job)
+    try:
+        result = materialize_dataset(Path(data_root), Path(ds_dir), owner_id, dataset_id, task_types)
+    except MaterializeTooLarge as exc:
+        job.update({"status": "failed", "error": "materialize_too_large", "max_mb": round(exc.max_bytes / 1024.0 / 1024.0, 1)})
+    except Exception as exc:
+        job.update({"status": "failed", "error": f"{type(exc).__name__}: {exc}"})
+    else:
+        job.update({"status": "done", "materialized": result})
+    job["finished_at"] = time.time()
+    save_materialize_job(r, dataset_id, job)
+    return job
 
 
 @celery_app.task(name="runs.execute")
@@ -842,10 +1260,12 @@ def execute_run(run_id: str) -> Dict[str, Any]:
         tracemalloc.start()
     wall_start = time.time()
     cpu_start = time.process_time()
+    decode_cache_run = DecodeCacheUsage()
 
     status0 = (run.get("status") or "").lower()
     p0 = run.get("params") if isinstance(run.get("params"), dict) else {}
     retry_max_attempts = _get_int(p0, "retry_max_attempts", 3, 1, 5)
+    publish_progress = _RunProgressPublisher(r, run_id, _get_num(p0, "progress_interval_s", 1.0, 0.0, 60.0))
     record0 = run.get("record") if isinstance(run.get("record"), dict) else {}
     retry0 = record0.get("retry") if isinstance(record0.get("retry"), dict) else {}
     prev_attempt = _get_int(retry0, "attempt_count", 0, 0, 100)
@@ -863,7 +1283,7 @@ def execute_run(run_id: str) -> Dict[str, Any]:
         run["error_code"] = err.E_CANCELED
         run["error_detail"] = None
         r.delete(cancel_key)
-        _attach_runtime_to_run(run, wall_start, cpu_start, attempt_count, retry_max_attempts, retry_count)
+        _attach_runtime_to_run(run, wall_start, cpu_start, attempt_count, retry_max_attempts, retry_count, decode_cache_run)
         save_run(r, run_id, run)
         return {"ok": False, "run_id": run_id, "error": run["error"]}
 
@@ -939,12 +1359,12 @@ def execute_run(run_id: str) -> Dict[str, Any]:
     user_algorithm_video_runner: UserAlgorithmVideoRunner | None = None
 
     try:
-        def check_cancel():
-            cur = load_run(r, run_id) or {}
-            s = (cur.get("status") or "").lower()
-            flag = r.get(cancel_key)
-            if flag or cur.get("cancel_requested") or s in {"canceled", "canceling"}:
-                raise RunCanceled()
+        check_cancel = _CancelSignal(
+            r,
+            run_id,
+            cancel_key,
+            poll_interval_s=_get_int(p0, "cancel_poll_ms", 200, 0, 1000) / 1000.0,
+        )
 
         if task_type in {"dehaze", "denoise", "deblur", "sr", "lowlight", "video_denoise", "video_sr"}:
             from pathlib import Path
@@ -1079,6 +1499,13 @@ def execute_run(run_id: str) -> Dict[str, Any]:
             _set_run_progress(run, 48, "preparing_algorithm", "\u5df2\u786e\u5b9a\u5b9e\u9645\u6267\u884c\u7b97\u6cd5")
             save_run(r, run_id, run)
 
+            builtin_pred = functools.partial(
+                _compute_builtin_pred,
+                task_type=task_type,
+                algorithm_id=algorithm_id,
+                algo_params=dict(algo_params),
+            )
+
             def compute_pred(inp_u8: np.ndarray, gt_u8: np.ndarray, pair: Any) -> np.ndarray:
                 nonlocal user_algorithm_runner, user_algorithm_video_runner
                 if is_user_package:
@@ -1125,112 +1552,18 @@ def execute_run(run_id: str) -> Dict[str, Any]:
                             result = type(result)(image_bgr_u8=result.image_bgr_u8, detail=detail)
                         else:
                             if user_algorithm_runner is None:
-                                user_algorithm_runner = UserAlgorithmImageRunner(alg, timeout_s=timeout_s)
+                                user_algorithm_runner = UserAlgorithmImageRunner(
+                                    alg,
+                                    timeout_s=timeout_s,
+                                    mode=algo_params.get("user_algorithm_mode") or (alg or {}).get("runtime_mode"),
+                                    transport=algo_params.get("user_algorithm_transport") or "shm",
+                                )
                             result = user_algorithm_runner.run(inp_u8, sample_name=sample_name)
                     except AlgorithmRuntimeError as exc:
                         raise RunFailed(err.E_ALGORITHM_RUNTIME, exc.message, exc.detail) from exc
                     user_runtime_details.append(result.detail)
                     return result.image_bgr_u8
-                if task_type == "dehaze":
-                    if algorithm_id.startswith("alg_dehaze_clahe"):
-                        clip = _get_num(algo_params, "clahe_clip_limit", 2.0, 0.1, 40.0)
-                        return _apply_clahe_bgr(inp_u8, clip_limit=clip)
-                    if algorithm_id.startswith("alg_dehaze_gamma"):
-                        gamma = _get_num(algo_params, "gamma", 0.75, 0.05, 5.0)
-                        return _apply_gamma_bgr(inp_u8, gamma=gamma)
-                    patch = _get_int(algo_params, "dcp_patch", 15, 3, 51)
-                    omega = _get_num(algo_params, "dcp_omega", 0.95, 0.0, 1.5)
-                    t0 = _get_num(algo_params, "dcp_t0", 0.1, 0.01, 0.5)
-                    return dehaze_dcp(inp_u8, patch=patch, omega=omega, t0=t0)
-                if task_type == "denoise":
-                    if algorithm_id.startswith("alg_denoise_bilateral"):
-                        d = _get_int(algo_params, "bilateral_d", 7, 1, 25)
-                        sc = _get_num(algo_params, "bilateral_sigmaColor", 35, 1, 200)
-                        ss = _get_num(algo_params, "bilateral_sigmaSpace", 35, 1, 200)
-                        return cv2.bilateralFilter(inp_u8, d=d, sigmaColor=sc, sigmaSpace=ss)
-                    if algorithm_id.startswith("alg_denoise_gaussian"):
-                        sigma = _get_num(algo_params, "gaussian_sigma", 1.0, 0.05, 20.0)
-                        return cv2.GaussianBlur(inp_u8, (0, 0), sigmaX=sigma)
-                    if algorithm_id.startswith("alg_denoise_median"):
-                        k = _get_int(algo_params, "median_ksize", 3, 1, 31)
-                        if k % 2 == 0:
-                            k += 1
-                        return cv2.medianBlur(inp_u8, k)
-                    h = _get_num(algo_params, "nlm_h", 10, 1, 50)
-                    hc = _get_num(algo_params, "nlm_hColor", 10, 1, 50)
-                    tw = _get_int(algo_params, "nlm_templateWindowSize", 7, 3, 21)
-                    sw = _get_int(algo_params, "nlm_searchWindowSize", 21, 3, 51)
-                    if tw % 2 == 0:
-                        tw += 1
-                    if sw % 2 == 0:
-                        sw += 1
-                    return cv2.fastNlMeansDenoisingColored(inp_u8, None, h, hc, tw, sw)
-                if task_type == "deblur":
-                    if algorithm_id.startswith("alg_deblur_laplacian"):
-                        st = _get_num(algo_params, "laplacian_strength", 0.7, 0.0, 5.0)
-                        return _laplacian_sharpen(inp_u8, strength=st)
-                    sigma = _get_num(algo_params, "unsharp_sigma", 1.0, 0.05, 10.0)
-                    amount = _get_num(algo_params, "unsharp_amount", 1.6, 1.0, 5.0)
-                    return _unsharp_mask(inp_u8, sigma=sigma, amount=amount)
-                if task_type == "sr":
-                    h, w = gt_u8.shape[:2]
-                    if algorithm_id == "alg_sr_nearest":
-                        return cv2.resize(inp_u8, (w, h), interpolation=cv2.INTER_NEAREST)
-                    if algorithm_id == "alg_sr_linear":
-                        return cv2.resize(inp_u8, (w, h), interpolation=cv2.INTER_LINEAR)
-                    if algorithm_id.startswith("alg_sr_lanczos"):
-                        pred = cv2.resize(inp_u8, (w, h), interpolation=cv2.INTER_LANCZOS4)
-                        if algorithm_id.endswith("_sharp"):
-                            sigma = _get_num(algo_params, "unsharp_sigma", 0.8, 0.05, 10.0)
-                            amount = _get_num(algo_params, "unsharp_amount", 1.2, 1.0, 5.0)
-                            return _unsharp_mask(pred, sigma=sigma, amount=amount)
-                        return pred
-                    if algorithm_id.startswith("alg_sr_bicubic"):
-                        pred = cv2.resize(inp_u8, (w, h), interpolation=cv2.INTER_CUBIC)
-                        if algorithm_id.endswith("_sharp"):
-                            sigma = _get_num(algo_params, "unsharp_sigma", 0.8, 0.05, 10.0)
-                            amount = _get_num(algo_params, "unsharp_amount", 1.3, 1.0, 5.0)
-                            return _unsharp_mask(pred, sigma=sigma, amount=amount)
-                        return pred
-                    return cv2.resize(inp_u8, (w, h), interpolation=cv2.INTER_CUBIC)
-                if task_type == "lowlight":
-                    if algorithm_id.startswith("alg_lowlight_clahe"):
-                        clip = _get_num(algo_params, "clahe_clip_limit", 2.5, 0.1, 40.0)
-                        return _apply_clahe_bgr(inp_u8, clip_limit=clip)
-                    if algorithm_id == "alg_lowlight_hybrid":
-                        gamma = _get_num(algo_params, "lowlight_gamma", 0.62, 0.05, 5.0)
-                        clip = _get_num(algo_params, "clahe_clip_limit", 2.6, 0.1, 40.0)
-                        return _apply_clahe_bgr(_apply_gamma_bgr(inp_u8, gamma=gamma), clip_limit=clip)
-                    gamma = _get_num(algo_params, "lowlight_gamma", 0.6, 0.05, 5.0)
-                    return _apply_gamma_bgr(inp_u8, gamma=gamma)
-                if task_type == "video_denoise":
-                    if algorithm_id.startswith("alg_video_denoise_median"):
-                        k = _get_int(algo_params, "median_ksize", 3, 1, 31)
-                        if k % 2 == 0:
-                            k += 1
-                        return cv2.medianBlur(inp_u8, k)
-                    sigma = _get_num(algo_params, "gaussian_sigma", 1.0, 0.05, 20.0)
-                    return cv2.GaussianBlur(inp_u8, (0, 0), sigmaX=sigma)
-                if task_type == "video_sr":
-                    h, w = gt_u8.shape[:2]
-                    if algorithm_id == "alg_video_sr_nearest":
-                        return cv2.resize(inp_u8, (w, h), interpolation=cv2.INTER_NEAREST)
-                    if algorithm_id == "alg_video_sr_linear":
-                        return cv2.resize(inp_u8, (w, h), interpolation=cv2.INTER_LINEAR)
-                    if algorithm_id.startswith("alg_video_sr_lanczos"):
-                        pred = cv2.resize(inp_u8, (w, h), interpolation=cv2.INTER_LANCZOS4)
-                        if algorithm_id.endswith("_sharp"):
-                            sigma = _get_num(algo_params, "unsharp_sigma", 0.8, 0.05, 10.0)
-                            amount = _get_num(algo_params, "unsharp_amount", 1.2, 1.0, 5.0)
-                            return _unsharp_mask(pred, sigma=sigma, amount=amount)
-                        return pred
-                    pred = cv2.resize(inp_u8, (w, h), interpolation=cv2.INTER_CUBIC)
-                    if algorithm_id.startswith("alg_video_sr_bicubic") and algorithm_id.endswith("_sharp"):
-                        sigma = _get_num(algo_params, "unsharp_sigma", 0.8, 0.05, 10.0)
-                        amount = _get_num(algo_params, "unsharp_amount", 1.3, 1.0, 5.0)
-                        return _unsharp_mask(pred, sigma=sigma, amount=amount)
-                    return pred
-                return inp_u8
+                return builtin_pred(inp_u8, gt_u8, pair)
 
             if pairs:
                 _set_run_progress(run, 20, "running_algorithm", "\u6b63\u5728\u6267\u884c\u7b97\u6cd5\u5e76\u8ba1\u7b97\u6307\u6807")
@@ -1241,9 +1574,10 @@ def execute_run(run_id: str) -> Dict[str, Any]:
                         done_safe = max(0, min(total_safe, int(done or 0)))
                         percent = 20 + int((done_safe / total_safe) * 70)
                         _set_run_progress(run, percent, "running_algorithm", f"\u6b63\u5728\u5904\u7406\u89c6\u9891\u6837\u672c {done_safe}/{total_safe}\uff0c\u5e76\u8ba1\u7b97\u6307\u6807")
-                        save_run(r, run_id, run)
+                        publish_progress(run)
 
                     vm_max = _video_metric_max_frames(algo_params)
+                    vm_batch = _video_metric_batch_frames(algo_params)
                     psnr_list: list[float] = []
                     ssim_list: list[float] = []
                     niqe_list: list[float] = []
@@ -1290,6 +1624,7 @@ def execute_run(run_id: str) -> Dict[str, Any]:
                                     task_type=task_type,
                                     sample_name=sample_name,
                                     max_frames=vm_max,
+                                    batch_frames=vm_batch,
                                 )
                                 if nf <= 0:
                                     read_fail += 1
@@ -1329,6 +1664,7 @@ def execute_run(run_id: str) -> Dict[str, Any]:
                                     task_type=task_type,
                                     sample_name=sample_name,
                                     max_frames=vm_max,
+                                    batch_frames=vm_batch,
                                 )
                                 if nf <= 0:
                                     read_fail += 1
@@ -1371,6 +1707,7 @@ def execute_run(run_id: str) -> Dict[str, Any]:
                             "read_fail": read_fail,
                             "video_metric_mode": "per_frame_mean",
                             "video_metric_max_frames": vm_max,
+                            "video_metric_batch_frames": vm_batch,
                             "video_metric_frames_total": video_frames_total,
                             "metric_elapsed_mean": round(float(np.mean(metric_elapsed_list)) if metric_elapsed_list else 0.0, 6),
                             "metric_elapsed_sum": round(float(np.sum(metric_elapsed_list)) if metric_elapsed_list else 0.0, 6),
@@ -1382,9 +1719,22 @@ def execute_run(run_id: str) -> Dict[str, Any]:
                             "metric_custom_elapsed_sum": round(float(np.sum(metric_custom_elapsed_list)) if metric_custom_elapsed_list else 0.0, 6),
                         }
                 else:
+                    # 用户算法包共用同一个运行目录与样本序号，只能串行；内置算法可交给线程 / 进程池
+                    sample_executor = resolve_sample_executor(algo_params, allow_parallel=not is_user_package)
+                    prefetch_depth = resolve_prefetch_depth(algo_params, sample_executor)
+                    record["eval_executor"] = {**sample_executor.as_record(), "prefetch_depth": prefetch_depth}
+                    materialized = None
+                    if _get_flag(algo_params, "use_materialized", True):
+                        materialized = open_materialized(data_root, source_owner_id, dataset_id, input_dirname)
+                    record["materialized"] = materialized.describe() if materialized is not None else None
                     metrics, params_patch, samples = _compute_run_for_task_from_pairs(
                         pairs=pairs,
-                        compute_pred=compute_pred,
+                        compute_pred=compute_pred if is_user_package else builtin_pred,
+                        executor=sample_executor,
+                        prefetch_depth=prefetch_depth,
+                        decode_cache=_get_flag(algo_params, "decode_cache", True),
+                        decode_cache_run=decode_cache_run,
+                        materialized=materialized,
                         min_demo_seconds=min_demo_seconds,
                         demo_start=demo_start,
                         seed=seed,
@@ -1400,7 +1750,7 @@ def execute_run(run_id: str) -> Dict[str, Any]:
                                 "running_algorithm",
                                 f"\u6b63\u5728\u5904\u7406\u56fe\u50cf\u6837\u672c {max(0, min(max(1, int(total or 1)), int(done or 0)))}/{max(1, int(total or 1))}\uff0c\u5e76\u8ba1\u7b97\u6307\u6807",
                             ),
-                            save_run(r, run_id, run),
+                            publish_progress(run),
                         ),
                     )
                 finished = time.time()
@@ -1420,7 +1770,10 @@ def execute_run(run_id: str) -> Dict[str, Any]:
                 params["real_algo"] = pick_impl_name()
                 params["input_dir"] = input_dirname
                 run["params"] = params
-                run["samples"] = samples
+                # 逐样本结果单独存放，Run 记录只保留数量
+                save_run_samples(r, run_id, samples)
+                run["samples"] = []
+                run["sample_count"] = len(samples)
                 record = run.get("record") if isinstance(run.get("record"), dict) else {}
                 record["data_mode"] = "paired_videos" if is_video_task else "paired_images"
                 record["pair_used"] = len(pairs)
@@ -1442,12 +1795,12 @@ def execute_run(run_id: str) -> Dict[str, Any]:
                 }
                 if user_runtime_details:
                     record["algorithm_runtime"] = {
-                        "mode": "subprocess",
+                        "mode": user_algorithm_runner.mode if user_algorithm_runner is not None else "subprocess",
                         "sample_count": len(user_runtime_details),
                         "last": user_runtime_details[-1],
                     }
                 run["record"] = record
-                _attach_runtime_to_run(run, wall_start, cpu_start, attempt_count, retry_max_attempts, retry_count)
+                _attach_runtime_to_run(run, wall_start, cpu_start, attempt_count, retry_max_attempts, retry_count, decode_cache_run)
                 check_cancel()
                 save_run(r, run_id, run)
                 check_cancel()
@@ -1518,7 +1871,9 @@ def execute_run(run_id: str) -> Dict[str, Any]:
             params["real_algo"] = pick_impl_name()
             params["input_dir"] = input_dirname
             run["params"] = params
-            run["samples"] = [_filter_sample_metrics(sample, selected_metrics)]
+            save_run_samples(r, run_id, [_filter_sample_metrics(sample, selected_metrics)])
+            run["samples"] = []
+            run["sample_count"] = 1
             record = run.get("record") if isinstance(run.get("record"), dict) else {}
             record["data_mode"] = "synthetic_no_dataset"
             record["pair_used"] = 0
@@ -1537,12 +1892,12 @@ def execute_run(run_id: str) -> Dict[str, Any]:
             }
             if user_runtime_details:
                 record["algorithm_runtime"] = {
-                    "mode": "subprocess",
+                    "mode": user_algorithm_runner.mode if user_algorithm_runner is not None else "subprocess",
                     "sample_count": len(user_runtime_details),
                     "last": user_runtime_details[-1],
                 }
             run["record"] = record
-            _attach_runtime_to_run(run, wall_start, cpu_start, attempt_count, retry_max_attempts, retry_count)
+            _attach_runtime_to_run(run, wall_start, cpu_start, attempt_count, retry_max_attempts, retry_count, decode_cache_run)
             check_cancel()
             save_run(r, run_id, run)
             check_cancel()
@@ -1562,7 +1917,7 @@ def execute_run(run_id: str) -> Dict[str, Any]:
         run["error"] = None
         run["error_code"] = None
         run["error_detail"] = None
-        _attach_runtime_to_run(run, wall_start, cpu_start, attempt_count, retry_max_attempts, retry_count)
+        _attach_runtime_to_run(run, wall_start, cpu_start, attempt_count, retry_max_attempts, retry_count, decode_cache_run)
         check_cancel()
         save_run(r, run_id, run)
         check_cancel()
@@ -1577,7 +1932,7 @@ def execute_run(run_id: str) -> Dict[str, Any]:
         run["error"] = "任务已取消"
         run["error_code"] = err.E_CANCELED
         run["error_detail"] = None
-        _attach_runtime_to_run(run, wall_start, cpu_start, attempt_count, retry_max_attempts, retry_count)
+        _attach_runtime_to_run(run, wall_start, cpu_start, attempt_count, retry_max_attempts, retry_count, decode_cache_run)
         save_run(r, run_id, run)
         r.delete(cancel_key)
         return {"ok": False, "run_id": run_id, "error": run["error"]}
@@ -1611,7 +1966,7 @@ def execute_run(run_id: str) -> Dict[str, Any]:
         )
         record["retry"] = retry_info
         run["record"] = record
-        _attach_runtime_to_run(run, wall_start, cpu_start, attempt_count, retry_max_attempts, retry_count)
+        _attach_runtime_to_run(run, wall_start, cpu_start, attempt_count, retry_max_attempts, retry_count, decode_cache_run)
         save_run(r, run_id, run)
         r.delete(cancel_key)
         return {"ok": False, "run_id": run_id, "error": run["error"], "error_code": run["error_code"]}
@@ -1645,7 +2000,7 @@ def execute_run(run_id: str) -> Dict[str, Any]:
             run["error"] = None
             run["error_code"] = None
             run["error_detail"] = None
-            _attach_runtime_to_run(run, wall_start, cpu_start, attempt_count, retry_max_attempts, retry_count)
+            _attach_runtime_to_run(run, wall_start, cpu_start, attempt_count, retry_max_attempts, retry_count, decode_cache_run)
             save_run(r, run_id, run)
             execute_run.apply_async((run_id,), countdown=float(backoff_s))
             return {"ok": False, "run_id": run_id, "retrying": True, "next_attempt": attempt_count + 1}
@@ -1677,7 +2032,7 @@ def execute_run(run_id: str) -> Dict[str, Any]:
         )
         record["retry"] = retry_info
         run["record"] = record
-        _attach_runtime_to_run(run, wall_start, cpu_start, attempt_count, retry_max_attempts, retry_count)
+        _attach_runtime_to_run(run, wall_start, cpu_start, attempt_count, retry_max_attempts, retry_count, decode_cache_run)
         save_run(r, run_id, run)
         r.delete(cancel_key)
         return {"ok": False, "run_id": run_id, "error": run["error"]}
@@ -13,6 +13,7 @@ from .dataset_io import (
     find_paired_images as _find_paired_images,
     find_paired_videos as _find_paired_videos,
 )
+from .pair_manifest import PairManifest, get_pair_manifest, manifest_root_for
 
 
 def resolve_dataset_dir(data_root: Path, owner_id: str, dataset_id: str, storage_path: str | None = None) -> Path:
@@ -28,6 +29,33 @@ def resolve_dataset_dir(data_root: Path, owner_id: str, dataset_id: str, storage
     return ds_dir
 
 
+def _pair_manifest(
+    data_root: Path,
+    owner_id: str,
+    dataset_id: str,
+    input_dirname: str,
+    kind: str,
+    gt_dirname: str,
+    storage_path: str | None,
+) -> PairManifest | None:
+    """能走配对清单时返回清单（目录解析与 dataset_io 一致），否则返回 None 由调用方直接扫描。"""
+    if gt_dirname != "gt":
+        return None
+    if str(storage_path or "").strip():
+        ds_dir = resolve_dataset_dir(data_root, owner_id, dataset_id, storage_path)
+    else:
+        ds_dir = data_root / owner_id / dataset_id
+        if not ds_dir.exists():
+            ds_dir = data_root / dataset_id
+    try:
+        manifest = get_pair_manifest(ds_dir, manifest_root=manifest_root_for(data_root))
+    except OSError:
+        return None
+    if manifest is None or not manifest.has_group(input_dirname, kind):
+        return None
+    return manifest
+
+
 def find_paired_images(
     data_root: Path,
     owner_id: str,
@@ -37,6 +65,9 @@ def find_paired_images(
     limit: int | None = 5,
     storage_path: str | None = None,
 ) -> list[PairedImage]:
+    manifest = _pair_manifest(data_root, owner_id, dataset_id, input_dirname, "image", gt_dirname, storage_path)
+    if manifest is not None:
+        return manifest.pairs(input_dirname, "image", limit)
     if not str(storage_path or "").strip():
         return _find_paired_images(
             data_root=data_root,
@@ -65,6 +96,9 @@ def count_paired_images(
     gt_dirname: str = "gt",
     storage_path: str | None = None,
 ) -> int:
+    manifest = _pair_manifest(data_root, owner_id, dataset_id, input_dirname, "image", gt_dirname, storage_path)
+    if manifest is not None:
+        return manifest.count(input_dirname, "image")
     if not str(storage_path or "").strip():
         return _count_paired_images(
             data_root=data_root,
@@ -92,6 +126,9 @@ def find_paired_videos(
     limit: int | None = 5,
     storage_path: str | None = None,
 ) -> list[PairedVideo]:
+    manifest = _pair_manifest(data_root, owner_id, dataset_id, input_dirname, "video", gt_dirname, storage_path)
+    if manifest is not None:
+        return manifest.pairs(input_dirname, "video", limit)
     if not str(storage_path or "").strip():
         return _find_paired_videos(
             data_root=data_root,
@@ -120,6 +157,9 @@ def count_paired_videos(
     gt_dirname: str = "gt",
     storage_path: str | None = None,
 ) -> int:
+    manifest = _pair_manifest(data_root, owner_id, dataset_id, input_dirname, "video", gt_dirname, storage_path)
+    if manifest is not None:
+        return manifest.count(input_dirname, "video")
     if not str(storage_path or "").strip():
         return _count_paired_videos(
             data_root=data_root,
@@ -3,9 +3,11 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import Iterable, List
 import re
 
+import numpy as np
+
 
 IMG_EXTS = {".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp"}
 VIDEO_EXTS = {".mp4", ".avi", ".mov", ".mkv", ".webm"}
@@ -127,47 +129,175 @@ def _fuzzy_match_score(a: str, b: str) -> int:
     return score
 
 
+_FUZZY_MIN_SCORE = 7000
+
+
+def _min_lcs_for(longest: int) -> int:
+    """得分 lcs * 10000 // longest 达到模糊匹配阈值所需的最小 LCS 长度。"""
+    return -(-_FUZZY_MIN_SCORE * longest // 10000)
+
+
+def _bigram_counts(token: str) -> dict[str, int]:
+    out: dict[str, int] = {}
+    for i in range(len(token) - 1):
+        gram = token[i : i + 2]
+        out[gram] = out.get(gram, 0) + 1
+    return out
+
+
+def _lcs_masks(token: str) -> dict[str, int]:
+    masks: dict[str, int] = {}
+    for i, ch in enumerate(token):
+        masks[ch] = masks.get(ch, 0) | (1 << i)
+    return masks
+
+
+def _lcs_len_bits(masks: dict[str, int], m: int, other: str) -> int:
+    """位并行 LCS（Hyyrö）：每个字符一次整数运算，结果与 _fuzzy_match_score 中的动态规划相同。"""
+    full = (1 << m) - 1
+    v = full
+    for ch in other:
+        u = v & masks.get(ch, 0)
+        v = ((v + u) | (v - u)) & full
+    return m - bin(v).count("1")
+
+
+class _GtTokenIndex:
+    """
+    单次扫描内构建的 GT 标记索引：精确标记、唯一数字标记，以及按长度分桶的二元组倒排表。
+    模糊匹配只对可能达到阈值的候选计算 LCS：公共子序列长度为 L 时，两串至少共享 3L - m - n - 1 个二元组，
+    据此既能剔除不可能达到 7000 分的候选，也能给出得分上界，按上界从高到低计算并提前结束；
+    结果（含同分时取先出现者）与逐个比较全部 GT 标记完全一致。
+    """
+
+    def __init__(self, gt_tokens: set[str]):
+        self.tokens = gt_tokens
+        # 与逐个遍历 set 的顺序一致：得分相同时取先出现者
+        self._order = list(gt_tokens)
+        self._lens = np.fromiter((len(t) for t in self._order), dtype=np.int64, count=len(self._order))
+        by_number: dict[str, list[str]] = {}
+        for token in self._order:
+            m = re.search(r"\d+", token)
+            if not m:
+                continue
+            by_number.setdefault(m.group(0), []).append(token)
+        self.by_number_unique = {k: v[0] for k, v in by_number.items() if len(v) == 1}
+        # (二元组, 第 k 次出现) -> 标记下标；查询串中出现 c 次的二元组累加 k=1..c 的倒排，即得 min(c, g)
+        grams: dict[tuple[str, int], list[int]] = {}
+        for idx, token in enumerate(self._order):
+            for gram, cnt in _bigram_counts(token).items():
+                for k in range(1, cnt + 1):
+                    grams.setdefault((gram, k), []).append(idx)
+        self._grams = {key: np.asarray(v, dtype=np.int64) for key, v in grams.items()}
+        self._fuzzy_memo: dict[str, str | None] = {}
+
+    def _candidates(self, token: str) -> list[tuple[int, int]]:
+        """返回按 (得分上界降序, 下标升序) 排列的 (上界, 下标)。"""
+        m = len(token)
+        lengths = np.arange(int(self._lens.max()) + 1, dtype=np.int64)
+        longest = np.maximum(lengths, m)
+        need_lcs = -(-_FUZZY_MIN_SCORE * longest // 10000)
+        need = 3 * need_lcs - m - lengths - 1
+        # 长度差过大时即使较短串整体是子序列也达不到阈值
+        need[need_lcs > np.minimum(lengths, m)] = np.iinfo(np.int64).max
+
+        parts = [
+            self._grams[(gram, k)]
+            for gram, cnt in _bigram_counts(token).items()
+            for k in range(1, cnt + 1)
+            if (gram, k) in self._grams
+        ]
+        if parts:
+            shared = np.bincount(np.concatenate(parts), minlength=len(self._order))
+        else:
+            shared = np.zeros(len(self._order), dtype=np.int64)
+        idxs = np.flatnonzero(shared >= need[self._lens])
+        if idxs.size == 0:
+            return []
+        n = self._lens[idxs]
+        upper_lcs = np.minimum(np.minimum(n, m), (shared[idxs] + m + n + 1) // 3)
+        upper = upper_lcs * 10000 // np.maximum(n, m)
+        order = np.lexsort((idxs, -upper))
+        return list(zip(upper[order].tolist(), idxs[order].tolist()))
+
+    def best_fuzzy(self, token: str) -> str | None:
+        if not token or not self._order:
+            return None
+        # 1. 精确匹配优先
+        if token in self.tokens:
+            return token
+        if token in self._fuzzy_memo:
+            return self._fuzzy_memo[token]
+        # 2. 模糊匹配：仅对候选计算 LCS，上界低于当前最佳时结束
+        m = len(token)
+        masks = _lcs_masks(token)
+        best_idx = -1
+        best_score = 0
+        for upper, idx in self._candidates(token):
+            # 同一上界内按下标升序：上界只与当前最佳持平且下标更大时，后面的候选都不可能胜出
+            if upper < best_score or (upper == best_score and idx > best_idx):
+                break
+            other = self._order[idx]
+            score = (_lcs_len_bits(masks, m, other) * 10000) // max(m, len(other))
+            if score > best_score or (score == best_score and idx < best_idx):
+                best_score = score
+                best_idx = idx
+        # 保持较高阈值，避免不同样本被错误配对导致指标失真
+        result = self._order[best_idx] if best_score >= _FUZZY_MIN_SCORE else None
+        self._fuzzy_memo[token] = result
+        return result
+
+
 def _best_fuzzy_match(input_name: str, gt_candidates: set[str]) -> str | None:
-    input_token = _pair_token_full(input_name)
-    if not input_token or not gt_candidates:
-        return None
-    
-    # 1. 精确匹配优先 (快)
-    if input_token in gt_candidates:
-        return input_token
-    
-    # 2. 模糊匹配 (慢)
-    best_name = None
-    best_score = 0
-    for g in gt_candidates:
-        score = _fuzzy_match_score(input_token, g)
-        if score > best_score:
-            best_score = score
-            best_name = g
-            
-    # 保持较高阈值，避免不同样本被错误配对导致指标失真
-    if best_score < 7000:
-        return None
-        
-    return best_name
+    return _GtTokenIndex(gt_candidates).best_fuzzy(_pair_token_full(input_name))
 
 
 def _pick_gt_token(
     input_name: str,
-    gt_tokens: set[str],
-    gt_by_number_unique: dict[str, str],
+    index: _GtTokenIndex,
     *,
     allow_fuzzy: bool,
 ) -> str | None:
     full = _pair_token_full(input_name)
-    if full and full in gt_tokens:
+    if full and full in index.tokens:
         return full
     number = _pair_number_token(input_name)
-    if number and number in gt_by_number_unique:
-        return gt_by_number_unique[number]
+    if number and number in index.by_number_unique:
+        return index.by_number_unique[number]
     if not allow_fuzzy:
         return None
-    return _best_fuzzy_match(input_name, gt_tokens)
+    return index.best_fuzzy(full)
+
+
+def _gt_files_by_token(gt_files: Iterable[Path]) -> dict[str, Path]:
+    """同一标记只保留首次出现的 GT 文件（按遍历顺序）。"""
+    gt_by_token: dict[str, Path] = {}
+    for gp in gt_files:
+        k = _pair_token_full(gp.name)
+        if not k or k in gt_by_token:
+            continue
+        gt_by_token[k] = gp
+    return gt_by_token
+
+
+def match_pair_files(input_files: Iterable[Path], gt_files: Iterable[Path]) -> list[tuple[Path, Path | None, bool]]:
+    """
+    对已列出的输入 / GT 文件做完整配对，口径与 find_paired_* / count_paired_* 一致：
+    返回按输入路径排序的 (输入, GT 或 None, 是否无需模糊匹配)，count_paired_* 只统计第三项为 True 的样本。
+    """
+    inputs = sorted(input_files)
+    gt_by_token = _gt_files_by_token(gt_files)
+    if not gt_by_token:
+        return [(ip, None, False) for ip in inputs]
+    gt_index = _GtTokenIndex(set(gt_by_token.keys()))
+    out: list[tuple[Path, Path | None, bool]] = []
+    for ip in inputs:
+        k = _pick_gt_token(ip.name, gt_index, allow_fuzzy=False)
+        strict = bool(k)
+        if not k:
+            k = gt_index.best_fuzzy(_pair_token_full(ip.name))
+        out.append((ip, gt_by_token.get(k) if k else None, strict))
+    return out
 
 
 def find_paired_images(
@@ -203,29 +333,15 @@ def find_paired_images(
     if not input_files:
         return []
 
-    gt_by_token = {}
-    for gp in gt_dir.rglob("*"):
-        if not _is_img(gp):
-            continue
-        k = _pair_token_full(gp.name)
-        if not k or k in gt_by_token:
-            continue
-        gt_by_token[k] = gp
+    gt_by_token = _gt_files_by_token(gp for gp in gt_dir.rglob("*") if _is_img(gp))
     if not gt_by_token:
         return []
-    gt_tokens = set(gt_by_token.keys())
-    gt_by_number: dict[str, list[str]] = {}
-    for token in gt_tokens:
-        m = re.search(r"\d+", token)
-        if not m:
-            continue
-        gt_by_number.setdefault(m.group(0), []).append(token)
-    gt_by_number_unique = {k: v[0] for k, v in gt_by_number.items() if len(v) == 1}
+    gt_index = _GtTokenIndex(set(gt_by_token.keys()))
 
     pairs: List[PairedImage] = []
     scan_cap = max(int(limit) * 5, 50) if limit is not None else len(input_files)
     for ip in sorted(input_files)[:scan_cap]:
-        k = _pick_gt_token(ip.name, gt_tokens, gt_by_number_unique, allow_fuzzy=True)
+        k = _pick_gt_token(ip.name, gt_index, allow_fuzzy=True)
         gp = gt_by_token.get(k) if k else None
         if gp is not None and gp.exists() and _is_img(gp):
             pairs.append(PairedImage(input_path=ip, gt_path=gp, name=ip.name))
@@ -266,20 +382,14 @@ def count_paired_images(
     gt_keys.discard("")
     if not gt_keys:
         return 0
-    gt_by_number: dict[str, list[str]] = {}
-    for token in gt_keys:
-        m = re.search(r"\d+", token)
-        if not m:
-            continue
-        gt_by_number.setdefault(m.group(0), []).append(token)
-    gt_by_number_unique = {k: v[0] for k, v in gt_by_number.items() if len(v) == 1}
+    gt_index = _GtTokenIndex(gt_keys)
 
     n = 0
     for ip in input_dir.rglob("*"):
         if not _is_img(ip):
             continue
         # 计数阶段默认禁用模糊匹配，避免预览模式因全量模糊扫描导致耗时过长
-        k = _pick_gt_token(ip.name, gt_keys, gt_by_number_unique, allow_fuzzy=False)
+        k = _pick_gt_token(ip.name, gt_index, allow_fuzzy=False)
         if k:
             n += 1
     return n
@@ -313,29 +423,15 @@ def find_paired_videos(
     if not input_files:
         return []
 
-    gt_by_token = {}
-    for gp in gt_dir.rglob("*"):
-        if not _is_video(gp):
-            continue
-        k = _pair_token_full(gp.name)
-        if not k or k in gt_by_token:
-            continue
-        gt_by_token[k] = gp
+    gt_by_token = _gt_files_by_token(gp for gp in gt_dir.rglob("*") if _is_video(gp))
     if not gt_by_token:
         return []
-    gt_tokens = set(gt_by_token.keys())
-    gt_by_number: dict[str, list[str]] = {}
-    for token in gt_tokens:
-        m = re.search(r"\d+", token)
-        if not m:
-            continue
-        gt_by_number.setdefault(m.group(0), []).append(token)
-    gt_by_number_unique = {k: v[0] for k, v in gt_by_number.items() if len(v) == 1}
+    gt_index = _GtTokenIndex(set(gt_by_token.keys()))
 
     pairs: List[PairedVideo] = []
     scan_cap = max(int(limit) * 5, 50) if limit is not None else len(input_files)
     for ip in sorted(input_files)[:scan_cap]:
-        k = _pick_gt_token(ip.name, gt_tokens, gt_by_number_unique, allow_fuzzy=True)
+        k = _pick_gt_token(ip.name, gt_index, allow_fuzzy=True)
         gp = gt_by_token.get(k) if k else None
         if gp is not None and gp.exists() and _is_video(gp):
             pairs.append(PairedVideo(input_path=ip, gt_path=gp, name=ip.name))
@@ -371,19 +467,13 @@ def count_paired_videos(
     gt_keys.discard("")
     if not gt_keys:
         return 0
-    gt_by_number: dict[str, list[str]] = {}
-    for token in gt_keys:
-        m = re.search(r"\d+", token)
-        if not m:
-            continue
-        gt_by_number.setdefault(m.group(0), []).append(token)
-    gt_by_number_unique = {k: v[0] for k, v in gt_by_number.items() if len(v) == 1}
+    gt_index = _GtTokenIndex(gt_keys)
 
     n = 0
     for ip in input_dir.rglob("*"):
         if not _is_video(ip):
             continue
-        k = _pick_gt_token(ip.name, gt_keys, gt_by_number_unique, allow_fuzzy=False)
+        k = _pick_gt_token(ip.name, gt_index, allow_fuzzy=False)
         if k:
             n += 1
     return n
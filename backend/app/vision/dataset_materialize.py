@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+数据集物化：把某个任务的全部图像配对一次性解码为 uint8 原始张量，顺序写入单个 frames-<token>.u8 文件，
+并用 index.json 记录每个样本输入 / GT 的偏移与形状（每个数组按 64 字节对齐、行主序连续存放）。
+评测时通过 np.memmap 直接取零拷贝的只读视图，不再读取和解码 PNG/JPG。
+
+物化目录位于 data/_materialized/<owner>/<dataset_id>/<input_dir>/，与 _algorithm_submissions 等并列，
+不放进数据集目录本身，避免影响数据集扫描、文件指纹与导出。
+索引记录源文件的 mtime / size，源文件变化的样本自动退回解码路径。
+
+物化在 Celery worker 中执行（tasks.materialize_dataset_job），写入总量受 ABP_MATERIALIZE_MAX_MB 限制，
+超出时放弃本次物化、保留旧索引。
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+import numpy as np
+
+from .dataset_io import find_paired_images
+from .image_cache import read_image_bgr
+
+MATERIALIZE_FORMAT_VERSION = 1
+MATERIALIZED_DIRNAME = "_materialized"
+INDEX_FILENAME = "index.json"
+FRAMES_PREFIX = "frames-"
+_ALIGN = 64
+MATERIALIZE_MAX_MB_ENV = "ABP_MATERIALIZE_MAX_MB"
+DEFAULT_MATERIALIZE_MAX_MB = 8192
+
+# 与 execute_run 中图像任务的输入目录约定一致（视频任务不物化）
+IMAGE_TASK_INPUT_DIRS = {
+    "dehaze": "hazy",
+    "denoise": "noisy",
+    "deblur": "blur",
+    "sr": "lr",
+    "lowlight": "dark",
+}
+
+
+class MaterializeTooLarge(ValueError):
+    def __init__(self, max_bytes: int):
+        super().__init__("materialize_too_large")
+        self.max_bytes = int(max_bytes)
+
+
+def materialize_max_bytes() -> int:
+    """单次物化（一个数据集的全部任务）允许写入的字节数，<=0 表示不限。"""
+    try:
+        mb = float(os.getenv(MATERIALIZE_MAX_MB_ENV, "") or DEFAULT_MATERIALIZE_MAX_MB)
+    except ValueError:
+        mb = DEFAULT_MATERIALIZE_MAX_MB
+    return int(mb * 1024 * 1024)
+
+
+def materialized_dir(data_root: Path, owner_id: str, dataset_id: str, input_dirname: str) -> Path:
+    return Path(data_root) / MATERIALIZED_DIRNAME / str(owner_id or "system") / str(dataset_id) / str(input_dirname)
+
+
+def _src_stamp(path: Path) -> dict[str, Any]:
+    st = os.stat(path)
+    return {"path": str(Path(path).resolve()), "mtime_ns": int(st.st_mtime_ns), "size": int(st.st_size)}
+
+
+def materialize_pairs(
+    pairs: Iterable[Any],
+    out_dir: Path,
+    *,
+    decode: Callable[[Any], np.ndarray | None] = read_image_bgr,
+    check_cancel: Callable[[], None] | None = None,
+    max_bytes: int = 0,
+) -> dict[str, Any]:
+    """
+    把 pairs 解码写入 out_dir。数据文件名带进程号与时间戳后缀，索引最后原子替换并指向新文件，
+    正在评测的 Run 继续使用旧映射，不会读到半成品或错位的偏移。
+    解码失败的样本不写入索引，评测时仍按原逻辑读取并计入 read_fail。
+    max_bytes > 0 时写入量超限即抛 MaterializeTooLarge，临时文件删除，旧索引不变。
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    frames_name = f"{FRAMES_PREFIX}{os.getpid()}-{int(time.time() * 1000)}.u8"
+    tmp_frames = out_dir / f".{frames_name}.tmp"
+    tmp_index = out_dir / f".{INDEX_FILENAME}.{os.getpid()}.tmp"
+    entries: list[dict[str, Any]] = []
+    skipped: list[str] = []
+    offset = 0
+    t0 = time.time()
+
+    def _write(fh, img: np.ndarray) -> dict[str, Any]:
+        nonlocal offset
+        pad = (-offset) % _ALIGN
+        if pad:
+            fh.write(b"\0" * pad)
+            offset += pad
+        arr = np.ascontiguousarray(img, dtype=np.uint8)
+        if max_bytes > 0 and offset + arr.nbytes > max_bytes:
+            raise MaterializeTooLarge(max_bytes)
+        fh.write(memoryview(arr).cast("B"))
+        item = {"offset": offset, "shape": list(arr.shape)}
+        offset += arr.nbytes
+        return item
+
+    try:
+        with open(tmp_frames, "wb") as fh:
+            for pair in pairs:
+                if check_cancel is not None:
+                    check_cancel()
+                name = str(getattr(pair, "name", "") or "")
+                inp = decode(pair.input_path)
+                gt = decode(pair.gt_path)
+                if inp is None or gt is None:
+                    skipped.append(name)
+                    continue
+                entries.append(
+                    {
+                        "name": name,
+                        "input_src": _src_stamp(Path(pair.input_path)),
+                        "gt_src": _src_stamp(Path(pair.gt_path)),
+                        "input": _write(fh, inp),
+                        "gt": _write(fh, gt),
+                    }
+                )
+        index = {
+            "format_version": MATERIALIZE_FORMAT_VERSION,
+            "frames_file": frames_name,
+            "created_at": time.time(),
+            "total_bytes": offset,
+            "entries": entries,
+            "skipped": skipped,
+        }
+        tmp_index.write_text(json.dumps(index, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_frames, out_dir / frames_name)
+        os.replace(tmp_index, out_dir / INDEX_FILENAME)
+        for old in out_dir.glob(f"{FRAMES_PREFIX}*.u8"):
+            if old.name != frames_name:
+                try:
+                    old.unlink()
+                except OSError:
+                    # Windows 下仍被映射的旧文件删不掉，留待下次物化清理
+                    pass
+    finally:
+        for tmp in (tmp_frames, tmp_index):
+            try:
+                tmp.unlink()
+            except FileNotFoundError:
+                pass
+    return {
+        "path": str(out_dir),
+        "entries": len(entries),
+        "skipped": len(skipped),
+        "total_bytes": offset,
+        "total_mb": round(offset / 1024.0 / 1024.0, 3),
+        "elapsed_s": round(time.time() - t0, 6),
+    }
+
+
+def materialize_dataset(
+    data_root: Path,
+    ds_dir: Path,
+    owner_id: str,
+    dataset_id: str,
+    task_types: Iterable[str] | None = None,
+    *,
+    max_bytes: int | None = None,
+    check_cancel: Callable[[], None] | None = None,
+) -> dict[str, Any]:
+    """
+    按任务类型物化数据集目录 ds_dir；同一输入目录只写一次，没有配对样本的任务跳过。
+    max_bytes 为全部任务合计的写入上限（缺省取 ABP_MATERIALIZE_MAX_MB），超出时抛 MaterializeTooLarge。
+    """
+    budget = materialize_max_bytes() if max_bytes is None else int(max_bytes)
+    used = 0
+    wanted = [str(t or "").strip().lower() for t in (task_types or IMAGE_TASK_INPUT_DIRS.keys())]
+    out: dict[str, Any] = {}
+    done: dict[str, dict[str, Any]] = {}
+    for task_type in wanted:
+        input_dirname = IMAGE_TASK_INPUT_DIRS.get(task_type)
+        if not input_dirname:
+            out[task_type] = {"skipped": "unsupported_task_type"}
+            continue
+        if input_dirname in done:
+            out[task_type] = done[input_dirname]
+            continue
+        pairs = find_paired_images(
+            data_root=Path(ds_dir).parent,
+            owner_id="",
+            dataset_id=Path(ds_dir).name,
+            input_dirname=input_dirname,
+            gt_dirname="gt",
+            limit=None,
+        )
+        if not pairs:
+            out[task_type] = {"skipped": "no_pairs"}
+            continue
+        remaining = max(1, budget - used) if budget > 0 else 0
+        summary = materialize_pairs(
+            pairs,
+            materialized_dir(data_root, owner_id, dataset_id, input_dirname),
+            check_cancel=check_cancel,
+            max_bytes=remaining,
+        )
+        used += int(summary["total_bytes"])
+        done[input_dirname] = summary
+        out[task_type] = summary
+    return out
+
+
+def remove_materialized(data_root: Path, owner_id: str, dataset_id: str) -> bool:
+    target = Path(data_root) / MATERIALIZED_DIRNAME / str(owner_id or "system") / str(dataset_id)
+    if not target.exists():
+        return False
+    shutil.rmtree(target, ignore_errors=True)
+    return True
+
+
+class MaterializedPairs:
+    """已物化数据的只读访问器；memmap 按需打开，pickle 时不携带映射，便于传给进程池。"""
+
+    def __init__(self, root: Path, index: dict[str, Any]):
+        self.root = Path(root)
+        self.frames_path = self.root / str(index.get("frames_file") or "")
+        self.created_at = float(index.get("created_at") or 0.0)
+        self._entries: dict[str, dict[str, Any]] = {}
+        for entry in index.get("entries") or []:
+            src = entry.get("input_src") or {}
+            if src.get("path"):
+                self._entries[str(src["path"])] = entry
+        self._frames: np.memmap | None = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = dict(self.__dict__)
+        state["_frames"] = None
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _mapped(self) -> np.memmap:
+        with self._lock:
+            if self._frames is None:
+                self._frames = np.memmap(self.frames_path, dtype=np.uint8, mode="r")
+            return self._frames
+
+    def _view(self, item: dict[str, Any]) -> np.ndarray:
+        shape = tuple(int(x) for x in item["shape"])
+        size = int(np.prod(shape))
+        start = int(item["offset"])
+        return self._mapped()[start : start + size].reshape(shape)
+
+    @staticmethod
+    def _fresh(stamp: dict[str, Any], path: Any) -> bool:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        return int(stamp.get("mtime_ns", -1)) == int(st.st_mtime_ns) and int(stamp.get("size", -1)) == int(st.st_size)
+
+    def lookup(self, pair: Any) -> tuple[np.ndarray, np.ndarray] | None:
+        """返回 (输入, GT) 的零拷贝只读视图；样本未物化或源文件已变化时返回 None。"""
+        entry = self._entries.get(str(Path(pair.input_path).resolve()))
+        if entry is None:
+            return None
+        if not self._fresh(entry["input_src"], pair.input_path) or not self._fresh(entry["gt_src"], pair.gt_path):
+            return None
+        if str(Path(pair.gt_path).resolve()) != str(entry["gt_src"].get("path")):
+            return None
+        try:
+            return self._view(entry["input"]), self._view(entry["gt"])
+        except (OSError, ValueError):
+            # 打开索引后数据文件被重新物化替换掉：本次退回解码
+            return None
+
+    def describe(self) -> dict[str, Any]:
+        return {"path": str(self.root), "entries": len(self._entries), "created_at": self.created_at}
+
+
+def open_materialized(data_root: Path, owner_id: str, dataset_id: str, input_dirname: str) -> MaterializedPairs | None:
+    root = materialized_dir(data_root, owner_id, dataset_id, input_dirname)
+    index_path = root / INDEX_FILENAME
+    if not index_path.is_file():
+        return None
+    try:
+        index = json.loads(index_path.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    if int(index.get("format_version") or 0) != MATERIALIZE_FORMAT_VERSION:
+        return None
+    store = MaterializedPairs(root, index)
+    if not len(store) or not store.frames_path.is_file():
+        return None
+    return store
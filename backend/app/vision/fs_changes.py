@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+数据集目录增量变更检测：按目录记录 mtime、文件数与文件摘要（文件名 + mtime），
+再次检测时只 stat 已知目录，mtime 变化的目录才重新列举并 stat 其中文件。
+文件增删 / 改名都会改变所在目录的 mtime；同名文件被原地覆盖不改变目录 mtime，需要 full=True 全量复核。
+快照存放在数据集存储根目录下的 _fs_state/<数据集路径摘要>.json，不写入数据集目录本身。
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+FS_STATE_VERSION = 1
+FS_STATE_DIRNAME = "_fs_state"
+_LOADED_CACHE_SIZE = 64
+
+_loaded: "OrderedDict[str, tuple[int, dict[str, Any]]]" = OrderedDict()
+_loaded_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class FsChange:
+    fs_hash: str
+    changed: bool
+    total_dirs: int
+    rescanned_dirs: int
+    file_count: int
+
+
+def state_root_for(data_root: Path) -> Path:
+    return Path(data_root) / FS_STATE_DIRNAME
+
+
+def default_state_root() -> Path:
+    return state_root_for(Path(__file__).resolve().parents[2] / "data")
+
+
+def state_path(ds_dir: Path, state_root: Path | None = None) -> Path:
+    digest = hashlib.sha1(str(Path(ds_dir).resolve()).encode("utf-8")).hexdigest()[:24]
+    return Path(state_root or default_state_root()) / f"{digest}.json"
+
+
+def _scan_dir(path: Path, mtime_ns: int) -> dict[str, Any]:
+    files: list[str] = []
+    subdirs: list[str] = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                    continue
+                files.append(f"{entry.name}:{entry.stat().st_mtime_ns}")
+            except OSError:
+                # 失效的符号链接等与 os.walk + getmtime 一样跳过
+                continue
+    files.sort()
+    hasher = hashlib.md5()
+    for line in files:
+        hasher.update(line.encode("utf-8", "surrogateescape"))
+        hasher.update(b"\n")
+    return {"mtime_ns": mtime_ns, "files": len(files), "digest": hasher.hexdigest(), "subdirs": sorted(subdirs)}
+
+
+def _load_state(path: Path) -> dict[str, Any]:
+    try:
+        file_mtime = int(os.stat(path).st_mtime_ns)
+    except OSError:
+        return {}
+    key = str(path)
+    with _loaded_lock:
+        hit = _loaded.get(key)
+        if hit is not None and hit[0] == file_mtime:
+            _loaded.move_to_end(key)
+            return hit[1]
+    try:
+        state = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(state, dict) or int(state.get("format_version") or 0) != FS_STATE_VERSION:
+        return {}
+    _remember(key, file_mtime, state)
+    return state
+
+
+def _remember(key: str, file_mtime: int, state: dict[str, Any]) -> None:
+    with _loaded_lock:
+        _loaded[key] = (file_mtime, state)
+        _loaded.move_to_end(key)
+        while len(_loaded) > _LOADED_CACHE_SIZE:
+            _loaded.popitem(last=False)
+
+
+def _save_state(path: Path, state: dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+        _remember(str(path), int(os.stat(path).st_mtime_ns), state)
+    finally:
+        try:
+            tmp.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def detect_dataset_changes(ds_dir: Path, *, full: bool = False, state_root: Path | None = None) -> FsChange:
+    """
+    返回数据集目录当前的 fs hash（目录结构 + 各目录文件摘要的 md5）。
+    未变化时只做与目录数相同次数的 stat；full=True 时忽略快照，重新 stat 全部文件。
+    """
+    ds_dir = Path(ds_dir)
+    path = state_path(ds_dir, state_root)
+    prev = {} if full else _load_state(path)
+    prev_dirs: dict[str, Any] = prev.get("dirs") or {}
+    dirs: dict[str, dict[str, Any]] = {}
+    rescanned = 0
+    stack = [""]
+    while stack:
+        rel = stack.pop()
+        cur = ds_dir / rel if rel else ds_dir
+        try:
+            # 先取 mtime 再列举：列举期间的增删会让下次检测看到 mtime 变化
+            mtime_ns = int(os.stat(cur).st_mtime_ns)
+        except OSError:
+            continue
+        entry = prev_dirs.get(rel)
+        if entry is None or int(entry.get("mtime_ns", -1)) != mtime_ns:
+            try:
+                entry = _scan_dir(cur, mtime_ns)
+            except OSError:
+                continue
+            rescanned += 1
+        dirs[rel] = entry
+        stack.extend(f"{rel}/{name}" if rel else name for name in entry["subdirs"])
+
+    hasher = hashlib.md5()
+    for rel in sorted(dirs):
+        entry = dirs[rel]
+        hasher.update(f"{rel}:{entry['files']}:{entry['digest']}\n".encode("utf-8", "surrogateescape"))
+    fs_hash = hasher.hexdigest()
+    changed = fs_hash != prev.get("fs_hash")
+    if dirs and (changed or rescanned):
+        try:
+            _save_state(path, {"format_version": FS_STATE_VERSION, "ds_dir": str(ds_dir.resolve()), "fs_hash": fs_hash, "dirs": dirs})
+        except OSError:
+            pass
+    return FsChange(
+        fs_hash=fs_hash,
+        changed=changed,
+        total_dirs=len(dirs),
+        rescanned_dirs=rescanned,
+        file_count=sum(int(e["files"]) for e in dirs.values()),
+    )
+
+
+def remove_fs_state(ds_dir: Path, state_root: Path | None = None) -> bool:
+    path = state_path(ds_dir, state_root)
+    with _loaded_lock:
+        _loaded.pop(str(path), None)
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        return False
+    return True
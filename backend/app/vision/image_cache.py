@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+进程内已解码图像缓存：Celery worker 进程常驻，批量对比时多个算法依次评测同一数据集，
+GT / 输入图只需解码一次。键为 (绝对路径, mtime_ns, size)，文件被替换后自然失效；
+按字节预算做 LRU 淘汰。缓存中的数组是只读的，防止某次评测原地修改后污染后续 Run；
+用户自定义指标拿到的是副本（见 metric_runtime）。
+
+同一 worker 进程内可能并发执行多个 Run，进程级计数会混在一起；
+每个 Run 持有自己的 DecodeCacheUsage，在 get_or_decode 时一并计数。
+"""
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+import cv2
+import numpy as np
+
+DECODE_CACHE_MB_ENV = "ABP_DECODE_CACHE_MB"
+DEFAULT_DECODE_CACHE_MB = 256
+
+
+def read_image_bgr(path: Any) -> np.ndarray | None:
+    """按字节读取再解码，兼容 Windows 中文路径；失败时退回 cv2.imread，仍失败返回 None。"""
+    try:
+        data = np.fromfile(str(path), dtype=np.uint8)
+    except Exception:
+        data = np.array([], dtype=np.uint8)
+    if data.size > 0:
+        img = cv2.imdecode(data, cv2.IMREAD_COLOR)
+        if img is not None and img.size > 0:
+            return img
+    return cv2.imread(str(path), cv2.IMREAD_COLOR)
+
+
+def _budget_from_env() -> int:
+    try:
+        mb = float(os.getenv(DECODE_CACHE_MB_ENV, "") or DEFAULT_DECODE_CACHE_MB)
+    except ValueError:
+        mb = DEFAULT_DECODE_CACHE_MB
+    return max(0, int(mb * 1024 * 1024))
+
+
+class DecodeCacheUsage:
+    """单个 Run 的缓存命中 / 未命中 / 因本 Run 写入而发生的淘汰计数。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def add(self, *, hits: int = 0, misses: int = 0, evictions: int = 0) -> None:
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.evictions += evictions
+
+
+class DecodedImageCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max(0, int(max_bytes))
+        self._items: "OrderedDict[tuple[str, int, int], np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(path: Any) -> tuple[str, int, int] | None:
+        full = os.path.abspath(str(path))
+        try:
+            st = os.stat(full)
+        except OSError:
+            return None
+        return full, int(st.st_mtime_ns), int(st.st_size)
+
+    def get_or_decode(
+        self,
+        path: Any,
+        decode: Callable[[Any], np.ndarray | None],
+        usage: DecodeCacheUsage | None = None,
+    ) -> np.ndarray | None:
+        key = self._key(path) if self.max_bytes > 0 else None
+        if key is None:
+            return decode(path)
+        with self._lock:
+            hit = self._items.get(key)
+            if hit is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if usage is not None:
+            usage.add(hits=int(hit is not None), misses=int(hit is None))
+        if hit is not None:
+            return hit
+        img = decode(path)
+        if img is None or img.nbytes > self.max_bytes:
+            return img
+        img.setflags(write=False)
+        evicted = 0
+        with self._lock:
+            if key not in self._items:
+                self._items[key] = img
+                self._bytes += img.nbytes
+            while self._bytes > self.max_bytes and self._items:
+                _, old = self._items.popitem(last=False)
+                self._bytes -= old.nbytes
+                evicted += 1
+            self.evictions += evicted
+        if usage is not None and evicted:
+            usage.add(evictions=evicted)
+        return img
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_CACHE: DecodedImageCache | None = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_decoded_image_cache() -> DecodedImageCache:
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = DecodedImageCache(_budget_from_env())
+        return _CACHE
+
+
+def decode_cache_usage(usage: DecodeCacheUsage | None) -> dict[str, Any]:
+    """本次 Run 的命中 / 未命中 / 淘汰数（只含本 Run 的访问），以及缓存当前的整体占用。"""
+    now = get_decoded_image_cache().stats()
+    hits = usage.hits if usage is not None else 0
+    misses = usage.misses if usage is not None else 0
+    return {
+        "hits": hits,
+        "misses": misses,
+        "evictions": usage.evictions if usage is not None else 0,
+        "hit_ratio": round(hits / (hits + misses), 6) if hits + misses else 0.0,
+        "entries": now["entries"],
+        "mb": round(now["bytes"] / 1024.0 / 1024.0, 3),
+        "budget_mb": round(now["max_bytes"] / 1024.0 / 1024.0, 3),
+    }
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+数据集配对清单：一次遍历数据集目录，按 (输入目录, 图像/视频) 记录全部样本的配对结果，
+由扫描写入，创建 Run、执行 Run 等处直接读取，不再各自 rglob 并重复配对。
+
+清单存放在 <data_root>/_pair_manifests/<数据集路径摘要>.json（与数据集同一存储根），不放进数据集目录本身（否则会改变 fs hash、
+触发版本号自增）。有效性由目录 mtime 戳判断：文件增删 / 改名都会改变所在目录的 mtime，
+读取时只需 stat 记录过的目录；配对只依赖文件名，图像内容被原地覆盖不影响清单。
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from .dataset_io import IMG_EXTS, VIDEO_EXTS, PairedImage, PairedVideo, match_pair_files, resolve_gt_dir_under
+
+PAIR_MANIFEST_VERSION = 1
+PAIR_MANIFEST_DIRNAME = "_pair_manifests"
+_LOADED_CACHE_SIZE = 32
+
+TASK_INPUT_DIRS = {
+    "dehaze": "hazy",
+    "denoise": "noisy",
+    "deblur": "blur",
+    "sr": "lr",
+    "lowlight": "dark",
+    "video_denoise": "noisy",
+    "video_sr": "lr",
+}
+
+_loaded: "OrderedDict[str, tuple[int, PairManifest]]" = OrderedDict()
+_loaded_lock = threading.Lock()
+
+
+def manifest_root_for(data_root: Path) -> Path:
+    return Path(data_root) / PAIR_MANIFEST_DIRNAME
+
+
+def default_manifest_root() -> Path:
+    return manifest_root_for(Path(__file__).resolve().parents[2] / "data")
+
+
+def task_group(task_type: str) -> tuple[str, str] | None:
+    """任务类型 -> (输入目录, image|video)。"""
+    input_dirname = TASK_INPUT_DIRS.get(str(task_type or "").strip().lower())
+    if not input_dirname:
+        return None
+    return input_dirname, ("video" if task_type.startswith("video_") else "image")
+
+
+def _group_key(input_dirname: str, kind: str) -> str:
+    return f"{kind}:{input_dirname}"
+
+
+def manifest_path(ds_dir: Path, manifest_root: Path | None = None) -> Path:
+    digest = hashlib.sha1(str(Path(ds_dir).resolve()).encode("utf-8")).hexdigest()[:24]
+    return Path(manifest_root or default_manifest_root()) / f"{digest}.json"
+
+
+def _dir_stamps(ds_dir: Path) -> dict[str, int]:
+    stamps: dict[str, int] = {}
+    for root, _dirs, _files in os.walk(ds_dir):
+        try:
+            rel = Path(root).relative_to(ds_dir).as_posix()
+            stamps["" if rel == "." else rel] = int(os.stat(root).st_mtime_ns)
+        except (OSError, ValueError):
+            continue
+    return stamps
+
+
+def _list_media(dir_path: Path | None) -> tuple[list[Path], list[Path]]:
+    if dir_path is None or not dir_path.exists():
+        return [], []
+    images: list[Path] = []
+    videos: list[Path] = []
+    for p in dir_path.rglob("*"):
+        suf = p.suffix.lower()
+        if suf not in IMG_EXTS and suf not in VIDEO_EXTS:
+            continue
+        if not p.is_file():
+            continue
+        (images if suf in IMG_EXTS else videos).append(p)
+    return images, videos
+
+
+def _rel(path: Path, ds_dir: Path) -> str:
+    return path.relative_to(ds_dir).as_posix()
+
+
+class PairManifest:
+    def __init__(self, ds_dir: Path, data: dict[str, Any]):
+        self.ds_dir = Path(ds_dir)
+        self.data = data
+
+    @property
+    def fs_hash(self) -> str | None:
+        return self.data.get("fs_hash")
+
+    def is_fresh(self) -> bool:
+        stamps = self.data.get("dir_stamps") or {}
+        if not stamps:
+            return False
+        for rel, mtime_ns in stamps.items():
+            try:
+                if int(os.stat(self.ds_dir / rel).st_mtime_ns) != int(mtime_ns):
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def has_group(self, input_dirname: str, kind: str) -> bool:
+        return _group_key(input_dirname, kind) in (self.data.get("groups") or {})
+
+    def _entries(self, input_dirname: str, kind: str) -> list[list[Any]]:
+        return (self.data.get("groups") or {}).get(_group_key(input_dirname, kind)) or []
+
+    def count(self, input_dirname: str, kind: str = "image") -> int:
+        """
+        与 count_paired_* 一致：只统计精确匹配（条目第三项 exact 为 True）的样本。
+        pairs() 为与 find_paired_* 一致会包含模糊匹配的配对，计数不能用 len(pairs())。
+        """
+        return sum(1 for _inp, gt, exact in self._entries(input_dirname, kind) if gt and exact)
+
+    def pairs(self, input_dirname: str, kind: str = "image", limit: int | None = 5) -> list[PairedImage] | list[PairedVideo]:
+        """与 find_paired_* 一致：有 limit 时只在排序后的前 max(limit*5, 50) 个输入中取样。"""
+        entries = self._entries(input_dirname, kind)
+        if limit is not None:
+            entries = entries[: max(int(limit) * 5, 50)]
+        cls = PairedVideo if kind == "video" else PairedImage
+        out = []
+        for inp, gt, _exact in entries:
+            if not gt:
+                continue
+            ip = self.ds_dir / inp
+            out.append(cls(input_path=ip, gt_path=self.ds_dir / gt, name=ip.name))
+            if limit is not None and len(out) >= limit:
+                break
+        return out
+
+    def dir_count(self, dirname: str, kind: str | None = None) -> int:
+        counts = (self.data.get("dir_counts") or {}).get(dirname) or {}
+        if kind is not None:
+            return int(counts.get(kind, 0))
+        return int(counts.get("image", 0)) + int(counts.get("video", 0))
+
+
+def build_pair_manifest(ds_dir: Path, *, fs_hash: str | None = None) -> PairManifest:
+    ds_dir = Path(ds_dir)
+    # 先记录目录戳再列文件：列举期间发生的增删会使戳失配，下次读取时重建
+    stamps = _dir_stamps(ds_dir)
+    gt_dir = resolve_gt_dir_under(ds_dir, "gt")
+    gt_images, gt_videos = _list_media(gt_dir)
+    dir_counts: dict[str, dict[str, int]] = {"gt": {"image": len(gt_images), "video": len(gt_videos)}}
+    groups: dict[str, list[list[Any]]] = {}
+    listed: dict[str, tuple[list[Path], list[Path]]] = {}
+    for task_type in TASK_INPUT_DIRS:
+        input_dirname, kind = task_group(task_type) or ("", "image")
+        if input_dirname not in listed:
+            listed[input_dirname] = _list_media(ds_dir / input_dirname)
+            images, videos = listed[input_dirname]
+            dir_counts[input_dirname] = {"image": len(images), "video": len(videos)}
+        if gt_dir is None:
+            groups[_group_key(input_dirname, kind)] = []
+            continue
+        inputs = listed[input_dirname][1 if kind == "video" else 0]
+        gts = gt_videos if kind == "video" else gt_images
+        groups[_group_key(input_dirname, kind)] = [
+            [_rel(ip, ds_dir), _rel(gp, ds_dir) if gp is not None else None, exact]
+            for ip, gp, exact in match_pair_files(inputs, gts)
+        ]
+    data = {
+        "format_version": PAIR_MANIFEST_VERSION,
+        "ds_dir": str(ds_dir.resolve()),
+        "fs_hash": fs_hash,
+        "created_at": time.time(),
+        "gt_dir": _rel(gt_dir, ds_dir) if gt_dir is not None else None,
+        "dir_stamps": stamps,
+        "dir_counts": dir_counts,
+        "groups": groups,
+    }
+    return PairManifest(ds_dir, data)
+
+
+def save_pair_manifest(manifest: PairManifest, manifest_root: Path | None = None) -> Path:
+    path = manifest_path(manifest.ds_dir, manifest_root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp.write_text(json.dumps(manifest.data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+    finally:
+        try:
+            tmp.unlink()
+        except FileNotFoundError:
+            pass
+    return path
+
+
+def load_pair_manifest(ds_dir: Path, manifest_root: Path | None = None) -> PairManifest | None:
+    """读取清单；格式版本不符或目录已变化时返回 None。同一进程内按清单文件 mtime 复用解析结果。"""
+    path = manifest_path(ds_dir, manifest_root)
+    try:
+        file_mtime = int(os.stat(path).st_mtime_ns)
+    except OSError:
+        return None
+    key = str(path)
+    with _loaded_lock:
+        hit = _loaded.get(key)
+        if hit is not None and hit[0] == file_mtime:
+            _loaded.move_to_end(key)
+            manifest = hit[1]
+        else:
+            manifest = None
+    if manifest is None:
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or int(data.get("format_version") or 0) != PAIR_MANIFEST_VERSION:
+            return None
+        manifest = PairManifest(Path(ds_dir), data)
+        with _loaded_lock:
+            _loaded[key] = (file_mtime, manifest)
+            while len(_loaded) > _LOADED_CACHE_SIZE:
+                _loaded.popitem(last=False)
+    if manifest.ds_dir != Path(ds_dir):
+        manifest = PairManifest(Path(ds_dir), manifest.data)
+    return manifest if manifest.is_fresh() else None
+
+
+def get_pair_manifest(
+    ds_dir: Path,
+    *,
+    fs_hash: str | None = None,
+    rebuild: bool = False,
+    manifest_root: Path | None = None,
+) -> PairManifest | None:
+    """读取有效清单，缺失 / 过期 / 指定 rebuild 时重新构建并写回；数据集目录不存在返回 None。"""
+    ds_dir = Path(ds_dir)
+    if not ds_dir.is_dir():
+        return None
+    if not rebuild:
+        manifest = load_pair_manifest(ds_dir, manifest_root)
+        if manifest is not None and (fs_hash is None or manifest.fs_hash in (None, fs_hash)):
+            return manifest
+    manifest = build_pair_manifest(ds_dir, fs_hash=fs_hash)
+    try:
+        save_pair_manifest(manifest, manifest_root)
+    except OSError:
+        # 清单只是加速手段，写不进去时本次仍使用内存中的结果
+        pass
+    return manifest
+
+
+def remove_pair_manifest(ds_dir: Path, manifest_root: Path | None = None) -> bool:
+    try:
+        manifest_path(ds_dir, manifest_root).unlink()
+    except FileNotFoundError:
+        return False
+    return True
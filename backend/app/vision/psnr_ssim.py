@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+PSNR / SSIM 融合内核：直接在 uint8 BGR 上计算，不做颜色转换，也不先整体转成 [0,1] 浮点。
+口径与 skimage 默认参数保持一致（data_range=1、7×7 均值窗口、样本协方差、K1=0.01、K2=0.03、
+按 3 像素裁边后逐通道求均值），仅在 0~255 量纲上计算；通道均值与通道顺序无关，BGR/RGB 结果相同。
+"""
+from __future__ import annotations
+
+import math
+import threading
+
+import cv2
+import numpy as np
+
+SSIM_WIN_SIZE = 7
+SSIM_K1 = 0.01
+SSIM_K2 = 0.03
+_DATA_RANGE = 255.0
+
+# 每个工作缓冲的元素上限：超过的尺寸（如 4K 帧 / 大帧批次）用完即释放，不常驻线程缓存。
+# 8 个缓冲 × 2M 元素 × 4 字节，每个线程最多常驻约 64 MB。
+WORKSPACE_CACHE_MAX_ELEMENTS = 1 << 21
+
+_workspaces = threading.local()
+
+
+def _check_pair(gt_u8: np.ndarray, pred_u8: np.ndarray) -> None:
+    if gt_u8.shape != pred_u8.shape:
+        raise ValueError("Input images must have the same dimensions.")
+    if gt_u8.dtype != np.uint8 or pred_u8.dtype != np.uint8:
+        raise ValueError("psnr_ssim kernel expects uint8 images")
+
+
+def psnr_u8(gt_u8: np.ndarray, pred_u8: np.ndarray) -> float:
+    _check_pair(gt_u8, pred_u8)
+    sse = float(cv2.norm(gt_u8, pred_u8, cv2.NORM_L2SQR))
+    if sse == 0.0:
+        return float("inf")
+    mse = sse / float(gt_u8.size)
+    return 10.0 * math.log10((_DATA_RANGE * _DATA_RANGE) / mse)
+
+
+def _workspace(shape: tuple[int, ...]) -> list[np.ndarray]:
+    """按线程缓存 float32 工作区，相同尺寸的连续样本 / 帧批次不再重复分配；超过上限的尺寸不缓存。"""
+    cached = getattr(_workspaces, "buffers", None)
+    if cached is not None and cached[0].shape == shape:
+        return cached
+    buffers = [np.empty(shape, dtype=np.float32) for _ in range(8)]
+    if math.prod(shape) <= WORKSPACE_CACHE_MAX_ELEMENTS:
+        _workspaces.buffers = buffers
+    return buffers
+
+
+def _psnr_ssim_stack(gt_stack: np.ndarray, pred_stack: np.ndarray, *, with_psnr: bool) -> tuple[np.ndarray | None, np.ndarray]:
+    """
+    对 N×H×W(×C) 帧栈一次性计算逐帧 SSIM（及可选 PSNR）。
+    帧在高度方向首尾相接成 (N·H)×W 的大图做盒式滤波：跨帧边界只影响每帧上下 3 行，而这些行本就被裁掉，
+    因此结果与逐帧计算完全一致。
+    """
+    n, h, w = gt_stack.shape[:3]
+    if min(h, w) < SSIM_WIN_SIZE:
+        raise ValueError("win_size exceeds image extent")
+    tall = (n * h, w) + tuple(gt_stack.shape[3:])
+    x, y, ux, uy, uxx, uyy, uxy, tmp = _workspace(tall)
+    np.copyto(x, gt_stack.reshape(tall), casting="unsafe")
+    np.copyto(y, pred_stack.reshape(tall), casting="unsafe")
+
+    psnr = None
+    if with_psnr:
+        # uint8 差值的平方在 float32 中精确，按帧求和用 float64
+        np.subtract(x, y, out=tmp)
+        tmp *= tmp
+        sse = tmp.reshape(n, -1).sum(axis=1, dtype=np.float64)
+        with np.errstate(divide="ignore"):
+            psnr = 10.0 * np.log10((_DATA_RANGE * _DATA_RANGE) * (gt_stack[0].size / sse))
+
+    ksize = (SSIM_WIN_SIZE, SSIM_WIN_SIZE)
+    border = cv2.BORDER_REFLECT
+    cv2.boxFilter(x, -1, ksize, dst=ux, normalize=True, borderType=border)
+    cv2.boxFilter(y, -1, ksize, dst=uy, normalize=True, borderType=border)
+    np.multiply(x, x, out=tmp)
+    cv2.boxFilter(tmp, -1, ksize, dst=uxx, normalize=True, borderType=border)
+    np.multiply(y, y, out=tmp)
+    cv2.boxFilter(tmp, -1, ksize, dst=uyy, normalize=True, borderType=border)
+    np.multiply(x, y, out=tmp)
+    cv2.boxFilter(tmp, -1, ksize, dst=uxy, normalize=True, borderType=border)
+
+    # 只有每帧裁边后的区域参与均值；x / y / tmp 已用完，裁剪视图直接复用为中间结果
+    pad = (SSIM_WIN_SIZE - 1) // 2
+    framed = (n, h, w) + tuple(gt_stack.shape[3:])
+    crop = (slice(None), slice(pad, h - pad), slice(pad, w - pad))
+    ux, uy, uxx, uyy, uxy, b1, t2, a1 = (buf.reshape(framed)[crop] for buf in (ux, uy, uxx, uyy, uxy, x, y, tmp))
+
+    m = SSIM_WIN_SIZE * SSIM_WIN_SIZE
+    cov_norm = m / (m - 1.0)
+    c1 = (SSIM_K1 * _DATA_RANGE) ** 2
+    c2 = (SSIM_K2 * _DATA_RANGE) ** 2
+
+    np.multiply(ux, ux, out=b1)
+    np.multiply(uy, uy, out=t2)
+    np.multiply(ux, uy, out=a1)
+    uxx -= b1  # 方差 / 协方差（未乘 cov_norm）
+    uyy -= t2
+    uxy -= a1
+    b1 += t2
+    b1 += c1  # B1 = ux^2 + uy^2 + C1
+    a1 *= 2.0
+    a1 += c1  # A1 = 2 ux uy + C1
+    uxy *= 2.0 * cov_norm
+    uxy += c2  # A2 = 2 vxy + C2
+    uxx += uyy
+    uxx *= cov_norm
+    uxx += c2  # B2 = vx + vy + C2
+    a1 *= uxy
+    b1 *= uxx
+    a1 /= b1
+    ssim = a1.reshape(n, -1).mean(axis=1, dtype=np.float64)
+    return psnr, ssim
+
+
+def ssim_u8(gt_u8: np.ndarray, pred_u8: np.ndarray) -> float:
+    _check_pair(gt_u8, pred_u8)
+    _, ssim = _psnr_ssim_stack(gt_u8[None], pred_u8[None], with_psnr=False)
+    return float(ssim[0])
+
+
+def psnr_ssim_u8(gt_u8: np.ndarray, pred_u8: np.ndarray) -> tuple[float, float]:
+    return psnr_u8(gt_u8, pred_u8), ssim_u8(gt_u8, pred_u8)
+
+
+def psnr_ssim_batch_u8(gt_stack: np.ndarray, pred_stack: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """批量版本：输入 N×H×W×C 的 uint8 帧栈，返回逐帧 PSNR / SSIM（float64 数组，长度 N）。"""
+    _check_pair(gt_stack, pred_stack)
+    if gt_stack.ndim < 3 or gt_stack.shape[0] == 0:
+        raise ValueError("psnr_ssim batch expects a non-empty N×H×W(×C) stack")
+    psnr, ssim = _psnr_ssim_stack(gt_stack, pred_stack, with_psnr=True)
+    return psnr, ssim
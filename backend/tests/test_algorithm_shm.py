@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""常驻 worker 共享内存传输：超分输出放不下时本样本退回管道并扩容，共享内存不可用时整体退回管道。"""
+from __future__ import annotations
+
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from app.algorithm_runtime import UserAlgorithmImageRunner, _SharedFrameBuffers
+
+SR_SCRIPT = """
+import numpy as np
+
+def process(image):
+    return np.repeat(np.repeat(image, 2, axis=0), 2, axis=1)
+"""
+
+
+def _image(seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 256, size=(6, 8, 3), dtype=np.uint8)
+
+
+def _upscaled(image: np.ndarray) -> np.ndarray:
+    return np.repeat(np.repeat(image, 2, axis=0), 2, axis=1)
+
+
+class TestAlgorithmShm(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.script = Path(self.tmp.name) / "infer.py"
+        self.script.write_text(textwrap.dedent(SR_SCRIPT), encoding="utf-8")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def _run_all(self, runner: UserAlgorithmImageRunner, count: int) -> list[str]:
+        transports = []
+        with runner:
+            for i in range(count):
+                result = runner.run(_image(i))
+                self.assertTrue(np.array_equal(result.image_bgr_u8, _upscaled(_image(i))))
+                transports.append(result.detail["transport"])
+        return transports
+
+    def test_sr_output_grows_from_pipe_to_shm(self) -> None:
+        runner = UserAlgorithmImageRunner({"archive_path": str(self.script)}, mode="worker", transport="shm")
+        # 首个样本输出是输入的 4 倍，输出段放不下走管道；之后按实际输出扩容改走共享内存
+        self.assertEqual(self._run_all(runner, 3), ["pipe", "shm", "shm"])
+
+    def test_pipe_fallback(self) -> None:
+        runner = UserAlgorithmImageRunner({"archive_path": str(self.script)}, mode="worker", transport="pipe")
+        self.assertEqual(self._run_all(runner, 2), ["pipe", "pipe"])
+
+        runner = UserAlgorithmImageRunner({"archive_path": str(self.script)}, mode="worker", transport="shm")
+        with mock.patch.object(_SharedFrameBuffers, "ensure", side_effect=OSError("no /dev/shm")):
+            self.assertEqual(self._run_all(runner, 2), ["pipe", "pipe"])
+
+
+if __name__ == "__main__":
+    unittest.main()
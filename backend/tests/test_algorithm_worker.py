@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""常驻算法 worker：就绪握手、正常处理、脚本异常、超时后杀掉重启、无 process() 时退回子进程。"""
+from __future__ import annotations
+
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from app.algorithm_runtime import AlgorithmRuntimeError, UserAlgorithmImageRunner
+
+WARM_SCRIPT = """
+import time
+
+def process(image):
+    marker = int(image[0, 0, 0])
+    if marker == 7:
+        raise ValueError("bad pixel")
+    if marker == 9:
+        time.sleep(30)
+    print("noise on stdout must not break the protocol")
+    return 255 - image
+"""
+
+LEGACY_SCRIPT = """
+import argparse
+import cv2
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--input")
+parser.add_argument("--output")
+args = parser.parse_args()
+cv2.imwrite(args.output, 255 - cv2.imread(args.input))
+"""
+
+
+def _image(marker: int) -> np.ndarray:
+    image = np.full((6, 8, 3), 40, dtype=np.uint8)
+    image[0, 0, 0] = marker
+    return image
+
+
+class TestAlgorithmWorker(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def _runner(self, source: str, **kwargs) -> UserAlgorithmImageRunner:
+        path = Path(self.tmp.name) / "infer.py"
+        path.write_text(textwrap.dedent(source), encoding="utf-8")
+        runner = UserAlgorithmImageRunner({"archive_path": str(path)}, mode="worker", transport="pipe", **kwargs)
+        self.addCleanup(runner.close)
+        return runner
+
+    def test_ready_process_and_script_error(self) -> None:
+        runner = self._runner(WARM_SCRIPT)
+        result = runner.run(_image(1), sample_name="a.png")
+        self.assertTrue(np.array_equal(result.image_bgr_u8, 255 - _image(1)))
+        detail = result.detail
+        self.assertEqual((detail["mode"], detail["worker_entry"]), ("worker", "process"))
+        self.assertEqual(detail["worker_pid"], runner._worker.proc.pid)
+        self.assertGreater(detail["worker_startup_s"], 0)
+
+        with self.assertRaises(AlgorithmRuntimeError) as ctx:
+            runner.run(_image(7), sample_name="b.png")
+        self.assertEqual(ctx.exception.message, "algorithm_script_failed")
+        self.assertIn("ValueError: bad pixel", ctx.exception.detail["message"])
+        self.assertEqual(ctx.exception.detail["sample_name"], "b.png")
+
+        # 脚本异常不影响常驻进程，后续样本继续复用
+        again = runner.run(_image(2))
+        self.assertEqual(again.detail["worker_pid"], detail["worker_pid"])
+
+    def test_timeout_kills_and_respawns(self) -> None:
+        runner = self._runner(WARM_SCRIPT, timeout_s=1.0)
+        first_pid = runner.run(_image(1)).detail["worker_pid"]
+        stuck = runner._worker.proc
+        with self.assertRaises(AlgorithmRuntimeError) as ctx:
+            runner.run(_image(9))
+        self.assertEqual(ctx.exception.message, "algorithm_script_timeout")
+        self.assertIsNotNone(stuck.poll())
+        self.assertIsNone(runner._worker)
+
+        result = runner.run(_image(3))
+        self.assertNotEqual(result.detail["worker_pid"], first_pid)
+        self.assertTrue(np.array_equal(result.image_bgr_u8, 255 - _image(3)))
+
+    def test_script_without_process_falls_back(self) -> None:
+        runner = self._runner(LEGACY_SCRIPT)
+        self.assertEqual((runner.mode, runner.mode_fallback), ("subprocess", "worker_entry_missing"))
+        result = runner.run(_image(5))
+        self.assertEqual(result.detail["mode_fallback"], "worker_entry_missing")
+        self.assertTrue(np.array_equal(result.image_bgr_u8, 255 - _image(5)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""取消检查：按间隔只查取消键，完整 Run 记录只做低频兜底；命中后不再访问 Redis。"""
+from __future__ import annotations
+
+import unittest
+from unittest import mock
+
+from app import tasks
+
+
+class _Redis:
+    def __init__(self) -> None:
+        self.keys: set[str] = set()
+        self.exists_calls = 0
+
+    def exists(self, key: str) -> int:
+        self.exists_calls += 1
+        return int(key in self.keys)
+
+
+class TestCancelSignal(unittest.TestCase):
+    def test_polls_key_at_interval_and_latches(self) -> None:
+        r = _Redis()
+        clock = mock.Mock(return_value=100.0)
+        with mock.patch.object(tasks.time, "monotonic", clock), mock.patch.object(tasks, "load_run") as load_run:
+            check = tasks._CancelSignal(r, "run1", "run_cancel:run1", poll_interval_s=0.2, full_check_interval_s=5.0)
+            for t in (100.0, 100.05, 100.1, 100.19):
+                clock.return_value = t
+                check()
+            self.assertEqual(r.exists_calls, 1)
+            load_run.assert_not_called()
+
+            r.keys.add("run_cancel:run1")
+            clock.return_value = 100.25
+            with self.assertRaises(tasks.RunCanceled):
+                check()
+            calls = r.exists_calls
+            with self.assertRaises(tasks.RunCanceled):
+                check()
+            self.assertEqual(r.exists_calls, calls)
+
+    def test_record_fallback(self) -> None:
+        r = _Redis()
+        clock = mock.Mock(return_value=0.0)
+        with mock.patch.object(tasks.time, "monotonic", clock), mock.patch.object(
+            tasks, "load_run", return_value={"status": "canceling"}
+        ) as load_run:
+            check = tasks._CancelSignal(r, "run1", "run_cancel:run1", poll_interval_s=0.2, full_check_interval_s=5.0)
+            clock.return_value = 4.9
+            check()
+            load_run.assert_not_called()
+            clock.return_value = 5.2
+            with self.assertRaises(tasks.RunCanceled):
+                check()
+            self.assertEqual(load_run.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""分块上传：乱序 / 重传写入、缺块时拒绝 complete、整体 sha256 校验。"""
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from fastapi import HTTPException
+
+from app.chunked_upload import (
+    MIN_UPLOAD_CHUNK_BYTES,
+    PURPOSE_DATASET_ZIP,
+    complete_upload,
+    completed_upload_path,
+    init_upload,
+    load_upload,
+    upload_status,
+    write_chunk,
+)
+
+
+class TestChunkedUpload(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.size = MIN_UPLOAD_CHUNK_BYTES
+        self.payload = os.urandom(self.size * 3 + 123)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def _init(self, sha256: str) -> dict:
+        st = init_upload(
+            self.root,
+            owner_id="alice",
+            purpose=PURPOSE_DATASET_ZIP,
+            filename="../ds.zip",
+            total_size=len(self.payload),
+            sha256=sha256,
+            chunk_size=self.size,
+        )
+        return load_upload(self.root, st["upload_id"], owner_id="alice")
+
+    def _chunk(self, i: int) -> bytes:
+        return self.payload[i * self.size : (i + 1) * self.size]
+
+    def test_out_of_order_resume_and_complete(self) -> None:
+        meta = self._init(hashlib.sha256(self.payload).hexdigest())
+        self.assertEqual(meta["filename"], "ds.zip")
+        for i in (3, 1, 1):
+            write_chunk(self.root, meta, i, io.BytesIO(self._chunk(i)))
+        with self.assertRaises(HTTPException) as ctx:
+            complete_upload(self.root, meta)
+        self.assertEqual(ctx.exception.status_code, 409)
+        self.assertEqual(upload_status(self.root, meta)["missing"], [0, 2])
+
+        with self.assertRaises(HTTPException):
+            write_chunk(self.root, meta, 0, io.BytesIO(self._chunk(0)[:-1]))
+        with self.assertRaises(HTTPException):
+            write_chunk(self.root, meta, 2, io.BytesIO(self._chunk(2)), sha256="0" * 64)
+        self.assertEqual(upload_status(self.root, meta)["missing"], [0, 2])
+
+        for i in (0, 2):
+            write_chunk(self.root, meta, i, io.BytesIO(self._chunk(i)), sha256=hashlib.sha256(self._chunk(i)).hexdigest())
+        self.assertTrue(complete_upload(self.root, meta)["completed"])
+        self.assertEqual(completed_upload_path(self.root, meta, PURPOSE_DATASET_ZIP).read_bytes(), self.payload)
+
+        with self.assertRaises(HTTPException) as ctx:
+            load_upload(self.root, meta["upload_id"], owner_id="bob")
+        self.assertEqual(ctx.exception.status_code, 404)
+
+    def test_hash_mismatch_resets_chunks(self) -> None:
+        meta = self._init("f" * 64)
+        for i in range(4):
+            write_chunk(self.root, meta, i, io.BytesIO(self._chunk(i)))
+        with self.assertRaises(HTTPException) as ctx:
+            complete_upload(self.root, meta)
+        self.assertEqual(ctx.exception.status_code, 400)
+        self.assertEqual(upload_status(self.root, meta)["missing"], [0, 1, 2, 3])
+        with self.assertRaises(HTTPException):
+            completed_upload_path(self.root, meta, PURPOSE_DATASET_ZIP)
+
+    def test_sha256_required(self) -> None:
+        with self.assertRaises(HTTPException) as ctx:
+            self._init("")
+        self.assertEqual(ctx.exception.detail["error_message"], "upload_sha256_required")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""内容寻址存储：下载副本与源共享 inode、重复下载不再计算哈希、全部删除后 blob 才被回收。"""
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from app import dataset_cas
+from app.dataset_cas import blob_path, dedup_copy_tree, gc_blobs, release_tree, rename_tree
+
+
+class TestDatasetCas(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        base = Path(self.tmp.name)
+        self.cas = base / "_cas"
+        self.src = base / "alice" / "ds"
+        (self.src / "gt").mkdir(parents=True)
+        (self.src / "hazy").mkdir()
+        for i in range(5):
+            (self.src / "gt" / f"{i}.png").write_bytes(os.urandom(1000))
+            (self.src / "hazy" / f"{i}.png").write_bytes(b"same")
+        self.copies = [base / user / "ds" for user in ("bob", "carol")]
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def _blobs(self) -> list[Path]:
+        return [p for p in (self.cas / "blobs").rglob("*") if p.is_file()]
+
+    def test_copies_share_inodes_and_are_released(self) -> None:
+        summary = dedup_copy_tree(self.src, self.copies[0], cas_root=self.cas)
+        self.assertEqual(summary, {"files": 10, "linked": 10, "copied": 0})
+        with mock.patch.object(dataset_cas, "_sha256_file", side_effect=AssertionError("rehashed")):
+            dedup_copy_tree(self.src, self.copies[1], cas_root=self.cas)
+
+        src_file = self.src / "gt" / "0.png"
+        for copy in self.copies:
+            self.assertEqual((copy / "gt" / "0.png").read_bytes(), src_file.read_bytes())
+            self.assertEqual((copy / "gt" / "0.png").stat().st_ino, src_file.stat().st_ino)
+        # 5 个不同的 gt + 1 个内容相同的 hazy
+        self.assertEqual(len(self._blobs()), 6)
+
+        for tree in (self.src, self.copies[0]):
+            shutil.rmtree(tree)
+            self.assertEqual(release_tree(tree, cas_root=self.cas), 0)
+        self.assertEqual(len(self._blobs()), 6)
+        self.assertEqual((self.copies[1] / "hazy" / "4.png").read_bytes(), b"same")
+
+        shutil.rmtree(self.copies[1])
+        self.assertEqual(release_tree(self.copies[1], cas_root=self.cas), 6)
+        self.assertEqual(self._blobs(), [])
+
+    def test_collected_blob_is_reingested(self) -> None:
+        dedup_copy_tree(self.src, self.copies[0], cas_root=self.cas)
+        sha = dataset_cas._load_manifest(self.src, self.cas)["hazy/0.png"][3]
+        blob_path(self.cas, sha).unlink()
+        dedup_copy_tree(self.src, self.copies[1], cas_root=self.cas)
+        self.assertEqual((self.copies[1] / "hazy" / "0.png").read_bytes(), b"same")
+        self.assertTrue(blob_path(self.cas, sha).exists())
+
+    def test_renamed_copy_keeps_manifest(self) -> None:
+        dedup_copy_tree(self.src, self.copies[0], cas_root=self.cas)
+        renamed = self.copies[0].with_name("ds2")
+        shutil.move(str(self.copies[0]), str(renamed))
+        self.assertEqual(rename_tree(self.copies[0], renamed, cas_root=self.cas), 0)
+
+        shutil.rmtree(self.src)
+        release_tree(self.src, cas_root=self.cas)
+        shutil.rmtree(renamed)
+        self.assertEqual(release_tree(renamed, cas_root=self.cas), 6)
+        self.assertEqual(self._blobs(), [])
+
+    def test_gc_sweeps_orphan_blobs(self) -> None:
+        dedup_copy_tree(self.src, self.copies[0], cas_root=self.cas)
+        # 清单丢失后直接删目录，只有全量扫描能发现
+        for tree in (self.src, self.copies[0]):
+            shutil.rmtree(tree)
+            dataset_cas.manifest_path(tree, self.cas).unlink()
+        self.assertEqual(len(self._blobs()), 6)
+        self.assertEqual(gc_blobs(cas_root=self.cas), 6)
+        self.assertEqual(self._blobs(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""数据集 zip 导出：媒体 STORED / 其余 deflate、并行与单线程输出一致、按布局索引取 Range 与完整输出逐字节相同。"""
+from __future__ import annotations
+
+import io
+import os
+import random
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+from app.dataset_export import (
+    ensure_export_layout,
+    export_etag,
+    list_export_entries,
+    load_export_layout,
+    parse_range,
+    stream_zip_directory,
+    stream_zip_entries,
+)
+
+
+class TestDatasetExport(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = Path(self.tmp.name) / "ds"
+        self.index_root = Path(self.tmp.name) / "idx"
+        (self.src / "gt").mkdir(parents=True)
+        (self.src / "hazy").mkdir()
+        for i in range(12):
+            (self.src / "gt" / f"{i}.png").write_bytes(os.urandom(3000 + i))
+            (self.src / "hazy" / f"{i}.bmp").write_bytes(bytes(range(256)) * (20 + i))
+        (self.src / "说明.txt").write_text("数据集" * 100, encoding="utf-8")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_valid_zip_with_store_and_deflate(self) -> None:
+        entries = list_export_entries(self.src)
+        etag = export_etag(entries)
+        data = b"".join(stream_zip_directory(self.src, entries, etag, workers=3, index_root=self.index_root))
+        self.assertEqual(data, b"".join(stream_zip_entries(entries, workers=1)))
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(zf.getinfo("gt/0.png").compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(zf.getinfo("hazy/0.bmp").compress_type, zipfile.ZIP_DEFLATED)
+            for e in entries:
+                self.assertEqual(zf.read(e.arcname), e.path.read_bytes())
+
+        layout = load_export_layout(self.src, entries, etag, self.index_root)
+        self.assertIsNotNone(layout)
+        self.assertEqual(layout.total_size, len(data))
+        rng = random.Random(0)
+        for _ in range(50):
+            a = rng.randrange(len(data))
+            b = rng.randrange(a, len(data))
+            self.assertEqual(b"".join(layout.iter_range(a, b)), data[a : b + 1])
+
+    def test_layout_built_on_demand_and_invalidated_by_changes(self) -> None:
+        entries = list_export_entries(self.src)
+        etag = export_etag(entries)
+        layout = ensure_export_layout(self.src, entries, etag, index_root=self.index_root)
+        full = b"".join(stream_zip_entries(entries))
+        self.assertEqual(layout.total_size, len(full))
+        (self.src / "gt" / "new.png").write_bytes(b"x")
+        changed = list_export_entries(self.src)
+        self.assertNotEqual(export_etag(changed), etag)
+        self.assertIsNone(load_export_layout(self.src, changed, export_etag(changed), self.index_root))
+
+    def test_parse_range(self) -> None:
+        self.assertEqual(parse_range("bytes=10-", 100), (10, 99))
+        self.assertEqual(parse_range("bytes=-5", 100), (95, 99))
+        self.assertEqual(parse_range("bytes=0-500", 100), (0, 99))
+        self.assertIs(parse_range("bytes=100-", 100), False)
+        self.assertIsNone(parse_range("bytes=0-1,5-6", 100))
+        self.assertIsNone(parse_range(None, 100))
+
+
+if __name__ == "__main__":
+    unittest.main()
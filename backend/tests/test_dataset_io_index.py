@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""配对索引：模糊匹配结果与逐个比较全部 GT 标记（_fuzzy_match_score）完全一致。"""
+from __future__ import annotations
+
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.vision.dataset_io import _GtTokenIndex, _fuzzy_match_score, find_paired_images
+
+
+def _brute_force(token: str, gt_tokens: set[str]) -> str | None:
+    if token in gt_tokens:
+        return token
+    best_name, best_score = None, 0
+    for g in gt_tokens:
+        score = _fuzzy_match_score(token, g)
+        if score > best_score:
+            best_score, best_name = score, g
+    return best_name if best_score >= 7000 else None
+
+
+class TestGtTokenIndex(unittest.TestCase):
+    def test_matches_brute_force(self) -> None:
+        rng = random.Random(7)
+        for alphabet in ("ab", "ab12x", "0123456789", "abcdefghijklmnopqrstuvwxyz0123456789"):
+            for _ in range(15):
+                gts = {"".join(rng.choice(alphabet) for _ in range(rng.randint(1, 16))) for _ in range(rng.randint(1, 50))}
+                index = _GtTokenIndex(gts)
+                for _ in range(10):
+                    token = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 16)))
+                    self.assertEqual(index.best_fuzzy(token), _brute_force(token, gts), (token, sorted(gts)))
+
+    def test_scan_pairs_fuzzy_names(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            root = Path(td)
+            ds = root / "u" / "ds"
+            (ds / "hazy").mkdir(parents=True)
+            (ds / "gt").mkdir()
+            for s in range(3):
+                (ds / "gt" / f"scene{s}_view.png").write_bytes(b"x")
+                (ds / "hazy" / f"scene{s}_viewx_hazy.png").write_bytes(b"x")
+            (ds / "hazy" / "unrelated.png").write_bytes(b"x")
+            pairs = find_paired_images(root, "u", "ds", "hazy", limit=None)
+            self.assertEqual(
+                [(p.input_path.name, p.gt_path.name) for p in pairs],
+                [(f"scene{s}_viewx_hazy.png", f"scene{s}_view.png") for s in range(3)],
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
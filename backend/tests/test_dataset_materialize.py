@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""数据集物化：memmap 视图与原图一致，源文件变化或解码失败的样本退回解码路径。"""
+from __future__ import annotations
+
+import os
+import pickle
+import tempfile
+import unittest
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from app.vision.dataset_io import find_paired_images
+from app.vision.dataset_materialize import MaterializeTooLarge, materialize_dataset, materialized_dir, open_materialized
+from app.vision.image_cache import read_image_bgr
+
+
+class TestDatasetMaterialize(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.ds = self.root / "alice" / "ds1"
+        (self.ds / "noisy").mkdir(parents=True)
+        (self.ds / "gt").mkdir()
+        rng = np.random.default_rng(0)
+        for i in range(3):
+            h, w = 20 + i, 30 + 2 * i
+            cv2.imwrite(str(self.ds / "gt" / f"{i}.png"), rng.integers(0, 256, (h, w, 3), dtype=np.uint8))
+            cv2.imwrite(str(self.ds / "noisy" / f"{i}.png"), rng.integers(0, 256, (h, w, 3), dtype=np.uint8))
+        (self.ds / "noisy" / "9.png").write_bytes(b"broken")
+        (self.ds / "gt" / "9.png").write_bytes(b"broken")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_views_match_decoded_images(self) -> None:
+        result = materialize_dataset(self.root, self.ds, "alice", "ds1", ["denoise", "dehaze"])
+        self.assertEqual((result["denoise"]["entries"], result["denoise"]["skipped"]), (3, 1))
+        self.assertEqual(result["dehaze"], {"skipped": "no_pairs"})
+        store = open_materialized(self.root, "alice", "ds1", "noisy")
+        self.assertIsNotNone(store)
+        store = pickle.loads(pickle.dumps(store))
+        for pair in find_paired_images(self.root, "alice", "ds1", "noisy", limit=None):
+            hit = store.lookup(pair)
+            if pair.name.startswith("9"):
+                self.assertIsNone(hit)
+                continue
+            self.assertTrue(np.array_equal(hit[0], read_image_bgr(pair.input_path)))
+            self.assertTrue(np.array_equal(hit[1], read_image_bgr(pair.gt_path)))
+            self.assertFalse(hit[0].flags.writeable)
+
+    def test_changed_source_falls_back(self) -> None:
+        materialize_dataset(self.root, self.ds, "alice", "ds1", ["denoise"])
+        store = open_materialized(self.root, "alice", "ds1", "noisy")
+        pair = next(p for p in find_paired_images(self.root, "alice", "ds1", "noisy", limit=None) if p.name.startswith("0"))
+        st = os.stat(pair.gt_path)
+        os.utime(pair.gt_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        self.assertIsNone(store.lookup(pair))
+
+    def test_size_guard_keeps_previous_index(self) -> None:
+        first = materialize_dataset(self.root, self.ds, "alice", "ds1", ["denoise"], max_bytes=0)
+        with self.assertRaises(MaterializeTooLarge):
+            materialize_dataset(self.root, self.ds, "alice", "ds1", ["denoise"], max_bytes=4096)
+        out_dir = materialized_dir(self.root, "alice", "ds1", "noisy")
+        self.assertEqual(sorted(p.name for p in out_dir.iterdir() if p.name.startswith(".")), [])
+        store = open_materialized(self.root, "alice", "ds1", "noisy")
+        self.assertEqual(len(store), first["denoise"]["entries"])
+
+
+if __name__ == "__main__":
+    unittest.main()
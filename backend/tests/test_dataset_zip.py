@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""数据集 zip 导入：外层目录规范化、越界路径整体拒绝且不影响原目录、未勾选覆盖时拒绝写入。"""
+from __future__ import annotations
+
+import io
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from unittest import mock
+
+from fastapi import HTTPException
+
+from app import dataset_zip
+from app.dataset_zip import import_zip_into_dir, spool_upload
+
+
+def _zip(members: list[tuple[str, bytes]]) -> bytes:
+    bio = io.BytesIO()
+    with zipfile.ZipFile(bio, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members:
+            zf.writestr(name, data)
+    return bio.getvalue()
+
+
+def _tree(root: Path) -> dict[str, bytes]:
+    return {p.relative_to(root).as_posix(): p.read_bytes() for p in root.rglob("*") if p.is_file()}
+
+
+class TestDatasetZipImport(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.ds = Path(self.tmp.name) / "alice" / "ds"
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_spooled_nested_layout_is_flattened(self) -> None:
+        data = _zip(
+            [
+                ("My Set/gt/1.png", b"g"),
+                ("My Set/hazy/1.png", b"h"),
+                ("__MACOSX/My Set/gt/._1.png", b"m"),
+                ("readme.txt", b"r"),
+            ]
+        )
+        zip_path = spool_upload(io.BytesIO(data), Path(self.tmp.name))
+        try:
+            summary = import_zip_into_dir(zip_path, self.ds, overwrite=True, workers=2)
+        finally:
+            zip_path.unlink()
+        self.assertEqual(summary["files"], 4)
+        self.assertEqual(
+            _tree(self.ds),
+            {"gt/1.png": b"g", "hazy/1.png": b"h", "__MACOSX/My Set/gt/._1.png": b"m", "readme.txt": b"r"},
+        )
+        self.assertEqual(sorted(p.name for p in self.ds.parent.iterdir()), ["ds"])
+
+    def test_traversal_rejected_before_writing(self) -> None:
+        (self.ds / "gt").mkdir(parents=True)
+        (self.ds / "gt" / "keep.png").write_bytes(b"k")
+        with self.assertRaises(HTTPException) as ctx:
+            import_zip_into_dir(_zip([("gt/1.png", b"1"), ("../evil.txt", b"x")]), self.ds, overwrite=True)
+        self.assertEqual(ctx.exception.status_code, 400)
+        self.assertEqual(_tree(self.ds), {"gt/keep.png": b"k"})
+        self.assertFalse((self.ds.parent / "evil.txt").exists())
+
+    def test_existing_files_require_overwrite(self) -> None:
+        (self.ds / "gt").mkdir(parents=True)
+        (self.ds / "gt" / "old.png").write_bytes(b"o")
+        with self.assertRaises(HTTPException) as ctx:
+            import_zip_into_dir(_zip([("gt/1.png", b"1")]), self.ds, overwrite=False)
+        self.assertEqual(ctx.exception.status_code, 409)
+        import_zip_into_dir(_zip([("gt/1.png", b"1")]), self.ds, overwrite=True)
+        self.assertEqual(_tree(self.ds), {"gt/1.png": b"1"})
+
+    def test_failed_swap_restores_old_dir(self) -> None:
+        (self.ds / "gt").mkdir(parents=True)
+        (self.ds / "gt" / "old.png").write_bytes(b"o")
+        real_replace = dataset_zip.os.replace
+
+        def failing_replace(src, dst):
+            if ".import-" in Path(src).name:
+                raise OSError("disk full")
+            return real_replace(src, dst)
+
+        with mock.patch.object(dataset_zip.os, "replace", side_effect=failing_replace):
+            with self.assertRaises(OSError):
+                import_zip_into_dir(_zip([("gt/1.png", b"1")]), self.ds, overwrite=True)
+        self.assertEqual(_tree(self.ds), {"gt/old.png": b"o"})
+        self.assertEqual(sorted(p.name for p in self.ds.parent.iterdir()), ["ds"])
+
+
+if __name__ == "__main__":
+    unittest.main()
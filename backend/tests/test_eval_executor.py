@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""样本执行器与解码预取：并行时结果仍按输入顺序产出，取消检查能中断后续提交与预取。"""
+from __future__ import annotations
+
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from app.eval_executor import map_ordered, prefetch_ordered, resolve_prefetch_depth, resolve_sample_executor
+
+
+def _slow_square(x: int) -> int:
+    time.sleep(0.002 * ((7 - x) % 4))
+    return x * x
+
+
+class TestEvalExecutor(unittest.TestCase):
+    def test_default_is_serial(self) -> None:
+        cfg = resolve_sample_executor({})
+        self.assertEqual((cfg.kind, cfg.workers), ("serial", 1))
+
+    def test_user_package_falls_back_to_serial(self) -> None:
+        cfg = resolve_sample_executor({"eval_workers": 8}, allow_parallel=False)
+        self.assertEqual(cfg.kind, "serial")
+        self.assertEqual(cfg.fallback_reason, "parallel_not_supported")
+
+    def test_thread_pool_keeps_input_order(self) -> None:
+        cfg = resolve_sample_executor({"eval_workers": 4})
+        self.assertEqual(cfg.kind, "thread")
+        out = list(map_ordered(_slow_square, range(20), cfg))
+        self.assertEqual(out, [x * x for x in range(20)])
+
+    def test_before_submit_can_cancel(self) -> None:
+        cfg = resolve_sample_executor({"eval_workers": 2})
+        calls = {"n": 0}
+
+        def check() -> None:
+            calls["n"] += 1
+            if calls["n"] > 5:
+                raise RuntimeError("canceled")
+
+        with self.assertRaises(RuntimeError):
+            list(map_ordered(_slow_square, range(100), cfg, before_submit=check))
+        self.assertLessEqual(calls["n"], 6)
+
+    def test_prefetch_keeps_order_and_stops_on_cancel(self) -> None:
+        decoded: list[int] = []
+
+        def decode(x: int) -> int:
+            decoded.append(x)
+            return _slow_square(x)
+
+        cfg = resolve_sample_executor({})
+        self.assertEqual(resolve_prefetch_depth({"prefetch_depth": 3}, cfg), 3)
+        self.assertEqual(list(prefetch_ordered(decode, range(10), 3)), [x * x for x in range(10)])
+
+        decoded.clear()
+        calls = {"n": 0}
+
+        def check() -> None:
+            calls["n"] += 1
+            if calls["n"] > 2:
+                raise RuntimeError("canceled")
+
+        with self.assertRaises(RuntimeError):
+            list(map_ordered(lambda v: v, prefetch_ordered(decode, range(100), 3), cfg, before_submit=check))
+        # 预取最多领先 depth 个元素，取消后不再继续解码
+        self.assertLessEqual(len(decoded), 2 + 3 + 1)
+
+    def test_process_executor_skips_prefetch(self) -> None:
+        with mock.patch("multiprocessing.current_process", return_value=SimpleNamespace(daemon=False)):
+            cfg = resolve_sample_executor({"eval_workers": 2, "eval_executor": "process"})
+        self.assertEqual(cfg.kind, "process")
+        self.assertEqual(resolve_prefetch_depth({"prefetch_depth": 8}, cfg), 0)
+
+    def test_process_executor_in_daemon_falls_back_to_threads(self) -> None:
+        with mock.patch("multiprocessing.current_process", return_value=SimpleNamespace(daemon=True)):
+            cfg = resolve_sample_executor({"eval_workers": 2, "eval_executor": "process"})
+        self.assertEqual((cfg.kind, cfg.fallback_reason), ("thread", "daemon_process"))
+        self.assertEqual(resolve_prefetch_depth({"prefetch_depth": 8}, cfg), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""增量变更检测：未变化时不重新列举目录，增删文件只重扫所在目录，full=True 可发现原地覆盖。"""
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from app.vision import fs_changes
+from app.vision.fs_changes import detect_dataset_changes, state_path, state_root_for
+
+
+class TestFsChanges(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.ds = Path(self.tmp.name) / "ds"
+        self.state = Path(self.tmp.name) / "state"
+        for d in ("gt", "hazy/sub"):
+            (self.ds / d).mkdir(parents=True)
+        for i in range(5):
+            (self.ds / "gt" / f"{i}.png").write_bytes(b"x")
+            (self.ds / "hazy" / "sub" / f"{i}.png").write_bytes(b"x")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def _bump_mtime(self, path: Path) -> None:
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    def test_unchanged_and_incremental(self) -> None:
+        first = detect_dataset_changes(self.ds, state_root=self.state)
+        self.assertEqual((first.total_dirs, first.rescanned_dirs, first.file_count), (4, 4, 10))
+        again = detect_dataset_changes(self.ds, state_root=self.state)
+        self.assertEqual((again.fs_hash, again.changed, again.rescanned_dirs), (first.fs_hash, False, 0))
+
+        (self.ds / "hazy" / "sub" / "5.png").write_bytes(b"x")
+        self._bump_mtime(self.ds / "hazy" / "sub")
+        after_add = detect_dataset_changes(self.ds, state_root=self.state)
+        self.assertTrue(after_add.changed)
+        self.assertEqual((after_add.rescanned_dirs, after_add.file_count), (1, 11))
+
+    def test_full_detects_in_place_overwrite(self) -> None:
+        first = detect_dataset_changes(self.ds, state_root=self.state)
+        self._bump_mtime(self.ds / "gt" / "0.png")
+        self.assertFalse(detect_dataset_changes(self.ds, state_root=self.state).changed)
+        full = detect_dataset_changes(self.ds, full=True, state_root=self.state)
+        self.assertTrue(full.changed)
+        self.assertNotEqual(full.fs_hash, first.fs_hash)
+
+    def test_state_lives_under_data_root(self) -> None:
+        root = state_root_for(Path(self.tmp.name))
+        detect_dataset_changes(self.ds, state_root=root)
+        self.assertTrue(state_path(self.ds, root).is_file())
+        self.assertEqual(root.parent, Path(self.tmp.name))
+
+    def test_loaded_cache_is_bounded(self) -> None:
+        with mock.patch.object(fs_changes, "_LOADED_CACHE_SIZE", 2):
+            for i in range(4):
+                ds = Path(self.tmp.name) / f"ds{i}"
+                ds.mkdir()
+                detect_dataset_changes(ds, state_root=self.state)
+            self.assertLessEqual(len(fs_changes._loaded), 2)
+            self.assertIn(str(state_path(Path(self.tmp.name) / "ds3", self.state)), fs_changes._loaded)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""已解码图像缓存：命中 / 文件变化失效 / 字节预算淘汰。"""
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from app.vision.image_cache import DecodeCacheUsage, DecodedImageCache
+
+
+class TestDecodedImageCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.decodes: list[str] = []
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def _decode(self, path) -> np.ndarray:
+        self.decodes.append(str(path))
+        size = Path(path).stat().st_size
+        return np.full((size, 10, 3), 7, dtype=np.uint8)
+
+    def _touch(self, name: str, size: int) -> Path:
+        path = self.root / name
+        path.write_bytes(b"x" * size)
+        return path
+
+    def test_hit_and_readonly(self) -> None:
+        cache = DecodedImageCache(1 << 20)
+        path = self._touch("a.png", 4)
+        first = cache.get_or_decode(path, self._decode)
+        second = cache.get_or_decode(path, self._decode)
+        self.assertIs(first, second)
+        self.assertEqual(len(self.decodes), 1)
+        self.assertFalse(first.flags.writeable)
+        self.assertEqual((cache.stats()["hits"], cache.stats()["misses"]), (1, 1))
+
+    def test_changed_file_is_decoded_again(self) -> None:
+        cache = DecodedImageCache(1 << 20)
+        path = self._touch("a.png", 4)
+        cache.get_or_decode(path, self._decode)
+        self._touch("a.png", 6)
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        self.assertEqual(cache.get_or_decode(path, self._decode).shape[0], 6)
+        self.assertEqual(len(self.decodes), 2)
+
+    def test_lru_eviction_by_bytes(self) -> None:
+        cache = DecodedImageCache(2 * 10 * 10 * 3)
+        paths = [self._touch(f"{i}.png", 10) for i in range(3)]
+        for path in paths:
+            cache.get_or_decode(path, self._decode)
+        stats = cache.stats()
+        self.assertEqual((stats["entries"], stats["evictions"]), (2, 1))
+        cache.get_or_decode(paths[0], self._decode)
+        self.assertEqual(len(self.decodes), 4)
+
+    def test_usage_counted_per_run(self) -> None:
+        cache = DecodedImageCache(1 << 20)
+        path = self._touch("a.png", 4)
+        run_a, run_b = DecodeCacheUsage(), DecodeCacheUsage()
+        cache.get_or_decode(path, self._decode, run_a)
+        cache.get_or_decode(path, self._decode, run_b)
+        cache.get_or_decode(path, self._decode, run_b)
+        self.assertEqual((run_a.hits, run_a.misses), (0, 1))
+        self.assertEqual((run_b.hits, run_b.misses), (2, 0))
+        self.assertEqual((cache.stats()["hits"], cache.stats()["misses"]), (2, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
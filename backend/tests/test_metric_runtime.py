@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""自定义指标编译缓存：同一代码只编译一次，修改后失效，参数绑定与原先一致。"""
+from __future__ import annotations
+
+import os
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from app.metric_runtime import (
+    METRIC_CACHE_SIZE_ENV,
+    execute_python_metric,
+    execute_python_metric_batch,
+    get_compiled_metric,
+    invalidate_metric_cache,
+)
+
+MEAN_DIFF = """
+def compute_metric(gt, pred, task_type=""):
+    return float(np.mean(np.abs(gt.astype(float) - pred.astype(float))))
+"""
+
+
+class TestMetricRuntimeCache(unittest.TestCase):
+    def setUp(self) -> None:
+        invalidate_metric_cache()
+
+    def test_compiles_once_per_code(self) -> None:
+        first = get_compiled_metric(MEAN_DIFF)
+        self.assertIs(get_compiled_metric(MEAN_DIFF), first)
+        self.assertEqual(first.arg_names, ("gt", "pred", "task_type"))
+        gt = np.zeros((4, 4, 3), dtype=np.uint8)
+        pred = np.full((4, 4, 3), 3, dtype=np.uint8)
+        self.assertAlmostEqual(execute_python_metric(MEAN_DIFF, gt, pred), 3.0)
+
+    def test_readonly_inputs_are_copied_for_user_code(self) -> None:
+        code = """
+def compute_metric(gt, pred):
+    pred -= gt
+    return float(pred.sum())
+"""
+        gt = np.ones((4, 4, 3), dtype=np.uint8)
+        pred = np.full((4, 4, 3), 3, dtype=np.uint8)
+        gt.setflags(write=False)
+        pred.setflags(write=False)
+        self.assertEqual(execute_python_metric(code, gt, pred), 96.0)
+        self.assertEqual(execute_python_metric_batch(code, gt[None], pred[None], ["a"]), [96.0])
+        self.assertEqual(int(pred[0, 0, 0]), 3)
+
+    def test_invalidate_drops_entry(self) -> None:
+        first = get_compiled_metric(MEAN_DIFF)
+        invalidate_metric_cache(MEAN_DIFF)
+        self.assertIsNot(get_compiled_metric(MEAN_DIFF), first)
+
+    def test_unsupported_param_still_raises(self) -> None:
+        code = "def compute_metric(gt, pred, extra):\n    return 1.0\n"
+        with self.assertRaises(ValueError) as ctx:
+            execute_python_metric(code, np.zeros((2, 2, 3), np.uint8), np.zeros((2, 2, 3), np.uint8))
+        self.assertEqual(str(ctx.exception), "metric_param_unsupported:extra")
+
+    def test_batch_entry_and_fallback(self) -> None:
+        batch_code = MEAN_DIFF + """
+def compute_metric_batch(gt_batch, pred_batch):
+    diff = np.abs(gt_batch.astype(float) - pred_batch.astype(float))
+    return [float(np.mean(frame)) for frame in diff]
+"""
+        gt = np.zeros((3, 4, 4, 3), dtype=np.uint8)
+        pred = np.stack([np.full((4, 4, 3), v, dtype=np.uint8) for v in (1, 2, 5)])
+        names = ["a", "b", "c"]
+        self.assertTrue(get_compiled_metric(batch_code).supports_batch)
+        self.assertFalse(get_compiled_metric(MEAN_DIFF).supports_batch)
+        self.assertEqual(execute_python_metric_batch(batch_code, gt, pred, names), [1.0, 2.0, 5.0])
+        self.assertEqual(execute_python_metric_batch(MEAN_DIFF, gt, pred, names), [1.0, 2.0, 5.0])
+
+    def test_lru_eviction(self) -> None:
+        codes = [f"def compute_metric(gt, pred):\n    return {i}.0\n" for i in range(3)]
+        with mock.patch.dict(os.environ, {METRIC_CACHE_SIZE_ENV: "2"}):
+            first = get_compiled_metric(codes[0])
+            get_compiled_metric(codes[1])
+            get_compiled_metric(codes[2])
+            self.assertIsNot(get_compiled_metric(codes[0]), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
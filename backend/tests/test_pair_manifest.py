@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""配对清单：与直接扫描结果一致，目录内文件增删后自动失效重建。"""
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.vision import dataset_access, dataset_io
+from app.vision.pair_manifest import PAIR_MANIFEST_DIRNAME, get_pair_manifest, load_pair_manifest
+
+
+class TestPairManifest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.manifests = self.root / "_manifests"
+        self.ds = self.root / "alice" / "ds"
+        for d in ("gt", "hazy", "noisy"):
+            (self.ds / d).mkdir(parents=True)
+        for i in range(12):
+            (self.ds / "gt" / f"scene{i}_view.png").write_bytes(b"x")
+            (self.ds / "hazy" / f"scene{i}_viewx_hazy.png").write_bytes(b"x")
+            (self.ds / "noisy" / f"{i:03d}_noisy.png").write_bytes(b"x")
+        (self.ds / "gt" / "clip.mp4").write_bytes(b"x")
+        (self.ds / "noisy" / "clip_noisy.mp4").write_bytes(b"x")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_matches_direct_scan(self) -> None:
+        manifest = get_pair_manifest(self.ds, manifest_root=self.manifests)
+        for input_dirname in ("hazy", "noisy", "blur"):
+            for limit in (None, 3):
+                self.assertEqual(
+                    manifest.pairs(input_dirname, "image", limit),
+                    dataset_io.find_paired_images(self.root, "alice", "ds", input_dirname, limit=limit),
+                )
+            self.assertEqual(manifest.count(input_dirname, "image"), dataset_io.count_paired_images(self.root, "alice", "ds", input_dirname))
+        self.assertEqual(manifest.pairs("noisy", "video", None), dataset_io.find_paired_videos(self.root, "alice", "ds", "noisy", limit=None))
+        self.assertEqual((manifest.dir_count("gt", "image"), manifest.dir_count("gt", "video")), (12, 1))
+
+    def test_stale_after_listing_change(self) -> None:
+        get_pair_manifest(self.ds, manifest_root=self.manifests)
+        self.assertIsNotNone(load_pair_manifest(self.ds, self.manifests))
+        extra = self.ds / "hazy" / "scene99_viewx_hazy.png"
+        extra.write_bytes(b"x")
+        st = os.stat(extra.parent)
+        os.utime(extra.parent, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        self.assertIsNone(load_pair_manifest(self.ds, self.manifests))
+        rebuilt = get_pair_manifest(self.ds, manifest_root=self.manifests)
+        self.assertEqual(len(rebuilt.pairs("hazy", "image", None)), len(dataset_io.find_paired_images(self.root, "alice", "ds", "hazy", limit=None)))
+
+    def test_access_counts_exact_only_under_data_root(self) -> None:
+        # blur 中的文件只能模糊匹配到 GT：取样包含这些配对，计数仍只算精确匹配
+        (self.ds / "blur").mkdir()
+        for i in range(3):
+            (self.ds / "blur" / f"scene0{i}_view.png").write_bytes(b"x")
+        (self.ds / "blur" / "scene5_view_blur.png").write_bytes(b"x")
+        pairs = dataset_access.find_paired_images(self.root, "alice", "ds", "blur", limit=None)
+        self.assertEqual(len(pairs), 4)
+        self.assertEqual(dataset_access.count_paired_images(self.root, "alice", "ds", "blur"), 1)
+        self.assertEqual(dataset_io.count_paired_images(self.root, "alice", "ds", "blur"), 1)
+        self.assertEqual(dataset_access.count_paired_images(self.root, "alice", "ds", "noisy"), dataset_io.count_paired_images(self.root, "alice", "ds", "noisy"))
+        self.assertIsNotNone(load_pair_manifest(self.ds, self.root / PAIR_MANIFEST_DIRNAME))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""PSNR / SSIM 融合内核与 skimage 原口径（BGR→RGB、float32/255、data_range=1）对齐。"""
+from __future__ import annotations
+
+import unittest
+
+import cv2
+import numpy as np
+from skimage.metrics import peak_signal_noise_ratio, structural_similarity
+
+from app.vision import psnr_ssim
+from app.vision.psnr_ssim import psnr_ssim_batch_u8, psnr_ssim_u8
+
+
+def _reference(gt_bgr_u8: np.ndarray, pred_bgr_u8: np.ndarray) -> tuple[float, float]:
+    gt01 = cv2.cvtColor(gt_bgr_u8, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
+    pr01 = cv2.cvtColor(pred_bgr_u8, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
+    psnr = float(peak_signal_noise_ratio(gt01, pr01, data_range=1.0))
+    ssim = float(structural_similarity(gt01, pr01, channel_axis=2, data_range=1.0))
+    return psnr, ssim
+
+
+class TestPsnrSsimKernel(unittest.TestCase):
+    def test_matches_skimage(self) -> None:
+        rng = np.random.default_rng(7)
+        for h, w, sigma in ((7, 9, 3.0), (64, 48, 12.0), (121, 203, 30.0), (240, 320, 1.5)):
+            gt = cv2.GaussianBlur(rng.integers(0, 256, (h, w, 3), dtype=np.uint8), (0, 0), 1.0)
+            pred = np.clip(gt + rng.normal(0, sigma, gt.shape), 0, 255).astype(np.uint8)
+            psnr, ssim = psnr_ssim_u8(gt, pred)
+            ref_psnr, ref_ssim = _reference(gt, pred)
+            self.assertAlmostEqual(psnr, ref_psnr, delta=1e-4)
+            self.assertAlmostEqual(ssim, ref_ssim, delta=1e-5)
+
+    def test_identical_images(self) -> None:
+        img = np.random.default_rng(0).integers(0, 256, (32, 32, 3), dtype=np.uint8)
+        psnr, ssim = psnr_ssim_u8(img, img.copy())
+        self.assertEqual(psnr, float("inf"))
+        self.assertAlmostEqual(ssim, 1.0, places=6)
+
+    def test_batch_matches_single_frames(self) -> None:
+        rng = np.random.default_rng(3)
+        gt = rng.integers(0, 256, (5, 40, 56, 3), dtype=np.uint8)
+        pred = np.clip(gt + rng.normal(0, 9.0, gt.shape), 0, 255).astype(np.uint8)
+        pred[2] = gt[2]
+        psnr, ssim = psnr_ssim_batch_u8(gt, pred)
+        for idx in range(gt.shape[0]):
+            ref_psnr, ref_ssim = psnr_ssim_u8(gt[idx], pred[idx])
+            self.assertAlmostEqual(float(psnr[idx]), ref_psnr, delta=1e-9)
+            self.assertAlmostEqual(float(ssim[idx]), ref_ssim, delta=1e-9)
+
+    def test_shape_mismatch_raises(self) -> None:
+        with self.assertRaises(ValueError):
+            psnr_ssim_u8(np.zeros((16, 16, 3), np.uint8), np.zeros((16, 17, 3), np.uint8))
+
+    def test_large_workspace_not_cached(self) -> None:
+        small = np.zeros((32, 32, 3), np.uint8)
+        psnr_ssim_u8(small, small)
+        cached = psnr_ssim._workspaces.buffers
+        big = np.zeros((1200, 600, 3), np.uint8)
+        self.assertGreater(big.size, psnr_ssim.WORKSPACE_CACHE_MAX_ELEMENTS)
+        psnr_ssim_u8(big, big)
+        self.assertIs(psnr_ssim._workspaces.buffers, cached)
+
+
+if __name__ == "__main__":
+    unittest.main()
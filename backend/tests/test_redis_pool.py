@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""共享连接池：按环境变量构建、make_redis 复用同一池与客户端、统计借出与池满。"""
+from __future__ import annotations
+
+import os
+import unittest
+from unittest import mock
+
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app import redis_pool, store
+
+
+class TestRedisPool(unittest.TestCase):
+    def setUp(self) -> None:
+        self.env = mock.patch.dict(
+            os.environ,
+            {
+                redis_pool.REDIS_URL_ENV: "redis://:secret@10.0.0.5:6390/2",
+                redis_pool.REDIS_MAX_CONNECTIONS_ENV: "2",
+                redis_pool.REDIS_POOL_TIMEOUT_ENV: "0.05",
+            },
+        )
+        self.env.start()
+        redis_pool.reset_pool()
+
+    def tearDown(self) -> None:
+        redis_pool.reset_pool()
+        self.env.stop()
+
+    def test_shared_pool_and_client(self) -> None:
+        a, b = store.make_redis(), store.make_redis()
+        self.assertIs(a, b)
+        self.assertIs(a.connection_pool, redis_pool.get_pool())
+        kwargs = a.connection_pool.connection_kwargs
+        self.assertEqual((kwargs["host"], kwargs["port"], kwargs["db"], kwargs["decode_responses"]), ("10.0.0.5", 6390, 2, True))
+        self.assertEqual(kwargs["health_check_interval"], redis_pool.DEFAULT_HEALTH_CHECK_S)
+        self.assertIsNone(kwargs["socket_timeout"])
+        stats = redis_pool.pool_stats()
+        self.assertEqual((stats["url"], stats["max_connections"], stats["created"]), ("redis://:***@10.0.0.5:6390/2", 2, 0))
+
+        redis_pool.reset_pool()
+        self.assertIsNot(store.make_redis(), a)
+
+    def test_stats_and_exhaustion(self) -> None:
+        pool = redis_pool.get_pool()
+        # 不连真实 Redis：借出时跳过 connect / can_read
+        with mock.patch("redis.connection.Connection.connect"), mock.patch("redis.connection.Connection.can_read", return_value=False):
+            c1 = pool.get_connection("GET")
+            c2 = pool.get_connection("GET")
+            with self.assertRaises(RedisConnectionError):
+                pool.get_connection("GET")
+            pool.release(c1)
+            stats = pool.stats()
+            self.assertEqual((stats["created"], stats["in_use"], stats["idle"], stats["acquired"], stats["exhausted"]), (2, 1, 1, 3, 1))
+            self.assertIs(pool.get_connection("GET"), c1)
+            pool.release(c1)
+            pool.release(c2)
+
+    def test_connect_failure_is_not_exhaustion(self) -> None:
+        pool = redis_pool.get_pool()
+        with mock.patch("redis.connection.Connection.connect", side_effect=RedisConnectionError("Connection refused")):
+            with self.assertRaises(RedisConnectionError):
+                pool.get_connection("GET")
+        stats = pool.stats()
+        self.assertEqual((stats["acquired"], stats["exhausted"]), (1, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""进度通道：只在 running 且比最近一次阶段切换更新时覆盖记录；样本级进度按最小间隔写入。"""
+from __future__ import annotations
+
+import unittest
+from unittest import mock
+
+from app import tasks
+from app.store import overlay_run_progress
+
+
+class TestRunProgress(unittest.TestCase):
+    def test_overlay_rules(self) -> None:
+        run = {"run_id": "r1", "status": "running", "progress": 20, "stage": "running_algorithm", "progress_updated_at": 100.0}
+        fresh = {"progress": "57", "stage": "running_algorithm", "progress_message": "57/100", "updated_at": "101.5"}
+        merged = overlay_run_progress(run, fresh)
+        self.assertEqual((merged["progress"], merged["progress_message"]), (57, "57/100"))
+        self.assertEqual(run["progress"], 20)
+
+        self.assertIs(overlay_run_progress(run, {**fresh, "updated_at": "99"}), run)
+        self.assertEqual(overlay_run_progress({**run, "status": "canceling"}, fresh)["progress"], 20)
+        self.assertEqual(overlay_run_progress({**run, "status": "done"}, fresh)["progress"], 20)
+        self.assertIs(overlay_run_progress(run, None), run)
+
+    def test_publisher_rate_limit(self) -> None:
+        run = {"progress": 0, "stage": "running_algorithm", "progress_message": ""}
+        with mock.patch.object(tasks, "save_run_progress") as save, mock.patch.object(tasks.time, "time") as now:
+            publish = tasks._RunProgressPublisher(object(), "r1", 1.0)
+            for t in (10.0, 10.2, 10.9, 11.0, 11.5, 12.1):
+                now.return_value = t
+                run["progress"] = int(t * 10)
+                publish(run)
+        self.assertEqual([c.args[2] for c in save.call_args_list], [100, 110, 121])
+
+
+if __name__ == "__main__":
+    unittest.main()
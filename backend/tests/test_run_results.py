@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""评测结果列式表：Run 展开为行、排行榜聚合与分位数、可见性过滤、对比矩阵。"""
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from app import run_results
+
+
+def _run(run_id: str, algorithm_id: str, psnr: float, *, owner_id: str = "alice", status: str = "done", **extra) -> dict:
+    return {
+        "run_id": run_id,
+        "owner_id": owner_id,
+        "task_type": "denoise",
+        "dataset_id": "ds1",
+        "algorithm_id": algorithm_id,
+        "status": status,
+        "created_at": 100.0,
+        "finished_at": 200.0 + psnr,
+        "elapsed": 3.0,
+        "metrics": {"PSNR": psnr, "NIQE": 10.0 - psnr / 10, "note": "n/a"},
+        "params": {"eval_mode": "full", "algo_elapsed_mean": 0.5},
+        "sample_count": 4,
+        **extra,
+    }
+
+
+class TestRunResults(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(self.tmp.name, 'results.db')}"
+        self.env = mock.patch.dict(os.environ, {run_results.RUN_RESULTS_URL_ENV: url})
+        self.env.start()
+
+    def tearDown(self) -> None:
+        run_results.get_engine().dispose()
+        self.env.stop()
+        self.tmp.cleanup()
+
+    def test_rows_only_for_done_runs(self) -> None:
+        rows = run_results.result_rows(_run("r1", "a", 30.0))
+        self.assertEqual(sorted(x["metric"] for x in rows), ["NIQE", "PSNR"])
+        self.assertEqual((rows[0]["eval_mode"], rows[0]["algo_elapsed_mean"], rows[0]["sample_count"]), ("full", 0.5, 4))
+        self.assertEqual(run_results.result_rows(_run("r2", "a", 30.0, status="failed")), [])
+
+    def test_leaderboard_compare_and_visibility(self) -> None:
+        stats = run_results.rebuild_run_results(
+            [
+                _run("a1", "algo_a", 30.0),
+                _run("a2", "algo_a", 32.0),
+                _run("b1", "algo_b", 31.0),
+                _run("c1", "algo_c", 40.0, owner_id="bob"),
+                _run("q1", "algo_a", 50.0, status="running"),
+            ]
+        )
+        self.assertEqual(stats, {"runs": 4, "rows": 8})
+
+        board = run_results.leaderboard("PSNR", percentiles=[50], viewer_id="alice")
+        self.assertEqual([(x["algorithm_id"], x["best"], x["count"]) for x in board], [("algo_a", 32.0, 2), ("algo_b", 31.0, 1)])
+        self.assertEqual((board[0]["best_run_id"], board[0]["mean"], board[0]["percentiles"]["p50"]), ("a2", 31.0, 31.0))
+
+        admin = run_results.leaderboard("NIQE", higher_better=False, rank_by="mean")
+        self.assertEqual(admin[0]["algorithm_id"], "algo_c")
+
+        # 对他人公开后可见；Run 被重新写入时替换原有行
+        run_results.record_run_results(_run("c1", "algo_c", 29.0, owner_id="bob", visibility="public"))
+        board = run_results.leaderboard("PSNR", viewer_id="alice", group_by="owner_id")
+        self.assertEqual([(x["owner_id"], x["max"]) for x in board], [("alice", 32.0), ("bob", 29.0)])
+
+        matrix = run_results.compare_runs(["b1", "c1", "missing"], metrics=["PSNR"], viewer_id="alice")
+        self.assertEqual([(x["run_id"], x["metrics"]) for x in matrix], [("b1", {"PSNR": 31.0}), ("c1", {"PSNR": 29.0})])
+
+        run_results.delete_run_results("a2")
+        run_results.record_run_results(_run("a1", "algo_a", 30.0, status="canceled"))
+        self.assertEqual(run_results.count_results(), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""逐样本结果独立存储：SQL 分页 / 批量读取，Redis 分页，以及旧 Run 内嵌样本的兜底。"""
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from app import sql_store, store
+
+
+class _Pipeline:
+    def __init__(self, r: "_Redis") -> None:
+        self.r = r
+        self.ops: list[tuple[str, tuple]] = []
+
+    def __getattr__(self, name: str):
+        return lambda *args: self.ops.append((name, args))
+
+    def execute(self) -> list:
+        return [getattr(self.r, name)(*args) for name, args in self.ops]
+
+
+class _Redis:
+    """只实现本测试用到的列表命令。"""
+
+    def __init__(self) -> None:
+        self.lists: dict[str, list[str]] = {}
+
+    def pipeline(self, transaction: bool = True) -> _Pipeline:
+        return _Pipeline(self)
+
+    def delete(self, *keys: str) -> int:
+        return sum(1 for k in keys if self.lists.pop(k, None) is not None)
+
+    def rpush(self, key: str, *values: str) -> int:
+        self.lists.setdefault(key, []).extend(values)
+        return len(self.lists[key])
+
+    def llen(self, key: str) -> int:
+        return len(self.lists.get(key, []))
+
+    def lrange(self, key: str, start: int, end: int) -> list[str]:
+        items = self.lists.get(key, [])
+        return items[start:] if end == -1 else items[start : end + 1]
+
+
+def _samples(n: int) -> list[dict]:
+    return [{"name": f"{i:04d}.png", "PSNR": 20.0 + i} for i in range(n)]
+
+
+class TestRunSamplesRedis(unittest.TestCase):
+    def test_paging_and_legacy_fallback(self) -> None:
+        r = _Redis()
+        with mock.patch.object(sql_store, "is_enabled", return_value=False):
+            store.save_run_samples(r, "run1", _samples(2500))
+            items, total = store.load_run_samples(r, "run1", offset=2490, limit=100)
+            self.assertEqual((total, [x["name"] for x in items][:2], len(items)), (2500, ["2490.png", "2491.png"], 10))
+
+            legacy = {"run_id": "old", "samples": _samples(5)}
+            items, total = store.load_run_samples(r, "old", offset=3, limit=10, run=legacy)
+            self.assertEqual((total, [x["name"] for x in items]), (5, ["0003.png", "0004.png"]))
+
+            by_run = store.load_samples_for_runs(r, [{"run_id": "run1"}, legacy, {"run_id": "none"}])
+            self.assertEqual((len(by_run["run1"]), len(by_run["old"]), "none" in by_run), (2500, 5, False))
+
+        stripped = store.strip_run_samples(legacy)
+        self.assertEqual((stripped["samples"], stripped["sample_count"]), ([], 5))
+        self.assertEqual(len(legacy["samples"]), 5)
+
+
+class TestRunSamplesSql(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(self.tmp.name, 'abp.db')}"
+        self.env = mock.patch.dict(os.environ, {sql_store.SQL_STORE_URL_ENV: url})
+        self.env.start()
+        sql_store.get_engine.cache_clear()
+
+    def tearDown(self) -> None:
+        sql_store.get_engine().dispose()
+        sql_store.get_engine.cache_clear()
+        self.env.stop()
+        self.tmp.cleanup()
+
+    def test_replace_page_and_delete(self) -> None:
+        sql_store.replace_run_samples("run1", _samples(2100))
+        sql_store.replace_run_samples("run2", _samples(3))
+        sql_store.replace_run_samples("run2", _samples(2))
+        items, total = sql_store.load_run_samples("run1", offset=2000, limit=50)
+        self.assertEqual((total, len(items), items[0]["name"]), (2100, 50, "2000.png"))
+        many = sql_store.load_run_samples_many(["run1", "run2", "missing"])
+        self.assertEqual((len(many["run1"]), len(many["run2"]), "missing" in many), (2100, 2, False))
+        sql_store.delete_run_samples("run1")
+        self.assertEqual(sql_store.load_run_samples("run1"), ([], 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""SQL 专表投影查询：只取索引列、keyset 游标分页、可跳过通用表合并。"""
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from app import sql_store
+
+
+def _run(i: int, owner_id: str = "alice", status: str = "done") -> dict:
+    return {"run_id": f"r{i:03d}", "owner_id": owner_id, "status": status, "task_type": "denoise", "created_at": float(i // 2)}
+
+
+class TestSqlProjection(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(self.tmp.name, 'abp.db')}"
+        self.env = mock.patch.dict(os.environ, {sql_store.SQL_STORE_URL_ENV: url})
+        self.env.start()
+        sql_store.get_engine.cache_clear()
+
+    def tearDown(self) -> None:
+        sql_store.get_engine().dispose()
+        sql_store.get_engine.cache_clear()
+        self.env.stop()
+        self.tmp.cleanup()
+
+    def test_keyset_pages_without_payload(self) -> None:
+        # created_at 两两相同，游标必须靠主键打破并列
+        sql_store.save_records("run", [(f"r{i:03d}", _run(i)) for i in range(25)])
+        sql_store.save_record("run", "b1", {"run_id": "b1", "owner_id": "bob", "created_at": 99.0})
+
+        seen: list[str] = []
+        cursor = None
+        with mock.patch.object(sql_store, "_load", side_effect=AssertionError("payload parsed")):
+            while True:
+                rows, cursor = sql_store.list_record_columns(
+                    "run", ["status"], limit=10, cursor=cursor, owner_id="alice", status="done"
+                )
+                seen += [x["run_id"] for x in rows]
+                if cursor is None:
+                    break
+        self.assertEqual(seen, [f"r{i:03d}" for i in reversed(range(25))])
+        self.assertEqual(set(rows[0]), {"run_id", "status", "sort_at"})
+
+        with self.assertRaises(ValueError):
+            sql_store.list_record_columns("run", ["payload_json"])
+
+    def test_sort_at_keeps_epoch_precision(self) -> None:
+        base = 1_760_000_000.0
+        runs = [dict(_run(i), created_at=base + i * 0.001) for i in range(5)]
+        sql_store.save_records("run", [(x["run_id"], x) for x in runs])
+        rows, cursor = sql_store.list_record_columns("run", ["status"], limit=2, owner_id="alice")
+        self.assertEqual([x["sort_at"] for x in rows], [base + 0.004, base + 0.003])
+        rows, _ = sql_store.list_record_columns("run", ["status"], limit=2, cursor=cursor, owner_id="alice")
+        self.assertEqual([x["run_id"] for x in rows], ["r002", "r001"])
+
+    def test_rebuild_sort_at_from_payload(self) -> None:
+        sql_store.save_records("run", [(f"r{i:03d}", dict(_run(i), finished_at=100.0 + i)) for i in range(3)])
+        table = sql_store.runs_table
+        with sql_store.get_engine().begin() as conn:
+            conn.execute(sql_store.update(table).values(sort_at=0.0))
+        self.assertEqual(sql_store._rebuild_sort_at(sql_store.get_engine(), table, sql_store._record_sort_at), 3)
+        rows, _ = sql_store.list_record_columns("run", ["status"], owner_id="alice")
+        self.assertEqual([(x["run_id"], x["sort_at"]) for x in rows], [("r002", 102.0), ("r001", 101.0), ("r000", 100.0)])
+
+    def test_generic_merge_can_be_skipped(self) -> None:
+        sql_store.save_record("run", "r1", _run(1, owner_id="system"))
+        with sql_store.get_engine().begin() as conn:
+            conn.execute(
+                sql_store.insert(sql_store.store_records_table),
+                sql_store._record_values("run", "legacy", {"run_id": "legacy", "owner_id": "system"}),
+            )
+        self.assertEqual(len(sql_store.list_records("run")), 2)
+        self.assertEqual([x["run_id"] for x in sql_store.list_records("run", include_generic=False)], ["r001"])
+        with mock.patch.dict(os.environ, {sql_store.SQL_GENERIC_MERGE_ENV: "0"}):
+            self.assertEqual(len(sql_store.list_records("run")), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""SQL 存储单语句 upsert：覆盖写、批量 save_records、建表只在首次执行。"""
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from app import sql_store
+
+
+class TestSqlUpsert(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{os.path.join(self.tmp.name, 'abp.db')}"
+        self.env = mock.patch.dict(os.environ, {sql_store.SQL_STORE_URL_ENV: url})
+        self.env.start()
+        sql_store.get_engine.cache_clear()
+
+    def tearDown(self) -> None:
+        sql_store.get_engine().dispose()
+        sql_store.get_engine.cache_clear()
+        self.env.stop()
+        self.tmp.cleanup()
+
+    def test_upsert_overwrites_and_bulk_saves(self) -> None:
+        sql_store.save_record("preset", "p1", {"preset_id": "p1", "name": "old"})
+        sql_store.save_record("preset", "p1", {"preset_id": "p1", "name": "new"})
+        self.assertEqual(sql_store.load_record("preset", "p1")["name"], "new")
+
+        n = sql_store.save_records("preset", {f"p{i}": {"preset_id": f"p{i}", "name": str(i)} for i in range(1, 1201)})
+        self.assertEqual(n, 1200)
+        self.assertEqual(sql_store.load_record("preset", "p1")["name"], "1")
+        self.assertEqual(len(sql_store.list_records("preset", limit=2000)), 1200)
+
+        # 未建专表的类型落到通用表，复合主键同样走 upsert
+        sql_store.save_records("misc", [("k1", {"v": 1}), ("k1", {"v": 2}), ("k2", {"v": 3})])
+        self.assertEqual(sql_store.load_record("misc", "k1"), {"v": 2})
+
+        sql_store.save_records("algorithm", [("a1", {"algorithm_id": "a1", "task": "denoise", "name": "A"})])
+        self.assertEqual(sql_store.load_algorithm("a1")["name"], "A")
+
+    def test_schema_initialized_once(self) -> None:
+        sql_store.save_record("preset", "p1", {"preset_id": "p1"})
+        with mock.patch.object(sql_store.metadata, "create_all") as create_all:
+            sql_store.save_record("preset", "p2", {"preset_id": "p2"})
+            sql_store.load_record("preset", "p2")
+            create_all.assert_not_called()
+            sql_store.init_schema(force=True)
+            create_all.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""批量访问层：save_many / delete_many 维护 key 索引，load_indexed 两次往返读完整列表。"""
+from __future__ import annotations
+
+import json
+import unittest
+from unittest import mock
+
+from app import store
+from tests.test_store_index import _Pipeline, _Redis
+
+
+class _CountingPipeline(_Pipeline):
+    def execute(self) -> list:
+        self.r.trips += 1
+        self.r.in_pipeline = True
+        try:
+            return super().execute()
+        finally:
+            self.r.in_pipeline = False
+
+
+class _CountingRedis(_Redis):
+    """单条命令与 pipeline.execute 各记一次往返。"""
+
+    _COMMANDS = {"get", "set", "mget", "exists", "delete", "hget", "hset", "hdel", "zadd", "zrem", "zrevrange", "scan_iter"}
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.trips = 0
+        self.in_pipeline = False
+
+    def __getattribute__(self, name: str):
+        if name in _CountingRedis._COMMANDS and not object.__getattribute__(self, "in_pipeline"):
+            object.__setattr__(self, "trips", object.__getattribute__(self, "trips") + 1)
+        return object.__getattribute__(self, name)
+
+    def pipeline(self, transaction: bool = True) -> _CountingPipeline:
+        return _CountingPipeline(self)
+
+
+class TestBatchedAccess(unittest.TestCase):
+    def test_load_500_indexed_records_in_two_round_trips(self) -> None:
+        r = _CountingRedis()
+        store.load_indexed(r, "notice:bob")  # 记录族首次读取时回填一次
+        items = {f"notice:alice:n{i:03d}": {"notice_id": f"n{i:03d}", "created_at": float(i)} for i in range(500)}
+        store.save_many(r, items, indexes=("notice:alice",))
+
+        r.trips = 0
+        loaded = store.load_indexed(r, "notice:alice")
+        self.assertEqual((r.trips, len(loaded), loaded[0][1]["notice_id"]), (2, 500, "n499"))
+
+        store.delete_many(r, [f"notice:alice:n{i:03d}" for i in range(100)], indexes=("notice:alice",))
+        r.kv.pop("notice:alice:n499")  # 索引外被删除的 key 会在读取时移出索引
+        loaded = store.load_indexed(r, "notice:alice", limit=3)
+        self.assertEqual([data["notice_id"] for _, data in loaded], ["n498", "n497", "n496"])
+        self.assertNotIn("notice:alice:n499", r.zsets[store.keyset_index_key("notice:alice")])
+
+    def test_new_index_in_ready_family_does_not_scan(self) -> None:
+        r = _CountingRedis()
+        r.set("notice:alice:n1", json.dumps({"notice_id": "n1", "created_at": 1}))
+        self.assertEqual([k for k, _ in store.load_indexed(r, "notice:alice")], ["notice:alice:n1"])
+        store.save_many(r, {"notice:carol:n9": {"notice_id": "n9", "created_at": 9}}, indexes=("notice:carol",))
+        with mock.patch.object(r, "scan_iter", side_effect=AssertionError("rescanned")):
+            self.assertEqual([k for k, _ in store.load_indexed(r, "notice:carol")], ["notice:carol:n9"])
+            self.assertEqual(store.load_indexed(r, "notice:dave"), [])
+
+    def test_legacy_keys_backfilled(self) -> None:
+        r = _CountingRedis()
+        r.set("report:r1", json.dumps({"report_id": "r1", "created_at": 1}))
+        r.set("report:r2", json.dumps({"report_id": "r2", "created_at": 2}))
+        r.set("report:bad", "{")
+        self.assertEqual([k for k, _ in store.load_indexed(r, "report")], ["report:r2", "report:r1"])
+        r.trips = 0
+        store.load_indexed(r, "report")
+        self.assertEqual(r.trips, 2)
+
+    def test_legacy_comments_fill_resource_and_family_indexes(self) -> None:
+        r = _CountingRedis()
+        r.set("comment:dataset:d1:c1", json.dumps({"comment_id": "c1", "created_at": 1}))
+        r.set("comment:run:x:c2", json.dumps({"comment_id": "c2", "created_at": 2}))
+        self.assertEqual([k for k, _ in store.load_indexed(r, "comment:dataset:d1")], ["comment:dataset:d1:c1"])
+        with mock.patch.object(r, "scan_iter", side_effect=AssertionError("rescanned")):
+            self.assertEqual([k for k, _ in store.load_indexed(r, "comment")], ["comment:run:x:c2", "comment:dataset:d1:c1"])
+            self.assertEqual([k for k, _ in store.load_indexed(r, "comment:run:x")], ["comment:run:x:c2"])
+
+if __name__ == "__main__":
+    unittest.main()
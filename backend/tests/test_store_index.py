@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""Redis 二级索引：保存 / 删除维护 ZSET，列表走索引而非 KEYS，老数据首次列表时 SCAN 回填。"""
+from __future__ import annotations
+
+import fnmatch
+import json
+import unittest
+from unittest import mock
+
+from app import run_results, sql_store, store
+
+
+class _Pipeline:
+    def __init__(self, r: "_Redis") -> None:
+        self.r = r
+        self.ops: list[tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str):
+        return lambda *args, **kwargs: self.ops.append((name, args, kwargs))
+
+    def execute(self) -> list:
+        return [getattr(self.r, name)(*args, **kwargs) for name, args, kwargs in self.ops]
+
+
+class _Redis:
+    """只实现本测试用到的命令；KEYS 被调用即失败。"""
+
+    def __init__(self) -> None:
+        self.kv: dict[str, str] = {}
+        self.hashes: dict[str, dict[str, str]] = {}
+        self.zsets: dict[str, dict[str, float]] = {}
+
+    def pipeline(self, transaction: bool = True) -> _Pipeline:
+        return _Pipeline(self)
+
+    def keys(self, pattern: str):
+        raise AssertionError("KEYS must not be used")
+
+    def scan_iter(self, match: str, count: int = 10):
+        return [k for k in list(self.kv) if fnmatch.fnmatchcase(k, match)]
+
+    def get(self, key: str):
+        return self.kv.get(key)
+
+    def set(self, key: str, value: str) -> bool:
+        self.kv[key] = value
+        return True
+
+    def mget(self, keys: list[str]) -> list:
+        return [self.kv.get(k) for k in keys]
+
+    def exists(self, key: str) -> int:
+        return int(key in self.kv)
+
+    def delete(self, *keys: str) -> int:
+        return sum(1 for k in keys if self.kv.pop(k, None) is not None)
+
+    def hget(self, key: str, field: str):
+        return self.hashes.get(key, {}).get(field)
+
+    def hset(self, key: str, field: str, value: str) -> int:
+        self.hashes.setdefault(key, {})[field] = value
+        return 1
+
+    def hdel(self, key: str, field: str) -> int:
+        return int(self.hashes.get(key, {}).pop(field, None) is not None)
+
+    def zadd(self, key: str, mapping: dict[str, float]) -> int:
+        self.zsets.setdefault(key, {}).update(mapping)
+        return len(mapping)
+
+    def zrem(self, key: str, *members: str) -> int:
+        return sum(int(self.zsets.get(key, {}).pop(m, None) is not None) for m in members)
+
+    def zrevrange(self, key: str, start: int, end: int, withscores: bool = False) -> list:
+        items = sorted(self.zsets.get(key, {}).items(), key=lambda kv: kv[1], reverse=True)[start : None if end == -1 else end + 1]
+        return items if withscores else [m for m, _ in items]
+
+
+def _run(run_id: str, owner_id: str, created_at: float, status: str = "queued", visibility: str = "private") -> dict:
+    return {"run_id": run_id, "owner_id": owner_id, "visibility": visibility, "status": status, "created_at": created_at}
+
+
+class TestRedisIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.patches = [
+            mock.patch.object(sql_store, "is_enabled", return_value=False),
+            mock.patch.object(run_results, "record_run_results"),
+            mock.patch.object(run_results, "delete_run_results"),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self) -> None:
+        for p in self.patches:
+            p.stop()
+
+    def test_runs_listed_through_index(self) -> None:
+        r = _Redis()
+        store.save_run(r, "a1", _run("a1", "alice", 1))
+        store.save_run(r, "b1", _run("b1", "bob", 2))
+        store.save_run(r, "b2", _run("b2", "bob", 3, visibility="public"))
+        store.save_run(r, "s1", _run("s1", "system", 4))
+        store.save_run(r, "a2", _run("a2", "alice", 5, status="running"))
+
+        self.assertEqual([x["run_id"] for x in store.list_runs(r, owner_id="alice")], ["a2", "s1", "b2", "a1"])
+        self.assertEqual([x["run_id"] for x in store.list_runs(r, limit=2, owner_id="alice")], ["a2", "s1"])
+
+        store.save_run(r, "a2", _run("a2", "alice", 5, status="done"))
+        self.assertEqual([x["run_id"] for x in store.list_all_runs(r, status="done")], ["a2"])
+        self.assertEqual(store.list_all_runs(r, status="running"), [])
+        self.assertNotIn("a2", r.zsets[store.index_key("run", "status", "running")])
+
+        store.delete_run(r, "b2")
+        self.assertEqual([x["run_id"] for x in store.list_all_runs(r)], ["a2", "s1", "b1", "a1"])
+        self.assertNotIn("b2", r.zsets[store.index_key("run", "visibility", "public")])
+
+    def test_legacy_keys_backfilled_once(self) -> None:
+        r = _Redis()
+        r.set("dataset:d1", json.dumps({"dataset_id": "d1", "owner_id": "system", "created_at": 1}))
+        r.set("dataset:d2", json.dumps({"dataset_id": "d2", "owner_id": "bob", "visibility": "public", "created_at": 2}))
+        r.set("dataset:version:d1", "7")
+        self.assertEqual([x["dataset_id"] for x in store.list_datasets(r, owner_id="alice")], ["d1"])
+        self.assertEqual([x["dataset_id"] for x in store.list_datasets(r, owner_id="alice", include_public=True)], ["d2", "d1"])
+        self.assertTrue(r.exists(store.index_key("dataset", "ready")))
+        with mock.patch.object(store, "rebuild_redis_index") as rebuild:
+            store.list_all_datasets(r)
+        rebuild.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
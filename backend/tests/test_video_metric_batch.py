@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""视频逐帧指标：只有批量自定义指标才拼批，内置指标逐帧计算；尺寸变化时先结算当前批。"""
+from __future__ import annotations
+
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from app import tasks
+
+_BATCH_METRIC = {
+    "implementation_type": "python",
+    "code_text": (
+        "def compute_metric(gt, pred):\n"
+        "    return float(pred.reshape(-1)[:64].mean())\n"
+        "def compute_metric_batch(gt_batch, pred_batch):\n"
+        "    return pred_batch.reshape(len(pred_batch), -1)[:, :64].mean(axis=1)\n"
+    ),
+}
+_FRAME_METRIC = {"implementation_type": "python", "code_text": "def compute_metric(gt, pred):\n    return float(pred.reshape(-1)[:64].mean())\n"}
+
+
+class TestVideoMetricBatch(unittest.TestCase):
+    def _collect(self, shapes, selected, defs) -> list[int]:
+        sizes: list[int] = []
+        real_batch, real_sample = tasks._compute_metric_batch, tasks._compute_metric_sample
+
+        def batch(gt_stack, pred_stack, **kwargs):
+            sizes.append(int(gt_stack.shape[0]))
+            return real_batch(gt_stack, pred_stack, **kwargs)
+
+        def sample(gt, pred, **kwargs):
+            sizes.append(1)
+            return real_sample(gt, pred, **kwargs)
+
+        collector = tasks._FrameMetricCollector(
+            selected_metrics=selected, metric_defs=defs, task_type="video_denoise", sample_name="v", batch_frames=32
+        )
+        rng = np.random.default_rng(0)
+        with mock.patch.object(tasks, "_compute_metric_batch", side_effect=batch), mock.patch.object(
+            tasks, "_compute_metric_sample", side_effect=sample
+        ):
+            for shape in shapes:
+                collector.add(rng.integers(0, 256, shape, dtype=np.uint8), rng.integers(0, 256, shape, dtype=np.uint8))
+            collector.flush()
+        self.assertEqual(len(collector.frame_samples), len(shapes))
+        return sizes
+
+    def test_builtin_only_is_per_frame(self) -> None:
+        self.assertEqual(self._collect([(72, 128, 3)] * 4, ["PSNR", "SSIM"], {}), [1, 1, 1, 1])
+
+    def test_per_frame_custom_metric_is_not_batched(self) -> None:
+        self.assertEqual(self._collect([(72, 128, 3)] * 3, ["PSNR", "m"], {"m": _FRAME_METRIC}), [1, 1, 1])
+
+    def test_batch_custom_metric_batches_1080p(self) -> None:
+        sizes = self._collect([(1080, 1920, 3)] * 3, ["m"], {"m": _BATCH_METRIC})
+        self.assertEqual(sizes, [3])
+
+    def test_batch_matches_per_frame_values(self) -> None:
+        rng = np.random.default_rng(1)
+        gt = rng.integers(0, 256, (3, 48, 64, 3), dtype=np.uint8)
+        pred = rng.integers(0, 256, (3, 48, 64, 3), dtype=np.uint8)
+        names = ["a", "b", "c"]
+        batch = tasks._compute_metric_batch(
+            gt, pred, selected_metrics=["PSNR", "SSIM", "m"], metric_defs={"m": _BATCH_METRIC}, task_type="denoise", sample_names=names
+        )
+        for idx, (sample, custom, _timings) in enumerate(batch):
+            single, single_custom, _ = tasks._compute_metric_sample(
+                gt[idx], pred[idx], selected_metrics=["PSNR", "SSIM", "m"], metric_defs={"m": _BATCH_METRIC}, task_type="denoise", sample_name=names[idx]
+            )
+            self.assertEqual(sample, single)
+            self.assertEqual(custom, single_custom)
+
+    def test_limit_by_resolution(self) -> None:
+        self.assertGreater(tasks._video_metric_batch_limit(1080 * 1920 * 3, 32), 1)
+        self.assertEqual(tasks._video_metric_batch_limit(64 * 64 * 3, 32), 32)
+
+    def test_shape_change_flushes(self) -> None:
+        sizes = self._collect([(48, 64, 3)] * 3 + [(72, 128, 3)] * 2, ["m"], {"m": _BATCH_METRIC})
+        self.assertEqual(sizes, [3, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+把数据集的图像配对物化为内存映射原始张量，后续评测直接读取零拷贝视图而不再解码。
+用法：python backend/tools/materialize_dataset.py --dataset ds_demo [--owner system] [--task-type denoise]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def main() -> int:
+    repo_root = Path(__file__).resolve().parents[2]
+    sys.path.insert(0, str(repo_root))
+
+    from backend.app.vision.dataset_access import resolve_dataset_dir
+    from backend.app.vision.dataset_materialize import IMAGE_TASK_INPUT_DIRS, materialize_dataset, remove_materialized
+
+    parser = argparse.ArgumentParser(description="materialize dataset image pairs into memory-mapped raw tensors")
+    parser.add_argument("--dataset", required=True, help="dataset_id")
+    parser.add_argument("--owner", default="system", help="数据集所有者，默认 system")
+    parser.add_argument("--storage-path", default="", help="数据集不在默认目录时的实际路径")
+    parser.add_argument("--data-root", default=str(repo_root / "backend" / "data"))
+    parser.add_argument("--task-type", action="append", choices=sorted(IMAGE_TASK_INPUT_DIRS), help="可重复；默认全部图像任务")
+    parser.add_argument("--remove", action="store_true", help="删除已物化数据")
+    args = parser.parse_args()
+
+    data_root = Path(args.data_root).resolve()
+    if args.remove:
+        removed = remove_materialized(data_root, args.owner, args.dataset)
+        print(json.dumps({"ok": True, "removed": removed}, ensure_ascii=False))
+        return 0
+    ds_dir = resolve_dataset_dir(data_root, args.owner, args.dataset, args.storage_path or None)
+    if not ds_dir.is_dir():
+        print(json.dumps({"ok": False, "error": "dataset_dir_not_found", "path": str(ds_dir)}, ensure_ascii=False))
+        return 2
+    result = materialize_dataset(data_root, ds_dir, args.owner, args.dataset, args.task_type)
+    print(json.dumps({"ok": True, "dataset_id": args.dataset, "materialized": result}, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -27,83 +27,96 @@ def _load_redis_dict(raw: str | None) -> dict[str, Any] | None:
     return data if isinstance(data, dict) else None
 
 
+# 每批 SCAN 到的 key 用一次 MGET 读取，再用一条多行 upsert 写入 SQL
+BATCH_SIZE = 500
+
+
+def _default_record_id(required_field: str) -> Callable[[str, dict[str, Any]], str]:
+    def _inner(key: str, item: dict[str, Any]) -> str:
+        return str(item.get(required_field) or key.split(":", 1)[-1])
+
+    return _inner
+
+
 @dataclass(frozen=True)
 class MigrationSpec:
     name: str
     pattern: str
     required_field: str
-    save: Callable[[str, dict[str, Any]], None]
+    record_type: str
+    record_id: Callable[[str, dict[str, Any]], str] | None = None
     skip_if_key_contains: tuple[str, ...] = ()
 
-
-def _iter_items(pattern: str, required_field: str, skip_if_key_contains: tuple[str, ...] = ()) -> Iterable[tuple[str, dict[str, Any]]]:
-    r = make_redis()
-    for key in r.scan_iter(match=pattern):
-        if any(part in key for part in skip_if_key_contains):
-            continue
-        item = _load_redis_dict(r.get(key))
-        if not item or required_field not in item:
-            continue
-        yield str(item.get(required_field) or key.split(":", 1)[-1]), item
+    def item_id(self, key: str, item: dict[str, Any]) -> str:
+        return (self.record_id or _default_record_id(self.required_field))(key, item)
 
 
-def _save_record(record_type: str) -> Callable[[str, dict[str, Any]], None]:
-    def _inner(record_id: str, item: dict[str, Any]) -> None:
-        sql_store.save_record(record_type, record_id, item)
+def _iter_batches(spec: MigrationSpec, batch_size: int = BATCH_SIZE) -> Iterable[list[tuple[str, dict[str, Any]]]]:
+    r = make_redis()
 
-    return _inner
+    def _load(keys: list[str]) -> list[tuple[str, dict[str, Any]]]:
+        out: list[tuple[str, dict[str, Any]]] = []
+        for key, raw in zip(keys, r.mget(keys)):
+            item = _load_redis_dict(raw)
+            if item and spec.required_field in item:
+                out.append((spec.item_id(key, item), item))
+        return out
+
+    keys: list[str] = []
+    for key in r.scan_iter(match=spec.pattern, count=batch_size):
+        if any(part in key for part in spec.skip_if_key_contains):
+            continue
+        keys.append(key)
+        if len(keys) >= batch_size:
+            yield _load(keys)
+            keys = []
+    if keys:
+        yield _load(keys)
 
 
-def _save_comment_record(_: str, item: dict[str, Any]) -> None:
-    record_id = ":".join(
+def _comment_record_id(_: str, item: dict[str, Any]) -> str:
+    return ":".join(
         [
             str(item.get("resource_type") or ""),
             str(item.get("resource_id") or ""),
             str(item.get("comment_id") or ""),
         ]
     )
-    sql_store.save_record("comment", record_id, item)
 
 
-def _save_notice_record(_: str, item: dict[str, Any]) -> None:
-    record_id = ":".join([str(item.get("username") or ""), str(item.get("notice_id") or "")])
-    sql_store.save_record("notice", record_id, item)
+def _notice_record_id(_: str, item: dict[str, Any]) -> str:
+    return ":".join([str(item.get("username") or ""), str(item.get("notice_id") or "")])
 
 
 def _migration_specs() -> list[MigrationSpec]:
     return [
-        MigrationSpec("runs", "run:*", "run_id", _save_record("run")),
+        MigrationSpec("runs", "run:*", "run_id", "run"),
         MigrationSpec(
             "datasets",
             "dataset:*",
             "dataset_id",
-            _save_record("dataset"),
+            "dataset",
             skip_if_key_contains=(":version:", ":fs_hash:", ":scan:"),
         ),
-        MigrationSpec("algorithms", "algorithm:*", "algorithm_id", sql_store.save_algorithm),
-        MigrationSpec("presets", "preset:*", "preset_id", _save_record("preset")),
-        MigrationSpec("metrics", "metric:*", "metric_id", _save_record("metric")),
-        MigrationSpec("algorithm_submissions", "algorithm_submission:*", "submission_id", sql_store.save_algorithm_submission),
-        MigrationSpec("users", "user:*", "username", _save_record("user")),
-        MigrationSpec("comments", "comment:*:*:*", "comment_id", _save_comment_record),
-        MigrationSpec("notices", "notice:*:*", "notice_id", _save_notice_record),
-        MigrationSpec("reports", "report:*", "report_id", _save_record("report")),
+        MigrationSpec("algorithms", "algorithm:*", "algorithm_id", "algorithm"),
+        MigrationSpec("presets", "preset:*", "preset_id", "preset"),
+        MigrationSpec("metrics", "metric:*", "metric_id", "metric"),
+        MigrationSpec("algorithm_submissions", "algorithm_submission:*", "submission_id", "algorithm_submission"),
+        MigrationSpec("users", "user:*", "username", "user"),
+        MigrationSpec("comments", "comment:*:*:*", "comment_id", "comment", record_id=_comment_record_id),
+        MigrationSpec("notices", "notice:*:*", "notice_id", "notice", record_id=_notice_record_id),
+        MigrationSpec("reports", "report:*", "report_id", "report"),
     ]
 
 
 def migrate_spec(spec: MigrationSpec, dry_run: bool = False) -> tuple[int, int]:
     migrated = 0
     skipped = 0
-    for item_id, item in _iter_items(spec.pattern, spec.required_field, spec.skip_if_key_contains):
+    for batch in _iter_batches(spec):
         if dry_run:
-            migrated += 1
+            migrated += len(batch)
             continue
-        try:
-            spec.save(item_id, item)
-            migrated += 1
-        except Exception:
-            skipped += 1
-            raise
+        migrated += sql_store.save_records(spec.record_type, batch)
     return migrated, skipped
 
 